@@ -0,0 +1,115 @@
+/**
+ * Bulk Estimates Endpoint Tests
+ *
+ * Testing POST /api/v1/estimates/bulk:
+ * - ids and filter targets
+ * - per-item results (success / not_found / forbidden / skipped)
+ * - affected rows cap
+ */
+
+process.env.ESTIMATES_BULK_LIMIT = '5';
+
+const request = require('supertest');
+const express = require('express');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const SQLiteStorage = require('../../storage/SQLiteStorage');
+const { generateToken } = require('../../middleware/jwt-auth');
+const estimatesRoutes = require('../../routes/api-v1/estimates');
+
+describe('POST /api/v1/estimates/bulk', () => {
+    let app;
+    let storage;
+    let dir;
+
+    const admin = { id: 'admin-user-id', username: 'admin', role: 'admin', organization_id: 'default-org' };
+    const member = { id: 'member-id', username: 'member', role: 'user', organization_id: 'default-org' };
+
+    const bulk = (user, body) => request(app)
+        .post('/api/v1/estimates/bulk')
+        .set('Authorization', `Bearer ${generateToken(user)}`)
+        .send(body);
+
+    const row = (id) => storage.db.prepare('SELECT * FROM estimates WHERE id = ?').get(id);
+
+    beforeEach(async () => {
+        dir = fs.mkdtempSync(path.join(os.tmpdir(), 'bulk-'));
+        storage = new SQLiteStorage({
+            dbPath: path.join(dir, 'bulk.db'),
+            schemaPath: path.join(__dirname, '..', '..', 'db', 'schema.sql'),
+            userId: 'admin-user-id',
+            organizationId: 'default-org'
+        });
+        await storage.init();
+
+        for (const id of ['e1', 'e2', 'e3']) {
+            await storage.saveEstimate(id, { clientName: `ACME ${id}` });
+        }
+
+        app = express();
+        app.use(express.json());
+        app.locals.storage = storage;
+        app.use('/api/v1/estimates', estimatesRoutes);
+    });
+
+    afterEach(async () => {
+        await storage.close();
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+
+    test('should apply action to id list with per-item results', async () => {
+        const res = await bulk(admin, { action: 'delete', ids: ['e1', 'e2', 'missing'] });
+
+        expect(res.status).toBe(200);
+        expect(res.body.data.affected).toBe(2);
+        expect(res.body.data.results).toEqual([
+            { id: 'e1', status: 'success' },
+            { id: 'e2', status: 'success' },
+            { id: 'missing', status: 'not_found' }
+        ]);
+        expect(row('e1').deleted_at).not.toBe(null);
+        expect(row('e3').deleted_at).toBe(null);
+    });
+
+    test('should select targets with list filters', async () => {
+        const res = await bulk(admin, {
+            action: 'visibility', visibility: 'organization', filter: { client_name: 'e2' }
+        });
+
+        expect(res.body.data.matched).toBe(1);
+        expect(row('e2').visibility).toBe('organization');
+        expect(row('e1').visibility).toBe('private');
+    });
+
+    test('should report forbidden and skipped items', async () => {
+        const forbidden = await bulk(member, { action: 'delete', ids: ['e1'] });
+        expect(forbidden.body.data.results[0].status).toBe('forbidden');
+        expect(row('e1').deleted_at).toBe(null);
+
+        const restore = await bulk(admin, { action: 'restore', ids: ['e1'] });
+        expect(restore.body.data.results[0]).toEqual({ id: 'e1', status: 'skipped', reason: 'not_deleted' });
+    });
+
+    test('should flag templates', async () => {
+        await bulk(admin, { action: 'template', ids: ['e3'], template_name: 'Base tour' });
+
+        expect(row('e3').is_template).toBe(1);
+        expect(row('e3').template_name).toBe('Base tour');
+    });
+
+    test('should reject requests over the cap without changes', async () => {
+        const ids = ['e1', 'e2', 'e3', 'a', 'b', 'c'];
+        const res = await bulk(admin, { action: 'delete', ids });
+
+        expect(res.status).toBe(400);
+        expect(res.body.code).toBe('BULK_LIMIT_EXCEEDED');
+        expect(row('e1').deleted_at).toBe(null);
+    });
+
+    test('should validate action and target', async () => {
+        expect((await bulk(admin, { action: 'purge', ids: ['e1'] })).status).toBe(400);
+        expect((await bulk(admin, { action: 'delete', ids: ['e1'], filter: {} })).status).toBe(400);
+        expect((await bulk(admin, { action: 'share', ids: ['e1'] })).status).toBe(400);
+    });
+});
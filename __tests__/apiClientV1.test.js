@@ -0,0 +1,146 @@
+/**
+ * Тесты для слоя запросов APIClientV1
+ * Общие GET в полёте, stale-while-revalidate, таймауты, лимит параллельных запросов и повторы
+ */
+
+const APIClientV1 = require('../js/APIClientV1');
+
+function jsonResponse(body, status = 200) {
+    return {
+        ok: status < 400,
+        status,
+        json: async () => body,
+        text: async () => JSON.stringify(body)
+    };
+}
+
+// fetch, который отвечает только по команде (и уважает AbortSignal)
+function deferredFetch() {
+    const calls = [];
+    global.fetch = jest.fn((url, options) => new Promise((resolve, reject) => {
+        calls.push({ url, options, resolve });
+        options.signal.addEventListener('abort', () => reject(new Error('aborted')));
+    }));
+    return calls;
+}
+
+const tick = () => new Promise(resolve => setTimeout(resolve, 0));
+
+describe('APIClientV1 request layer', () => {
+    let client;
+
+    beforeEach(() => {
+        global.localStorage = {
+            getItem: () => null,
+            setItem: () => {},
+            removeItem: () => {}
+        };
+        APIClientV1.limiters.clear();
+        client = new APIClientV1();
+        client.token = 'token-1';
+    });
+
+    afterEach(() => {
+        delete global.fetch;
+        delete global.localStorage;
+    });
+
+    test('should share identical GET requests in flight', async () => {
+        const calls = deferredFetch();
+
+        const first = client.getCatalog('c1');
+        const second = client.getCatalog('c1');
+        await tick();
+
+        expect(global.fetch).toHaveBeenCalledTimes(1);
+        calls[0].resolve(jsonResponse({ success: true, data: { id: 'c1' } }));
+
+        expect(await first).toBe(await second);
+        expect(client.inflight.size).toBe(0);
+    });
+
+    test('should serve stale response and revalidate in background', async () => {
+        global.fetch = jest.fn(async () => jsonResponse({ success: true, data: { version: global.fetch.mock.calls.length } }));
+
+        const fresh = await client.getEstimate('e1');
+        expect((await client.getEstimate('e1'))).toBe(fresh);
+        expect(global.fetch).toHaveBeenCalledTimes(1);
+
+        for (const entry of client.responseCache.values()) {
+            entry.fetchedAt -= client.REQUEST_CONFIG.CACHE_FRESH_MS + 1;
+        }
+
+        expect(await client.getEstimate('e1')).toBe(fresh);
+        await tick();
+        expect(global.fetch).toHaveBeenCalledTimes(2);
+        expect((await client.getEstimate('e1')).data.version).toBe(2);
+    });
+
+    test('should invalidate cached resource after a write', async () => {
+        global.fetch = jest.fn(async () => jsonResponse({ success: true, data: {} }));
+
+        await client.getEstimate('e1');
+        await client.updateEstimate('e1', '{}', 1);
+        await client.getEstimate('e1');
+
+        expect(global.fetch).toHaveBeenCalledTimes(3);
+    });
+
+    test('should drop every cached resource after sync batch and import', async () => {
+        global.fetch = jest.fn(async () => jsonResponse({ success: true, data: {} }));
+
+        await client.getEstimate('e1');
+        await client.getCatalog('c1');
+        expect(client.responseCache.size).toBe(2);
+        await client.syncBatch([]);
+        expect(client.responseCache.size).toBe(0);
+
+        await client.getSettings();
+        await client.importFull({}, 'merge');
+        expect(client.responseCache.size).toBe(0);
+    });
+
+    test('should abort request after timeout', async () => {
+        deferredFetch();
+
+        const result = await client._fetch('/api/v1/estimates/slow', { auth: true, timeout: 10, retries: 0 });
+
+        expect(result.success).toBe(false);
+        expect(result.timeout).toBe(true);
+    });
+
+    test('should limit concurrent requests per origin', async () => {
+        client.REQUEST_CONFIG.MAX_CONCURRENT = 2;
+        const calls = deferredFetch();
+
+        const requests = ['a', 'b', 'c', 'd'].map(id => client.getCatalog(id));
+        await tick();
+        expect(global.fetch).toHaveBeenCalledTimes(2);
+
+        calls[0].resolve(jsonResponse({ success: true }));
+        await tick();
+        await tick();
+        expect(global.fetch).toHaveBeenCalledTimes(3);
+
+        calls[1].resolve(jsonResponse({ success: true }));
+        await tick();
+        await tick();
+        calls[2].resolve(jsonResponse({ success: true }));
+        calls[3].resolve(jsonResponse({ success: true }));
+        await Promise.all(requests);
+        expect(global.fetch).toHaveBeenCalledTimes(4);
+    });
+
+    test('should retry GET on gateway errors but not writes', async () => {
+        client.REQUEST_CONFIG.RETRY_BASE_MS = 1;
+        const responses = [jsonResponse({}, 503), jsonResponse({ success: true, data: [] })];
+        global.fetch = jest.fn(async () => responses.shift());
+
+        expect((await client.getUsers()).success).toBe(true);
+        expect(global.fetch).toHaveBeenCalledTimes(2);
+
+        global.fetch = jest.fn(async () => jsonResponse({}, 503));
+        expect((await client.saveCatalog({})).status).toBe(503);
+        expect(global.fetch).toHaveBeenCalledTimes(1);
+    });
+});
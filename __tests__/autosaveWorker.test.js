@@ -0,0 +1,96 @@
+/**
+ * Тесты для AutosaveWorker
+ * Дельта снимков должна восстанавливать смету через applyOverrides; на сервер уходит
+ * только дельта, а при конфликте версий - полная смета
+ */
+
+const { AutosaveWorker, diffQuote } = require('../js/AutosaveWorker');
+const { applyOverrides } = require('../utils/estimateOverrides');
+
+function jsonResponse(status, body) {
+    return { ok: status < 400, status, json: async () => body };
+}
+
+function mockFetch(responses) {
+    global.fetch = jest.fn(async () => responses.shift());
+}
+
+describe('diffQuote', () => {
+    const quote = {
+        clientName: 'ACME',
+        paxCount: 10,
+        services: [{ id: 's1', price: 100 }, { id: 's2', price: 40 }],
+        notes: 'draft'
+    };
+
+    test('should return null for unchanged snapshot', () => {
+        expect(diffQuote(quote, JSON.parse(JSON.stringify(quote)))).toBe(null);
+    });
+
+    test('should encode field edits and replace resized arrays', () => {
+        const next = JSON.parse(JSON.stringify(quote));
+        next.services[1].price = 55;
+        next.clientEmail = 'a@b.c';
+        next.notes = undefined;
+
+        const changes = diffQuote(quote, next);
+        expect(changes.set).toEqual([[['services', 1, 'price'], 55], [['clientEmail'], 'a@b.c']]);
+        expect(changes.unset).toEqual([['notes']]);
+        expect(applyOverrides(quote, changes)).toEqual(JSON.parse(JSON.stringify(next)));
+
+        next.services.push({ id: 's3', price: 80 });
+        expect(diffQuote(quote, next).set[0]).toEqual([['services'], next.services]);
+    });
+});
+
+describe('AutosaveWorker.save', () => {
+    let scope;
+    let worker;
+    const quote = { id: 'est-1', clientName: 'ACME', services: [{ id: 's1', price: 100 }] };
+
+    beforeEach(() => {
+        scope = { postMessage: jest.fn() };
+        worker = new AutosaveWorker(scope);
+    });
+
+    afterEach(() => {
+        delete global.fetch;
+    });
+
+    test('should send full estimate first, then only changes', async () => {
+        mockFetch([
+            jsonResponse(200, { success: true, dataVersion: 1 }),
+            jsonResponse(200, { success: true, dataVersion: 2 })
+        ]);
+
+        await worker.save('est-1', quote, '');
+        await worker.save('est-1', { ...quote, services: [{ id: 's1', price: 120 }] }, '');
+        await worker.save('est-1', { ...quote, services: [{ id: 's1', price: 120 }] }, '');
+
+        expect(global.fetch).toHaveBeenCalledTimes(2);
+        expect(global.fetch.mock.calls[0][1].method).toBe('POST');
+
+        const [url, request] = global.fetch.mock.calls[1];
+        const body = JSON.parse(request.body);
+        expect(url).toBe('/api/estimates/est-1');
+        expect(request.method).toBe('PATCH');
+        expect(body.baseVersion).toBe(1);
+        expect(body.set[0]).toEqual([['services', 0, 'price'], 120]);
+        expect(scope.postMessage.mock.calls[1][0]).toEqual({ type: 'saved', id: 'est-1', mode: 'patch', dataVersion: 2 });
+    });
+
+    test('should fall back to full save on version conflict', async () => {
+        mockFetch([
+            jsonResponse(200, { success: true, dataVersion: 1 }),
+            jsonResponse(409, { success: false, code: 'CONFLICT' }),
+            jsonResponse(200, { success: true, dataVersion: 4 })
+        ]);
+
+        await worker.save('est-1', quote, '');
+        await worker.save('est-1', { ...quote, clientName: 'Other' }, '');
+
+        expect(global.fetch).toHaveBeenCalledTimes(3);
+        expect(global.fetch.mock.calls[2][1].method).toBe('POST');
+        expect(worker.serverSnapshots.get('est-1').dataVersion).toBe(4);
+    });
+});
@@ -0,0 +1,145 @@
+/**
+ * Тесты для CacheManager
+ * Байтовый бюджет с LRU вытеснением, перенос старого кэша из localStorage и пакетная запись last_accessed.
+ * В node нет IndexedDB - записи лежат в MemoryEntryStore
+ */
+
+const CacheManager = require('../js/CacheManager');
+
+// localStorage поверх Map
+function memoryStorage(initial = {}) {
+    const items = new Map(Object.entries(initial).map(([key, value]) => [key, JSON.stringify(value)]));
+    return {
+        items,
+        getItem: key => (items.has(key) ? items.get(key) : null),
+        setItem: (key, value) => items.set(key, String(value)),
+        removeItem: key => items.delete(key)
+    };
+}
+
+// 41 байт в JSON
+const payload = id => ({ text: `${id}`.padEnd(30, 'x') });
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+describe('CacheManager', () => {
+    let cache;
+
+    beforeEach(async () => {
+        global.localStorage = memoryStorage();
+        cache = new CacheManager();
+        await cache.ready;
+    });
+
+    afterEach(() => {
+        cache._flushTouches();
+        delete global.localStorage;
+    });
+
+    test('should fall back to the memory entry store without IndexedDB', async () => {
+        await cache.cacheEstimate('e1', payload('e1'), 3);
+
+        const cached = await cache.getCachedEstimate('e1');
+        expect(cached.data).toEqual(payload('e1'));
+        expect(cached.data_version).toBe(3);
+        expect((await cache.getStats()).backend).toBe('memory');
+        expect(cache.bytesUsed).toBe(41);
+    });
+
+    test('should evict least recently used entries to stay within the byte budget', async () => {
+        cache.CACHE_CONFIG.MAX_BYTES = 100;
+
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+        await cache.cacheCatalog('c1', payload('c1'), 1);
+        await cache.getCachedEstimate('e1');
+        await cache.cacheEstimate('e2', payload('e2'), 1);
+
+        expect([...cache.entries.keys()]).toEqual(['estimate:e1', 'estimate:e2']);
+        expect([...cache.store.meta.keys()].sort()).toEqual(['estimate:e1', 'estimate:e2']);
+        expect(cache.store.data.has('catalog:c1')).toBe(false);
+        expect(cache.bytesUsed).toBe(82);
+        expect(await cache.getCachedCatalog('c1')).toBe(null);
+    });
+
+    test('should count replaced entries once', async () => {
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+        await cache.cacheEstimate('e1', { text: 'short' }, 2);
+
+        expect(cache.bytesUsed).toBe(JSON.stringify({ text: 'short' }).length);
+        expect((await cache.getCachedEstimate('e1')).data_version).toBe(2);
+    });
+
+    test('should not cache entries larger than the whole budget', async () => {
+        cache.CACHE_CONFIG.MAX_BYTES = 100;
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+
+        await cache.cacheEstimate('huge', { text: 'x'.repeat(200) }, 1);
+
+        expect(await cache.getCachedEstimate('huge')).toBe(null);
+        expect([...cache.entries.keys()]).toEqual(['estimate:e1']);
+    });
+
+    test('should add server updates only while there is free space', async () => {
+        cache.CACHE_CONFIG.MAX_BYTES = 100;
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+        await cache.cacheEstimate('e2', payload('e2'), 1);
+
+        await cache.addToCacheIfSpace('estimate', { id: 'e3', data_version: 1 });
+
+        expect(await cache.getCachedEstimate('e3')).toBe(null);
+        expect(cache.entries.size).toBe(2);
+    });
+
+    test('should migrate legacy localStorage caches into the entry store', async () => {
+        global.localStorage = memoryStorage({
+            estimates_full: {
+                e1: { id: 'e1', data: payload('e1'), data_version: 4 },
+                broken: null
+            },
+            catalogs: {
+                c1: { id: 'c1', data: payload('c1'), data_version: 2 }
+            }
+        });
+
+        cache = new CacheManager();
+        await cache.ready;
+
+        expect((await cache.getCachedEstimate('e1')).data_version).toBe(4);
+        expect((await cache.getCachedCatalog('c1')).data).toEqual(payload('c1'));
+        expect(cache.entries.size).toBe(2);
+        expect(localStorage.getItem('estimates_full')).toBe(null);
+        expect(localStorage.getItem('catalogs')).toBe(null);
+        // Остальные ключи localStorage не тронуты
+        expect(JSON.parse(localStorage.getItem('cache_metadata')).version).toBe('1.1.0');
+    });
+
+    test('should batch last_accessed writes', async () => {
+        cache.CACHE_CONFIG.TOUCH_FLUSH_MS = 5;
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+        await cache.cacheEstimate('e2', payload('e2'), 1);
+
+        const writeMeta = cache.store.writeMeta.bind(cache.store);
+        cache.store.writeMeta = jest.fn(metas => writeMeta(metas));
+
+        for (let i = 0; i < 3; i++) {
+            await cache.getCachedEstimate('e1');
+            await cache.getCachedEstimate('e2');
+        }
+        expect(cache.store.writeMeta).toHaveBeenCalledTimes(0);
+
+        await sleep(20);
+
+        expect(cache.store.writeMeta).toHaveBeenCalledTimes(1);
+        expect(cache.store.writeMeta.mock.calls[0][0].map(meta => meta.key)).toEqual(['estimate:e1', 'estimate:e2']);
+        expect(cache.pendingTouches.size).toBe(0);
+    });
+
+    test('should move read entries to the end of the LRU order', async () => {
+        await cache.cacheEstimate('e1', payload('e1'), 1);
+        await cache.cacheEstimate('e2', payload('e2'), 1);
+
+        await cache.getCachedEstimate('e1');
+
+        expect([...cache.entries.keys()]).toEqual(['estimate:e2', 'estimate:e1']);
+    });
+});
@@ -0,0 +1,111 @@
+/**
+ * Тесты для CatalogSync
+ * Delta-синхронизация каталога поверх SQLiteStorage (patchCatalog / getCatalogChanges)
+ */
+
+const CatalogSync = require('../js/CatalogSync');
+const { createTestStorage, removeTestStorage } = require('./helpers/storage-setup');
+
+// APIClient поверх хранилища: те же методы и формат ответов, что у routes/api-v1/catalogs.js
+function fakeApiClient(storage) {
+    return {
+        getCatalogChanges: jest.fn(async (id, since) => ({ success: true, data: await storage.getCatalogChanges(id, since) })),
+        patchCatalog: jest.fn(async (id, baseVersion, changes) => ({ success: true, ...(await storage.patchCatalog(id, baseVersion, changes)) })),
+        saveCatalog: jest.fn(async (name, data) => ({ success: true, ...(await storage.saveCatalog(name, data)) }))
+    };
+}
+
+function catalog(templates) {
+    return {
+        version: '1.2.0',
+        region: 'Ushuaia',
+        templates,
+        categories: [{ id: 'undefined', name: 'Не определено', system: true }]
+    };
+}
+
+describe('CatalogSync', () => {
+    let storage;
+    let testDb;
+    let api;
+    let sync;
+    let catalogId;
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('catalog-sync');
+        storage = testDb.storage;
+
+        ({ id: catalogId } = await storage.saveCatalog('Ushuaia', catalog([{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }])));
+        api = fakeApiClient(storage);
+        sync = new CatalogSync(api, null);
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should load a full catalog and then only changes', async () => {
+        expect(await sync.load(catalogId)).toEqual(catalog([{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }]));
+
+        await storage.patchCatalog(catalogId, 1, { templates: { upsert: [{ id: 't3', name: 'Boat' }], delete: ['t1'] } });
+        const data = await sync.load(catalogId);
+
+        expect(api.getCatalogChanges.mock.calls[1]).toEqual([catalogId, 1]);
+        expect(data.templates.map(t => t.id)).toEqual(['t2', 't3']);
+    });
+
+    test('should send only changed templates', async () => {
+        await sync.load(catalogId);
+
+        const result = await sync.save('Ushuaia', catalog([{ id: 't1', name: 'Hotel 5*' }, { id: 't2', name: 'Transfer' }, { id: 't3' }]), { catalogId });
+
+        expect(result.mode).toBe('patch');
+        expect(result.merged).toBe(false);
+        expect(api.patchCatalog.mock.calls[0][2]).toEqual({
+            templates: { upsert: [{ id: 't1', name: 'Hotel 5*' }, { id: 't3' }], delete: [] }
+        });
+        expect((await storage.loadCatalogById(catalogId)).templates.map(t => t.name))
+            .toEqual(['Hotel 5*', 'Transfer', undefined]);
+    });
+
+    test('should skip saving an unchanged catalog', async () => {
+        await sync.load(catalogId);
+
+        const result = await sync.save('Ushuaia', { ...catalog([{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }]), updated_at: 'now' }, { catalogId });
+        expect(result.mode).toBe('unchanged');
+        expect(api.patchCatalog.mock.calls.length).toBe(0);
+    });
+
+    test('should fall back to a full save when templates are reordered', async () => {
+        await sync.load(catalogId);
+
+        const result = await sync.save('Ushuaia', catalog([{ id: 't2', name: 'Transfer' }, { id: 't1', name: 'Hotel' }]), { catalogId });
+
+        expect(result.mode).toBe('full');
+        expect(api.saveCatalog.mock.calls.length).toBe(1);
+        expect((await storage.loadCatalogById(catalogId)).templates.map(t => t.id)).toEqual(['t2', 't1']);
+    });
+
+    test('should merge edits of other clients', async () => {
+        await sync.load(catalogId);
+        await storage.patchCatalog(catalogId, 1, { templates: { upsert: [{ id: 't2', name: 'Transfer VIP' }] } });
+
+        const result = await sync.save('Ushuaia', catalog([{ id: 't1', name: 'Hotel 5*' }, { id: 't2', name: 'Transfer' }]), { catalogId });
+
+        expect(result.merged).toBe(true);
+        expect(result.data.templates).toEqual([{ id: 't1', name: 'Hotel 5*' }, { id: 't2', name: 'Transfer VIP' }]);
+    });
+
+    test('should rebase and retry on a conflict for the same template', async () => {
+        await sync.load(catalogId);
+        await storage.patchCatalog(catalogId, 1, {
+            templates: { upsert: [{ id: 't1', name: 'Hotel A' }, { id: 't4', name: 'Guide' }] }
+        });
+
+        const result = await sync.save('Ushuaia', catalog([{ id: 't1', name: 'Hotel B' }, { id: 't2', name: 'Transfer' }]), { catalogId });
+
+        expect(api.patchCatalog.mock.calls.length).toBe(2);
+        expect(result.merged).toBe(true);
+        expect(result.data.templates).toEqual([{ id: 't1', name: 'Hotel B' }, { id: 't2', name: 'Transfer' }, { id: 't4', name: 'Guide' }]);
+    });
+});
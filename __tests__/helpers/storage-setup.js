@@ -0,0 +1,71 @@
+/**
+ * SQLiteStorage Setup Helper for Tests
+ *
+ * Временная БД на актуальной db/schema.sql (без миграций, в отличие от
+ * db-setup.js) в отдельном tmpdir - по одной на тест.
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const SQLiteStorage = require('../../storage/SQLiteStorage');
+
+const SCHEMA_PATH = path.join(__dirname, '..', '..', 'db', 'schema.sql');
+
+const DEFAULT_OPTIONS = {
+    userId: 'admin-user-id',
+    organizationId: 'default-org'
+};
+
+async function openStorage(testDb) {
+    testDb.storage = new SQLiteStorage({
+        dbPath: testDb.dbPath,
+        schemaPath: SCHEMA_PATH,
+        ...testDb.options
+    });
+    await testDb.storage.init();
+    return testDb.storage;
+}
+
+/**
+ * Создать и инициализировать SQLiteStorage во временном каталоге
+ * @param {string} prefix - Префикс каталога и имя файла БД
+ * @param {Object} [options] - Дополнительные параметры SQLiteStorage (userId, organizationId, ...)
+ * @returns {Promise<{storage: SQLiteStorage, dir: string, dbPath: string, options: Object}>}
+ */
+async function createTestStorage(prefix, options = {}) {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), `${prefix}-`));
+    const testDb = {
+        storage: null,
+        dir,
+        dbPath: path.join(dir, `${prefix}.db`),
+        options: { ...DEFAULT_OPTIONS, ...options }
+    };
+
+    await openStorage(testDb);
+    return testDb;
+}
+
+/**
+ * Закрыть и открыть ту же БД заново (проверки backfill в init)
+ * @returns {Promise<SQLiteStorage>} Новый экземпляр (также testDb.storage)
+ */
+async function reopenTestStorage(testDb) {
+    await testDb.storage.close();
+    return openStorage(testDb);
+}
+
+/**
+ * Закрыть storage и удалить временный каталог
+ */
+async function removeTestStorage(testDb) {
+    await testDb.storage.close();
+    fs.rmSync(testDb.dir, { recursive: true, force: true });
+}
+
+module.exports = {
+    SCHEMA_PATH,
+    createTestStorage,
+    reopenTestStorage,
+    removeTestStorage
+};
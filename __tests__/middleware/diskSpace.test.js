@@ -0,0 +1,34 @@
+/**
+ * Disk Space Middleware Tests
+ *
+ * Testing:
+ * - Projection of write size from Content-Length
+ * - Cached sample used by health check
+ */
+
+const {
+    getDiskSpaceInfo,
+    sampleDiskSpace,
+    projectWriteSizeMB
+} = require('../../middleware/diskSpace');
+
+describe('Disk space sampler', () => {
+    test('should project write size from Content-Length with safety factor', () => {
+        const req = { headers: { 'content-length': String(10 * 1024 * 1024) } };
+        expect(projectWriteSizeMB(req)).toBe(20);
+    });
+
+    test('should project zero without Content-Length', () => {
+        expect(projectWriteSizeMB({ headers: {} })).toBe(0);
+        expect(projectWriteSizeMB({ headers: { 'content-length': 'abc' } })).toBe(0);
+    });
+
+    test('should serve health info from cached sample', async () => {
+        const sample = await sampleDiskSpace();
+        const info = getDiskSpaceInfo();
+
+        expect(info.freeSpaceMB).toBe(Math.floor(sample.freeSpaceMB));
+        expect(info.sampledAt).toBe(new Date(sample.sampledAt).toISOString());
+        expect(info.sampleAgeMs).toBeGreaterThanOrEqual(0);
+    });
+});
@@ -0,0 +1,136 @@
+/**
+ * Large JSON Body Middleware Tests
+ *
+ * Testing:
+ * - Inline parsing for small bodies, worker pool for large ones
+ * - Per-route limits (Content-Length and streamed)
+ * - Validation errors from the worker
+ */
+
+const { PassThrough } = require('stream');
+const { largeJsonBody, parseSize } = require('../../middleware/largeJsonBody');
+const JsonParserPool = require('../../services/JsonParserPool');
+
+function fakeRequest(method, path, body, headers = {}) {
+    const req = new PassThrough();
+    req.method = method;
+    req.path = path;
+    req.headers = { 'content-type': 'application/json', ...headers };
+    process.nextTick(() => req.end(body));
+    return req;
+}
+
+function fakeResponse() {
+    return {
+        statusCode: 200,
+        body: null,
+        headers: {},
+        status(code) { this.statusCode = code; return this; },
+        set(name, value) { this.headers[name] = value; return this; },
+        json(body) { this.body = body; this.resolve(); return this; }
+    };
+}
+
+function run(middleware, req) {
+    return new Promise((resolve) => {
+        const res = fakeResponse();
+        res.resolve = () => resolve({ req, res, nextCalled: false });
+        middleware(req, res, (err) => resolve({ req, res, nextCalled: true, err }));
+    });
+}
+
+describe('largeJsonBody', () => {
+    let pool;
+    let middleware;
+
+    beforeAll(() => {
+        pool = new JsonParserPool({ size: 1 });
+        middleware = largeJsonBody([
+            { method: 'POST', path: '/api/import/all', limit: '1mb', validate: 'import' },
+            { method: 'POST', path: /^\/api\/estimates\/[^/]+$/, limit: '64kb' }
+        ], { pool, inlineLimit: '1kb' });
+    });
+
+    afterAll(async () => {
+        await pool.close();
+    });
+
+    test('should parse sizes with units', () => {
+        expect(parseSize('256kb')).toBe(262144);
+        expect(parseSize('1.5mb')).toBe(1572864);
+        expect(parseSize(100)).toBe(100);
+    });
+
+    test('should parse small bodies in-thread', async () => {
+        const req = fakeRequest('POST', '/api/estimates/e1', JSON.stringify({ a: 1 }));
+        const { nextCalled } = await run(middleware, req);
+
+        expect(nextCalled).toBe(true);
+        expect(req.body).toEqual({ a: 1 });
+        expect(req._body).toBe(true);
+        expect(pool.getStats().parsed).toBe(0);
+    });
+
+    test('should parse large bodies in the worker pool', async () => {
+        const services = Array.from({ length: 200 }, (_, i) => ({ id: i, name: `service-${i}` }));
+        const body = JSON.stringify({ version: '1.0', data: { services } });
+        const req = fakeRequest('POST', '/api/import/all', body);
+        const { nextCalled } = await run(middleware, req);
+
+        expect(nextCalled).toBe(true);
+        expect(req.body.data.services.length).toBe(200);
+        expect(pool.getStats().parsed).toBe(1);
+    });
+
+    test('should not run JSON.parse on the main thread for large bodies', async () => {
+        const body = JSON.stringify({ version: '1.0', data: { padding: 'x'.repeat(2048) } });
+        const req = fakeRequest('POST', '/api/import/all', body);
+
+        const parse = JSON.parse;
+        const mainThreadParses = [];
+        JSON.parse = (text, ...rest) => {
+            mainThreadParses.push(String(text).length);
+            return parse(text, ...rest);
+        };
+
+        let result;
+        try {
+            result = await run(middleware, req);
+        } finally {
+            JSON.parse = parse;
+        }
+
+        expect(result.nextCalled).toBe(true);
+        expect(req.body.data.padding.length).toBe(2048);
+        expect(mainThreadParses.filter(length => length >= body.length)).toEqual([]);
+        expect(pool.getStats().workerParseMs).toBeGreaterThan(0);
+    });
+
+    test('should return 400 when worker validation fails', async () => {
+        const req = fakeRequest('POST', '/api/import/all', JSON.stringify({ padding: 'x'.repeat(2048) }));
+        const { res, nextCalled } = await run(middleware, req);
+
+        expect(nextCalled).toBe(false);
+        expect(res.statusCode).toBe(400);
+        expect(res.body.code).toBe('INVALID_BODY');
+    });
+
+    test('should reject bodies over the route limit', async () => {
+        const big = JSON.stringify({ padding: 'x'.repeat(70 * 1024) });
+
+        const declared = await run(middleware,
+            fakeRequest('POST', '/api/estimates/e1', big, { 'content-length': String(big.length) }));
+        expect(declared.res.statusCode).toBe(413);
+
+        const streamed = await run(middleware, fakeRequest('POST', '/api/estimates/e1', big));
+        expect(streamed.res.statusCode).toBe(413);
+    });
+
+    test('should leave other routes to express.json', async () => {
+        const req = fakeRequest('POST', '/api/settings', '{}');
+        const { nextCalled } = await run(middleware, req);
+
+        expect(nextCalled).toBe(true);
+        expect(req._body).toBe(undefined);
+    });
+});
@@ -0,0 +1,135 @@
+/**
+ * Static Assets Tests (scripts/build-assets.js + middleware/staticAssets.js)
+ *
+ * Testing:
+ * - Inline blocks extracted, local scripts fingerprinted, lazy URLs rewritten
+ * - Encoding negotiation (br > gzip > identity), cache headers, ETag / 304
+ * - Pass-through when there is no build
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const zlib = require('zlib');
+const { build, minifyCss } = require('../../scripts/build-assets');
+const { staticAssets, acceptedEncodings } = require('../../middleware/staticAssets');
+
+function fakeResponse() {
+    return {
+        statusCode: 200,
+        headers: {},
+        body: undefined,
+        setHeader(name, value) { this.headers[name] = value; },
+        end(body) { this.body = body; }
+    };
+}
+
+function run(middleware, method, urlPath, headers = {}) {
+    const req = { method, path: urlPath, headers };
+    const res = fakeResponse();
+    let nextCalled = false;
+    middleware(req, res, () => { nextCalled = true; });
+    return { res, nextCalled };
+}
+
+describe('static assets', () => {
+    let distDir;
+    let manifest;
+    let middleware;
+
+    beforeAll(async () => {
+        distDir = fs.mkdtempSync(path.join(os.tmpdir(), 'assets-'));
+        manifest = await build({ outDir: distDir });
+        middleware = staticAssets({ distDir });
+    });
+
+    afterAll(() => {
+        fs.rmSync(distDir, { recursive: true, force: true });
+    });
+
+    test('should extract inline blocks and fingerprint script references', () => {
+        const html = fs.readFileSync(path.join(distDir, 'index.html'), 'utf8');
+
+        expect(html).not.toContain('<script>');
+        expect(html).not.toContain('<style>');
+        expect(html).not.toContain('src="/js/');
+        expect(/^\/assets\/CacheManager\.[0-9a-f]{10}\.js$/.test(manifest.assets['/js/CacheManager.js'])).toBe(true);
+        expect(html).toContain(`src="${manifest.assets['/js/CacheManager.js']}"`);
+    });
+
+    test('should rewrite lazily loaded URLs inside scripts', () => {
+        const client = fs.readFileSync(path.join(distDir, manifest.assets['/js/AutosaveClient.js']), 'utf8');
+        expect(client).toContain(`'${manifest.assets['/js/AutosaveWorker.js']}'`);
+        expect(client).not.toContain("'/js/AutosaveWorker.js'");
+    });
+
+    test('should serve brotli with immutable cache headers', () => {
+        const url = manifest.assets['/js/SyncManager.js'];
+        const { res, nextCalled } = run(middleware, 'GET', url, { 'accept-encoding': 'gzip, deflate, br' });
+
+        expect(nextCalled).toBe(false);
+        expect(res.statusCode).toBe(200);
+        expect(res.headers['Content-Encoding']).toBe('br');
+        expect(res.headers['Cache-Control']).toBe('public, max-age=31536000, immutable');
+        expect(res.headers['Vary']).toBe('Accept-Encoding');
+        expect(zlib.brotliDecompressSync(res.body).toString()).toBe(fs.readFileSync(path.join(distDir, url), 'utf8'));
+    });
+
+    test('should fall back to gzip and identity', () => {
+        const url = manifest.assets['/js/SyncManager.js'];
+
+        const gzip = run(middleware, 'GET', url, { 'accept-encoding': 'gzip, br;q=0' });
+        expect(gzip.res.headers['Content-Encoding']).toBe('gzip');
+
+        const identity = run(middleware, 'GET', url, {});
+        expect(identity.res.headers['Content-Encoding']).toBeUndefined();
+        expect(identity.res.headers['Content-Length']).toBe(fs.statSync(path.join(distDir, url)).size);
+    });
+
+    test('should serve index.html without long-term caching', () => {
+        const { res } = run(middleware, 'GET', '/', { 'accept-encoding': 'br' });
+        expect(res.headers['Cache-Control']).toBe('no-cache');
+        expect(res.headers['Content-Type']).toBe('text/html; charset=utf-8');
+    });
+
+    test('should answer 304 for a matching ETag', () => {
+        const first = run(middleware, 'GET', '/index.html', { 'accept-encoding': 'gzip' });
+        const second = run(middleware, 'GET', '/index.html', {
+            'accept-encoding': 'gzip',
+            'if-none-match': first.res.headers['ETag']
+        });
+
+        expect(second.res.statusCode).toBe(304);
+        expect(second.res.body).toBeUndefined();
+    });
+
+    test('should send headers only for HEAD', () => {
+        const { res } = run(middleware, 'HEAD', '/', {});
+        expect(res.statusCode).toBe(200);
+        expect(res.headers['Content-Length']).toBeGreaterThan(0);
+        expect(res.body).toBeUndefined();
+    });
+
+    test('should pass through unknown paths and other methods', () => {
+        expect(run(middleware, 'GET', '/login.html', {}).nextCalled).toBe(true);
+        expect(run(middleware, 'POST', '/', {}).nextCalled).toBe(true);
+    });
+
+    test('should pass through everything without a build', () => {
+        const empty = fs.mkdtempSync(path.join(os.tmpdir(), 'assets-empty-'));
+        try {
+            expect(run(staticAssets({ distDir: empty }), 'GET', '/', {}).nextCalled).toBe(true);
+        } finally {
+            fs.rmSync(empty, { recursive: true, force: true });
+        }
+    });
+
+    test('should parse Accept-Encoding with q-values', () => {
+        expect([...acceptedEncodings('gzip;q=0.5, br;q=0, identity')]).toEqual(['gzip', 'identity']);
+    });
+
+    test('should minify CSS without touching strings', () => {
+        expect(minifyCss('/* c */ .a  >  .b {\n  content: "a  b";\n  color: red;\n}\n'))
+            .toBe('.a>.b{content:"a  b";color:red}');
+    });
+});
@@ -0,0 +1,132 @@
+/**
+ * Тесты для PricingTotals
+ * Инкрементальные суммы должны совпадать с полным пересчётом после правок, добавления и удаления услуг
+ */
+
+const PricingTotals = require('../js/PricingTotals');
+
+// Полный пересчёт - как в updateCalculations() до PricingTotals
+function fullPass(lists, { hiddenMarkup, partnerCommission }) {
+    let baseCost = 0;
+    let baseCostForHiddenMarkup = 0;
+    let totalWithIndividualMarkup = 0;
+    let individualMarkupAmount = 0;
+    let fullProfitAmount = 0;
+
+    for (const service of [].concat(...lists)) {
+        const serviceCost = service.price * service.quantity;
+        const serviceWithMarkup = serviceCost * (1 + service.markup / 100);
+
+        if (service.fullProfit) {
+            fullProfitAmount += serviceWithMarkup;
+            totalWithIndividualMarkup += serviceWithMarkup;
+            baseCost += serviceWithMarkup;
+        } else {
+            baseCost += serviceCost;
+            totalWithIndividualMarkup += serviceWithMarkup;
+            individualMarkupAmount += serviceWithMarkup - serviceCost;
+            if (!service.excludeFromMarkup) {
+                baseCostForHiddenMarkup += serviceCost;
+            }
+        }
+    }
+
+    const hiddenMarkupAmount = baseCostForHiddenMarkup * (hiddenMarkup / 100);
+    const partnerCommissionAmount = baseCost * (partnerCommission / 100);
+
+    return {
+        baseCost,
+        clientTotal: totalWithIndividualMarkup + hiddenMarkupAmount + partnerCommissionAmount,
+        totalProfit: individualMarkupAmount + hiddenMarkupAmount + fullProfitAmount
+    };
+}
+
+function expectClose(actual, expected) {
+    for (const key of Object.keys(expected)) {
+        expect(Math.abs(actual[key] - expected[key]) < 1e-6).toBe(true);
+    }
+}
+
+describe('PricingTotals', () => {
+    const rates = { hiddenMarkup: 10, partnerCommission: 5 };
+    let services;
+    let hotels;
+    let totals;
+
+    beforeEach(() => {
+        services = [
+            { id: 's1', price: 100, quantity: 2, markup: 10 },
+            { id: 's2', price: 50, quantity: 1, markup: 0, excludeFromMarkup: true },
+            { id: 's3', price: 30, quantity: 3, markup: 20, fullProfit: true }
+        ];
+        hotels = [{ id: 'h1', price: 200, quantity: 4, markup: 15 }];
+        totals = new PricingTotals();
+    });
+
+    test('should match full recalculation', () => {
+        const summary = totals.sync([services, hotels, null]).summary(rates);
+
+        expectClose(summary, fullPass([services, hotels], rates));
+    });
+
+    test('should apply deltas for edited, added and removed services', () => {
+        totals.sync([services, hotels]);
+
+        services[0].price = '120';
+        services[1].excludeFromMarkup = false;
+        services[2].fullProfit = false;
+        hotels.push({ id: 'h2', price: 80, quantity: 2, markup: 5 });
+        hotels.shift();
+
+        const summary = totals.sync([services, hotels]).summary(rates);
+
+        expectClose(summary, fullPass([services, hotels], rates));
+        expect(totals.contributions.size).toBe(4);
+    });
+
+    test('should recompute only changed services', () => {
+        const serviceTotal = jest.fn(service => service.price * service.quantity * (1 + service.markup / 100));
+        totals = new PricingTotals(serviceTotal);
+
+        totals.sync([services, hotels]);
+        expect(serviceTotal).toHaveBeenCalledTimes(4);
+
+        hotels[0].quantity = 5;
+        totals.sync([services, hotels]);
+        expect(serviceTotal).toHaveBeenCalledTimes(5);
+    });
+
+    test('should expose totals for JSON helpers', () => {
+        const all = totals.sync([services, hotels]).totals();
+
+        expect(all.cost).toBe(200 + 50 + 90 + 800);
+        expect(all.markupBase).toBe(200 + 90 + 800);
+    });
+
+    test('should recover after a service with a non-numeric markup is fixed', () => {
+        services.push({ id: 's4', price: 10, quantity: 1 });
+        expect(Number.isFinite(totals.sync([services, hotels]).summary(rates).clientTotal)).toBe(true);
+
+        services[3].markup = 0;
+        expectClose(totals.sync([services, hotels]).summary(rates), fullPass([services, hotels], rates));
+
+        services.pop();
+        expectClose(totals.sync([services, hotels]).summary(rates), fullPass([services, hotels], rates));
+    });
+
+    test('should not show negative zero after removing every service', () => {
+        services = [{ id: 'a', price: 0.1, quantity: 3, markup: 7 }, { id: 'b', price: 0.2, quantity: 7, markup: 13 }];
+        totals.sync([services]);
+        services[0].price = 0.3;
+        totals.sync([services]);
+        services.pop();
+        totals.sync([services]);
+        services[0].price = 0;
+
+        const summary = totals.sync([services]).summary(rates);
+        expect(Object.is(summary.clientTotal, -0)).toBe(false);
+        expect(summary.clientTotal).toBe(0);
+        expect(totals.sync([[]]).totals()).toEqual({ cost: 0, total: 0, markupBase: 0 });
+    });
+});
+
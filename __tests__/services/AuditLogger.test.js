@@ -0,0 +1,101 @@
+/**
+ * AuditLogger Tests
+ *
+ * Testing:
+ * - Field-level diff format
+ * - record() не пишет в БД синхронно
+ * - Batched flush, пропуск пустых update
+ */
+
+const Database = require('better-sqlite3');
+const AuditLogger = require('../../services/AuditLogger');
+
+describe('AuditLogger', () => {
+    let db;
+    let auditLogger;
+
+    beforeEach(() => {
+        db = new Database(':memory:');
+        db.exec(`
+            CREATE TABLE audit_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity_type TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                action TEXT NOT NULL,
+                changes TEXT,
+                snapshot_before TEXT,
+                snapshot_after TEXT,
+                user_id TEXT NOT NULL,
+                user_ip TEXT,
+                user_agent TEXT,
+                organization_id TEXT NOT NULL,
+                metadata TEXT,
+                created_at INTEGER NOT NULL
+            );
+        `);
+        auditLogger = new AuditLogger({ db, flushInterval: 60000 });
+    });
+
+    afterEach(() => {
+        auditLogger.close();
+        db.close();
+    });
+
+    const rows = () => db.prepare('SELECT * FROM audit_logs ORDER BY id').all();
+
+    test('should produce field-level diff', () => {
+        const { changes } = AuditLogger.diff(
+            { clientName: 'A', services: [{ price: 10 }, { price: 20 }] },
+            { clientName: 'A', services: [{ price: 15 }], paxCount: 2 }
+        );
+
+        expect(changes).toEqual([
+            { op: 'set', path: 'services.0.price', from: 10, to: 15 },
+            { op: 'remove', path: 'services.1', from: { price: 20 } },
+            { op: 'add', path: 'paxCount', to: 2 }
+        ]);
+    });
+
+    test('should queue records and write them in one flush', async () => {
+        for (let i = 0; i < 3; i++) {
+            auditLogger.record({
+                entityType: 'estimate', entityId: `est-${i}`, action: 'update',
+                before: '{"total":1}', after: `{"total":${i + 2}}`,
+                userId: 'user-1', organizationId: 'org-1'
+            });
+        }
+        expect(rows()).toHaveLength(0);
+
+        await auditLogger.flush();
+
+        const written = rows();
+        expect(written).toHaveLength(3);
+        expect(JSON.parse(written[0].changes)).toEqual([{ op: 'set', path: 'total', from: 1, to: 2 }]);
+        expect(written[0].snapshot_before).toBeNull();
+    });
+
+    test('should skip updates without changes', async () => {
+        auditLogger.record({
+            entityType: 'estimate', entityId: 'est-1', action: 'update',
+            before: '{"a":1}', after: '{"a":1}',
+            userId: 'user-1', organizationId: 'org-1'
+        });
+
+        await auditLogger.flush();
+
+        expect(rows()).toHaveLength(0);
+        expect(auditLogger.getStats().skipped).toBe(1);
+    });
+
+    test('should flush remaining queue on close', () => {
+        auditLogger.record({
+            entityType: 'estimate', entityId: 'est-1', action: 'delete',
+            userId: 'user-1', organizationId: 'org-1'
+        });
+
+        auditLogger.close();
+
+        expect(rows()).toHaveLength(1);
+        expect(rows()[0].action).toBe('delete');
+    });
+});
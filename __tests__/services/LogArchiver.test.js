@@ -0,0 +1,96 @@
+/**
+ * LogArchiver Tests
+ *
+ * Testing:
+ * - Закрытые сутки переносятся в сжатые сегменты и удаляются из SQLite
+ * - query() читает только сегменты, подходящие по индексу
+ * - Повторный запуск после сбоя не дублирует строки
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const Database = require('better-sqlite3');
+const LogArchiver = require('../../services/LogArchiver');
+
+const DAY = 24 * 60 * 60;
+
+describe('LogArchiver', () => {
+    let db;
+    let dir;
+    let archiver;
+
+    const now = Math.floor(Date.now() / 1000);
+    const insertAudit = (entityId, orgId, createdAt) => db.prepare(`
+        INSERT INTO audit_logs (entity_type, entity_id, action, user_id, organization_id, created_at)
+        VALUES ('estimate', ?, 'update', 'user-1', ?, ?)
+    `).run(entityId, orgId, createdAt);
+
+    beforeEach(() => {
+        dir = fs.mkdtempSync(path.join(os.tmpdir(), 'log-archive-'));
+        db = new Database(':memory:');
+        db.exec(`
+            CREATE TABLE audit_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity_type TEXT NOT NULL, entity_id TEXT NOT NULL, action TEXT NOT NULL,
+                changes TEXT, snapshot_before TEXT, snapshot_after TEXT,
+                user_id TEXT NOT NULL, user_ip TEXT, user_agent TEXT,
+                organization_id TEXT NOT NULL, metadata TEXT, created_at INTEGER NOT NULL
+            );
+            CREATE TABLE auth_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT, action TEXT NOT NULL, ip_address TEXT, user_agent TEXT,
+                success INTEGER DEFAULT 1, error_message TEXT, metadata TEXT,
+                created_at INTEGER NOT NULL
+            );
+        `);
+        archiver = new LogArchiver({ db, dir, retentionDays: 30 });
+    });
+
+    afterEach(() => {
+        db.close();
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+
+    test('should move old days into segments and keep recent rows', async () => {
+        insertAudit('est-1', 'org-a', now - 40 * DAY);
+        insertAudit('est-2', 'org-b', now - 35 * DAY);
+        insertAudit('est-3', 'org-a', now - DAY);
+
+        const result = await archiver.archive();
+
+        expect(result).toEqual({ segments: 2, rows: 2 });
+        expect(db.prepare('SELECT COUNT(*) AS count FROM audit_logs').get().count).toBe(1);
+        expect(archiver.getStats().rows).toBe(2);
+    });
+
+    test('should scan only segments matching the filter', async () => {
+        insertAudit('est-1', 'org-a', now - 40 * DAY);
+        insertAudit('est-2', 'org-b', now - 35 * DAY);
+        insertAudit('est-3', 'org-a', now - DAY);
+        await archiver.archive();
+
+        const result = await archiver.query({ table: 'audit_logs', organizationId: 'org-b' });
+
+        expect(result.rows.map(row => row.entity_id)).toEqual(['est-2']);
+        expect(result.scannedSegments).toBe(1);
+        expect(result.totalSegments).toBe(2);
+    });
+
+    test('should not duplicate rows already archived before a crash', async () => {
+        insertAudit('est-1', 'org-a', now - 40 * DAY);
+        await archiver.archive();
+
+        // Эмулируем сбой между записью index.json и DELETE
+        db.prepare(`
+            INSERT INTO audit_logs (id, entity_type, entity_id, action, user_id, organization_id, created_at)
+            VALUES (1, 'estimate', 'est-1', 'update', 'user-1', 'org-a', ?)
+        `).run(now - 40 * DAY);
+
+        const result = await archiver.archive();
+
+        expect(result.rows).toBe(0);
+        expect(db.prepare('SELECT COUNT(*) AS count FROM audit_logs').get().count).toBe(0);
+        expect((await archiver.query({ table: 'audit_logs' })).rows).toHaveLength(1);
+    });
+});
@@ -0,0 +1,108 @@
+/**
+ * PasswordHasher Tests
+ *
+ * Testing:
+ * - hash/compare через worker_threads
+ * - Совместимость с bcryptjs хешами из основного потока
+ * - Back-pressure (HASH_POOL_SATURATED при переполнении очереди)
+ * - Метрики пула
+ * - Общие хелперы роутов (hashWithPool / compareWithPool / sendPoolSaturated)
+ */
+
+const bcrypt = require('bcryptjs');
+const PasswordHasher = require('../../services/PasswordHasher');
+const { BCRYPT_ROUNDS, hashWithPool, compareWithPool, sendPoolSaturated } = PasswordHasher;
+
+describe('PasswordHasher', () => {
+    let hasher;
+
+    afterEach(async () => {
+        if (hasher) {
+            await hasher.close();
+            hasher = null;
+        }
+    });
+
+    test('should hash and verify password in worker', async () => {
+        hasher = new PasswordHasher({ size: 1, rounds: 4 });
+
+        const hash = await hasher.hash('secret-password');
+
+        expect(hash).toMatch(/^\$2[aby]\$04\$/);
+        await expect(hasher.compare('secret-password', hash)).resolves.toBe(true);
+        await expect(hasher.compare('wrong-password', hash)).resolves.toBe(false);
+    });
+
+    test('should verify hashes created on the main thread', async () => {
+        hasher = new PasswordHasher({ size: 1 });
+        const hash = bcrypt.hashSync('admin123', 4);
+
+        await expect(hasher.compare('admin123', hash)).resolves.toBe(true);
+    });
+
+    test('should reject with HASH_POOL_SATURATED when queue is full', async () => {
+        hasher = new PasswordHasher({ size: 1, maxQueue: 2, rounds: 4 });
+
+        const results = await Promise.all(
+            Array.from({ length: 5 }, (_, i) =>
+                hasher.hash(`password-${i}`).then(() => 'ok', err => err.code)
+            )
+        );
+
+        // 1 в работе + 2 в очереди, остальные отклонены
+        expect(results.filter(r => r === 'ok')).toHaveLength(3);
+        expect(results.filter(r => r === 'HASH_POOL_SATURATED')).toHaveLength(2);
+        expect(hasher.getStats().rejected).toBe(2);
+    });
+
+    test('should expose queue depth and latency metrics', async () => {
+        hasher = new PasswordHasher({ size: 2, rounds: 4 });
+
+        await Promise.all([hasher.hash('a-password'), hasher.hash('b-password')]);
+        const stats = hasher.getStats();
+
+        expect(stats.size).toBe(2);
+        expect(stats.queueDepth).toBe(0);
+        expect(stats.completed).toBe(2);
+        expect(stats.latencyMs.max).toBeGreaterThanOrEqual(stats.latencyMs.p50);
+    });
+
+    test('should reject new work after close', async () => {
+        hasher = new PasswordHasher({ size: 1 });
+        await hasher.close();
+
+        await expect(hasher.hash('password')).rejects.toThrow('closed');
+        hasher = null;
+    });
+
+    test('should hash through the pool with the shared cost factor', async () => {
+        hasher = new PasswordHasher({ size: 1 });
+
+        const hash = await hashWithPool(hasher, 'secret-password');
+
+        expect(hash.split('$')[2]).toBe(String(BCRYPT_ROUNDS));
+        expect(hasher.getStats().completed).toBe(1);
+        await expect(compareWithPool(hasher, 'secret-password', hash)).resolves.toBe(true);
+    });
+
+    test('should fall back to the main thread without a pool', async () => {
+        const hash = await hashWithPool(null, 'secret-password', 4);
+
+        await expect(compareWithPool(null, 'secret-password', hash)).resolves.toBe(true);
+    });
+
+    test('should answer 429 with Retry-After when the pool is saturated', () => {
+        const res = {
+            set: jest.fn(),
+            status: jest.fn(() => res),
+            json: jest.fn(() => res)
+        };
+        const err = Object.assign(new Error('Too many'), { code: 'HASH_POOL_SATURATED', status: 429 });
+
+        sendPoolSaturated(res, err);
+
+        expect(res.set).toHaveBeenCalledWith('Retry-After', '1');
+        expect(res.status).toHaveBeenCalledWith(429);
+        expect(res.json).toHaveBeenCalledWith({ success: false, error: 'Too many', code: 'HASH_POOL_SATURATED' });
+    });
+});
@@ -0,0 +1,91 @@
+/**
+ * SQLiteSessionStore Tests
+ *
+ * Testing:
+ * - get/set/destroy на основном соединении (таблица sessions)
+ * - Просроченные сессии не возвращаются
+ * - touch() throttling
+ * - Batched expiry sweep
+ */
+
+const Database = require('better-sqlite3');
+const SQLiteSessionStore = require('../../storage/SQLiteSessionStore');
+
+const call = (fn, ...args) => new Promise((resolve, reject) => {
+    fn(...args, (err, result) => (err ? reject(err) : resolve(result)));
+});
+
+const makeSession = (expiresInMs) => ({
+    cookie: { expires: new Date(Date.now() + expiresInMs).toISOString(), httpOnly: true },
+    passport: { user: 'user-1' }
+});
+
+describe('SQLiteSessionStore', () => {
+    let db;
+    let store;
+
+    beforeEach(() => {
+        db = new Database(':memory:');
+        db.exec(`
+            CREATE TABLE sessions (
+                sid TEXT PRIMARY KEY,
+                sess TEXT NOT NULL,
+                expired INTEGER NOT NULL
+            );
+            CREATE INDEX idx_sessions_expired ON sessions(expired);
+        `);
+        store = new SQLiteSessionStore({ storage: { db }, sweepBatchSize: 2 });
+    });
+
+    afterEach(() => {
+        store.stopSweeper();
+        db.close();
+    });
+
+    test('should require storage', () => {
+        expect(() => new SQLiteSessionStore()).toThrow('storage');
+    });
+
+    test('should store and load session', async () => {
+        await call(store.set.bind(store), 'sid-1', makeSession(60000));
+
+        const sess = await call(store.get.bind(store), 'sid-1');
+        expect(sess.passport.user).toBe('user-1');
+    });
+
+    test('should not return expired session', async () => {
+        await call(store.set.bind(store), 'sid-old', makeSession(-1000));
+
+        await expect(call(store.get.bind(store), 'sid-old')).resolves.toBeNull();
+    });
+
+    test('should destroy session', async () => {
+        await call(store.set.bind(store), 'sid-1', makeSession(60000));
+        await call(store.destroy.bind(store), 'sid-1');
+
+        await expect(call(store.get.bind(store), 'sid-1')).resolves.toBeNull();
+    });
+
+    test('should skip touch writes within touch interval', async () => {
+        await call(store.set.bind(store), 'sid-1', makeSession(60000));
+        const before = db.prepare('SELECT expired FROM sessions WHERE sid = ?').get('sid-1').expired;
+
+        await call(store.touch.bind(store), 'sid-1', makeSession(61000));
+        expect(db.prepare('SELECT expired FROM sessions WHERE sid = ?').get('sid-1').expired).toBe(before);
+
+        await call(store.touch.bind(store), 'sid-1', makeSession(10 * 60000));
+        expect(db.prepare('SELECT expired FROM sessions WHERE sid = ?').get('sid-1').expired).toBeGreaterThan(before);
+    });
+
+    test('should sweep expired sessions in batches', async () => {
+        for (let i = 0; i < 5; i++) {
+            await call(store.set.bind(store), `expired-${i}`, makeSession(-1000));
+        }
+        await call(store.set.bind(store), 'active', makeSession(60000));
+
+        const removed = await store.sweep();
+
+        expect(removed).toBe(5);
+        await expect(call(store.length.bind(store))).resolves.toBe(1);
+    });
+});
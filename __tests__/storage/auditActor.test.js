@@ -0,0 +1,44 @@
+/**
+ * Storage Audit Actor Tests
+ *
+ * Testing:
+ * - delete / rename / settings audit rows name the acting user
+ * - Fallback to the storage default user without a request user
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+describe('SQLiteStorage audit actor', () => {
+    let storage;
+    let testDb;
+    let records;
+
+    beforeEach(async () => {
+        records = [];
+        testDb = await createTestStorage('audit-actor', { auditLogger: { record: entry => records.push(entry) } });
+        storage = testDb.storage;
+        await storage.saveEstimate('est-1', { clientName: 'A' });
+        records = [];
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should record the acting user for rename and delete', async () => {
+        await storage.renameEstimate('est-1', 'renamed.json', null, 'bob');
+        await storage.deleteEstimate('est-1', null, 'carol');
+
+        expect(records.map(r => [r.action, r.userId])).toEqual([['rename', 'bob'], ['delete', 'carol']]);
+    });
+
+    test('should record the acting user for settings', async () => {
+        await storage.saveSettings({ bookingTerms: 'Terms' }, null, 'bob');
+        expect(records[0].userId).toBe('bob');
+    });
+
+    test('should fall back to the default user', async () => {
+        await storage.deleteEstimate('est-1');
+        expect(records[0].userId).toBe('admin-user-id');
+    });
+});
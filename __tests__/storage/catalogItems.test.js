@@ -0,0 +1,162 @@
+/**
+ * Catalog Items Tests (per-template storage and delta sync)
+ *
+ * Testing:
+ * - Full save writes only changed templates / categories
+ * - patchCatalog: append, update in place, delete, per-item conflicts
+ * - getCatalogChanges: full and delta responses with tombstones
+ * - Legacy catalogs (templates inside catalogs.data) are split on init
+ */
+
+const { createTestStorage, reopenTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+function catalog(templates, extra = {}) {
+    return {
+        version: '1.2.0',
+        region: 'Ushuaia',
+        templates,
+        categories: [{ id: 'undefined', name: 'Не определено', system: true }, { id: 'hotels', name: 'Отели' }],
+        ...extra
+    };
+}
+
+describe('SQLiteStorage catalog items', () => {
+    let storage;
+    let testDb;
+
+    const itemVersions = (id) => Object.fromEntries(
+        storage.db.prepare("SELECT item_key, version FROM catalog_items WHERE catalog_id = ? AND kind = 'template'")
+            .all(id).map(row => [row.item_key, row.version])
+    );
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('catalog-items');
+        storage = testDb.storage;
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should round-trip a catalog through catalog_items', async () => {
+        const data = catalog([{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }, { name: 'No id' }]);
+        const { id, dataVersion } = await storage.saveCatalog('Ushuaia', data);
+
+        expect(dataVersion).toBe(1);
+        expect(await storage.loadCatalog('Ushuaia')).toEqual(data);
+        expect(await storage.loadCatalogById(id)).toEqual(data);
+
+        const header = JSON.parse(storage.db.prepare('SELECT data FROM catalogs WHERE id = ?').pluck().get(id));
+        expect(header.templates).toEqual([]);
+    });
+
+    test('should rewrite only changed templates on a full save', async () => {
+        const templates = [{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }, { id: 't3', name: 'Guide' }];
+        const { id } = await storage.saveCatalog('Ushuaia', catalog(templates));
+
+        const result = await storage.saveCatalog('Ushuaia', catalog([
+            templates[0],
+            { id: 't2', name: 'Transfer VIP' },
+            { id: 't4', name: 'Boat' }
+        ]));
+
+        expect(result.dataVersion).toBe(2);
+        expect(itemVersions(id)).toEqual({ t1: 1, t2: 2, t3: 2, t4: 2 });
+        expect((await storage.loadCatalog('Ushuaia')).templates.map(t => t.id)).toEqual(['t1', 't2', 't4']);
+    });
+
+    test('should not bump the version when nothing changed', async () => {
+        const data = catalog([{ id: 't1', name: 'Hotel' }]);
+        await storage.saveCatalog('Ushuaia', data);
+
+        const result = await storage.saveCatalog('Ushuaia', data);
+        expect(result.unchanged).toBe(true);
+        expect(result.dataVersion).toBe(1);
+    });
+
+    test('should renumber positions when templates are reordered', async () => {
+        await storage.saveCatalog('Ushuaia', catalog([{ id: 't1' }, { id: 't2' }, { id: 't3' }]));
+        await storage.saveCatalog('Ushuaia', catalog([{ id: 't3' }, { id: 't1' }, { id: 't2' }]));
+
+        expect((await storage.loadCatalog('Ushuaia')).templates.map(t => t.id)).toEqual(['t3', 't1', 't2']);
+    });
+
+    test('should patch templates and merge edits of other templates', async () => {
+        const { id } = await storage.saveCatalog('Ushuaia', catalog([{ id: 't1', name: 'Hotel' }, { id: 't2', name: 'Transfer' }]));
+
+        // Два клиента на версии 1 правят разные шаблоны
+        await storage.patchCatalog(id, 1, { templates: { upsert: [{ id: 't1', name: 'Hotel 5*' }] } });
+        const result = await storage.patchCatalog(id, 1, {
+            templates: { upsert: [{ id: 't3', name: 'Boat' }], delete: ['t2'] }
+        });
+
+        expect(result.dataVersion).toBe(3);
+
+        const data = await storage.loadCatalog('Ushuaia');
+        expect(data.templates).toEqual([{ id: 't1', name: 'Hotel 5*' }, { id: 't3', name: 'Boat' }]);
+        expect(data.categories.length).toBe(2);
+
+        const row = storage.db.prepare('SELECT templates_count, categories_count FROM catalogs WHERE id = ?').get(id);
+        expect(row).toEqual({ templates_count: 2, categories_count: 2 });
+    });
+
+    test('should reject a patch of a template changed after baseVersion', async () => {
+        const { id } = await storage.saveCatalog('Ushuaia', catalog([{ id: 't1', name: 'Hotel' }]));
+        await storage.patchCatalog(id, 1, { templates: { upsert: [{ id: 't1', name: 'Hotel A' }] } });
+
+        await expect(storage.patchCatalog(id, 1, { templates: { upsert: [{ id: 't1', name: 'Hotel B' }] } }))
+            .rejects.toMatchObject({ code: 'CONFLICT', status: 409, dataVersion: 2 });
+    });
+
+    test('should validate patches and report missing catalogs', async () => {
+        const { id } = await storage.saveCatalog('Ushuaia', catalog([]));
+
+        await expect(storage.patchCatalog(id, 1, { templates: { upsert: [{ name: 'No id' }] } }))
+            .rejects.toMatchObject({ code: 'INVALID_PATCH', status: 400 });
+        await expect(storage.patchCatalog('missing', 1, { templates: { delete: ['t1'] } }))
+            .rejects.toMatchObject({ code: 'CATALOG_NOT_FOUND', status: 404 });
+    });
+
+    test('should return only changes since the client version', async () => {
+        const { id } = await storage.saveCatalog('Ushuaia', catalog([{ id: 't1' }, { id: 't2' }]));
+        await storage.patchCatalog(id, 1, {
+            header: { version: '1.2.0', region: 'Ushuaia', note: 'updated' },
+            templates: { upsert: [{ id: 't3' }], delete: ['t1'] }
+        });
+
+        const delta = await storage.getCatalogChanges(id, 1);
+        expect(delta.full).toBe(false);
+        expect(delta.dataVersion).toBe(2);
+        expect(delta.header.note).toBe('updated');
+        expect(delta.templates).toEqual({ upsert: [{ key: 't3', position: 2, data: { id: 't3' } }], delete: ['t1'] });
+        expect(delta.categories).toEqual({ upsert: [], delete: [] });
+
+        const full = await storage.getCatalogChanges(id, 0);
+        expect(full.full).toBe(true);
+        expect(full.templates.upsert.map(item => item.key)).toEqual(['t2', 't3']);
+        expect(full.templates.delete).toEqual([]);
+
+        expect((await storage.getCatalogChanges(id, 99)).full).toBe(true);
+    });
+
+    test('should split legacy catalogs on init', async () => {
+        const data = catalog([{ id: 't1', name: 'Hotel' }]);
+        storage.db.prepare(`
+            INSERT INTO catalogs (id, name, slug, organization_id, owner_id, data, data_version, created_at, updated_at)
+            VALUES ('legacy', 'Legacy', 'legacy', 'default-org', 'admin-user-id', ?, 4, 0, 0)
+        `).run(JSON.stringify(data));
+
+        storage = await reopenTestStorage(testDb);
+
+        expect(itemVersions('legacy')).toEqual({ t1: 4 });
+        expect(await storage.loadCatalogById('legacy')).toEqual(data);
+    });
+
+    test('should keep storage usage in sync with catalog items', async () => {
+        const { id } = await storage.saveCatalog('Ushuaia', catalog([{ id: 't1', name: 'Hotel' }]));
+        await storage.patchCatalog(id, 1, { templates: { upsert: [{ id: 't2', name: 'x'.repeat(1000) }], delete: ['t1'] } });
+
+        const result = await storage.reconcileUsageCounters();
+        expect(result.corrected).toEqual([]);
+    });
+});
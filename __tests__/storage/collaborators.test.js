@@ -0,0 +1,79 @@
+/**
+ * Estimate Collaborators (sharing ACL) Tests
+ *
+ * Testing:
+ * - Backfill of legacy estimates.shared_with into estimate_collaborators
+ * - Point-lookup access checks and collaborator replacement
+ * - Keyset-paginated shared-with-me listing
+ */
+
+const { createTestStorage, reopenTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+describe('Estimate collaborators', () => {
+    let storage;
+    let testDb;
+
+    const addUser = (id) => {
+        const now = Math.floor(Date.now() / 1000);
+        storage.db.prepare(`
+            INSERT INTO users (id, email, username, password_hash, organization_id, created_at, updated_at)
+            VALUES (?, ?, ?, 'x', 'default-org', ?, ?)
+        `).run(id, `${id}@test.local`, id, now, now);
+    };
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('collab');
+        storage = testDb.storage;
+
+        addUser('alice');
+        addUser('bob');
+        for (const id of ['e1', 'e2', 'e3']) {
+            await storage.saveEstimate(id, { clientName: id });
+        }
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should backfill shared_with on init', async () => {
+        storage.db.prepare('UPDATE estimates SET shared_with = ? WHERE id = ?').run('["alice","ghost"]', 'e1');
+        storage.db.prepare('UPDATE estimates SET shared_with = ? WHERE id = ?').run('not json', 'e2');
+
+        storage = await reopenTestStorage(testDb);
+
+        expect(storage.getEstimateCollaborators('e1')).toEqual(['alice']);
+        expect(storage.getEstimateCollaborators('e2')).toEqual([]);
+        expect(storage.db.prepare('SELECT COUNT(*) AS n FROM estimates WHERE shared_with IS NOT NULL').get().n).toBe(0);
+    });
+
+    test('should replace collaborators and answer point lookups', () => {
+        storage.setEstimateCollaborators('e1', ['alice', 'bob', 'ghost'], 'admin-user-id');
+        expect(storage.isEstimateCollaborator('e1', 'bob')).toBe(true);
+
+        const { before, after } = storage.setEstimateCollaborators('e1', ['alice'], 'admin-user-id');
+        expect(before).toEqual(['alice', 'bob']);
+        expect(after).toEqual(['alice']);
+        expect(storage.isEstimateCollaborator('e1', 'bob')).toBe(false);
+        expect(storage.isEstimateCollaborator('e2', 'alice')).toBe(false);
+    });
+
+    test('should page shared-with-me listing by cursor', () => {
+        for (const id of ['e1', 'e2', 'e3']) {
+            storage.setEstimateCollaborators(id, ['alice'], 'admin-user-id');
+        }
+        storage.db.prepare('UPDATE estimates SET deleted_at = 1 WHERE id = ?').run('e2');
+
+        const first = storage.listSharedWithUser('alice', { limit: 1 });
+        expect(first.estimates.map(e => e.id)).toEqual(['e3']);
+        expect(first.estimates[0].role).toBe('viewer');
+        expect(first.next_cursor).not.toBe(null);
+
+        const second = storage.listSharedWithUser('alice', { limit: 1, cursor: first.next_cursor });
+        expect(second.estimates.map(e => e.id)).toEqual(['e1']);
+        expect(second.next_cursor).toBe(null);
+
+        expect(storage.listSharedWithUser('bob').estimates).toEqual([]);
+        expect(() => storage.listSharedWithUser('alice', { cursor: 'garbage' })).toThrow('Invalid cursor');
+    });
+});
@@ -0,0 +1,100 @@
+/**
+ * Estimate Patch Tests (autosave deltas)
+ *
+ * Testing:
+ * - set/unset changes applied on top of the stored version
+ * - Conflict when baseVersion is stale
+ * - Missing estimate
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+describe('SQLiteStorage.patchEstimate', () => {
+    let storage;
+    let testDb;
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('patch');
+        storage = testDb.storage;
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should apply changes and bump version', async () => {
+        await storage.saveEstimate('est-1', {
+            id: 'est-1',
+            clientName: 'Old',
+            notes: 'draft',
+            services: [{ name: 'Hotel', price: 100 }, { name: 'Transfer', price: 40 }]
+        });
+
+        const result = await storage.patchEstimate('est-1', 1, {
+            set: [[['clientName'], 'New'], [['services', 1, 'price'], 55]],
+            unset: [['notes']]
+        });
+
+        expect(result.dataVersion).toBe(2);
+
+        const data = await storage.loadEstimate('est-1');
+        expect(data.clientName).toBe('New');
+        expect(data.notes).toBe(undefined);
+        expect(data.services).toEqual([{ name: 'Hotel', price: 100 }, { name: 'Transfer', price: 55 }]);
+        expect(data.dataVersion).toBe(2);
+    });
+
+    test('should reject a stale baseVersion', async () => {
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V1' });
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V2' });
+
+        let error;
+        try {
+            await storage.patchEstimate('est-1', 1, { set: [[['clientName'], 'V3']], unset: [] });
+        } catch (err) {
+            error = err;
+        }
+
+        expect(error.code).toBe('CONFLICT');
+        expect(error.status).toBe(409);
+        expect(error.dataVersion).toBe(2);
+        expect((await storage.loadEstimate('est-1')).clientName).toBe('V2');
+    });
+
+    test('should report a missing estimate', async () => {
+        let error;
+        try {
+            await storage.patchEstimate('missing', 1, { set: [], unset: [] });
+        } catch (err) {
+            error = err;
+        }
+
+        expect(error.code).toBe('ESTIMATE_NOT_FOUND');
+        expect(error.status).toBe(404);
+    });
+
+    test('should reject malformed patch entries', async () => {
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'A' });
+
+        for (const changes of [{ set: [null] }, { unset: [5] }, { set: [[[], 1]] }, { set: [[['a']]] }, { unset: [['__proto__']] }]) {
+            await expect(storage.patchEstimate('est-1', 1, changes))
+                .rejects.toMatchObject({ code: 'INVALID_PATCH', status: 400 });
+        }
+    });
+
+    test('should reject paths through primitive values', async () => {
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'A', services: [{ price: 1 }] });
+
+        for (const changes of [
+            { set: [[['clientName', 'first'], 'x']] },
+            { set: [[['services', 3, 'price'], 2]] },
+            { set: [[['services', 'x'], 2]] },
+            { unset: [['services', 0]] }
+        ]) {
+            await expect(storage.patchEstimate('est-1', 1, changes))
+                .rejects.toMatchObject({ code: 'INVALID_PATCH', status: 400 });
+        }
+
+        expect((await storage.loadEstimate('est-1')).dataVersion).toBe(1);
+    });
+});
@@ -0,0 +1,92 @@
+/**
+ * Settings Snapshot Tests (versioned settings cache)
+ *
+ * Testing:
+ * - Snapshot served from memory until the scope version changes
+ * - Bulk update skips unchanged values and bumps the version once per changed key
+ * - Version bumped by triggers for writes outside updateSettings
+ * - loadSettings / saveSettings (organization scope)
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+describe('SQLiteStorage settings snapshots', () => {
+    let storage;
+    let testDb;
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('settings', { organizationId: 'test-org' });
+        storage = testDb.storage;
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should round-trip typed values', async () => {
+        const values = { theme: 'dark', pageSize: 25, compact: true, columns: ['a', 'b'], layout: { left: 1 } };
+        const { version } = await storage.updateSettings('user', 'u1', values);
+
+        const snapshot = await storage.getSettingsSnapshot('user', 'u1');
+        expect(snapshot.version).toBe(version);
+        expect(snapshot.settings).toEqual(values);
+        expect(JSON.parse(snapshot.json)).toEqual(values);
+    });
+
+    test('should serve the same snapshot until the scope changes', async () => {
+        await storage.updateSettings('user', 'u1', { theme: 'dark' });
+
+        const first = await storage.getSettingsSnapshot('user', 'u1');
+        expect(await storage.getSettingsSnapshot('user', 'u1')).toBe(first);
+
+        await storage.updateSettings('user', 'u1', { theme: 'light' });
+        const second = await storage.getSettingsSnapshot('user', 'u1');
+
+        expect(second).not.toBe(first);
+        expect(second.version).toBeGreaterThan(first.version);
+        expect(second.etag).not.toBe(first.etag);
+        expect(second.settings.theme).toBe('light');
+    });
+
+    test('should keep scopes apart', async () => {
+        await storage.updateSettings('user', 'u1', { theme: 'dark' });
+        await storage.updateSettings('user', 'u2', { theme: 'dark' });
+
+        const u1 = await storage.getSettingsSnapshot('user', 'u1');
+        const u2 = await storage.getSettingsSnapshot('user', 'u2');
+        expect(u1.version).toBe(u2.version);
+        expect(u1.etag).not.toBe(u2.etag);
+    });
+
+    test('should skip values that did not change', async () => {
+        const { version } = await storage.updateSettings('organization', 'test-org', { a: 1, b: 'x' });
+
+        const same = await storage.updateSettings('organization', 'test-org', { a: 1, b: 'x' });
+        expect(same).toEqual({ version, before: {}, unchanged: true });
+
+        const changed = await storage.updateSettings('organization', 'test-org', { a: 1, b: 'y' });
+        expect(changed.before).toEqual({ b: 'x' });
+        expect(changed.version).toBe(version + 1);
+    });
+
+    test('should notice writes made outside updateSettings', async () => {
+        await storage.updateSettings('app', 'global', { maintenance: false });
+        const before = await storage.getSettingsSnapshot('app', 'global');
+
+        storage.db.exec("DELETE FROM settings WHERE scope = 'app'");
+
+        const after = await storage.getSettingsSnapshot('app', 'global');
+        expect(after.version).toBeGreaterThan(before.version);
+        expect(after.settings).toEqual({});
+    });
+
+    test('should save and load organization settings', async () => {
+        expect(await storage.loadSettings()).toEqual({ bookingTerms: '', version: '1.0.0' });
+
+        await storage.saveSettings({ bookingTerms: 'Terms', markup: 12.5 });
+        await storage.saveSettings({ markup: 15 });
+
+        expect(await storage.loadSettings()).toEqual({ bookingTerms: 'Terms', markup: 15 });
+        expect((await storage.getSettingsSnapshot('organization', 'test-org')).settings.markup).toBe(15);
+    });
+});
@@ -0,0 +1,93 @@
+/**
+ * Copy-on-write Template Instances Tests
+ *
+ * Testing:
+ * - Instances store override documents, not full copies
+ * - Lazy materialization on load
+ * - Full copy on first structural divergence
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+describe('Template instances (copy-on-write)', () => {
+    let storage;
+    let testDb;
+
+    const template = {
+        id: 'tpl-1',
+        clientName: '',
+        paxCount: 2,
+        services: Array.from({ length: 20 }, (_, i) => ({ name: `Service ${i}`, price: 100 + i, description: 'x'.repeat(200) }))
+    };
+
+    const storedData = (id) => storage.db.prepare('SELECT data FROM estimates WHERE id = ?').get(id).data;
+    const ref = (id) => storage.db.prepare('SELECT * FROM estimate_template_refs WHERE estimate_id = ?').get(id);
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('cow');
+        storage = testDb.storage;
+
+        await storage.saveEstimate('tpl-1', template);
+        storage.db.prepare('UPDATE estimates SET is_template = 1 WHERE id = ?').run('tpl-1');
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should store instance as reference plus overrides', async () => {
+        const result = await storage.createEstimateFromTemplate('tpl-1', {
+            id: 'est-1',
+            fields: { clientName: 'ACME', paxCount: 4 }
+        });
+
+        expect(result.copyOnWrite).toBe(true);
+        expect(ref('est-1').template_version).toBe(1);
+        expect(storedData('est-1').length).toBeLessThan(JSON.stringify(template).length / 10);
+
+        const loaded = await storage.loadEstimate('est-1');
+        expect(loaded.clientName).toBe('ACME');
+        expect(loaded.paxCount).toBe(4);
+        expect(loaded.services.length).toBe(20);
+        expect(loaded.filename).toBe('estimate_est-1.json');
+    });
+
+    test('should keep overrides on value edits and pin the template version', async () => {
+        await storage.createEstimateFromTemplate('tpl-1', { id: 'est-1' });
+
+        // Шаблон меняется - экземпляр остаётся на своей версии
+        await storage.saveEstimate('tpl-1', { ...template, paxCount: 10 });
+
+        const loaded = await storage.loadEstimate('est-1');
+        loaded.services[3].price = 999;
+        delete loaded.dataVersion;
+        delete loaded.updatedAt;
+        delete loaded.createdAt;
+        await storage.saveEstimate('est-1', loaded);
+
+        const reloaded = await storage.loadEstimate('est-1');
+        expect(ref('est-1')).toBeDefined();
+        expect(reloaded.paxCount).toBe(2);
+        expect(reloaded.services[3].price).toBe(999);
+    });
+
+    test('should copy the full estimate on structural divergence', async () => {
+        await storage.createEstimateFromTemplate('tpl-1', { id: 'est-1' });
+
+        const loaded = await storage.loadEstimate('est-1');
+        loaded.services.push({ name: 'Extra', price: 1 });
+        delete loaded.dataVersion;
+        delete loaded.updatedAt;
+        delete loaded.createdAt;
+        await storage.saveEstimate('est-1', loaded);
+
+        expect(ref('est-1')).toBeUndefined();
+        expect(JSON.parse(storedData('est-1')).services.length).toBe(21);
+        expect((await storage.loadEstimate('est-1')).services.length).toBe(21);
+    });
+
+    test('should reject unknown templates', async () => {
+        await expect(storage.createEstimateFromTemplate('missing', { id: 'est-1' }))
+            .rejects.toMatchObject({ code: 'TEMPLATE_NOT_FOUND' });
+    });
+});
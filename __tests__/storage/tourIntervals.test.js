@@ -0,0 +1,74 @@
+/**
+ * Tour Interval Index Tests
+ *
+ * Testing:
+ * - R*Tree maintained by triggers on insert / date change / delete
+ * - Overlap query over day numbers
+ * - Backfill for databases created before the index
+ */
+
+const { createTestStorage, reopenTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+const day = (date) => Date.parse(date) / 86400000;
+
+describe('Tour interval index', () => {
+    let storage;
+    let testDb;
+
+    const interval = (id) => storage.db.prepare(`
+        SELECT r.start_day, r.end_day
+        FROM estimate_intervals i JOIN estimate_intervals_rtree r ON r.id = i.id
+        WHERE i.estimate_id = ?
+    `).get(id);
+
+    const activeBetween = (from, to) => storage.db.prepare(`
+        SELECT i.estimate_id
+        FROM estimate_intervals_rtree r CROSS JOIN estimate_intervals i ON i.id = r.id
+        WHERE r.start_day <= ? AND r.end_day >= ?
+        ORDER BY i.estimate_id
+    `).pluck().all(day(to), day(from));
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('intervals');
+        storage = testDb.storage;
+
+        await storage.saveEstimate('march', { tourStart: '2025-03-01', tourEnd: '2025-03-10' });
+        await storage.saveEstimate('april', { tourStart: '2025-04-05', tourEnd: '2025-04-08' });
+        await storage.saveEstimate('oneday', { tourStart: '2025-03-20' });
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should index tours on insert', () => {
+        expect(interval('march')).toEqual({ start_day: day('2025-03-01'), end_day: day('2025-03-10') });
+        expect(interval('oneday')).toEqual({ start_day: day('2025-03-20'), end_day: day('2025-03-20') });
+    });
+
+    test('should find overlapping tours from both sides of the range', () => {
+        expect(activeBetween('2025-03-08', '2025-03-20')).toEqual(['march', 'oneday']);
+        expect(activeBetween('2025-02-01', '2025-03-01')).toEqual(['march']);
+        expect(activeBetween('2025-03-11', '2025-03-19')).toEqual([]);
+    });
+
+    test('should follow date changes and deletes', () => {
+        storage.db.prepare('UPDATE estimates SET tour_start = ?, tour_end = ? WHERE id = ?')
+            .run('2025-05-01', '2025-05-03', 'april');
+        expect(interval('april')).toEqual({ start_day: day('2025-05-01'), end_day: day('2025-05-03') });
+
+        storage.db.prepare('UPDATE estimates SET tour_start = NULL WHERE id = ?').run('oneday');
+        expect(interval('oneday')).toBe(undefined);
+
+        storage.db.prepare('DELETE FROM estimates WHERE id = ?').run('march');
+        expect(storage.db.prepare('SELECT COUNT(*) AS n FROM estimate_intervals_rtree').get().n).toBe(1);
+    });
+
+    test('should backfill an empty index on init', async () => {
+        storage.db.exec('DELETE FROM estimate_intervals_rtree; DELETE FROM estimate_intervals;');
+
+        storage = await reopenTestStorage(testDb);
+
+        expect(activeBetween('2025-03-01', '2025-04-30')).toEqual(['april', 'march', 'oneday']);
+    });
+});
@@ -0,0 +1,105 @@
+/**
+ * Organization Usage Counters Tests
+ *
+ * Testing:
+ * - Counters maintained by triggers on insert / soft delete / restore
+ * - Catalog items bytes follow catalog soft delete / restore
+ * - O(1) quota enforcement on create
+ * - Reconciliation of drifted counters
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+
+const ORG_ID = 'default-org';
+const USER_ID = 'admin-user-id';
+
+describe('Organization usage counters', () => {
+    let storage;
+    let testDb;
+
+    const usage = () => storage.db.prepare(`
+        SELECT current_users_count, current_estimates_count, current_catalogs_count, current_storage_mb
+        FROM organizations WHERE id = ?
+    `).get(ORG_ID);
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('usage', { userId: USER_ID, organizationId: ORG_ID });
+        storage = testDb.storage;
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should track estimates count and stored bytes', async () => {
+        await storage.saveEstimate('est-1', { clientName: 'A' });
+        const afterInsert = usage();
+        expect(afterInsert.current_estimates_count).toBe(1);
+        expect(afterInsert.current_storage_mb).toBeGreaterThan(0);
+
+        await storage.deleteEstimate('est-1');
+        const afterDelete = usage();
+        expect(afterDelete.current_estimates_count).toBe(0);
+        expect(afterDelete.current_storage_mb).toBeCloseTo(0, 10);
+    });
+
+    test('should count users created by schema seed', () => {
+        expect(usage().current_users_count).toBe(1);
+    });
+
+    test('should reject creates over plan limit', async () => {
+        storage.db.prepare('UPDATE organizations SET max_estimates = 1 WHERE id = ?').run(ORG_ID);
+
+        await storage.saveEstimate('est-1', { clientName: 'A' });
+        await expect(storage.saveEstimate('est-2', { clientName: 'B' }))
+            .rejects.toMatchObject({ code: 'QUOTA_EXCEEDED', status: 403 });
+
+        // Обновление существующей сметы лимитом не ограничено
+        await expect(storage.saveEstimate('est-1', { clientName: 'A2' })).resolves.toMatchObject({ isNew: false });
+    });
+
+    test('should drop and restore catalog items bytes with the catalog', async () => {
+        const { id } = await storage.saveCatalog('Hotels', {
+            templates: [{ id: 't1', name: 'Hotel', description: 'x'.repeat(500) }],
+            categories: [{ id: 'c1', name: 'Stay' }]
+        });
+        const stored = usage().current_storage_mb;
+        expect(stored).toBeGreaterThan(0);
+
+        storage.db.prepare('UPDATE catalogs SET deleted_at = CURRENT_TIMESTAMP WHERE id = ?').run(id);
+        expect(usage().current_catalogs_count).toBe(0);
+        expect(usage().current_storage_mb).toBeCloseTo(0, 10);
+
+        storage.db.prepare('UPDATE catalogs SET deleted_at = NULL WHERE id = ?').run(id);
+        expect(usage().current_storage_mb).toBeCloseTo(stored, 10);
+
+        storage.db.prepare('DELETE FROM catalogs WHERE id = ?').run(id);
+        expect(usage().current_storage_mb).toBeCloseTo(0, 10);
+
+        const result = await storage.reconcileUsageCounters();
+        expect(result.corrected.map(c => c.organizationId)).not.toContain(ORG_ID);
+    });
+
+    test('should not count items of soft-deleted catalogs when reconciling', async () => {
+        const { id } = await storage.saveCatalog('Hotels', {
+            templates: [{ id: 't1', name: 'Hotel' }],
+            categories: []
+        });
+        storage.db.prepare('UPDATE catalogs SET deleted_at = CURRENT_TIMESTAMP WHERE id = ?').run(id);
+
+        const result = await storage.reconcileUsageCounters();
+
+        expect(result.corrected.map(c => c.organizationId)).not.toContain(ORG_ID);
+        expect(usage().current_storage_mb).toBeCloseTo(0, 10);
+    });
+
+    test('should reconcile drifted counters', async () => {
+        await storage.saveEstimate('est-1', { clientName: 'A' });
+        storage.db.prepare('UPDATE organizations SET current_estimates_count = 42 WHERE id = ?').run(ORG_ID);
+
+        const result = await storage.reconcileUsageCounters();
+
+        expect(result.corrected.map(c => c.organizationId)).toContain(ORG_ID);
+        expect(usage().current_estimates_count).toBe(1);
+    });
+});
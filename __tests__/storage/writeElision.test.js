@@ -0,0 +1,71 @@
+/**
+ * Estimate Write Elision Tests
+ *
+ * Testing:
+ * - Unchanged saves return current version without UPDATE
+ * - Changed saves still bump data_version
+ * - Elided writes counter
+ */
+
+const { createTestStorage, removeTestStorage } = require('../helpers/storage-setup');
+const metrics = require('../../utils/metrics');
+
+describe('Estimate write elision', () => {
+    let storage;
+    let testDb;
+
+    const row = (id) => storage.db.prepare('SELECT data_version, data_hash, updated_at FROM estimates WHERE id = ?').get(id);
+    const elided = () => metrics.counter('estimate_writes_elided_total').get({ source: 'storage' });
+
+    beforeEach(async () => {
+        testDb = await createTestStorage('elision');
+        storage = testDb.storage;
+    });
+
+    afterEach(async () => {
+        await removeTestStorage(testDb);
+    });
+
+    test('should skip the write when data is unchanged', async () => {
+        const estimate = { id: 'est-1', clientName: 'Same', services: [{ name: 'Hotel', price: 100 }] };
+        await storage.saveEstimate('est-1', estimate);
+
+        const before = row('est-1');
+        const elidedBefore = elided();
+        const result = await storage.saveEstimate('est-1', JSON.parse(JSON.stringify(estimate)));
+
+        expect(result.unchanged).toBe(true);
+        expect(result.dataVersion).toBe(1);
+        expect(row('est-1')).toEqual(before);
+        expect(elided()).toBe(elidedBefore + 1);
+    });
+
+    test('should still write and bump version when data changes', async () => {
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V1' });
+        const result = await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V2' });
+
+        expect(result.unchanged).toBe(undefined);
+        expect(result.dataVersion).toBe(2);
+        expect(row('est-1').data_version).toBe(2);
+        expect(row('est-1').data_hash).toBe(storage._calculateHash(JSON.stringify({ id: 'est-1', clientName: 'V2' })));
+    });
+
+    test('should hash the same data equally regardless of key order and formatting', async () => {
+        const hash = storage._calculateHash({ id: 'est-1', clientName: 'A', services: [{ price: 1, name: 'B' }] });
+
+        expect(storage._calculateHash('{ "services": [{"name":"B","price":1}], "clientName": "A", "id": "est-1" }')).toBe(hash);
+        expect(storage._calculateHash({ id: 'est-1', clientName: 'A', services: [{ name: 'B', price: 2 }] })).not.toBe(hash);
+
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'A', paxCount: 2 });
+        const result = await storage.saveEstimate('est-1', { paxCount: 2, clientName: 'A', id: 'est-1' });
+        expect(result.unchanged).toBe(true);
+    });
+
+    test('should not elide rows without a stored hash', async () => {
+        await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V1' });
+        storage.db.prepare('UPDATE estimates SET data_hash = NULL WHERE id = ?').run('est-1');
+
+        const result = await storage.saveEstimate('est-1', { id: 'est-1', clientName: 'V1' });
+        expect(result.dataVersion).toBe(2);
+    });
+});
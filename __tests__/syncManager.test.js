@@ -0,0 +1,155 @@
+/**
+ * Тесты для очереди изменений SyncManager
+ * Одна запись на сущность, восстановление после перезагрузки, батчи по байтам и backoff
+ */
+
+const SyncManager = require('../js/SyncManager');
+
+class FakeChangeStore {
+    constructor(changes = []) {
+        this.changes = new Map(changes.map(change => [change.key, change]));
+    }
+
+    async open() {}
+
+    async getAll() {
+        return [...this.changes.values()];
+    }
+
+    async write(puts, deleteKeys = []) {
+        for (const key of deleteKeys) this.changes.delete(key);
+        for (const change of puts) this.changes.set(change.key, change);
+    }
+}
+
+function okResponse(changes) {
+    return {
+        success: true,
+        data: {
+            results: changes.map(change => ({
+                entity_type: change.entity_type,
+                entity_id: change.entity_id,
+                status: 'success',
+                data_version: (change.client_version || 0) + 1
+            }))
+        }
+    };
+}
+
+describe('SyncManager change queue', () => {
+    let store;
+    let api;
+    let cache;
+    let sync;
+
+    beforeEach(async () => {
+        store = new FakeChangeStore();
+        api = { post: jest.fn(async (url, body) => okResponse(body.changes)) };
+        cache = { updateCachedItem: jest.fn(async () => {}) };
+        sync = new SyncManager(api, cache, store);
+        await sync.ready;
+    });
+
+    afterEach(() => {
+        sync.stop();
+    });
+
+    test('should keep only the latest state per entity', async () => {
+        for (let i = 1; i <= 10; i++) {
+            sync.queueChange('estimate', 'e1', 'update', JSON.stringify({ rev: i }), 3);
+        }
+        sync.queueChange('estimate', 'e2', 'create', '{}', null);
+        sync.queueChange('estimate', 'e2', 'delete', null, null);
+        await sync.storeWrites;
+
+        expect(sync.pendingChanges.size).toBe(1);
+        expect(sync.pendingChanges.get('estimate:e1').data).toBe('{"rev":10}');
+        expect(sync.pendingChanges.get('estimate:e1').dataVersion).toBe(3);
+        expect(store.changes.size).toBe(1);
+
+        await sync.pushLocalChanges();
+        await sync.storeWrites;
+
+        expect(api.post).toHaveBeenCalledTimes(1);
+        expect(api.post.mock.calls[0][1].changes.length).toBe(1);
+        expect(store.changes.size).toBe(0);
+    });
+
+    test('should restore pending changes after reload', async () => {
+        sync.queueChange('estimate', 'e1', 'update', '{"a":1}', 1);
+        await sync.storeWrites;
+
+        const reloaded = new SyncManager(api, cache, store);
+        reloaded.queueChange('estimate', 'e1', 'update', '{"a":2}', 2);
+        await reloaded.ready;
+
+        expect(reloaded.pendingChanges.get('estimate:e1').data).toBe('{"a":2}');
+        expect(reloaded.pendingChanges.get('estimate:e1').dataVersion).toBe(1);
+    });
+
+    test('should split batches by payload bytes', async () => {
+        sync.PUSH_CONFIG.MAX_BATCH_BYTES = 25;
+        for (let i = 0; i < 3; i++) {
+            sync.queueChange('estimate', `e${i}`, 'update', JSON.stringify({ text: 'x'.repeat(10) }), 1);
+        }
+
+        await sync.pushLocalChanges();
+
+        expect(api.post).toHaveBeenCalledTimes(3);
+        expect(sync.pendingChanges.size).toBe(0);
+    });
+
+    test('should send delete + create of a server entity as an update', async () => {
+        sync.queueChange('estimate', 'e1', 'delete', null, 4);
+        sync.queueChange('estimate', 'e1', 'create', '{"a":1}', null);
+
+        const change = sync.pendingChanges.get('estimate:e1');
+        expect(change.action).toBe('update');
+        expect(change.dataVersion).toBe(4);
+    });
+
+    test('should park a change the server rejects as too large', async () => {
+        api.post = jest.fn(async (url, body) => (body.changes.some(change => change.entity_id === 'big')
+            ? { success: false, error: 'Payload too large', status: 413 }
+            : okResponse(body.changes)));
+        sync.queueChange('estimate', 'big', 'update', JSON.stringify({ text: 'x'.repeat(100) }), 1);
+        sync.queueChange('estimate', 'e1', 'update', '{"a":1}', 1);
+        sync.queueChange('estimate', 'e2', 'update', '{"a":2}', 1);
+
+        await sync.pushLocalChanges();
+        await sync.storeWrites;
+
+        const sent = api.post.mock.calls.map(call => call[1].changes.map(change => change.entity_id));
+        expect(sent).toEqual([['big', 'e1', 'e2'], ['big', 'e1'], ['big'], ['e1', 'e2']]);
+        expect(sync.pendingChanges.size).toBe(0);
+        expect([...sync.parkedChanges.keys()]).toEqual(['estimate:big']);
+        expect(sync.pushFailures).toBe(0);
+        // Остаётся в IndexedDB до успешной отправки
+        expect([...store.changes.keys()]).toEqual(['estimate:big']);
+
+        sync.queueChange('estimate', 'big', 'update', '{"text":"short"}', null);
+        expect(sync.parkedChanges.size).toBe(0);
+        expect(sync.pendingChanges.get('estimate:big').dataVersion).toBe(1);
+    });
+
+    test('should keep changes and back off after failure', async () => {
+        api.post = jest.fn(async () => { throw new Error('offline'); });
+        sync.queueChange('estimate', 'e1', 'update', '{"a":1}', 1);
+
+        let error;
+        try {
+            await sync.pushLocalChanges();
+        } catch (err) {
+            error = err;
+        }
+
+        expect(error.message).toBe('offline');
+        expect(sync.pendingChanges.size).toBe(1);
+        expect(sync.pushFailures).toBe(1);
+        expect(sync.retryAt > Date.now()).toBe(true);
+
+        // До истечения задержки повторной отправки нет
+        await sync.pushLocalChanges();
+        expect(api.post).toHaveBeenCalledTimes(1);
+    });
+});
@@ -0,0 +1,49 @@
+/**
+ * Тесты для TemplateSearchIndex
+ * Префиксный поиск по name / contractor / description с транслитерацией
+ */
+
+const TemplateSearchIndex = require('../js/TemplateSearchIndex');
+
+// Упрощённая транслитерация (в index.html - QuoteCalc.transliterate)
+const map = { 'м': 'm', 'о': 'o', 'с': 's', 'к': 'k', 'в': 'v', 'а': 'a', 'т': 't', 'р': 'r', 'н': 'n', 'ф': 'f', 'е': 'e' };
+const transliterate = text => text.toLowerCase().split('').map(char => map[char] || char).join('');
+
+describe('TemplateSearchIndex', () => {
+    const templates = [
+        { id: 't1', name: 'Трансфер аэропорт', contractor: 'Moskva Tours', description: '' },
+        { id: 't2', name: 'Transfer hotel', contractor: '', description: 'Минивэн до отеля' },
+        { id: 't3', name: 'Экскурсия Москва', contractor: 'Гид-Сервис', description: 'Обзорная' }
+    ];
+    let index;
+
+    beforeEach(() => {
+        index = new TemplateSearchIndex(templates, transliterate);
+    });
+
+    test('should return null for empty query', () => {
+        expect(index.search('')).toBe(null);
+        expect(index.search('  ,. ')).toBe(null);
+    });
+
+    test('should match word prefixes in all fields', () => {
+        expect([...index.search('экск')]).toEqual(['t3']);
+        expect([...index.search('минив')]).toEqual(['t2']);
+        expect([...index.search('сервис')]).toEqual(['t3']);
+    });
+
+    test('should match Cyrillic and Latin spellings', () => {
+        expect([...index.search('moskva')].sort()).toEqual(['t1', 't3']);
+        expect([...index.search('трансф')].sort()).toEqual(['t1', 't2']);
+    });
+
+    test('should require every query word', () => {
+        expect([...index.search('transfer hot')]).toEqual(['t2']);
+        expect(index.search('transfer экск').size).toBe(0);
+    });
+
+    test('should track catalog version', () => {
+        expect(index.isCurrent(templates)).toBe(true);
+        expect(index.isCurrent([...templates])).toBe(false);
+    });
+});
@@ -0,0 +1,74 @@
+/**
+ * BufferedFileTransport Tests
+ *
+ * Testing:
+ * - Batched flush to file
+ * - Bounded buffer drops oldest entries
+ * - Tailable rotation
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const BufferedFileTransport = require('../../utils/BufferedFileTransport');
+
+const MESSAGE = Symbol.for('message');
+
+function logLine(transport, text) {
+    return new Promise(resolve => transport.log({ [MESSAGE]: text }, resolve));
+}
+
+describe('BufferedFileTransport', () => {
+    let dir;
+    let transport;
+
+    beforeEach(() => {
+        dir = fs.mkdtempSync(path.join(os.tmpdir(), 'log-transport-'));
+    });
+
+    afterEach(() => {
+        if (transport) transport.close();
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+
+    test('should buffer lines until flush', async () => {
+        const filename = path.join(dir, 'app.log');
+        transport = new BufferedFileTransport({ filename, flushInterval: 60000 });
+
+        await logLine(transport, 'first');
+        await logLine(transport, 'second');
+        expect(fs.existsSync(filename)).toBe(false);
+
+        await transport.flush();
+        expect(fs.readFileSync(filename, 'utf8')).toBe('first\nsecond\n');
+        expect(transport.getStats().buffered).toBe(0);
+    });
+
+    test('should drop oldest entries when buffer is full', async () => {
+        const filename = path.join(dir, 'app.log');
+        transport = new BufferedFileTransport({ filename, bufferSize: 2, flushInterval: 60000 });
+
+        await logLine(transport, 'a');
+        await logLine(transport, 'b');
+        await logLine(transport, 'c');
+        expect(transport.getStats()).toEqual({ buffered: 2, capacity: 2, dropped: 1 });
+
+        await transport.flush();
+        const lines = fs.readFileSync(filename, 'utf8').trim().split('\n');
+        expect(JSON.parse(lines[0]).dropped).toBe(1);
+        expect(lines.slice(1)).toEqual(['b', 'c']);
+    });
+
+    test('should rotate file when maxsize is reached', async () => {
+        const filename = path.join(dir, 'app.log');
+        transport = new BufferedFileTransport({ filename, maxsize: 10, maxFiles: 3, flushInterval: 60000 });
+
+        await logLine(transport, '0123456789');
+        await transport.flush();
+        await logLine(transport, 'next');
+        await transport.flush();
+
+        expect(fs.readFileSync(path.join(dir, 'app1.log'), 'utf8')).toBe('0123456789\n');
+        expect(fs.readFileSync(filename, 'utf8')).toBe('next\n');
+    });
+});
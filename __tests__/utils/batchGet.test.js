@@ -0,0 +1,99 @@
+/**
+ * Batch-get Helpers Tests
+ *
+ * Testing:
+ * - Request validation and limit
+ * - Known data_version filtering in SQL (data = NULL when unchanged)
+ * - Streamed JSON response
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const Database = require('better-sqlite3');
+const {
+    BATCH_GET_LIMIT,
+    parseBatchGetRequest,
+    batchGetSql,
+    createBatchGetWriter
+} = require('../../utils/batchGet');
+
+function fakeResponse() {
+    return {
+        statusCode: null,
+        output: '',
+        status(code) { this.statusCode = code; return this; },
+        type() { return this; },
+        write(chunk) { this.output += chunk; return true; },
+        end(chunk = '') { this.output += chunk; }
+    };
+}
+
+describe('batchGet', () => {
+    test('should deduplicate ids and keep numeric versions', () => {
+        const request = parseBatchGetRequest({ ids: ['a', 'b', 'a'], versions: { a: '3', b: 'x', c: 1 } });
+
+        expect(request.ids).toEqual(['a', 'b']);
+        expect(request.versions).toEqual({ a: 3 });
+    });
+
+    test('should reject invalid bodies and too many ids', () => {
+        expect(() => parseBatchGetRequest({ ids: 'a' })).toThrow('ids must be an array');
+        expect(() => parseBatchGetRequest({ ids: ['a'], versions: [] })).toThrow('versions must be an object');
+
+        const ids = Array.from({ length: BATCH_GET_LIMIT + 1 }, (_, i) => `id-${i}`);
+        try {
+            parseBatchGetRequest({ ids });
+            throw new Error('expected limit error');
+        } catch (err) {
+            expect(err.code).toBe('BATCH_GET_LIMIT_EXCEEDED');
+            expect(err.status).toBe(400);
+        }
+    });
+
+    test('should not select data for rows with known version', () => {
+        const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'batch-get-'));
+        const db = new Database(path.join(dir, 'test.db'));
+
+        try {
+            db.exec('CREATE TABLE items (id TEXT PRIMARY KEY, data TEXT, data_version INTEGER)');
+            db.prepare('INSERT INTO items VALUES (?, ?, ?)').run('a', '{"v":1}', 1);
+            db.prepare('INSERT INTO items VALUES (?, ?, ?)').run('b"q', '{"v":2}', 2);
+
+            const ids = ['a', 'b"q'];
+            const sql = batchGetSql(ids);
+            const rows = db.prepare(`SELECT id, ${sql.dataColumn} FROM items WHERE id IN (${sql.placeholders}) ORDER BY id`)
+                .all(JSON.stringify({ a: 1, 'b"q': 1 }), ...ids);
+
+            expect(rows).toEqual([
+                { id: 'a', data: null },
+                { id: 'b"q', data: '{"v":2}' }
+            ]);
+        } finally {
+            db.close();
+            fs.rmSync(dir, { recursive: true, force: true });
+        }
+    });
+
+    test('should stream items with raw data and summary', async () => {
+        const res = fakeResponse();
+        const writer = createBatchGetWriter(res, 'catalogs');
+
+        await writer.write({ id: 'a', data_version: 2 }, '{"templates":[]}');
+        await writer.write({}, '[1]');
+        writer.end({ unchanged: ['b'], not_found: [] });
+
+        expect(res.statusCode).toBe(200);
+        expect(JSON.parse(res.output)).toEqual({
+            success: true,
+            data: {
+                catalogs: [
+                    { id: 'a', data_version: 2, data: { templates: [] } },
+                    { data: [1] }
+                ],
+                unchanged: ['b'],
+                not_found: []
+            }
+        });
+    });
+});
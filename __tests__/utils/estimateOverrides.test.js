@@ -0,0 +1,70 @@
+/**
+ * Estimate Overrides Tests
+ *
+ * Testing:
+ * - Override documents for value changes
+ * - Structural divergence detection
+ * - Applying overrides without mutating the snapshot
+ * - Validation of client patches
+ */
+
+const { computeOverrides, applyOverrides, validateOverrides } = require('../../utils/estimateOverrides');
+
+describe('estimateOverrides', () => {
+    const template = {
+        clientName: '',
+        paxCount: 2,
+        services: [
+            { name: 'Hotel', price: 100, meta: { nights: 3 } },
+            { name: 'Transfer', price: 40 }
+        ],
+        notes: 'draft'
+    };
+
+    test('should encode value changes as set/unset operations', () => {
+        const target = JSON.parse(JSON.stringify(template));
+        target.clientName = 'ACME';
+        target.services[1].price = 55;
+        target.tourStart = '2026-01-10';
+        delete target.notes;
+
+        const overrides = computeOverrides(template, target);
+
+        expect(overrides.set).toEqual([
+            [['clientName'], 'ACME'],
+            [['services', 1, 'price'], 55],
+            [['tourStart'], '2026-01-10']
+        ]);
+        expect(overrides.unset).toEqual([['notes']]);
+        expect(applyOverrides(template, overrides)).toEqual(target);
+    });
+
+    test('should report structural divergence when array length changes', () => {
+        const target = { ...template, services: [...template.services, { name: 'Guide', price: 80 }] };
+        expect(computeOverrides(template, target)).toBe(null);
+    });
+
+    test('should not mutate the snapshot when applying overrides', () => {
+        const snapshot = JSON.parse(JSON.stringify(template));
+        const result = applyOverrides(snapshot, { set: [[['services', 0, 'meta', 'nights'], 5]], unset: [] });
+
+        expect(result.services[0].meta.nights).toBe(5);
+        expect(snapshot).toEqual(template);
+        expect(result.services[1]).toBe(snapshot.services[1]);
+    });
+
+    test('should validate client patches', () => {
+        expect(validateOverrides({ set: [[['services', 0, 'price'], 5]], unset: [['notes']] })).toBe(null);
+        expect(validateOverrides({})).toBe(null);
+        expect(validateOverrides({ set: [null] })).not.toBe(null);
+        expect(validateOverrides({ unset: [5] })).not.toBe(null);
+        expect(validateOverrides({ set: [[['a', 1.5], 1]] })).not.toBe(null);
+        expect(validateOverrides({ set: {} })).not.toBe(null);
+    });
+
+    test('should apply strict patches that append to arrays', () => {
+        const result = applyOverrides(template, { set: [[['services', 2], { name: 'Boat' }]] }, { strict: true });
+        expect(result.services.length).toBe(3);
+        expect(template.services.length).toBe(2);
+    });
+});
@@ -0,0 +1,52 @@
+/**
+ * Metrics Registry Tests
+ *
+ * Testing:
+ * - Counter / Histogram exposition format
+ * - Statement instrumentation
+ * - Cache hit ratio collector
+ */
+
+const metrics = require('../../utils/metrics');
+
+describe('Metrics registry', () => {
+    test('should render counters with labels', () => {
+        const requests = metrics.counter('test_requests_total', 'Test counter');
+        requests.inc({ route: '/a' });
+        requests.inc({ route: '/a' }, 2);
+
+        const output = metrics.render();
+        expect(output).toContain('# TYPE test_requests_total counter');
+        expect(output).toContain('test_requests_total{route="/a"} 3');
+    });
+
+    test('should render cumulative histogram buckets', () => {
+        const latency = metrics.histogram('test_latency_seconds', 'Test histogram', [0.1, 1]);
+        latency.observe({}, 0.05);
+        latency.observe({}, 0.5);
+        latency.observe({}, 5);
+
+        const output = metrics.render();
+        expect(output).toContain('test_latency_seconds_bucket{le="0.1"} 1');
+        expect(output).toContain('test_latency_seconds_bucket{le="1"} 2');
+        expect(output).toContain('test_latency_seconds_bucket{le="+Inf"} 3');
+        expect(output).toContain('test_latency_seconds_count 3');
+    });
+
+    test('should time instrumented statements', () => {
+        const statement = { get: (id) => ({ id }), run: () => ({ changes: 1 }), all: () => [] };
+        const wrapped = metrics.instrumentStatement('testGet', statement);
+
+        expect(wrapped.get(7)).toEqual({ id: 7 });
+        expect(metrics.render()).toContain('sqlite_statement_duration_seconds_count{statement="testGet"} 1');
+    });
+
+    test('should report cache hit ratio', () => {
+        metrics.recordCache('test_cache', true);
+        metrics.recordCache('test_cache', true);
+        metrics.recordCache('test_cache', false);
+        metrics.recordCache('test_cache', true);
+
+        expect(metrics.render()).toContain('cache_hit_ratio{cache="test_cache"} 0.75');
+    });
+});
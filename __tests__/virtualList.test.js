@@ -0,0 +1,262 @@
+/**
+ * Тесты для VirtualList
+ * Видимое окно (+ overscan) по оценённым и измеренным высотам, переиспользование строк по ключу
+ * и перерисовка только при изменении сигнатуры
+ */
+
+const VirtualList = require('../js/VirtualList');
+
+const VIEWPORT_HEIGHT = 500;
+let scrollY = 0;
+
+// Минимальный DOM: элементы в одну колонку, offsetTop = сумма высот предыдущих соседей
+class FakeElement {
+    constructor(tagName, height = 0) {
+        this.tagName = tagName;
+        this.height = height;
+        this.parentNode = null;
+        this.children = [];
+        this.style = {};
+        this.attributes = {};
+        this.connected = false;
+    }
+
+    get isConnected() {
+        return this.connected || Boolean(this.parentNode && this.parentNode.isConnected);
+    }
+
+    get parentElement() {
+        return this.parentNode;
+    }
+
+    get firstChild() {
+        return this.children[0] || null;
+    }
+
+    get nextSibling() {
+        if (!this.parentNode) return null;
+        const siblings = this.parentNode.children;
+        return siblings[siblings.indexOf(this) + 1] || null;
+    }
+
+    get nextElementSibling() {
+        return this.nextSibling;
+    }
+
+    get offsetHeight() {
+        return this.style.height ? parseFloat(this.style.height) : this.height;
+    }
+
+    get offsetTop() {
+        let top = 0;
+        for (const sibling of this.parentNode.children) {
+            if (sibling === this) break;
+            top += sibling.offsetHeight;
+        }
+        return top;
+    }
+
+    getBoundingClientRect() {
+        const top = this.offsetTop - scrollY;
+        return { top, bottom: top + this.offsetHeight };
+    }
+
+    setAttribute(name, value) {
+        this.attributes[name] = value;
+    }
+
+    appendChild(child) {
+        child.remove();
+        child.parentNode = this;
+        this.children.push(child);
+        return child;
+    }
+
+    replaceChildren(...nodes) {
+        for (const child of this.children) child.parentNode = null;
+        this.children = [];
+        for (const node of nodes) this.appendChild(node);
+    }
+
+    after(node) {
+        node.remove();
+        const siblings = this.parentNode.children;
+        siblings.splice(siblings.indexOf(this) + 1, 0, node);
+        node.parentNode = this.parentNode;
+    }
+
+    replaceWith(node) {
+        node.remove();
+        const siblings = this.parentNode.children;
+        siblings[siblings.indexOf(this)] = node;
+        node.parentNode = this.parentNode;
+        this.parentNode = null;
+    }
+
+    remove() {
+        if (!this.parentNode) return;
+        const siblings = this.parentNode.children;
+        siblings.splice(siblings.indexOf(this), 1);
+        this.parentNode = null;
+    }
+}
+
+// <template>: корневой элемент строки хранит свою HTML строку
+function fakeTemplate() {
+    const content = { firstElementChild: null };
+    return {
+        content,
+        set innerHTML(html) {
+            content.firstElementChild = Object.assign(new FakeElement('div', 40), { html });
+        }
+    };
+}
+
+describe('VirtualList', () => {
+    let container;
+    let rendered;
+
+    // Строки через DOM API: render считается по ключам
+    const items = (count, { height = 50, version = () => 1 } = {}) => Array.from({ length: count }, (_, i) => ({
+        key: `k${i}`,
+        signature: () => `k${i}:${version(i)}`,
+        render: () => {
+            rendered.push(`k${i}`);
+            return Object.assign(new FakeElement('div', height), { key: `k${i}` });
+        }
+    }));
+
+    const rowKeys = () => container.children.slice(1, -1).map(element => element.key);
+    const spacerHeights = list => [list.topSpacer.style.height, list.bottomSpacer.style.height];
+
+    beforeEach(() => {
+        scrollY = 0;
+        rendered = [];
+        global.window = {
+            innerHeight: VIEWPORT_HEIGHT,
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn()
+        };
+        global.document = {
+            body: new FakeElement('body'),
+            documentElement: new FakeElement('html'),
+            createElement: tag => (tag === 'template' ? fakeTemplate() : new FakeElement(tag))
+        };
+        document.body.connected = true;
+        container = document.body.appendChild(new FakeElement('div'));
+    });
+
+    afterEach(() => {
+        delete global.window;
+        delete global.document;
+    });
+
+    test('should render only the visible window and size the spacers', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        list.setItems(items(100));
+
+        expect(rowKeys()).toEqual(['k0', 'k1', 'k2', 'k3', 'k4', 'k5', 'k6', 'k7', 'k8', 'k9']);
+        expect(spacerHeights(list)).toEqual(['0px', '4500px']);
+    });
+
+    test('should move the window with scroll and overscan', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        list.setItems(items(100));
+
+        scrollY = 1000;
+        expect(list._visibleRange()).toEqual({ start: 19, end: 30 });
+
+        list.overscan = 100;
+        expect(list._visibleRange()).toEqual({ start: 17, end: 32 });
+
+        list.update();
+        expect(rowKeys()[0]).toBe('k17');
+        expect(rowKeys().length).toBe(15);
+        expect(spacerHeights(list)).toEqual(['850px', '3400px']);
+    });
+
+    test('should use measured heights instead of the estimate', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        list.setItems(items(20, { height: 100 }));
+
+        expect(list.heights.get('k0')).toBe(100);
+        expect(list._visibleRange()).toEqual({ start: 0, end: 5 });
+
+        list.update();
+        expect(rowKeys()).toEqual(['k0', 'k1', 'k2', 'k3', 'k4']);
+        // k5..k9 измерены при первом проходе, остальные - по оценке
+        expect(spacerHeights(list)).toEqual(['0px', `${5 * 100 + 10 * 50}px`]);
+    });
+
+    test('should reuse rows by key when items are reordered', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        const initial = items(5);
+        list.setItems(initial);
+        const k1 = list.rows.get('k1').element;
+        rendered = [];
+
+        list.setItems([initial[1], initial[0], ...initial.slice(2)]);
+
+        expect(rendered).toEqual([]);
+        expect(rowKeys()).toEqual(['k1', 'k0', 'k2', 'k3', 'k4']);
+        expect(list.rows.get('k1').element).toBe(k1);
+    });
+
+    test('should drop rows that left the window', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        list.setItems(items(100));
+
+        scrollY = 2000;
+        list.update();
+
+        expect(list.rows.has('k0')).toBe(false);
+        expect(list.rows.size).toBe(11);
+        expect(rowKeys().length).toBe(11);
+    });
+
+    test('should patch only rows whose signature changed', () => {
+        const onRender = jest.fn();
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50, onRender });
+        const versions = { k2: 1 };
+        list.setItems(items(5, { version: i => versions[`k${i}`] || 1 }));
+        const old = list.rows.get('k2').element;
+        rendered = [];
+
+        list.update();
+        expect(rendered).toEqual([]);
+        expect(onRender).toHaveBeenCalledTimes(1);
+
+        versions.k2 = 2;
+        list.update();
+
+        expect(rendered).toEqual(['k2']);
+        expect(old.parentNode).toBe(null);
+        expect(rowKeys()).toEqual(['k0', 'k1', 'k2', 'k3', 'k4']);
+        expect(onRender).toHaveBeenCalledTimes(2);
+    });
+
+    test('should use the HTML string as the signature of html rows', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 40 });
+        let label = 'Hotel';
+        const row = { key: 'r1', html: () => `<div>${label}</div>` };
+        list.setItems([row]);
+        const first = list.rows.get('r1').element;
+
+        list.update();
+        expect(list.rows.get('r1').element).toBe(first);
+
+        label = 'Hostel';
+        list.update();
+        expect(list.rows.get('r1').element.html).toBe('<div>Hostel</div>');
+        expect(container.children[1]).toBe(list.rows.get('r1').element);
+    });
+
+    test('should not render after the container was overwritten', () => {
+        const list = new VirtualList(container, { overscan: 0, defaultHeight: 50 });
+        container.replaceChildren();
+
+        list.setItems(items(3));
+        expect(rendered).toEqual([]);
+        expect(list.isAttached()).toBe(false);
+    });
+});
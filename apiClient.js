@@ -79,6 +79,61 @@ class APIClient {
         return response.json();
     }
 
+    /**
+     * Templates / categories changed since a catalog version
+     * @param {string} id - Catalog UUID
+     * @param {number} since - data_version known to the client (0 - everything)
+     * @returns {Promise<{success: boolean, data: Object}>}
+     */
+    async getCatalogChanges(id, since = 0) {
+        const response = await fetch(`${this.baseURL}/api/v1/catalogs/${encodeURIComponent(id)}/changes?since=${since}`, {
+            method: 'GET',
+            headers: this.getAuthHeaders()
+        });
+
+        if (!response.ok) {
+            if (response.status === 404) {
+                throw new Error('Catalog not found');
+            }
+            if (response.status === 401) {
+                throw new Error('Authentication required');
+            }
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        return response.json();
+    }
+
+    /**
+     * Change individual templates / categories
+     * @param {string} id - Catalog UUID
+     * @param {number} baseVersion - data_version the changes are based on
+     * @param {Object} changes - { header?, templates?: { upsert, delete }, categories?: { upsert, delete } }
+     * @returns {Promise<{success: boolean, id: string, dataVersion: number}>}
+     * @throws {Error} code CONFLICT - a changed template was modified on the server
+     */
+    async patchCatalog(id, baseVersion, changes) {
+        const response = await fetch(`${this.baseURL}/api/v1/catalogs/${encodeURIComponent(id)}`, {
+            method: 'PATCH',
+            headers: {
+                ...this.getAuthHeaders(),
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ baseVersion, ...changes })
+        });
+
+        const result = await response.json();
+
+        if (!response.ok) {
+            const error = new Error(result.error || 'Save failed');
+            error.code = result.code;
+            error.dataVersion = result.dataVersion;
+            throw error;
+        }
+
+        return result;
+    }
+
     /**
      * Helper: Get authorization headers
      * @returns {Object}
@@ -35,6 +35,11 @@ function configurePassport(authService) {
             // Success
             return done(null, user);
         } catch (error) {
+            // Hash pool saturated - это не ошибка credentials, отдаём наверх (429)
+            if (error.code === 'HASH_POOL_SATURATED') {
+                return done(error);
+            }
+
             // Authentication failed
             logger.warn('Authentication failed', {
                 email,
@@ -148,6 +148,40 @@ CREATE TABLE IF NOT EXISTS estimates (
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Copy-on-write сметы из шаблонов
+-- Неизменяемый снимок шаблона на data_version (общий для всех экземпляров)
+CREATE TABLE IF NOT EXISTS template_snapshots (
+    template_id TEXT NOT NULL,
+    template_version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    organization_id TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    PRIMARY KEY (template_id, template_version)
+);
+
+-- Смета-экземпляр: estimates.data хранит override-документ относительно снимка.
+-- При структурном расхождении смета копируется целиком, а строка удаляется.
+CREATE TABLE IF NOT EXISTS estimate_template_refs (
+    estimate_id TEXT PRIMARY KEY NOT NULL,
+    template_id TEXT NOT NULL,
+    template_version INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    FOREIGN KEY (estimate_id) REFERENCES estimates(id) ON DELETE CASCADE,
+    FOREIGN KEY (template_id, template_version) REFERENCES template_snapshots(template_id, template_version)
+);
+
+-- Interval index дат тура: R*Tree по номерам дней (дни от 1970-01-01).
+-- Запрос "туры, активные в интервале" - overlap двух концов, который B-tree
+-- индекс (organization_id, tour_start, tour_end) ограничивает только с одной стороны.
+-- estimate_intervals даёт стабильный INTEGER id (rowid estimates меняется при VACUUM).
+-- Поддерживается triggers на estimates (ниже).
+CREATE TABLE IF NOT EXISTS estimate_intervals (
+    id INTEGER PRIMARY KEY,  -- = id в estimate_intervals_rtree
+    estimate_id TEXT NOT NULL UNIQUE
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS estimate_intervals_rtree USING rtree(id, start_day, end_day);
+
 -- Backups
 CREATE TABLE IF NOT EXISTS backups (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -191,6 +225,23 @@ CREATE TABLE IF NOT EXISTS catalogs (
     UNIQUE(organization_id, slug)
 );
 
+-- Catalog items: шаблоны и категории каталога отдельными строками.
+-- catalogs.data хранит только заголовок (с пустыми "templates": [] / "categories": []),
+-- catalogs.data_version - часы каталога, version строки - data_version, в которой
+-- строка последний раз менялась. data IS NULL - строка удалена (tombstone для delta sync).
+CREATE TABLE IF NOT EXISTS catalog_items (
+    catalog_id TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('template', 'category')),
+    item_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT,
+    version INTEGER NOT NULL,
+    organization_id TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (catalog_id, kind, item_key),
+    FOREIGN KEY (catalog_id) REFERENCES catalogs(id) ON DELETE CASCADE
+);
+
 -- Settings (scope-based key-value store)
 CREATE TABLE IF NOT EXISTS settings (
     scope TEXT NOT NULL CHECK (scope IN ('app', 'organization', 'user')),
@@ -204,6 +255,16 @@ CREATE TABLE IF NOT EXISTS settings (
     PRIMARY KEY (scope, scope_id, key)
 );
 
+-- Версия настроек scope: увеличивается triggers в той же транзакции, что и запись настроек
+-- (ETag и проверка кэша снимков настроек в SQLiteStorage.getSettingsSnapshot)
+CREATE TABLE IF NOT EXISTS settings_versions (
+    scope TEXT NOT NULL CHECK (scope IN ('app', 'organization', 'user')),
+    scope_id TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (scope, scope_id)
+);
+
 -- Audit Logs (general entity changes)
 CREATE TABLE IF NOT EXISTS audit_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -244,6 +305,7 @@ CREATE INDEX IF NOT EXISTS idx_estimates_tour_dates ON estimates(organization_id
 CREATE INDEX IF NOT EXISTS idx_estimates_accessed ON estimates(last_accessed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_estimates_templates ON estimates(organization_id, is_template);
 CREATE INDEX IF NOT EXISTS idx_estimates_filename ON estimates(filename);
+CREATE INDEX IF NOT EXISTS idx_template_refs_template ON estimate_template_refs(template_id, template_version);
 
 -- Catalogs indexes
 CREATE INDEX IF NOT EXISTS idx_catalogs_org ON catalogs(organization_id, updated_at DESC);
@@ -252,6 +314,8 @@ CREATE INDEX IF NOT EXISTS idx_catalogs_region ON catalogs(organization_id, regi
 CREATE INDEX IF NOT EXISTS idx_catalogs_slug ON catalogs(slug);
 CREATE INDEX IF NOT EXISTS idx_catalogs_accessed ON catalogs(last_accessed_at DESC);
 CREATE INDEX IF NOT EXISTS idx_catalogs_name ON catalogs(name);
+CREATE INDEX IF NOT EXISTS idx_catalog_items_version ON catalog_items(catalog_id, version);
+CREATE INDEX IF NOT EXISTS idx_catalog_items_position ON catalog_items(catalog_id, kind, position);
 
 -- Organizations indexes
 CREATE INDEX IF NOT EXISTS idx_orgs_slug ON organizations(slug);
@@ -279,6 +343,7 @@ CREATE INDEX IF NOT EXISTS idx_audit_entity ON audit_logs(entity_type, entity_id
 CREATE INDEX IF NOT EXISTS idx_audit_org ON audit_logs(organization_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_logs(action, entity_type);
+CREATE INDEX IF NOT EXISTS idx_audit_created ON audit_logs(created_at);
 
 -- Auth logs indexes (for `auth_logs` table)
 CREATE INDEX IF NOT EXISTS idx_auth_logs_user ON auth_logs(user_id);
@@ -290,7 +355,12 @@ CREATE INDEX IF NOT EXISTS idx_sessions_expired ON sessions(expired);
 
 -- Collaborators indexes
 CREATE INDEX IF NOT EXISTS idx_collaborators_estimate ON estimate_collaborators(estimate_id);
-CREATE INDEX IF NOT EXISTS idx_collaborators_user ON estimate_collaborators(user_id);
+-- Shared-with-me: keyset-пагинация (user_id, created_at DESC, id DESC);
+-- заменяет idx_collaborators_user(user_id) - префикс нового индекса
+DROP INDEX IF EXISTS idx_collaborators_user;
+CREATE INDEX IF NOT EXISTS idx_collaborators_user_created ON estimate_collaborators(user_id, created_at);
+-- Сметы с legacy sharing в shared_with (JSON), ещё не перенесённые в estimate_collaborators
+CREATE INDEX IF NOT EXISTS idx_estimates_shared_legacy ON estimates(id) WHERE shared_with IS NOT NULL;
 
 -- ============================================================================
 -- Views
@@ -361,8 +431,17 @@ BEGIN
     UPDATE catalogs SET updated_at = unixepoch() WHERE id = NEW.id;
 END;
 
-CREATE TRIGGER IF NOT EXISTS trigger_organizations_updated_at
-AFTER UPDATE ON organizations
+-- Только "настоящие" изменения org: счётчики usage (current_*) обновляются
+-- триггерами ниже на каждую запись и не должны трогать updated_at.
+-- DROP + CREATE: пересоздаём старую версию триггера (AFTER UPDATE на все колонки)
+DROP TRIGGER IF EXISTS trigger_organizations_updated_at;
+CREATE TRIGGER trigger_organizations_updated_at
+AFTER UPDATE OF
+    name, slug, logo_url, primary_color, email, phone, website, address, settings,
+    plan, subscription_status, trial_ends_at, subscription_starts_at, subscription_ends_at,
+    billing_email, max_users, max_estimates, max_catalogs, storage_limit_mb, api_rate_limit,
+    owner_id, is_active, suspended_at, suspension_reason, deleted_at
+ON organizations
 FOR EACH ROW
 WHEN NEW.updated_at = OLD.updated_at
 BEGIN
@@ -386,6 +465,298 @@ BEGIN
     WHERE scope = NEW.scope AND scope_id = NEW.scope_id AND key = NEW.key;
 END;
 
+-- ============================================================================
+-- Triggers for settings versions (любая запись в settings, включая скрипты)
+-- ============================================================================
+
+CREATE TRIGGER IF NOT EXISTS trigger_settings_version_insert
+AFTER INSERT ON settings
+FOR EACH ROW
+BEGIN
+    INSERT INTO settings_versions (scope, scope_id, version, updated_at)
+    VALUES (NEW.scope, NEW.scope_id, 1, unixepoch())
+    ON CONFLICT(scope, scope_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+-- Только value / value_type: обновление updated_at (trigger выше) версию не меняет
+CREATE TRIGGER IF NOT EXISTS trigger_settings_version_update
+AFTER UPDATE OF value, value_type ON settings
+FOR EACH ROW
+WHEN NEW.value IS NOT OLD.value OR NEW.value_type IS NOT OLD.value_type
+BEGIN
+    INSERT INTO settings_versions (scope, scope_id, version, updated_at)
+    VALUES (NEW.scope, NEW.scope_id, 1, unixepoch())
+    ON CONFLICT(scope, scope_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_settings_version_delete
+AFTER DELETE ON settings
+FOR EACH ROW
+BEGIN
+    INSERT INTO settings_versions (scope, scope_id, version, updated_at)
+    VALUES (OLD.scope, OLD.scope_id, 1, unixepoch())
+    ON CONFLICT(scope, scope_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;
+END;
+
+-- ============================================================================
+-- Triggers for organization usage counters
+-- ============================================================================
+-- current_*_count и current_storage_mb обновляются в той же транзакции,
+-- что и INSERT / soft delete / restore / DELETE. Квоты проверяются чтением
+-- одной строки organizations вместо COUNT(*). Дрейф (ручные правки БД,
+-- смена organization_id) исправляет SQLiteStorage.reconcileUsageCounters().
+
+-- Estimates
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_usage_insert
+AFTER INSERT ON estimates
+FOR EACH ROW
+WHEN NEW.deleted_at IS NULL
+BEGIN
+    UPDATE organizations
+    SET current_estimates_count = current_estimates_count + 1,
+        current_storage_mb = current_storage_mb + length(CAST(NEW.data AS BLOB)) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+-- Обычное сохранение: изменился только размер data
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_usage_resize
+AFTER UPDATE OF data ON estimates
+FOR EACH ROW
+WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NULL
+    AND OLD.organization_id = NEW.organization_id
+    AND length(CAST(OLD.data AS BLOB)) != length(CAST(NEW.data AS BLOB))
+BEGIN
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb
+        + (length(CAST(NEW.data AS BLOB)) - length(CAST(OLD.data AS BLOB))) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+-- Soft delete / restore / перенос в другую org
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_usage_move
+AFTER UPDATE OF deleted_at, organization_id ON estimates
+FOR EACH ROW
+WHEN (OLD.deleted_at IS NULL) != (NEW.deleted_at IS NULL)
+    OR OLD.organization_id != NEW.organization_id
+BEGIN
+    UPDATE organizations
+    SET current_estimates_count = current_estimates_count - 1,
+        current_storage_mb = current_storage_mb - length(CAST(OLD.data AS BLOB)) / 1048576.0
+    WHERE id = OLD.organization_id AND OLD.deleted_at IS NULL;
+
+    UPDATE organizations
+    SET current_estimates_count = current_estimates_count + 1,
+        current_storage_mb = current_storage_mb + length(CAST(NEW.data AS BLOB)) / 1048576.0
+    WHERE id = NEW.organization_id AND NEW.deleted_at IS NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_usage_delete
+AFTER DELETE ON estimates
+FOR EACH ROW
+WHEN OLD.deleted_at IS NULL
+BEGIN
+    UPDATE organizations
+    SET current_estimates_count = current_estimates_count - 1,
+        current_storage_mb = current_storage_mb - length(CAST(OLD.data AS BLOB)) / 1048576.0
+    WHERE id = OLD.organization_id;
+END;
+
+-- Catalogs
+CREATE TRIGGER IF NOT EXISTS trigger_catalogs_usage_insert
+AFTER INSERT ON catalogs
+FOR EACH ROW
+WHEN NEW.deleted_at IS NULL
+BEGIN
+    UPDATE organizations
+    SET current_catalogs_count = current_catalogs_count + 1,
+        current_storage_mb = current_storage_mb + length(CAST(NEW.data AS BLOB)) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_catalogs_usage_resize
+AFTER UPDATE OF data ON catalogs
+FOR EACH ROW
+WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NULL
+    AND OLD.organization_id = NEW.organization_id
+    AND length(CAST(OLD.data AS BLOB)) != length(CAST(NEW.data AS BLOB))
+BEGIN
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb
+        + (length(CAST(NEW.data AS BLOB)) - length(CAST(OLD.data AS BLOB))) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+-- Soft delete / restore снимает / возвращает и байты строк catalog_items
+-- (они считаются в organization_id самих строк).
+-- DROP + CREATE: пересоздаём версию без catalog_items
+DROP TRIGGER IF EXISTS trigger_catalogs_usage_move;
+CREATE TRIGGER trigger_catalogs_usage_move
+AFTER UPDATE OF deleted_at, organization_id ON catalogs
+FOR EACH ROW
+WHEN (OLD.deleted_at IS NULL) != (NEW.deleted_at IS NULL)
+    OR OLD.organization_id != NEW.organization_id
+BEGIN
+    UPDATE organizations
+    SET current_catalogs_count = current_catalogs_count - 1,
+        current_storage_mb = current_storage_mb - length(CAST(OLD.data AS BLOB)) / 1048576.0
+    WHERE id = OLD.organization_id AND OLD.deleted_at IS NULL;
+
+    UPDATE organizations
+    SET current_catalogs_count = current_catalogs_count + 1,
+        current_storage_mb = current_storage_mb + length(CAST(NEW.data AS BLOB)) / 1048576.0
+    WHERE id = NEW.organization_id AND NEW.deleted_at IS NULL;
+
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb
+        + (CASE WHEN NEW.deleted_at IS NULL THEN 1 ELSE -1 END)
+        * (SELECT COALESCE(SUM(length(CAST(i.data AS BLOB))), 0) FROM catalog_items i
+           WHERE i.catalog_id = NEW.id AND i.organization_id = organizations.id) / 1048576.0
+    WHERE (OLD.deleted_at IS NULL) != (NEW.deleted_at IS NULL)
+        AND id IN (SELECT organization_id FROM catalog_items WHERE catalog_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_catalogs_usage_delete
+AFTER DELETE ON catalogs
+FOR EACH ROW
+WHEN OLD.deleted_at IS NULL
+BEGIN
+    UPDATE organizations
+    SET current_catalogs_count = current_catalogs_count - 1,
+        current_storage_mb = current_storage_mb - length(CAST(OLD.data AS BLOB)) / 1048576.0
+    WHERE id = OLD.organization_id;
+END;
+
+-- Catalog items: размер строк (tombstone data IS NULL - 0 байт), только пока
+-- каталог не удалён - байты удалённого каталога сняты trigger_catalogs_usage_move.
+-- DROP + CREATE: пересоздаём версии без проверки каталога
+DROP TRIGGER IF EXISTS trigger_catalog_items_usage_insert;
+CREATE TRIGGER trigger_catalog_items_usage_insert
+AFTER INSERT ON catalog_items
+FOR EACH ROW
+WHEN NEW.data IS NOT NULL
+    AND EXISTS (SELECT 1 FROM catalogs WHERE id = NEW.catalog_id AND deleted_at IS NULL)
+BEGIN
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb + length(CAST(NEW.data AS BLOB)) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+DROP TRIGGER IF EXISTS trigger_catalog_items_usage_resize;
+CREATE TRIGGER trigger_catalog_items_usage_resize
+AFTER UPDATE OF data ON catalog_items
+FOR EACH ROW
+WHEN COALESCE(length(CAST(OLD.data AS BLOB)), 0) != COALESCE(length(CAST(NEW.data AS BLOB)), 0)
+    AND EXISTS (SELECT 1 FROM catalogs WHERE id = NEW.catalog_id AND deleted_at IS NULL)
+BEGIN
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb
+        + (COALESCE(length(CAST(NEW.data AS BLOB)), 0) - COALESCE(length(CAST(OLD.data AS BLOB)), 0)) / 1048576.0
+    WHERE id = NEW.organization_id;
+END;
+
+DROP TRIGGER IF EXISTS trigger_catalog_items_usage_delete;
+CREATE TRIGGER trigger_catalog_items_usage_delete
+AFTER DELETE ON catalog_items
+FOR EACH ROW
+WHEN OLD.data IS NOT NULL
+    AND EXISTS (SELECT 1 FROM catalogs WHERE id = OLD.catalog_id AND deleted_at IS NULL)
+BEGIN
+    UPDATE organizations
+    SET current_storage_mb = current_storage_mb - length(CAST(OLD.data AS BLOB)) / 1048576.0
+    WHERE id = OLD.organization_id;
+END;
+
+-- ON DELETE CASCADE удаляет строки уже без каталога (проверка выше не прошла бы) -
+-- удаляем их раньше, пока каталог на месте
+CREATE TRIGGER IF NOT EXISTS trigger_catalogs_delete_items
+BEFORE DELETE ON catalogs
+FOR EACH ROW
+BEGIN
+    DELETE FROM catalog_items WHERE catalog_id = OLD.id;
+END;
+
+-- Users
+CREATE TRIGGER IF NOT EXISTS trigger_users_usage_insert
+AFTER INSERT ON users
+FOR EACH ROW
+WHEN NEW.deleted_at IS NULL
+BEGIN
+    UPDATE organizations SET current_users_count = current_users_count + 1
+    WHERE id = NEW.organization_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_users_usage_move
+AFTER UPDATE OF deleted_at, organization_id ON users
+FOR EACH ROW
+WHEN (OLD.deleted_at IS NULL) != (NEW.deleted_at IS NULL)
+    OR OLD.organization_id != NEW.organization_id
+BEGIN
+    UPDATE organizations SET current_users_count = current_users_count - 1
+    WHERE id = OLD.organization_id AND OLD.deleted_at IS NULL;
+
+    UPDATE organizations SET current_users_count = current_users_count + 1
+    WHERE id = NEW.organization_id AND NEW.deleted_at IS NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_users_usage_delete
+AFTER DELETE ON users
+FOR EACH ROW
+WHEN OLD.deleted_at IS NULL
+BEGIN
+    UPDATE organizations SET current_users_count = current_users_count - 1
+    WHERE id = OLD.organization_id;
+END;
+
+-- ============================================================================
+-- Triggers for tour interval index (estimate_intervals_rtree)
+-- ============================================================================
+-- Без tour_start смета в индекс не попадает; без tour_end (или tour_end раньше
+-- начала) тур считается однодневным. Удалённые сметы остаются в индексе
+-- (include_deleted), фильтр deleted_at - при join с estimates.
+
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_interval_insert
+AFTER INSERT ON estimates
+FOR EACH ROW
+WHEN julianday(NEW.tour_start) IS NOT NULL
+BEGIN
+    INSERT INTO estimate_intervals (estimate_id) VALUES (NEW.id);
+
+    INSERT INTO estimate_intervals_rtree (id, start_day, end_day)
+    SELECT id,
+           CAST(julianday(NEW.tour_start) - 2440587.5 AS INTEGER),
+           CAST(MAX(julianday(NEW.tour_start), COALESCE(julianday(NEW.tour_end), 0)) - 2440587.5 AS INTEGER)
+    FROM estimate_intervals WHERE estimate_id = NEW.id;
+END;
+
+-- Обычное сохранение перезаписывает tour_start/tour_end теми же значениями - индекс не трогаем
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_interval_update
+AFTER UPDATE OF tour_start, tour_end ON estimates
+FOR EACH ROW
+WHEN OLD.tour_start IS NOT NEW.tour_start OR OLD.tour_end IS NOT NEW.tour_end
+BEGIN
+    DELETE FROM estimate_intervals_rtree
+    WHERE id = (SELECT id FROM estimate_intervals WHERE estimate_id = OLD.id);
+    DELETE FROM estimate_intervals WHERE estimate_id = OLD.id;
+
+    INSERT INTO estimate_intervals (estimate_id)
+    SELECT NEW.id WHERE julianday(NEW.tour_start) IS NOT NULL;
+
+    INSERT INTO estimate_intervals_rtree (id, start_day, end_day)
+    SELECT id,
+           CAST(julianday(NEW.tour_start) - 2440587.5 AS INTEGER),
+           CAST(MAX(julianday(NEW.tour_start), COALESCE(julianday(NEW.tour_end), 0)) - 2440587.5 AS INTEGER)
+    FROM estimate_intervals WHERE estimate_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_estimates_interval_delete
+AFTER DELETE ON estimates
+FOR EACH ROW
+BEGIN
+    DELETE FROM estimate_intervals_rtree
+    WHERE id = (SELECT id FROM estimate_intervals WHERE estimate_id = OLD.id);
+    DELETE FROM estimate_intervals WHERE estimate_id = OLD.id;
+END;
+
 -- ============================================================================
 -- Initial Data for Default Organization, Admin User, and Settings (from Migration 007)
 -- This section assumes a fresh database creation. For a migration run, this data
@@ -1,5 +1,5 @@
 /**
- * APIClientV1 v3.0.0
+ * APIClientV1 v3.1.0
  *
  * API Client для работы с Quote Calculator API v1
  *
@@ -10,9 +10,58 @@
  * - Auto token refresh
  * - Error handling с retry logic
  *
+ * Слой запросов (v3.1.0):
+ * - одинаковые GET в полёте разделяют один fetch (регион + sync pull = один запрос)
+ * - stale-while-revalidate для смет, каталогов и настроек: свежий ответ из кэша
+ *   сразу, устаревший - сразу + обновление в фоне; любая запись сбрасывает кэш ресурса
+ * - таймаут и отмена (AbortController, options.signal)
+ * - не больше MAX_CONCURRENT запросов на origin, остальные ждут в очереди
+ * - GET повторяется при сетевой ошибке / 429 / 5xx шлюза с экспоненциальной задержкой
+ * Ответы из кэша и общих запросов - общие объекты, их нельзя изменять.
+ *
  * Created: 2025-11-19
- * Migration: v3.0.0
+ * Migration: v3.0.0, v3.1.0 (request coalescing, SWR)
+ */
+
+// Записи, которые меняют несколько ресурсов сразу (сметы, каталоги, настройки) -
+// после них сбрасывается весь кэш ответов
+const CROSS_RESOURCE_WRITES = ['/api/v1/sync', '/api/v1/import'];
+
+/**
+ * Семафор запросов одного origin
  */
+class RequestLimiter {
+    constructor(maxConcurrent) {
+        this.maxConcurrent = maxConcurrent;
+        this.active = 0;
+        this.waiting = [];
+    }
+
+    /**
+     * @returns {Promise<Function>} release - освободить слот
+     */
+    async acquire() {
+        if (this.active < this.maxConcurrent) {
+            this.active++;
+        } else {
+            // Слот передаётся из release без уменьшения active
+            await new Promise(resolve => this.waiting.push(resolve));
+        }
+
+        let released = false;
+        return () => {
+            if (released) return;
+            released = true;
+
+            const next = this.waiting.shift();
+            if (next) {
+                next();
+            } else {
+                this.active--;
+            }
+        };
+    }
+}
 
 class APIClientV1 {
     constructor(baseURL = '') {
@@ -21,6 +70,19 @@ class APIClientV1 {
         this.refreshToken = null;
         this.user = null;
 
+        this.REQUEST_CONFIG = {
+            TIMEOUT_MS: 30 * 1000,              // Таймаут одного запроса
+            MAX_CONCURRENT: 6,                  // Запросов на origin одновременно
+            GET_RETRIES: 2,                     // Повторы GET при временных ошибках
+            RETRY_BASE_MS: 300,                 // Задержка перед первым повтором
+            CACHE_FRESH_MS: 10 * 1000,          // Ответ из кэша без запроса
+            CACHE_MAX_STALE_MS: 5 * 60 * 1000   // Устаревший ответ + обновление в фоне
+        };
+
+        this.inflight = new Map();       // key -> Promise<result>
+        this.responseCache = new Map();  // key -> { result, fetchedAt }
+        this.cacheGeneration = 0;        // Растёт при каждой записи
+
         // Load token from localStorage if exists
         this._loadAuthFromStorage();
     }
@@ -108,14 +170,35 @@ class APIClientV1 {
         const queryString = new URLSearchParams(params).toString();
         const url = `/api/v1/estimates${queryString ? '?' + queryString : ''}`;
 
+        return await this._fetch(url, { auth: true, swr: true });
+    }
+
+    /**
+     * Сметы, которыми поделились с текущим пользователем
+     * @param {Object} [params] - { limit, cursor } (cursor = pagination.next_cursor)
+     */
+    async getSharedEstimates(params = {}) {
+        const queryString = new URLSearchParams(params).toString();
+        const url = `/api/v1/estimates/shared-with-me${queryString ? '?' + queryString : ''}`;
+
         return await this._fetch(url, { auth: true });
     }
 
+    /**
+     * Занятость по дням: активные туры и pax
+     * @param {string} from - YYYY-MM-DD
+     * @param {string} to - YYYY-MM-DD (включительно, до 366 дней)
+     */
+    async getOccupancy(from, to) {
+        const queryString = new URLSearchParams({ from, to }).toString();
+        return await this._fetch(`/api/v1/estimates/occupancy?${queryString}`, { auth: true });
+    }
+
     /**
      * Получить смету по ID
      */
     async getEstimate(id) {
-        return await this._fetch(`/api/v1/estimates/${id}`, { auth: true });
+        return await this._fetch(`/api/v1/estimates/${id}`, { auth: true, swr: true });
     }
 
     /**
@@ -188,6 +271,35 @@ class APIClientV1 {
         });
     }
 
+    /**
+     * Групповая операция над сметами (одна транзакция на сервере)
+     * @param {string} action - 'delete' | 'restore' | 'share' | 'visibility' | 'template'
+     * @param {Object} target - { ids: [...] } или { filter: {...} } + параметры действия
+     *   (user_ids, visibility, is_template, template_name)
+     * @returns {Promise<Object>} { action, matched, affected, results: [{ id, status }] }
+     */
+    async bulkEstimates(action, target) {
+        return await this._fetch('/api/v1/estimates/bulk', {
+            method: 'POST',
+            auth: true,
+            body: { action, ...target }
+        });
+    }
+
+    /**
+     * Полные данные нескольких смет одним запросом
+     * @param {string[]} ids - ID смет
+     * @param {Object} [versions] - { id: data_version } уже известных клиенту смет
+     * @returns {Promise<Object>} { estimates: [...], unchanged, deleted, not_found, forbidden }
+     */
+    async batchGetEstimates(ids, versions = {}) {
+        return await this._fetch('/api/v1/estimates/batch-get', {
+            method: 'POST',
+            auth: true,
+            body: { ids, versions }
+        });
+    }
+
     // ============================================================================
     // Catalogs API
     // ============================================================================
@@ -199,14 +311,28 @@ class APIClientV1 {
         const queryString = new URLSearchParams(params).toString();
         const url = `/api/v1/catalogs${queryString ? '?' + queryString : ''}`;
 
-        return await this._fetch(url, { auth: true });
+        return await this._fetch(url, { auth: true, swr: true });
     }
 
     /**
      * Получить каталог по ID
      */
     async getCatalog(id) {
-        return await this._fetch(`/api/v1/catalogs/${id}`, { auth: true });
+        return await this._fetch(`/api/v1/catalogs/${id}`, { auth: true, swr: true });
+    }
+
+    /**
+     * Полные данные нескольких каталогов одним запросом
+     * @param {string[]} ids - ID каталогов
+     * @param {Object} [versions] - { id: data_version } уже известных клиенту каталогов
+     * @returns {Promise<Object>} { catalogs: [...], unchanged, not_found, forbidden }
+     */
+    async batchGetCatalogs(ids, versions = {}) {
+        return await this._fetch('/api/v1/catalogs/batch-get', {
+            method: 'POST',
+            auth: true,
+            body: { ids, versions }
+        });
     }
 
     /**
@@ -228,7 +354,7 @@ class APIClientV1 {
      * Получить настройки
      */
     async getSettings(scope = 'user') {
-        return await this._fetch(`/api/v1/settings?scope=${scope}`, { auth: true });
+        return await this._fetch(`/api/v1/settings?scope=${scope}`, { auth: true, swr: true });
     }
 
     /**
@@ -422,13 +548,98 @@ class APIClientV1 {
 
     /**
      * Универсальный wrapper для fetch с обработкой ошибок
+     * @param {string} url
+     * @param {Object} options - method, auth, body, headers,
+     *   timeout (мс), signal (AbortSignal), swr (stale-while-revalidate для GET), retries
      */
     async _fetch(url, options = {}) {
+        const method = options.method || 'GET';
+
+        if (method !== 'GET') {
+            const result = await this._request(url, options);
+            // И после ошибки (409 и т.п.) закэшированная версия уже не надёжна
+            this._invalidate(url);
+            return result;
+        }
+
+        const key = this._requestKey(url, options);
+
+        if (options.swr && !options.signal) {
+            const cached = this.responseCache.get(key);
+            const age = cached ? Date.now() - cached.fetchedAt : Infinity;
+
+            if (age < this.REQUEST_CONFIG.CACHE_FRESH_MS) {
+                return cached.result;
+            }
+            if (age < this.REQUEST_CONFIG.CACHE_MAX_STALE_MS) {
+                this._sharedGet(key, url, options);
+                return cached.result;
+            }
+        }
+
+        return await this._sharedGet(key, url, options);
+    }
+
+    /**
+     * GET с разделением одинаковых запросов в полёте.
+     * Запрос со своим signal не разделяется (его отмена не должна отменять чужие)
+     */
+    _sharedGet(key, url, options) {
+        if (options.signal) {
+            return this._requestWithRetry(url, options);
+        }
+
+        const inflight = this.inflight.get(key);
+        if (inflight) return inflight;
+
+        const authToken = this.token;
+        const generation = this.cacheGeneration;
+        const promise = this._requestWithRetry(url, options)
+            .then(result => {
+                // За время запроса сменился токен или была запись - ответ может быть устаревшим
+                if (options.swr && result.success !== false &&
+                    this.token === authToken && this.cacheGeneration === generation) {
+                    this.responseCache.set(key, { result, fetchedAt: Date.now() });
+                }
+                return result;
+            })
+            .finally(() => this.inflight.delete(key));
+
+        this.inflight.set(key, promise);
+        return promise;
+    }
+
+    async _requestWithRetry(url, options) {
+        const retries = options.retries ?? this.REQUEST_CONFIG.GET_RETRIES;
+
+        for (let attempt = 0; ; attempt++) {
+            const result = await this._request(url, options);
+
+            if (attempt >= retries || !this._isRetryable(result)) {
+                return result;
+            }
+
+            const backoff = this.REQUEST_CONFIG.RETRY_BASE_MS * Math.pow(2, attempt);
+            await new Promise(resolve => setTimeout(resolve, backoff / 2 + Math.random() * backoff / 2));
+        }
+    }
+
+    _isRetryable(result) {
+        if (result.success !== false || result.cancelled) return false;
+        return result.networkError === true || [429, 502, 503, 504].includes(result.status);
+    }
+
+    /**
+     * Один HTTP запрос: слот origin, таймаут, отмена
+     */
+    async _request(url, options = {}) {
         const {
             method = 'GET',
             auth = false,
             body = null,
-            headers = {}
+            headers = {},
+            timeout = this.REQUEST_CONFIG.TIMEOUT_MS,
+            signal = null
         } = options;
 
         const fetchOptions = {
@@ -449,6 +660,22 @@ class APIClientV1 {
             fetchOptions.body = JSON.stringify(body);
         }
 
+        const release = await this._limiter().acquire();
+        const controller = new AbortController();
+        const onAbort = () => controller.abort();
+        let timedOut = false;
+
+        if (signal) {
+            if (signal.aborted) controller.abort();
+            signal.addEventListener('abort', onAbort, { once: true });
+        }
+        const timer = setTimeout(() => {
+            timedOut = true;
+            controller.abort();
+        }, timeout);
+
+        fetchOptions.signal = controller.signal;
+
         try {
             const response = await fetch(`${this.baseURL}${url}`, fetchOptions);
 
@@ -500,6 +727,12 @@ class APIClientV1 {
             return result;
 
         } catch (err) {
+            if (controller.signal.aborted) {
+                return timedOut
+                    ? { success: false, error: `Request timeout after ${timeout}ms`, networkError: true, timeout: true }
+                    : { success: false, error: 'Request cancelled', cancelled: true };
+            }
+
             console.error('[APIClientV1] Fetch error:', err);
 
             return {
@@ -507,9 +740,60 @@ class APIClientV1 {
                 error: err.message || 'Network error',
                 networkError: true
             };
+        } finally {
+            clearTimeout(timer);
+            if (signal) signal.removeEventListener('abort', onAbort);
+            release();
+        }
+    }
+
+    /**
+     * Ключ запроса: URL + токен (ответы разных пользователей не смешиваются)
+     */
+    _requestKey(url, options) {
+        return `${options.auth ? this.token : ''} ${url}`;
+    }
+
+    /**
+     * Сбросить кэш ресурса после записи: /api/v1/estimates/123/rename -> всё под /api/v1/estimates.
+     * sync/batch и import затрагивают несколько ресурсов - сбрасывается весь кэш
+     */
+    _invalidate(url) {
+        this.cacheGeneration++;
+
+        const resource = url.split('?')[0].split('/').slice(0, 4).join('/');
+        if (CROSS_RESOURCE_WRITES.includes(resource)) {
+            this.responseCache.clear();
+            return;
+        }
+
+        for (const key of this.responseCache.keys()) {
+            const path = key.slice(key.indexOf(' ') + 1);
+            if (path === resource || path.startsWith(resource + '/') || path.startsWith(resource + '?')) {
+                this.responseCache.delete(key);
+            }
         }
     }
 
+    /**
+     * Семафор origin (общий для всех экземпляров клиента)
+     */
+    _limiter() {
+        let origin = 'same-origin';
+        try {
+            if (this.baseURL) origin = new URL(this.baseURL).origin;
+        } catch (err) {
+            // Относительный baseURL - тот же origin
+        }
+
+        let limiter = APIClientV1.limiters.get(origin);
+        if (!limiter) {
+            limiter = new RequestLimiter(this.REQUEST_CONFIG.MAX_CONCURRENT);
+            APIClientV1.limiters.set(origin, limiter);
+        }
+        return limiter;
+    }
+
     // ============================================================================
     // Auth Storage
     // ============================================================================
@@ -552,6 +836,8 @@ class APIClientV1 {
     _clearAuth() {
         this.token = null;
         this.user = null;
+        this.responseCache.clear();
+        this.cacheGeneration++;
 
         try {
             localStorage.removeItem('auth_token');
@@ -561,3 +847,16 @@ class APIClientV1 {
         }
     }
 }
+
+// Семафоры запросов по origin
+APIClientV1.limiters = new Map();
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.APIClientV1 = APIClientV1;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = APIClientV1;
+}
@@ -0,0 +1,135 @@
+/**
+ * AutosaveClient - основной поток для AutosaveWorker
+ *
+ * Снимок сметы передаётся воркеру через postMessage (structured clone, без JSON.stringify);
+ * сравнение со снимком, запись в IndexedDB и отправка дельты на сервер - в воркере.
+ * Без Web Worker (или если воркер упал) - прежний путь: localStorage и POST полной сметы.
+ */
+
+class AutosaveClient {
+    /**
+     * @param {Object} options
+     * @param {string} options.workerUrl - URL скрипта воркера
+     * @param {number} options.delay - Debounce отправки на сервер (мс)
+     * @param {string} options.baseURL - Префикс API (как у APIClient)
+     * @param {Function} options.fallbackSave - (id, quote) => Promise, сохранение без воркера
+     */
+    constructor(options = {}) {
+        this.workerUrl = options.workerUrl || '/js/AutosaveWorker.js';
+        this.delay = options.delay ?? 8000;
+        this.baseURL = options.baseURL || '';
+        this.fallbackSave = options.fallbackSave || null;
+
+        this.worker = null;
+        this.saveTimeout = null;
+        this.pendingSave = null;
+
+        if (typeof Worker !== 'undefined') {
+            try {
+                this.worker = new Worker(this.workerUrl);
+                this.worker.onmessage = (event) => this._onMessage(event.data);
+                this.worker.onerror = (event) => {
+                    console.warn('[Autosave] Worker failed, falling back to main thread:', event.message);
+                    this._disableWorker();
+                };
+            } catch (err) {
+                console.warn('[Autosave] Worker unavailable:', err);
+                this.worker = null;
+            }
+        }
+    }
+
+    /**
+     * Локальная копия сметы (восстановление после сбоя)
+     */
+    persist(quote) {
+        if (this._post({ type: 'persist', quote })) return;
+
+        try {
+            localStorage.setItem('quoteCalc_autosave', JSON.stringify({ ...quote, timestamp: new Date().toISOString() }));
+            localStorage.setItem('quoteCalc_autosave_timestamp', Date.now().toString());
+        } catch (err) {
+            console.warn('Ошибка автосохранения:', err);
+        }
+    }
+
+    /**
+     * Сохранить на сервер через delay мс; повторные вызовы откладывают отправку
+     */
+    scheduleSave(id, quote) {
+        if (!id) return; // ID обязателен (ID-First)
+
+        this.pendingSave = { id, quote };
+
+        if (this.saveTimeout) {
+            clearTimeout(this.saveTimeout);
+        }
+        this.saveTimeout = setTimeout(() => this.flush(), this.delay);
+    }
+
+    /**
+     * Отправить отложенное сохранение немедленно
+     */
+    flush() {
+        if (this.saveTimeout) {
+            clearTimeout(this.saveTimeout);
+            this.saveTimeout = null;
+        }
+        if (!this.pendingSave) return;
+
+        const { id, quote } = this.pendingSave;
+        this.pendingSave = null;
+
+        if (this._post({ type: 'save', id, quote, baseURL: this.baseURL })) return;
+
+        if (this.fallbackSave) {
+            Promise.resolve(this.fallbackSave(id, { ...quote, timestamp: new Date().toISOString() }))
+                .catch(err => console.error('Autosave failed:', err));
+        }
+    }
+
+    /**
+     * Удалить локальную копию (смета сохранена / создана новая)
+     */
+    clear() {
+        this._post({ type: 'clear' });
+        localStorage.removeItem('quoteCalc_autosave');
+        localStorage.removeItem('quoteCalc_autosave_timestamp');
+    }
+
+    _post(message) {
+        if (!this.worker) return false;
+
+        try {
+            this.worker.postMessage(message);
+            return true;
+        } catch (err) {
+            // DataCloneError - в смете несериализуемое значение
+            console.warn('[Autosave] Could not post to worker:', err);
+            return false;
+        }
+    }
+
+    _onMessage(message) {
+        if (message.type === 'error') {
+            console.error('Autosave failed:', message.error);
+        }
+    }
+
+    _disableWorker() {
+        if (this.worker) {
+            this.worker.terminate();
+            this.worker = null;
+        }
+    }
+}
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.AutosaveClient = AutosaveClient;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = AutosaveClient;
+}
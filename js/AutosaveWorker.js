@@ -0,0 +1,258 @@
+/**
+ * AutosaveWorker - автосохранение сметы вне основного потока (Web Worker)
+ *
+ * Воркер хранит последний сохранённый снимок сметы и сравнивает с ним новую версию
+ * структурно (формат utils/estimateOverrides: { set: [[path, value]], unset: [path] }):
+ * - локальная копия пишется в IndexedDB (вместо localStorage 'quoteCalc_autosave'),
+ *   только если что-то изменилось;
+ * - на сервер уходит только дельта (PATCH /api/estimates/:id с baseVersion).
+ *   Нет базовой версии, конфликт (409) или смета не найдена (404) - POST полной сметы.
+ *
+ * Сообщения от основного потока (AutosaveClient):
+ *   { type: 'persist', quote }              - локальный снимок
+ *   { type: 'save', id, quote, baseURL }    - сохранение на сервер
+ *   { type: 'clear' }                       - удалить локальный снимок
+ * Ответы: { type: 'saved', id, mode, dataVersion } | { type: 'error', id, error }
+ */
+
+const AUTOSAVE_DB_NAME = 'quote-calc-autosave';
+const AUTOSAVE_DB_VERSION = 1;
+const LOCAL_STORE = 'local';     // key 'current' -> { key, quote }
+const SERVER_STORE = 'server';   // id -> { id, data, dataVersion } (последнее, что принял сервер)
+const LOCAL_KEY = 'current';
+
+// Больше операций - дешевле отправить смету целиком
+const MAX_CHANGES = 1000;
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+/**
+ * Изменения next относительно prev.
+ * Массив другой длины (добавлена / удалена услуга) заменяется целиком;
+ * ключи со значением undefined считаются отсутствующими (как в JSON).
+ * @returns {{set: Array, unset: Array}|null} null - изменений нет
+ */
+function diffQuote(prev, next) {
+    const set = [];
+    const unset = [];
+
+    const walk = (a, b, path) => {
+        if (a === b) return;
+
+        if (Array.isArray(a) && Array.isArray(b) && a.length === b.length) {
+            for (let i = 0; i < a.length; i++) {
+                walk(a[i], b[i], [...path, i]);
+            }
+            return;
+        }
+
+        if (isPlainObject(a) && isPlainObject(b)) {
+            for (const key of Object.keys(a)) {
+                if (a[key] !== undefined && b[key] === undefined) unset.push([...path, key]);
+            }
+            for (const key of Object.keys(b)) {
+                if (b[key] === undefined) continue;
+                if (a[key] === undefined) {
+                    set.push([[...path, key], b[key]]);
+                } else {
+                    walk(a[key], b[key], [...path, key]);
+                }
+            }
+            return;
+        }
+
+        // NaN не сериализуется в JSON и не равен сам себе
+        if (typeof a === 'number' && typeof b === 'number' && Number.isNaN(a) && Number.isNaN(b)) return;
+
+        set.push([path, b]);
+    };
+
+    walk(prev, next, []);
+
+    if (set.length === 0 && unset.length === 0) return null;
+    return { set, unset };
+}
+
+class AutosaveWorker {
+    /**
+     * @param {Object} scope - Глобальный объект воркера (self)
+     */
+    constructor(scope) {
+        this.scope = scope;
+        this.db = null;
+        this.localSnapshot = undefined;  // undefined - ещё не прочитан из IndexedDB
+        this.serverSnapshots = new Map();
+        this.queue = Promise.resolve();
+    }
+
+    /**
+     * Сообщения обрабатываются строго по очереди (снимки не гоняются друг с другом)
+     */
+    handle(message) {
+        this.queue = this.queue
+            .then(() => this._dispatch(message))
+            .catch(error => this.scope.postMessage({
+                type: 'error',
+                id: message.id,
+                error: error.message || String(error)
+            }));
+        return this.queue;
+    }
+
+    async _dispatch(message) {
+        switch (message.type) {
+            case 'persist':
+                return this.persist(message.quote);
+            case 'save':
+                return this.save(message.id, message.quote, message.baseURL || '');
+            case 'clear':
+                return this.clear();
+        }
+    }
+
+    async persist(quote) {
+        quote = this._withoutTimestamp(quote);
+
+        if (this.localSnapshot === undefined) {
+            const record = await this._get(LOCAL_STORE, LOCAL_KEY);
+            this.localSnapshot = record ? record.quote : null;
+        }
+
+        if (this.localSnapshot && !diffQuote(this._withoutTimestamp(this.localSnapshot), quote)) {
+            return;
+        }
+
+        const snapshot = { ...quote, timestamp: new Date().toISOString() };
+        await this._put(LOCAL_STORE, { key: LOCAL_KEY, quote: snapshot });
+        this.localSnapshot = snapshot;
+    }
+
+    async clear() {
+        await this._delete(LOCAL_STORE, LOCAL_KEY);
+        this.localSnapshot = null;
+    }
+
+    async save(id, quote, baseURL) {
+        quote = this._withoutTimestamp(quote);
+
+        let base = this.serverSnapshots.get(id);
+        if (base === undefined) {
+            base = (await this._get(SERVER_STORE, id)) || null;
+        }
+
+        let changes = null;
+        if (base) {
+            changes = diffQuote(this._withoutTimestamp(base.data), quote);
+            if (!changes) {
+                this.serverSnapshots.set(id, base);
+                return;
+            }
+        }
+
+        const data = { ...quote, timestamp: new Date().toISOString() };
+        const url = `${baseURL}/api/estimates/${encodeURIComponent(id)}`;
+        let mode = 'patch';
+        let response = null;
+
+        if (changes && changes.set.length + changes.unset.length <= MAX_CHANGES) {
+            changes.set.push([['timestamp'], data.timestamp]);
+            response = await this._request(url, 'PATCH', { baseVersion: base.dataVersion, ...changes });
+        }
+
+        // Нет базы / дельта слишком большая / сервер не принял дельту - полная смета
+        if (!response || response.status === 404 || response.status === 409) {
+            mode = 'full';
+            response = await this._request(url, 'POST', data);
+        }
+
+        const result = await response.json();
+        if (!response.ok || !result.success) {
+            throw new Error(result.error || `HTTP ${response.status}`);
+        }
+
+        const snapshot = { id, data, dataVersion: result.dataVersion };
+        this.serverSnapshots.set(id, snapshot);
+        await this._put(SERVER_STORE, snapshot);
+
+        this.scope.postMessage({ type: 'saved', id, mode, dataVersion: result.dataVersion });
+    }
+
+    _withoutTimestamp(quote) {
+        const { timestamp, ...rest } = quote;
+        return rest;
+    }
+
+    _request(url, method, body) {
+        return fetch(url, {
+            method,
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+    }
+
+    // ============================================================================
+    // IndexedDB
+    // ============================================================================
+
+    _open() {
+        if (!this.db) {
+            this.db = new Promise((resolve) => {
+                if (typeof indexedDB === 'undefined') return resolve(null);
+
+                const request = indexedDB.open(AUTOSAVE_DB_NAME, AUTOSAVE_DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    if (!db.objectStoreNames.contains(LOCAL_STORE)) {
+                        db.createObjectStore(LOCAL_STORE, { keyPath: 'key' });
+                    }
+                    if (!db.objectStoreNames.contains(SERVER_STORE)) {
+                        db.createObjectStore(SERVER_STORE, { keyPath: 'id' });
+                    }
+                };
+                request.onsuccess = () => resolve(request.result);
+                // IndexedDB недоступен (приватный режим) - сохраняем только на сервер
+                request.onerror = () => resolve(null);
+            });
+        }
+        return this.db;
+    }
+
+    async _transaction(storeName, mode, operation) {
+        const db = await this._open();
+        if (!db) return undefined;
+
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(storeName, mode);
+            const request = operation(tx.objectStore(storeName));
+            tx.oncomplete = () => resolve(request.result);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+
+    _get(storeName, key) {
+        return this._transaction(storeName, 'readonly', store => store.get(key));
+    }
+
+    _put(storeName, value) {
+        return this._transaction(storeName, 'readwrite', store => store.put(value));
+    }
+
+    _delete(storeName, key) {
+        return this._transaction(storeName, 'readwrite', store => store.delete(key));
+    }
+}
+
+// Запуск внутри Web Worker
+if (typeof WorkerGlobalScope !== 'undefined' && typeof self !== 'undefined' && self instanceof WorkerGlobalScope) {
+    const autosaveWorker = new AutosaveWorker(self);
+    self.onmessage = (event) => autosaveWorker.handle(event.data);
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { AutosaveWorker, diffQuote };
+}
@@ -1,36 +1,215 @@
 /**
- * CacheManager v3.0.0
+ * CacheManager v3.1.0
  *
- * Управление localStorage кэшем для Quote Calculator
+ * Управление клиентским кэшем для Quote Calculator
  *
  * Концепция: Server-First Logic
  * - Сервер = источник истины (Single Source of Truth)
- * - localStorage = временный кэш для offline работы и производительности
+ * - Локальный кэш = временное хранилище для offline работы и производительности
  * - При конфликте ВСЕГДА выигрывает сервер
  *
+ * Хранилища:
+ * - localStorage: маленькие ключи (метаданные, список смет, настройки) - синхронный доступ
+ * - IndexedDB: полные сметы и каталоги - одна запись на сущность, асинхронный доступ.
+ *   Метаданные записи (размер, last_accessed) лежат отдельно от данных, поэтому
+ *   обновление LRU не перезаписывает саму смету. Лимит - по байтам (MAX_BYTES),
+ *   а не по количеству записей.
+ *
  * Created: 2025-11-19
- * Migration: v3.0.0
+ * Migration: v3.0.0, v3.1.0 (estimates_full / catalogs -> IndexedDB)
  */
 
+const CACHE_DB_NAME = 'quote-calc-cache';
+const CACHE_DB_VERSION = 1;
+
+/**
+ * Хранилище записей в IndexedDB
+ *
+ * entry_meta: { key, type, id, data_version, size, cached_at, last_accessed }, индекс last_accessed
+ * entry_data: { key, data }
+ */
+class IndexedDBEntryStore {
+    static isSupported() {
+        return typeof indexedDB !== 'undefined';
+    }
+
+    constructor(name = CACHE_DB_NAME) {
+        this.name = name;
+        this.db = null;
+    }
+
+    open() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(this.name, CACHE_DB_VERSION);
+
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                const meta = db.createObjectStore('entry_meta', { keyPath: 'key' });
+                meta.createIndex('last_accessed', 'last_accessed');
+                db.createObjectStore('entry_data', { keyPath: 'key' });
+            };
+            request.onsuccess = () => {
+                this.db = request.result;
+                // Другая вкладка обновляет схему - отпускаем соединение
+                this.db.onversionchange = () => this.db.close();
+                resolve();
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    /**
+     * Метаданные всех записей, от давно использованных к недавним
+     */
+    listMeta() {
+        return this._transaction(['entry_meta'], 'readonly', (tx, done) => {
+            const request = tx.objectStore('entry_meta').index('last_accessed').getAll();
+            request.onsuccess = () => done(request.result);
+        });
+    }
+
+    get(key) {
+        return this._transaction(['entry_data'], 'readonly', (tx, done) => {
+            const request = tx.objectStore('entry_data').get(key);
+            request.onsuccess = () => done(request.result ? request.result.data : undefined);
+        });
+    }
+
+    /**
+     * Записать и удалить записи одной транзакцией
+     * @param {Array<{meta: Object, data: *}>} puts
+     * @param {string[]} deleteKeys
+     */
+    write(puts, deleteKeys = []) {
+        return this._transaction(['entry_meta', 'entry_data'], 'readwrite', (tx) => {
+            const meta = tx.objectStore('entry_meta');
+            const data = tx.objectStore('entry_data');
+
+            for (const key of deleteKeys) {
+                meta.delete(key);
+                data.delete(key);
+            }
+            for (const entry of puts) {
+                meta.put(entry.meta);
+                data.put({ key: entry.meta.key, data: entry.data });
+            }
+        });
+    }
+
+    /**
+     * Обновить только метаданные (last_accessed) - без перезаписи данных
+     */
+    writeMeta(metas) {
+        return this._transaction(['entry_meta'], 'readwrite', (tx) => {
+            const store = tx.objectStore('entry_meta');
+            for (const meta of metas) {
+                store.put(meta);
+            }
+        });
+    }
+
+    clear() {
+        return this._transaction(['entry_meta', 'entry_data'], 'readwrite', (tx) => {
+            tx.objectStore('entry_meta').clear();
+            tx.objectStore('entry_data').clear();
+        });
+    }
+
+    _transaction(stores, mode, fn) {
+        return new Promise((resolve, reject) => {
+            const tx = this.db.transaction(stores, mode);
+            let result;
+
+            fn(tx, (value) => { result = value; });
+
+            tx.oncomplete = () => resolve(result);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+}
+
+/**
+ * Fallback без IndexedDB (приватный режим старых браузеров) - записи живут до перезагрузки
+ */
+class MemoryEntryStore {
+    constructor() {
+        this.meta = new Map();
+        this.data = new Map();
+    }
+
+    async open() {}
+
+    async listMeta() {
+        return [...this.meta.values()];
+    }
+
+    async get(key) {
+        return this.data.get(key);
+    }
+
+    async write(puts, deleteKeys = []) {
+        for (const key of deleteKeys) {
+            this.meta.delete(key);
+            this.data.delete(key);
+        }
+        for (const entry of puts) {
+            this.meta.set(entry.meta.key, entry.meta);
+            this.data.set(entry.meta.key, entry.data);
+        }
+    }
+
+    async writeMeta(metas) {
+        for (const meta of metas) {
+            this.meta.set(meta.key, meta);
+        }
+    }
+
+    async clear() {
+        this.meta.clear();
+        this.data.clear();
+    }
+}
+
 class CacheManager {
     constructor() {
         this.CACHE_CONFIG = {
-            MAX_FULL_ESTIMATES: 10,              // Максимум 10 полных смет в кэше
-            MAX_CATALOGS: 5,                     // Максимум 5 каталогов
+            MAX_BYTES: 50 * 1024 * 1024,         // Бюджет IndexedDB на сметы и каталоги (~50 MB)
+            PREFETCH_FULL_ESTIMATES: 100,        // Сколько последних смет грузить при полной синхронизации
             MAX_AGE_MS: 7 * 24 * 60 * 60 * 1000, // 7 дней
-            SYNC_INTERVAL_MS: 5 * 60 * 1000      // Синхронизация каждые 5 минут
+            SYNC_INTERVAL_MS: 5 * 60 * 1000,     // Синхронизация каждые 5 минут
+            TOUCH_FLUSH_MS: 1000                 // Запись last_accessed пачкой раз в секунду
         };
 
         this.CACHE_KEYS = {
             METADATA: 'cache_metadata',
             ESTIMATES_LIST: 'estimates_list',
-            ESTIMATES_FULL: 'estimates_full',
-            CATALOGS: 'catalogs',
             USER_SETTINGS: 'user_settings',
-            ORG_SETTINGS: 'org_settings'
+            ORG_SETTINGS: 'org_settings',
+            // Старые ключи localStorage (до v3.1.0), переносятся в IndexedDB
+            LEGACY_ESTIMATES_FULL: 'estimates_full',
+            LEGACY_CATALOGS: 'catalogs'
         };
 
+        // LRU индекс в памяти: key -> meta. Порядок Map = порядок использования
+        // (в начале - давно использованные), поэтому вытеснение не сортирует записи
+        this.entries = new Map();
+        this.bytesUsed = 0;
+        this.pendingTouches = new Map();
+        this.touchTimer = null;
+
+        this.store = IndexedDBEntryStore.isSupported()
+            ? new IndexedDBEntryStore()
+            : new MemoryEntryStore();
+
         this._initCache();
+
+        // Все методы полных смет/каталогов асинхронные и ждут открытия хранилища
+        this.ready = this._openEntryStore();
+
+        if (typeof window !== 'undefined') {
+            window.addEventListener('pagehide', () => this._flushTouches());
+        }
     }
 
     /**
@@ -44,9 +223,6 @@ class CacheManager {
             if (!metadata) {
                 this._createEmptyCache();
             }
-
-            // Cleanup старых данных при инициализации
-            this._cleanupStaleData();
         } catch (err) {
             console.error('Cache initialization failed:', err);
             this._createEmptyCache();
@@ -54,19 +230,76 @@ class CacheManager {
     }
 
     /**
-     * Создание пустой структуры кэша
+     * Открыть хранилище записей, загрузить LRU индекс и перенести старый кэш
+     */
+    async _openEntryStore() {
+        try {
+            await this.store.open();
+        } catch (err) {
+            console.error('[CacheManager] IndexedDB unavailable, using memory cache:', err);
+            this.store = new MemoryEntryStore();
+        }
+
+        try {
+            await this._loadIndex();
+            await this._migrateLegacyStorage();
+            await this._cleanupStaleData();
+        } catch (err) {
+            console.error('[CacheManager] Entry store initialization failed:', err);
+        }
+    }
+
+    /**
+     * Загрузить метаданные записей в LRU индекс
+     */
+    async _loadIndex() {
+        const metas = await this.store.listMeta();
+
+        this.entries = new Map();
+        this.bytesUsed = 0;
+
+        for (const meta of metas) {
+            this.entries.set(meta.key, meta);
+            this.bytesUsed += meta.size || 0;
+        }
+    }
+
+    /**
+     * Перенос estimates_full / catalogs из localStorage (v3.0.0) в IndexedDB
+     */
+    async _migrateLegacyStorage() {
+        const legacy = [
+            ['estimate', this.CACHE_KEYS.LEGACY_ESTIMATES_FULL],
+            ['catalog', this.CACHE_KEYS.LEGACY_CATALOGS]
+        ];
+
+        for (const [type, storageKey] of legacy) {
+            const items = this._getItem(storageKey);
+            if (!items) continue;
+
+            for (const item of Object.values(items)) {
+                if (item && item.id && !this.entries.has(this._entryKey(type, item.id))) {
+                    await this._writeEntry(type, item.id, item.data, item.data_version);
+                }
+            }
+
+            localStorage.removeItem(storageKey);
+            console.log(`[CacheManager] Migrated ${storageKey} to IndexedDB`);
+        }
+    }
+
+    /**
+     * Создание пустой структуры кэша (localStorage часть)
      */
     _createEmptyCache() {
         const emptyCache = {
             cache_metadata: {
-                version: '1.0.0',
+                version: '1.1.0',
                 last_sync: Date.now(),
                 user_id: null,
                 organization_id: null
             },
             estimates_list: [],
-            estimates_full: {},
-            catalogs: {},
             user_settings: {},
             org_settings: {}
         };
@@ -88,7 +321,7 @@ class CacheManager {
      */
     updateSyncMetadata(updates) {
         const metadata = this.getMetadata() || {
-            version: '1.0.0',
+            version: '1.1.0',
             last_sync: null,
             user_id: null,
             organization_id: null
@@ -155,65 +388,37 @@ class CacheManager {
     }
 
     // ============================================================================
-    // Estimates Full Data (LRU policy)
+    // Estimates Full Data (LRU policy, IndexedDB)
     // ============================================================================
 
     /**
      * Получить полные данные сметы из кэша
+     * @returns {Promise<Object|null>}
      */
-    getCachedEstimate(estimateId) {
-        const fullCache = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-        const cached = fullCache[estimateId];
-
-        if (cached) {
-            // Обновляем last_accessed для LRU
-            cached.last_accessed = Date.now();
-            this._setItem(this.CACHE_KEYS.ESTIMATES_FULL, fullCache);
-
-            return cached;
-        }
-
-        return null;
+    async getCachedEstimate(estimateId) {
+        return this._getEntry('estimate', estimateId);
     }
 
     /**
      * Сохранить полную смету в кэш
      */
-    cacheEstimate(estimateId, data, dataVersion) {
-        const fullCache = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-
-        // LRU: если превышен лимит, удаляем самую старую
-        const cacheSize = Object.keys(fullCache).length;
-        if (cacheSize >= this.CACHE_CONFIG.MAX_FULL_ESTIMATES && !fullCache[estimateId]) {
-            this._evictLRU(fullCache);
-        }
-
-        fullCache[estimateId] = {
-            id: estimateId,
-            data: data,
-            data_version: dataVersion,
-            cached_at: Date.now(),
-            last_accessed: Date.now()
-        };
-
-        this._setItem(this.CACHE_KEYS.ESTIMATES_FULL, fullCache);
+    async cacheEstimate(estimateId, data, dataVersion) {
+        await this._putEntry('estimate', estimateId, data, dataVersion);
     }
 
     /**
      * Удалить смету из full cache
      */
-    removeCachedEstimate(estimateId) {
-        const fullCache = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-        delete fullCache[estimateId];
-        this._setItem(this.CACHE_KEYS.ESTIMATES_FULL, fullCache);
+    async removeCachedEstimate(estimateId) {
+        await this._deleteEntry('estimate', estimateId);
     }
 
     /**
      * Обновить кэшированную смету
      */
-    updateCachedItem(entityType, entityId, serverData) {
+    async updateCachedItem(entityType, entityId, serverData) {
         if (entityType === 'estimate') {
-            this.cacheEstimate(entityId, serverData, serverData.data_version);
+            await this.cacheEstimate(entityId, serverData, serverData.data_version);
 
             // Также обновить в списке
             this.addToEstimatesList({
@@ -225,96 +430,71 @@ class CacheManager {
                 cached_at: Date.now()
             });
         } else if (entityType === 'catalog') {
-            this.cacheCatalog(entityId, serverData, serverData.data_version);
+            await this.cacheCatalog(entityId, serverData, serverData.data_version);
         }
     }
 
     /**
      * Получить кэшированный item (generic)
+     * @returns {Promise<Object|null>}
      */
-    getCachedItem(entityType, entityId) {
-        if (entityType === 'estimate') {
-            return this.getCachedEstimate(entityId);
-        } else if (entityType === 'catalog') {
-            return this.getCachedCatalog(entityId);
+    async getCachedItem(entityType, entityId) {
+        if (entityType === 'estimate' || entityType === 'catalog') {
+            return this._getEntry(entityType, entityId);
         }
         return null;
     }
 
     /**
-     * Добавить в кэш если есть место
+     * Добавить в кэш если есть место (без вытеснения других записей)
      */
-    addToCacheIfSpace(entityType, data) {
-        if (entityType === 'estimate') {
-            const fullCache = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-            const cacheSize = Object.keys(fullCache).length;
+    async addToCacheIfSpace(entityType, data) {
+        if (entityType !== 'estimate' && entityType !== 'catalog') return;
 
-            if (cacheSize < this.CACHE_CONFIG.MAX_FULL_ESTIMATES) {
-                this.cacheEstimate(data.id, data, data.data_version);
-            }
-        } else if (entityType === 'catalog') {
-            const catalogCache = this._getItem(this.CACHE_KEYS.CATALOGS) || {};
-            const cacheSize = Object.keys(catalogCache).length;
+        await this.ready;
 
-            if (cacheSize < this.CACHE_CONFIG.MAX_CATALOGS) {
-                this.cacheCatalog(data.id, data, data.data_version);
-            }
+        const size = this._estimateSize(data);
+        if (this.bytesUsed + size <= this.CACHE_CONFIG.MAX_BYTES) {
+            await this._putEntry(entityType, data.id, data, data.data_version);
         }
     }
 
     /**
      * Удалить item из кэша
      */
-    removeCachedItem(entityType, entityId) {
+    async removeCachedItem(entityType, entityId) {
         if (entityType === 'estimate') {
-            this.removeCachedEstimate(entityId);
+            await this.removeCachedEstimate(entityId);
             this.removeFromEstimatesList(entityId);
         } else if (entityType === 'catalog') {
-            this.removeCachedCatalog(entityId);
+            await this.removeCachedCatalog(entityId);
         }
     }
 
     // ============================================================================
-    // Catalogs
+    // Catalogs (IndexedDB, общий бюджет со сметами)
     // ============================================================================
 
     /**
      * Получить каталог из кэша
+     * @returns {Promise<Object|null>}
      */
-    getCachedCatalog(catalogId) {
-        const catalogs = this._getItem(this.CACHE_KEYS.CATALOGS) || {};
-        return catalogs[catalogId] || null;
+    async getCachedCatalog(catalogId) {
+        return this._getEntry('catalog', catalogId);
     }
 
     /**
      * Сохранить каталог в кэш
      */
-    cacheCatalog(catalogId, data, dataVersion) {
-        const catalogs = this._getItem(this.CACHE_KEYS.CATALOGS) || {};
-
-        // LRU: если превышен лимит, удаляем самый старый
-        const cacheSize = Object.keys(catalogs).length;
-        if (cacheSize >= this.CACHE_CONFIG.MAX_CATALOGS && !catalogs[catalogId]) {
-            this._evictLRU(catalogs);
-        }
-
-        catalogs[catalogId] = {
-            id: catalogId,
-            data: data,
-            data_version: dataVersion,
-            cached_at: Date.now()
-        };
-
-        this._setItem(this.CACHE_KEYS.CATALOGS, catalogs);
+    async cacheCatalog(catalogId, data, dataVersion) {
+        await this._putEntry('catalog', catalogId, data, dataVersion);
     }
 
     /**
      * Удалить каталог из кэша
      */
-    removeCachedCatalog(catalogId) {
-        const catalogs = this._getItem(this.CACHE_KEYS.CATALOGS) || {};
-        delete catalogs[catalogId];
-        this._setItem(this.CACHE_KEYS.CATALOGS, catalogs);
+    async removeCachedCatalog(catalogId) {
+        await this._deleteEntry('catalog', catalogId);
     }
 
     // ============================================================================
@@ -356,14 +536,16 @@ class CacheManager {
     /**
      * Полная очистка кэша
      */
-    clearAllCache() {
+    async clearAllCache() {
         this._createEmptyCache();
+        await this._clearEntries();
     }
 
     /**
-     * Очистка кэша кроме исключений
+     * Очистка кэша кроме исключений (ключи localStorage).
+     * Полные сметы и каталоги очищаются всегда.
      */
-    clearCacheExcept(keysToKeep = []) {
+    async clearCacheExcept(keysToKeep = []) {
         const toKeep = {};
 
         for (const key of keysToKeep) {
@@ -375,6 +557,7 @@ class CacheManager {
 
         // Очистить всё
         this._createEmptyCache();
+        await this._clearEntries();
 
         // Восстановить исключения
         for (const [key, value] of Object.entries(toKeep)) {
@@ -385,8 +568,14 @@ class CacheManager {
     /**
      * Инвалидация кэша каталогов
      */
-    invalidateCatalogCache() {
-        this._setItem(this.CACHE_KEYS.CATALOGS, {});
+    async invalidateCatalogCache() {
+        await this.ready;
+
+        const keys = [...this.entries.values()]
+            .filter(meta => meta.type === 'catalog')
+            .map(meta => meta.key);
+
+        await this._deleteKeys(keys);
     }
 
     /**
@@ -399,58 +588,213 @@ class CacheManager {
     /**
      * Удалить конкретную смету из кэша
      */
-    deleteCachedItem(itemId) {
-        this.removeCachedEstimate(itemId);
+    async deleteCachedItem(itemId) {
+        await this.removeCachedEstimate(itemId);
     }
 
     // ============================================================================
-    // LRU Eviction
+    // Entry Store (IndexedDB) + LRU Eviction
     // ============================================================================
 
+    _entryKey(type, id) {
+        return `${type}:${id}`;
+    }
+
     /**
-     * Удалить самый старый элемент (LRU)
+     * Приблизительный размер записи в байтах (длина JSON)
      */
-    _evictLRU(cache) {
-        const items = Object.entries(cache);
+    _estimateSize(data) {
+        try {
+            return JSON.stringify(data === undefined ? null : data).length;
+        } catch (err) {
+            return 0;
+        }
+    }
 
-        if (items.length === 0) return;
+    async _getEntry(type, id) {
+        await this.ready;
 
-        // Сортировка по last_accessed (или cached_at если нет last_accessed)
-        items.sort((a, b) => {
-            const timeA = a[1].last_accessed || a[1].cached_at || 0;
-            const timeB = b[1].last_accessed || b[1].cached_at || 0;
-            return timeA - timeB;
-        });
+        const key = this._entryKey(type, id);
+        const meta = this.entries.get(key);
+        if (!meta) return null;
+
+        let data;
+        try {
+            data = await this.store.get(key);
+        } catch (err) {
+            console.error(`[CacheManager] Failed to get ${key}:`, err);
+            return null;
+        }
+
+        // Запись удалена другой вкладкой
+        if (data === undefined) {
+            this._forget(key);
+            return null;
+        }
+
+        this._touch(meta);
+
+        return {
+            id: meta.id,
+            data: data,
+            data_version: meta.data_version,
+            cached_at: meta.cached_at,
+            last_accessed: meta.last_accessed
+        };
+    }
+
+    async _putEntry(type, id, data, dataVersion) {
+        await this.ready;
+        await this._writeEntry(type, id, data, dataVersion);
+    }
+
+    async _writeEntry(type, id, data, dataVersion) {
+        const key = this._entryKey(type, id);
+        const size = this._estimateSize(data);
+
+        if (size > this.CACHE_CONFIG.MAX_BYTES) {
+            console.warn(`[CacheManager] ${key} (${size} bytes) exceeds cache budget, not cached`);
+            return;
+        }
+
+        const now = Date.now();
+        const meta = {
+            key,
+            type,
+            id,
+            data_version: dataVersion,
+            size,
+            cached_at: now,
+            last_accessed: now
+        };
+
+        this._forget(key);
+        this.entries.set(key, meta);
+        this.bytesUsed += size;
+
+        const evicted = this._collectEvictions(key);
+
+        try {
+            await this.store.write([{ meta, data }], evicted);
+        } catch (err) {
+            console.error(`[CacheManager] Failed to set ${key}:`, err);
+            // Индекс мог разойтись с хранилищем (например, QuotaExceededError) - перечитать
+            await this._loadIndex().catch(() => {});
+        }
+    }
 
-        // Удалить самый старый
-        const [oldestKey] = items[0];
-        delete cache[oldestKey];
+    async _deleteEntry(type, id) {
+        await this.ready;
+        await this._deleteKeys([this._entryKey(type, id)]);
+    }
+
+    async _deleteKeys(keys) {
+        if (keys.length === 0) return;
+
+        for (const key of keys) {
+            this._forget(key);
+        }
+
+        try {
+            await this.store.write([], keys);
+        } catch (err) {
+            console.error('[CacheManager] Failed to delete entries:', err);
+        }
+    }
+
+    async _clearEntries() {
+        await this.ready;
+
+        this.entries.clear();
+        this.pendingTouches.clear();
+        this.bytesUsed = 0;
 
-        console.log(`[CacheManager] LRU eviction: removed ${oldestKey}`);
+        try {
+            await this.store.clear();
+        } catch (err) {
+            console.error('[CacheManager] Failed to clear entries:', err);
+        }
     }
 
     /**
-     * Очистка устаревших данных (> 7 дней)
+     * Убрать запись из индекса в памяти
      */
-    _cleanupStaleData() {
-        const now = Date.now();
-        const maxAge = this.CACHE_CONFIG.MAX_AGE_MS;
+    _forget(key) {
+        const meta = this.entries.get(key);
+        if (meta) {
+            this.entries.delete(key);
+            this.pendingTouches.delete(key);
+            this.bytesUsed -= meta.size || 0;
+        }
+    }
 
-        // Cleanup full estimates
-        const fullCache = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-        let removed = 0;
+    /**
+     * Выбрать самые старые записи (LRU), пока кэш не уложится в MAX_BYTES
+     * @param {string} keepKey - только что записанный ключ, не вытесняется
+     * @returns {string[]} ключи для удаления
+     */
+    _collectEvictions(keepKey) {
+        const evicted = [];
+        let bytes = this.bytesUsed;
 
-        for (const [id, item] of Object.entries(fullCache)) {
-            const age = now - (item.cached_at || 0);
-            if (age > maxAge) {
-                delete fullCache[id];
-                removed++;
-            }
+        for (const [key, meta] of this.entries) {
+            if (bytes <= this.CACHE_CONFIG.MAX_BYTES) break;
+            if (key === keepKey) continue;
+
+            evicted.push(key);
+            bytes -= meta.size || 0;
         }
 
-        if (removed > 0) {
-            this._setItem(this.CACHE_KEYS.ESTIMATES_FULL, fullCache);
-            console.log(`[CacheManager] Removed ${removed} stale items from cache`);
+        for (const key of evicted) {
+            this._forget(key);
+            console.log(`[CacheManager] LRU eviction: removed ${key}`);
+        }
+
+        return evicted;
+    }
+
+    /**
+     * Отметить обращение: запись переезжает в конец LRU, last_accessed пишется пачкой
+     */
+    _touch(meta) {
+        meta.last_accessed = Date.now();
+
+        this.entries.delete(meta.key);
+        this.entries.set(meta.key, meta);
+
+        this.pendingTouches.set(meta.key, meta);
+        if (!this.touchTimer) {
+            this.touchTimer = setTimeout(() => this._flushTouches(), this.CACHE_CONFIG.TOUCH_FLUSH_MS);
+        }
+    }
+
+    _flushTouches() {
+        clearTimeout(this.touchTimer);
+        this.touchTimer = null;
+
+        if (this.pendingTouches.size === 0) return;
+
+        const metas = [...this.pendingTouches.values()];
+        this.pendingTouches.clear();
+
+        this.store.writeMeta(metas).catch(err => {
+            console.error('[CacheManager] Failed to update last_accessed:', err);
+        });
+    }
+
+    /**
+     * Очистка устаревших данных (> 7 дней)
+     */
+    async _cleanupStaleData() {
+        const cutoff = Date.now() - this.CACHE_CONFIG.MAX_AGE_MS;
+
+        const stale = [...this.entries.values()]
+            .filter(meta => (meta.cached_at || 0) < cutoff)
+            .map(meta => meta.key);
+
+        if (stale.length > 0) {
+            await this._deleteKeys(stale);
+            console.log(`[CacheManager] Removed ${stale.length} stale items from cache`);
         }
     }
 
@@ -479,19 +823,6 @@ class CacheManager {
             localStorage.setItem(key, JSON.stringify(value));
         } catch (err) {
             console.error(`[CacheManager] Failed to set ${key}:`, err);
-
-            // Quota exceeded - очистить старые данные
-            if (err.name === 'QuotaExceededError') {
-                console.warn('[CacheManager] Quota exceeded, performing cleanup...');
-                this._cleanupStaleData();
-
-                // Попробовать снова
-                try {
-                    localStorage.setItem(key, JSON.stringify(value));
-                } catch (retryErr) {
-                    console.error('[CacheManager] Failed even after cleanup:', retryErr);
-                }
-            }
         }
     }
 
@@ -502,16 +833,20 @@ class CacheManager {
     /**
      * Получить статистику кэша
      */
-    getStats() {
+    async getStats() {
+        await this.ready;
+
         const estimatesList = this.getEstimatesList();
-        const estimatesFull = this._getItem(this.CACHE_KEYS.ESTIMATES_FULL) || {};
-        const catalogs = this._getItem(this.CACHE_KEYS.CATALOGS) || {};
         const metadata = this.getMetadata();
+        const metas = [...this.entries.values()];
 
         return {
             estimates_list_count: estimatesList.length,
-            estimates_full_count: Object.keys(estimatesFull).length,
-            catalogs_count: Object.keys(catalogs).length,
+            estimates_full_count: metas.filter(meta => meta.type === 'estimate').length,
+            catalogs_count: metas.filter(meta => meta.type === 'catalog').length,
+            bytes_used: this.bytesUsed,
+            max_bytes: this.CACHE_CONFIG.MAX_BYTES,
+            backend: this.store instanceof IndexedDBEntryStore ? 'indexeddb' : 'memory',
             last_sync: metadata?.last_sync,
             last_sync_ago_ms: metadata?.last_sync ? Date.now() - metadata.last_sync : null,
             user_id: metadata?.user_id,
@@ -519,3 +854,13 @@ class CacheManager {
         };
     }
 }
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.CacheManager = CacheManager;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = CacheManager;
+}
@@ -0,0 +1,286 @@
+/**
+ * CatalogSync - delta-синхронизация каталога услуг
+ *
+ * Для каждого каталога хранится последний подтверждённый сервером снимок: версия
+ * (catalogs.data_version), заголовок и элементы templates / categories по ключу (id)
+ * с позицией и JSON. Снимок переживает перезагрузку страницы (localStorage).
+ * - load: GET /api/v1/catalogs/:id/changes?since=<версия снимка> - только изменения
+ * - save: PATCH /api/v1/catalogs/:id - только изменённые / новые / удалённые элементы;
+ *   если порядок элементов изменился или у элемента нет id - весь каталог (POST)
+ * После записи снимок догружается с сервера (позиции назначает сервер).
+ */
+
+const CATALOG_COLLECTIONS = ['templates', 'categories'];
+const SNAPSHOT_KEY_PREFIX = 'quoteCalc_catalogSnapshot_';
+
+/**
+ * Ключ элемента - как на сервере (SQLiteStorage catalogItemKey)
+ * @returns {string|null}
+ */
+function catalogItemKey(item) {
+    if (typeof item === 'string') return item;
+    if (item && typeof item === 'object' && item.id !== undefined && item.id !== null) return String(item.id);
+    return null;
+}
+
+/**
+ * Поля заголовка без коллекций и updated_at (меняется при каждом сохранении)
+ */
+function catalogHeaderFields(data) {
+    const header = {};
+    for (const [key, value] of Object.entries(data || {})) {
+        if (!CATALOG_COLLECTIONS.includes(key) && key !== 'updated_at') header[key] = value;
+    }
+    return header;
+}
+
+class CatalogSync {
+    /**
+     * @param {APIClient} apiClient - getCatalogChanges, patchCatalog, saveCatalog
+     * @param {Storage|null} storage - Где хранить снимки между сессиями (localStorage)
+     */
+    constructor(apiClient, storage = (typeof localStorage !== 'undefined' ? localStorage : null)) {
+        this.apiClient = apiClient;
+        this.storage = storage;
+        this.snapshots = new Map();
+    }
+
+    /**
+     * Загрузить каталог: изменения после версии снимка применяются к снимку
+     * @returns {Promise<Object>} Данные каталога ({ ...header, templates, categories })
+     */
+    async load(catalogId) {
+        const snapshot = this._getSnapshot(catalogId);
+        const response = await this.apiClient.getCatalogChanges(catalogId, snapshot ? snapshot.version : 0);
+
+        if (!response.success) {
+            throw new Error(response.error || 'Failed to load catalog data');
+        }
+
+        const next = this.applyChanges(response.data.full ? null : snapshot, response.data);
+        this._setSnapshot(catalogId, next);
+        return this.materialize(next);
+    }
+
+    /**
+     * Сохранить каталог
+     * @param {string} name - Имя каталога
+     * @param {Object} data - { ...header, templates, categories }
+     * @param {Object} options
+     * @param {string|null} options.catalogId - ID каталога (без него - всегда полное сохранение)
+     * @param {string} options.visibility
+     * @returns {Promise<Object>} { success, id, dataVersion, mode: 'patch'|'full'|'unchanged',
+     *   merged, data } - merged: в каталоге есть чужие изменения, data - актуальные данные
+     */
+    async save(name, data, { catalogId = null, visibility = 'organization' } = {}) {
+        let snapshot = catalogId ? this._getSnapshot(catalogId) : null;
+        let changes = snapshot ? this.diff(snapshot, data) : false;
+
+        if (changes === null) {
+            return { success: true, id: catalogId, dataVersion: snapshot.version, mode: 'unchanged', merged: false };
+        }
+
+        if (changes === false) {
+            const result = await this.apiClient.saveCatalog(name, data, visibility);
+            if (snapshot) await this.load(catalogId);
+            return { ...result, mode: 'full', merged: false };
+        }
+
+        let result;
+        let rebased = false;
+        try {
+            result = await this.apiClient.patchCatalog(catalogId, snapshot.version, changes);
+        } catch (error) {
+            if (error.code !== 'CONFLICT') throw error;
+
+            // Тот же элемент изменён на сервере: догружаем сервер и повторяем поверх него
+            // (для этих элементов побеждает последняя запись, как при полном сохранении)
+            await this.load(catalogId);
+            snapshot = this._getSnapshot(catalogId);
+            changes = this.diff(snapshot, this.rebase(snapshot, changes));
+            rebased = true;
+            result = changes
+                ? await this.apiClient.patchCatalog(catalogId, snapshot.version, changes)
+                : { success: true, id: catalogId, dataVersion: snapshot.version };
+        }
+
+        const merged = rebased || result.dataVersion > snapshot.version + 1;
+        const current = await this.load(catalogId);
+
+        return { ...result, mode: 'patch', merged, data: merged ? current : undefined };
+    }
+
+    /**
+     * Изменения data относительно снимка
+     * @returns {Object|null|false} changes для PATCH; null - изменений нет;
+     *   false - delta невозможна (порядок изменился, элемент без id)
+     */
+    diff(snapshot, data) {
+        const changes = {};
+        let changed = false;
+
+        for (const collection of CATALOG_COLLECTIONS) {
+            const stored = snapshot[collection];
+            const items = Array.isArray(data[collection]) ? data[collection] : [];
+            const keys = new Set();
+            const kept = [];
+            const upsert = [];
+            let added = false;
+
+            for (const item of items) {
+                const key = catalogItemKey(item);
+                if (key === null || keys.has(key)) return false;
+                keys.add(key);
+
+                const current = stored.get(key);
+                if (!current) {
+                    added = true;
+                    upsert.push(item);
+                    continue;
+                }
+                // Новые элементы сервер добавляет в конец - существующий после нового это перестановка
+                if (added) return false;
+
+                kept.push(key);
+                if (current.json !== JSON.stringify(item)) upsert.push(item);
+            }
+
+            const order = this._orderedKeys(stored);
+            const remaining = order.filter(key => keys.has(key));
+            if (remaining.some((key, index) => key !== kept[index])) return false;
+
+            const remove = order.filter(key => !keys.has(key));
+            if (upsert.length > 0 || remove.length > 0) {
+                changes[collection] = { upsert, delete: remove };
+                changed = true;
+            }
+        }
+
+        const header = catalogHeaderFields(data);
+        if (JSON.stringify(header) !== JSON.stringify(catalogHeaderFields(snapshot.header))) {
+            changes.header = { ...header, ...(data.updated_at !== undefined ? { updated_at: data.updated_at } : {}) };
+            changed = true;
+        }
+
+        return changed ? changes : null;
+    }
+
+    /**
+     * Снимок + ответ /changes
+     */
+    applyChanges(snapshot, changes) {
+        const next = { version: changes.dataVersion, header: changes.header };
+
+        for (const collection of CATALOG_COLLECTIONS) {
+            next[collection] = new Map(snapshot ? snapshot[collection] : []);
+            for (const key of changes[collection].delete) {
+                next[collection].delete(key);
+            }
+            for (const { key, position, data } of changes[collection].upsert) {
+                next[collection].set(key, { position, json: JSON.stringify(data) });
+            }
+        }
+        return next;
+    }
+
+    /**
+     * Данные каталога из снимка
+     */
+    materialize(snapshot) {
+        const data = { ...snapshot.header };
+
+        for (const collection of CATALOG_COLLECTIONS) {
+            if (!Array.isArray(snapshot.header[collection]) && snapshot[collection].size === 0) continue;
+            data[collection] = this._orderedKeys(snapshot[collection])
+                .map(key => JSON.parse(snapshot[collection].get(key).json));
+        }
+        return data;
+    }
+
+    /**
+     * Данные снимка с наложенными локальными изменениями
+     */
+    rebase(snapshot, changes) {
+        const data = this.materialize(snapshot);
+        if (changes.header) Object.assign(data, changes.header);
+
+        for (const collection of CATALOG_COLLECTIONS) {
+            if (!changes[collection]) continue;
+
+            const removed = new Set(changes[collection].delete);
+            const upserts = new Map(changes[collection].upsert.map(item => [catalogItemKey(item), item]));
+            const items = (data[collection] || [])
+                .filter(item => !removed.has(catalogItemKey(item)))
+                .map((item) => {
+                    const key = catalogItemKey(item);
+                    const replacement = upserts.get(key);
+                    upserts.delete(key);
+                    return replacement || item;
+                });
+
+            data[collection] = [...items, ...upserts.values()];
+        }
+        return data;
+    }
+
+    /**
+     * Забыть снимок (следующая загрузка - полная)
+     */
+    forget(catalogId) {
+        this.snapshots.delete(catalogId);
+        if (this.storage) this.storage.removeItem(SNAPSHOT_KEY_PREFIX + catalogId);
+    }
+
+    _orderedKeys(items) {
+        return [...items.entries()]
+            .sort((a, b) => a[1].position - b[1].position)
+            .map(([key]) => key);
+    }
+
+    _getSnapshot(catalogId) {
+        if (this.snapshots.has(catalogId)) return this.snapshots.get(catalogId);
+        if (!this.storage) return null;
+
+        try {
+            const stored = JSON.parse(this.storage.getItem(SNAPSHOT_KEY_PREFIX + catalogId));
+            if (!stored) return null;
+
+            const snapshot = { version: stored.version, header: stored.header };
+            for (const collection of CATALOG_COLLECTIONS) {
+                snapshot[collection] = new Map(stored[collection]);
+            }
+            this.snapshots.set(catalogId, snapshot);
+            return snapshot;
+        } catch (err) {
+            console.warn('[CatalogSync] Ignoring corrupted snapshot:', err);
+            return null;
+        }
+    }
+
+    _setSnapshot(catalogId, snapshot) {
+        this.snapshots.set(catalogId, snapshot);
+        if (!this.storage) return;
+
+        const stored = { version: snapshot.version, header: snapshot.header };
+        for (const collection of CATALOG_COLLECTIONS) {
+            stored[collection] = [...snapshot[collection].entries()];
+        }
+
+        try {
+            this.storage.setItem(SNAPSHOT_KEY_PREFIX + catalogId, JSON.stringify(stored));
+        } catch (err) {
+            // QuotaExceededError - снимок остаётся только в памяти
+            console.warn('[CatalogSync] Snapshot not persisted:', err);
+        }
+    }
+}
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.CatalogSync = CatalogSync;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = CatalogSync;
+}
@@ -0,0 +1,198 @@
+/**
+ * PricingTotals - инкрементальный агрегатор итогов сметы
+ *
+ * Хранит вклад каждой услуги (ключ - сам объект услуги) и текущие суммы по корзинам:
+ * - regular:    обычные услуги
+ * - fullProfit: услуги "вся сумма в прибыль"
+ * В каждой корзине: cost (себестоимость), total (с индивидуальной наценкой),
+ * markupBase (себестоимость без excludeFromMarkup - база для скрытой маржи).
+ *
+ * sync() сравнивает у каждой услуги только поля, влияющие на цену; для изменённых
+ * применяется дельта (старый вклад вычитается, новый прибавляется), для удалённых
+ * вклад вычитается. Без новых массивов и без пересчёта неизменённых услуг.
+ *
+ * Нечисловой вклад (NaN / Infinity - например, старая услуга без markup) считается
+ * нулём, иначе он навсегда испортил бы суммы. Если сумма всё же стала нечисловой,
+ * корзины пересобираются из вкладов.
+ */
+
+// Остаток ошибки округления после вычитаний (иначе -1e-13 показывается как "-0.00")
+const PRICING_EPSILON = 1e-9;
+
+function finiteOrZero(value) {
+    return Number.isFinite(value) ? value : 0;
+}
+
+function roundOffDrift(value) {
+    return Math.abs(value) < PRICING_EPSILON ? 0 : value;
+}
+
+class PricingTotals {
+    /**
+     * @param {Function} serviceTotal - (service) => сумма с индивидуальной наценкой
+     */
+    constructor(serviceTotal) {
+        this.serviceTotal = serviceTotal || (service => service.price * service.quantity * (1 + service.markup / 100));
+        this.reset();
+    }
+
+    reset() {
+        this.contributions = new Map();
+        this._clearBuckets();
+        this.epoch = 0;
+    }
+
+    _clearBuckets() {
+        this.buckets = {
+            regular: { cost: 0, total: 0, markupBase: 0 },
+            fullProfit: { cost: 0, total: 0, markupBase: 0 }
+        };
+    }
+
+    /**
+     * Пересобрать корзины из вкладов (без накопленной ошибки)
+     */
+    _rebuildBuckets() {
+        this._clearBuckets();
+        for (const entry of this.contributions.values()) {
+            this._apply(entry, 1);
+        }
+    }
+
+    _bucketsFinite() {
+        const { regular, fullProfit } = this.buckets;
+        return [regular, fullProfit].every(bucket =>
+            Number.isFinite(bucket.cost) && Number.isFinite(bucket.total) && Number.isFinite(bucket.markupBase));
+    }
+
+    /**
+     * Привести суммы в соответствие с текущими списками услуг
+     * @param {Array<Array<Object>>} lists - services, hotels, flights, otherServices
+     * @returns {PricingTotals}
+     */
+    sync(lists) {
+        const epoch = ++this.epoch;
+        let seen = 0;
+
+        for (const list of lists) {
+            if (!list) continue;
+
+            for (const service of list) {
+                this._syncService(service, epoch);
+                seen++;
+            }
+        }
+
+        // Удалённые услуги - вычесть вклад
+        if (this.contributions.size > seen) {
+            for (const [service, entry] of this.contributions) {
+                if (entry.epoch !== epoch) {
+                    this._apply(entry, -1);
+                    this.contributions.delete(service);
+                }
+            }
+        }
+
+        if (this.contributions.size === 0) {
+            this._clearBuckets();
+        } else if (!this._bucketsFinite()) {
+            this._rebuildBuckets();
+        }
+
+        return this;
+    }
+
+    _syncService(service, epoch) {
+        let entry = this.contributions.get(service);
+
+        if (entry &&
+            entry.price === service.price &&
+            entry.quantity === service.quantity &&
+            entry.markup === service.markup &&
+            entry.fullProfit === !!service.fullProfit &&
+            entry.excludeFromMarkup === !!service.excludeFromMarkup) {
+            entry.epoch = epoch;
+            return;
+        }
+
+        if (entry) {
+            this._apply(entry, -1);
+        }
+
+        const cost = finiteOrZero(service.price * service.quantity);
+        entry = {
+            price: service.price,
+            quantity: service.quantity,
+            markup: service.markup,
+            fullProfit: !!service.fullProfit,
+            excludeFromMarkup: !!service.excludeFromMarkup,
+            cost,
+            total: finiteOrZero(this.serviceTotal(service)),
+            markupBase: service.excludeFromMarkup ? 0 : cost,
+            epoch
+        };
+
+        this._apply(entry, 1);
+        this.contributions.set(service, entry);
+    }
+
+    _apply(entry, sign) {
+        const bucket = entry.fullProfit ? this.buckets.fullProfit : this.buckets.regular;
+        bucket.cost += sign * entry.cost;
+        bucket.total += sign * entry.total;
+        bucket.markupBase += sign * entry.markupBase;
+    }
+
+    /**
+     * Итоги для панели расчётов (updateCalculations)
+     * @param {Object} rates - { hiddenMarkup, partnerCommission } в процентах
+     */
+    summary({ hiddenMarkup = 0, partnerCommission = 0 } = {}) {
+        const { regular, fullProfit } = this.buckets;
+
+        // "Вся сумма в прибыль" участвует в базе комиссии партнера полной суммой
+        const baseCost = regular.cost + fullProfit.total;
+        const individualMarkupAmount = regular.total - regular.cost;
+        const totalWithIndividualMarkup = regular.total + fullProfit.total;
+
+        // Скрытая маржа - только от неисключенных обычных услуг
+        const hiddenMarkupAmount = regular.markupBase * (hiddenMarkup / 100);
+
+        // Комиссия партнера рассчитывается от СЕБЕСТОИМОСТИ
+        const partnerCommissionAmount = baseCost * (partnerCommission / 100);
+
+        return {
+            baseCost: roundOffDrift(baseCost),
+            individualMarkupAmount: roundOffDrift(individualMarkupAmount),
+            totalWithIndividualMarkup: roundOffDrift(totalWithIndividualMarkup),
+            hiddenMarkupAmount: roundOffDrift(hiddenMarkupAmount),
+            partnerCommissionAmount: roundOffDrift(partnerCommissionAmount),
+            fullProfitAmount: roundOffDrift(fullProfit.total),
+            clientTotal: roundOffDrift(totalWithIndividualMarkup + hiddenMarkupAmount + partnerCommissionAmount),
+            totalProfit: roundOffDrift(individualMarkupAmount + hiddenMarkupAmount + fullProfit.total)
+        };
+    }
+
+    /**
+     * Суммы по всем услугам без деления на корзины (для calculateBaseCost / calculateClientTotal / calculateTotalProfit)
+     */
+    totals() {
+        const { regular, fullProfit } = this.buckets;
+
+        return {
+            cost: roundOffDrift(regular.cost + fullProfit.cost),
+            total: roundOffDrift(regular.total + fullProfit.total),
+            markupBase: roundOffDrift(regular.markupBase + fullProfit.markupBase)
+        };
+    }
+}
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.PricingTotals = PricingTotals;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = PricingTotals;
+}
@@ -1,5 +1,5 @@
 /**
- * SyncManager v3.0.0
+ * SyncManager v3.1.0
  *
  * Управление синхронизацией между localStorage и сервером
  *
@@ -10,19 +10,150 @@
  * - Conflict resolution с 3-way merge
  * - Optimistic locking защита
  *
+ * Очередь изменений (v3.1.0):
+ * - одна запись на сущность (entity_type:entity_id) - повторные правки заменяют
+ *   данные, а не добавляют новую запись; create + delete взаимно уничтожаются
+ * - хранится в IndexedDB и переживает перезагрузку страницы
+ * - батчи ограничены по байтам payload; после ошибки - экспоненциальная
+ *   задержка с jitter, при возврате сети (online) - немедленная отправка
+ * - батч, отклонённый сервером по размеру (413), делится пополам; одиночное
+ *   изменение больше лимита откладывается и не блокирует остальную очередь
+ *
  * Created: 2025-11-19
- * Migration: v3.0.0
+ * Migration: v3.0.0, v3.1.0 (persistent coalescing queue)
+ */
+
+const SYNC_DB_NAME = 'quote-calc-sync';
+const SYNC_DB_VERSION = 1;
+
+/**
+ * Очередь изменений в IndexedDB: pending_changes { key, entityType, entityId, action, data, dataVersion, timestamp, size }
  */
+class IndexedDBChangeStore {
+    static isSupported() {
+        return typeof indexedDB !== 'undefined';
+    }
+
+    constructor(name = SYNC_DB_NAME) {
+        this.name = name;
+        this.db = null;
+    }
+
+    open() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(this.name, SYNC_DB_VERSION);
+
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore('pending_changes', { keyPath: 'key' });
+            };
+            request.onsuccess = () => {
+                this.db = request.result;
+                this.db.onversionchange = () => this.db.close();
+                resolve();
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    getAll() {
+        return this._transaction('readonly', (store, done) => {
+            const request = store.getAll();
+            request.onsuccess = () => done(request.result);
+        });
+    }
+
+    /**
+     * Записать и удалить изменения одной транзакцией
+     */
+    write(puts, deleteKeys = []) {
+        return this._transaction('readwrite', (store) => {
+            for (const key of deleteKeys) {
+                store.delete(key);
+            }
+            for (const change of puts) {
+                store.put(change);
+            }
+        });
+    }
+
+    _transaction(mode, fn) {
+        return new Promise((resolve, reject) => {
+            const tx = this.db.transaction(['pending_changes'], mode);
+            let result;
+
+            fn(tx.objectStore('pending_changes'), (value) => { result = value; });
+
+            tx.oncomplete = () => resolve(result);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+}
+
+/**
+ * Fallback без IndexedDB - очередь живёт до перезагрузки
+ */
+class MemoryChangeStore {
+    constructor() {
+        this.changes = new Map();
+    }
+
+    async open() {}
+
+    async getAll() {
+        return [...this.changes.values()];
+    }
+
+    async write(puts, deleteKeys = []) {
+        for (const key of deleteKeys) {
+            this.changes.delete(key);
+        }
+        for (const change of puts) {
+            this.changes.set(change.key, change);
+        }
+    }
+}
 
 class SyncManager {
-    constructor(apiClient, cacheManager) {
+    constructor(apiClient, cacheManager, changeStore = null) {
         this.apiClient = apiClient;
         this.cache = cacheManager;
 
+        this.PUSH_CONFIG = {
+            MAX_BATCH_BYTES: 1024 * 1024,      // Payload одного /sync/batch (~1 MB)
+            MAX_BATCH_CHANGES: 100,            // И не больше 100 изменений в батче
+            RETRY_BASE_MS: 2000,               // Первая повторная попытка через ~2 с
+            RETRY_MAX_MS: 5 * 60 * 1000        // Не реже раза в 5 минут
+        };
+
         this.syncInterval = 5 * 60 * 1000;  // 5 минут
         this.syncTimer = null;
         this.isSyncing = false;
-        this.pendingChanges = [];           // Очередь изменений для отправки
+
+        // Очередь изменений: key (entity_type:entity_id) -> последнее состояние.
+        // Порядок Map = порядок первой правки сущности
+        this.pendingChanges = new Map();
+        // Изменения больше лимита сервера (413): остаются в IndexedDB и снова
+        // отправляются после перезагрузки или новой правки сущности
+        this.parkedChanges = new Map();
+        this.pushFailures = 0;
+        this.retryAt = 0;
+        this.retryTimer = null;
+
+        this.changeStore = changeStore || (IndexedDBChangeStore.isSupported()
+            ? new IndexedDBChangeStore()
+            : new MemoryChangeStore());
+        this.storeWrites = Promise.resolve();
+        this.loaded = false;
+
+        // Очередь из IndexedDB; push ждёт загрузки
+        this.ready = this._loadPendingChanges();
+
+        this._onOnline = () => {
+            console.log('[SyncManager] Back online, pushing pending changes...');
+            this._resetBackoff();
+            this.performSync();
+        };
     }
 
     /**
@@ -31,6 +162,10 @@ class SyncManager {
     start() {
         console.log('[SyncManager] Starting periodic sync...');
 
+        if (typeof window !== 'undefined') {
+            window.addEventListener('online', this._onOnline);
+        }
+
         // Периодическая синхронизация
         this.syncTimer = setInterval(() => {
             this.performSync();
@@ -50,6 +185,15 @@ class SyncManager {
             clearInterval(this.syncTimer);
             this.syncTimer = null;
         }
+
+        if (this.retryTimer) {
+            clearTimeout(this.retryTimer);
+            this.retryTimer = null;
+        }
+
+        if (typeof window !== 'undefined') {
+            window.removeEventListener('online', this._onOnline);
+        }
     }
 
     /**
@@ -104,7 +248,7 @@ class SyncManager {
 
         try {
             // Очистить локальный кэш (кроме settings)
-            this.cache.clearCacheExcept(['user_settings', 'cache_metadata']);
+            await this.cache.clearCacheExcept(['user_settings', 'cache_metadata']);
 
             // Загрузить весь список смет
             const response = await this.apiClient.get('/api/v1/estimates?limit=1000');
@@ -122,6 +266,22 @@ class SyncManager {
                     cached_at: Date.now()
                 })));
 
+                // Полные данные последних смет - одним batch-get запросом (список отсортирован по updated_at).
+                // Сколько из них останется в кэше, решает байтовый бюджет CacheManager
+                const recentIds = estimates
+                    .slice(0, this.cache.CACHE_CONFIG.PREFETCH_FULL_ESTIMATES)
+                    .map(e => e.id);
+
+                if (recentIds.length > 0) {
+                    const fullEstimates = await this.apiClient.post('/api/v1/estimates/batch-get', { ids: recentIds });
+
+                    if (fullEstimates.success) {
+                        for (const estimate of fullEstimates.data.estimates) {
+                            await this.cache.cacheEstimate(estimate.id, estimate.data, estimate.data_version);
+                        }
+                    }
+                }
+
                 console.log(`[SyncManager] Full sync: loaded ${estimates.length} estimates`);
             }
 
@@ -131,16 +291,16 @@ class SyncManager {
             if (catalogsResponse.success && catalogsResponse.data && catalogsResponse.data.catalogs) {
                 const catalogs = catalogsResponse.data.catalogs;
 
-                for (const catalog of catalogs) {
-                    // Загрузить полные данные каталога
-                    const fullCatalog = await this.apiClient.get(`/api/v1/catalogs/${catalog.id}`);
+                // Полные данные всех каталогов - один запрос вместо N
+                if (catalogs.length > 0) {
+                    const fullCatalogs = await this.apiClient.post('/api/v1/catalogs/batch-get', {
+                        ids: catalogs.map(c => c.id)
+                    });
 
-                    if (fullCatalog.success) {
-                        this.cache.cacheCatalog(
-                            catalog.id,
-                            fullCatalog.data,
-                            catalog.data_version
-                        );
+                    if (fullCatalogs.success) {
+                        for (const catalog of fullCatalogs.data.catalogs) {
+                            await this.cache.cacheCatalog(catalog.id, catalog.data, catalog.data_version);
+                        }
                     }
                 }
 
@@ -163,85 +323,337 @@ class SyncManager {
     // ============================================================================
 
     /**
-     * Отправить локальные изменения на сервер
+     * Отправить локальные изменения на сервер.
+     * Вся очередь уходит батчами по байтам; при ошибке неотправленное остаётся
+     * в очереди до следующей попытки (backoff)
      */
     async pushLocalChanges() {
-        if (this.pendingChanges.length === 0) {
+        await this.ready;
+
+        if (this.pendingChanges.size === 0) {
             console.log('[SyncManager] No pending changes to push');
             return;
         }
 
-        console.log(`[SyncManager] Pushing ${this.pendingChanges.length} local changes...`);
+        if (Date.now() < this.retryAt) {
+            console.log(`[SyncManager] Push postponed for ${this.retryAt - Date.now()}ms after failure`);
+            return;
+        }
 
-        // Батчами по 50
-        const batch = this.pendingChanges.splice(0, 50);
+        console.log(`[SyncManager] Pushing ${this.pendingChanges.size} local changes...`);
 
-        try {
-            const response = await this.apiClient.post('/api/v1/sync/batch', {
-                changes: batch.map(change => ({
-                    entity_type: change.entityType,
-                    entity_id: change.entityId,
-                    action: change.action,
-                    data: change.data,
-                    client_version: change.dataVersion,
-                    timestamp: change.timestamp
-                }))
-            });
+        let maxChanges = this.PUSH_CONFIG.MAX_BATCH_CHANGES;
 
-            if (!response.success) {
-                throw new Error(response.error || 'Batch sync failed');
+        while (this.pendingChanges.size > 0) {
+            const batch = this._takeBatch(maxChanges);
+
+            try {
+                await this._pushBatch(batch);
+            } catch (error) {
+                if (error.status === 413) {
+                    // Слишком большой payload: повтор меньшими батчами, одиночное изменение - в сторону
+                    if (batch.length > 1) {
+                        maxChanges = Math.ceil(batch.length / 2);
+                        this._restoreBatch(batch);
+                    } else {
+                        this._parkChange(batch[0]);
+                        maxChanges = this.PUSH_CONFIG.MAX_BATCH_CHANGES;
+                    }
+                    continue;
+                }
+
+                console.error('[SyncManager] Push failed:', error);
+
+                // Возвращаем в очередь (поверх них могли прийти новые правки)
+                this._restoreBatch(batch);
+                this._scheduleRetry();
+
+                throw error;
             }
+        }
 
-            // Обработка результатов
-            const results = response.data.results || [];
-
-            for (let i = 0; i < results.length; i++) {
-                const result = results[i];
-                const originalChange = batch[i];
-
-                if (result.status === 'conflict') {
-                    console.warn('[SyncManager] Conflict detected:', result);
-                    await this.handleConflict(originalChange, result.serverData, result);
-                } else if (result.status === 'success') {
-                    // Обновить кэш с серверной версией
-                    this.cache.updateCachedItem(
-                        result.entity_type,
-                        result.entity_id,
-                        result.serverData
-                    );
+        this._resetBackoff();
+    }
 
-                    console.log(`[SyncManager] Pushed ${result.entity_type} ${result.entity_id} successfully`);
-                } else if (result.status === 'error') {
-                    console.error('[SyncManager] Server rejected change:', result);
-                }
+    /**
+     * Изменения из начала очереди, пока суммарный payload <= MAX_BATCH_BYTES
+     * (первое изменение берётся всегда, даже если оно больше лимита)
+     * @param {number} [maxChanges] - Не больше изменений в батче (default: MAX_BATCH_CHANGES)
+     */
+    _takeBatch(maxChanges = this.PUSH_CONFIG.MAX_BATCH_CHANGES) {
+        const batch = [];
+        let bytes = 0;
+
+        for (const [key, change] of this.pendingChanges) {
+            if (batch.length > 0 &&
+                (bytes + change.size > this.PUSH_CONFIG.MAX_BATCH_BYTES ||
+                 batch.length >= maxChanges)) {
+                break;
             }
 
-        } catch (error) {
-            console.error('[SyncManager] Push failed:', error);
+            batch.push(change);
+            bytes += change.size;
+            this.pendingChanges.delete(key);
+        }
 
-            // Возвращаем в очередь при ошибке
-            this.pendingChanges.unshift(...batch);
+        return batch;
+    }
 
+    async _pushBatch(batch) {
+        const response = await this.apiClient.post('/api/v1/sync/batch', {
+            changes: batch.map(change => ({
+                entity_type: change.entityType,
+                entity_id: change.entityId,
+                action: change.action,
+                data: change.data,
+                client_version: change.dataVersion,
+                timestamp: change.timestamp
+            }))
+        });
+
+        if (!response.success) {
+            const error = new Error(response.error || 'Batch sync failed');
+            error.status = response.status;
             throw error;
         }
+
+        // Батч принят: запись в IndexedDB удаляется, если за время запроса
+        // не появилась новая правка той же сущности (она уже перезаписала запись)
+        const acknowledged = [];
+        const sent = new Map(batch.map(change => [change.key, change]));
+
+        for (const change of batch) {
+            if (!this.pendingChanges.has(change.key)) {
+                acknowledged.push(change.key);
+            }
+        }
+        this._persist([], acknowledged);
+
+        // Обработка результатов
+        const results = response.data.results || [];
+
+        for (const result of results) {
+            const originalChange = sent.get(this._changeKey(result.entity_type, result.entity_id));
+            if (!originalChange) continue;
+
+            if (result.status === 'conflict') {
+                console.warn('[SyncManager] Conflict detected:', result);
+                await this.handleConflict(originalChange, result.serverData, result);
+            } else if (result.status === 'success') {
+                // Новая правка той же сущности основана на только что записанной версии
+                const newer = this.pendingChanges.get(originalChange.key);
+                if (newer && result.data_version) {
+                    newer.dataVersion = result.data_version;
+                    this._persist([newer]);
+                }
+
+                // Обновить кэш с серверной версией
+                await this.cache.updateCachedItem(
+                    result.entity_type,
+                    result.entity_id,
+                    result.serverData
+                );
+
+                console.log(`[SyncManager] Pushed ${result.entity_type} ${result.entity_id} successfully`);
+            } else if (result.status === 'error') {
+                console.error('[SyncManager] Server rejected change:', result);
+            }
+        }
     }
 
     /**
-     * Добавить изменение в очередь отправки
+     * Отложить изменение, которое сервер не принимает по размеру
+     */
+    _parkChange(change) {
+        this.parkedChanges.set(change.key, change);
+        console.warn(`[SyncManager] ${change.entityType} ${change.entityId} is too large for the server (${change.size} bytes), parked`);
+    }
+
+    _restoreBatch(batch) {
+        const restored = new Map();
+
+        for (const change of batch) {
+            const newer = this.pendingChanges.get(change.key);
+            const merged = newer ? this._compactChange(change, newer) : change;
+            if (merged) {
+                restored.set(change.key, merged);
+            }
+        }
+
+        // Старые изменения - снова в начало очереди
+        for (const [key, change] of this.pendingChanges) {
+            if (!restored.has(key)) {
+                restored.set(key, change);
+            }
+        }
+        this.pendingChanges = restored;
+    }
+
+    /**
+     * Добавить изменение в очередь отправки (заменяет ещё не отправленное изменение той же сущности)
      */
     queueChange(entityType, entityId, action, data, dataVersion) {
-        this.pendingChanges.push({
+        const key = this._changeKey(entityType, entityId);
+        const change = {
+            key,
             entityType,
             entityId,
             action,
             data,
             dataVersion,
-            timestamp: Date.now()
-        });
+            timestamp: Date.now(),
+            size: this._estimateSize(data)
+        };
+
+        // Новая правка отложенной сущности возвращает её в очередь
+        const previous = this.pendingChanges.get(key) || this.parkedChanges.get(key);
+        const merged = previous ? this._compactChange(previous, change) : change;
+        this.parkedChanges.delete(key);
+
+        if (merged) {
+            this.pendingChanges.set(key, merged);
+        } else {
+            this.pendingChanges.delete(key);
+        }
+
+        // До загрузки очереди запись делает _loadPendingChanges
+        if (this.loaded) {
+            this._persist(merged ? [merged] : [], merged ? [] : [key]);
+        }
 
         console.log(`[SyncManager] Queued ${action} for ${entityType} ${entityId}`);
     }
 
+    /**
+     * Слить ещё не отправленное изменение с более новым
+     * @returns {Object|null} null - изменения взаимно уничтожились (create + delete)
+     */
+    _compactChange(previous, change) {
+        if (previous.action === 'create') {
+            // Сервер сущность ещё не видел
+            if (change.action === 'delete') return null;
+            return { ...change, action: 'create', dataVersion: previous.dataVersion };
+        }
+
+        if (previous.action === 'delete' && change.action === 'create') {
+            // Сущность на сервере есть (удаление не отправлено) - пересоздание = перезапись
+            return { ...change, action: 'update', dataVersion: previous.dataVersion ?? change.dataVersion };
+        }
+
+        // Версия, от которой начались локальные правки - для optimistic locking
+        return { ...change, dataVersion: previous.dataVersion ?? change.dataVersion };
+    }
+
+    _changeKey(entityType, entityId) {
+        return `${entityType}:${entityId}`;
+    }
+
+    /**
+     * Приблизительный размер payload в байтах (длина JSON)
+     */
+    _estimateSize(data) {
+        try {
+            return typeof data === 'string' ? data.length : JSON.stringify(data ?? null).length;
+        } catch (err) {
+            return 0;
+        }
+    }
+
+    /**
+     * Загрузить очередь из IndexedDB. Правки, поставленные до загрузки, новее сохранённых
+     */
+    async _loadPendingChanges() {
+        try {
+            await this.changeStore.open();
+        } catch (err) {
+            console.error('[SyncManager] IndexedDB unavailable, pending changes kept in memory:', err);
+            this.changeStore = new MemoryChangeStore();
+        }
+
+        try {
+            const stored = await this.changeStore.getAll();
+            const queued = this.pendingChanges;
+
+            const puts = [];
+            const deleteKeys = [];
+
+            this.pendingChanges = new Map();
+            for (const change of stored.sort((a, b) => a.timestamp - b.timestamp)) {
+                this.pendingChanges.set(change.key, change);
+            }
+
+            for (const [key, change] of queued) {
+                const previous = this.pendingChanges.get(key);
+                const merged = previous ? this._compactChange(previous, change) : change;
+
+                if (merged) {
+                    this.pendingChanges.set(key, merged);
+                    puts.push(merged);
+                } else {
+                    this.pendingChanges.delete(key);
+                    deleteKeys.push(key);
+                }
+            }
+
+            if (puts.length > 0 || deleteKeys.length > 0) {
+                this._persist(puts, deleteKeys);
+            }
+
+            if (this.pendingChanges.size > 0) {
+                console.log(`[SyncManager] Restored ${this.pendingChanges.size} pending changes`);
+            }
+        } catch (err) {
+            console.error('[SyncManager] Failed to load pending changes:', err);
+        } finally {
+            this.loaded = true;
+        }
+    }
+
+    /**
+     * Записи в IndexedDB выполняются по порядку вызовов
+     */
+    _persist(puts, deleteKeys = []) {
+        this.storeWrites = this.storeWrites
+            .then(() => this.changeStore.write(puts, deleteKeys))
+            .catch(err => console.error('[SyncManager] Failed to persist pending changes:', err));
+        return this.storeWrites;
+    }
+
+    /**
+     * Экспоненциальная задержка с jitter: base * 2^(n-1), случайно в [50%, 100%]
+     */
+    _scheduleRetry() {
+        this.pushFailures++;
+
+        const backoff = Math.min(
+            this.PUSH_CONFIG.RETRY_MAX_MS,
+            this.PUSH_CONFIG.RETRY_BASE_MS * Math.pow(2, this.pushFailures - 1)
+        );
+        const delay = Math.round(backoff / 2 + Math.random() * backoff / 2);
+
+        this.retryAt = Date.now() + delay;
+
+        if (this.retryTimer) {
+            clearTimeout(this.retryTimer);
+        }
+        this.retryTimer = setTimeout(() => {
+            this.retryTimer = null;
+            this.performSync();
+        }, delay);
+
+        console.log(`[SyncManager] Retrying push in ${delay}ms (attempt ${this.pushFailures})`);
+    }
+
+    _resetBackoff() {
+        this.pushFailures = 0;
+        this.retryAt = 0;
+
+        if (this.retryTimer) {
+            clearTimeout(this.retryTimer);
+            this.retryTimer = null;
+        }
+    }
+
     // ============================================================================
     // PULL Strategy (сервер → локальный кэш)
     // ============================================================================
@@ -269,19 +681,19 @@ class SyncManager {
             console.log(`[SyncManager] Received ${updates.length} updates from server`);
 
             for (const update of updates) {
-                const cachedItem = this.cache.getCachedItem(
+                const cachedItem = await this.cache.getCachedItem(
                     update.entity_type,
                     update.entity_id
                 );
 
                 // Новый item - добавить если есть место
                 if (!cachedItem) {
-                    this.cache.addToCacheIfSpace(update.entity_type, update);
+                    await this.cache.addToCacheIfSpace(update.entity_type, update);
                     console.log(`[SyncManager] Added new ${update.entity_type} ${update.entity_id} to cache`);
                 }
                 // Server version новее - обновить
                 else if (update.data_version > cachedItem.data_version) {
-                    this.cache.updateCachedItem(
+                    await this.cache.updateCachedItem(
                         update.entity_type,
                         update.entity_id,
                         update
@@ -290,7 +702,7 @@ class SyncManager {
                 }
                 // Item удалён на сервере
                 else if (update.deleted_at) {
-                    this.cache.removeCachedItem(
+                    await this.cache.removeCachedItem(
                         update.entity_type,
                         update.entity_id
                     );
@@ -363,7 +775,7 @@ class SyncManager {
         console.log('[SyncManager] Attempting 3-way merge...');
 
         // Получить базовую версию из кэша
-        const base = this.cache.getCachedItem(localChange.entityType, localChange.entityId);
+        const base = await this.cache.getCachedItem(localChange.entityType, localChange.entityId);
 
         if (!base) {
             // Нет базовой версии - принимаем серверную
@@ -385,7 +797,7 @@ class SyncManager {
                 });
 
                 // Обновить кэш
-                this.cache.updateCachedItem(localChange.entityType, localChange.entityId, merged);
+                await this.cache.updateCachedItem(localChange.entityType, localChange.entityId, merged);
 
                 return merged;
             } catch (err) {
@@ -478,7 +890,7 @@ class SyncManager {
         console.warn('[SyncManager] Item was deleted on server:', localChange.entityId);
 
         // Удалить из кэша
-        this.cache.removeCachedItem(localChange.entityType, localChange.entityId);
+        await this.cache.removeCachedItem(localChange.entityType, localChange.entityId);
 
         return null;
     }
@@ -500,12 +912,12 @@ class SyncManager {
     /**
      * Принять серверную версию
      */
-    acceptServerVersion(serverData) {
+    async acceptServerVersion(serverData) {
         console.log('[SyncManager] Accepting server version');
 
         // Обновить кэш с серверными данными
         if (serverData.id) {
-            this.cache.updateCachedItem('estimate', serverData.id, serverData);
+            await this.cache.updateCachedItem('estimate', serverData.id, serverData);
         }
 
         return serverData;
@@ -545,3 +957,13 @@ class SyncManager {
         return await this.performFullSync();
     }
 }
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.SyncManager = SyncManager;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = SyncManager;
+}
@@ -0,0 +1,131 @@
+/**
+ * TemplateSearchIndex - поисковый индекс каталога шаблонов
+ *
+ * Строится один раз на версию каталога (массив шаблонов). Инвертированный индекс
+ * term -> Set(id) по словам из name, contractor и description; каждое слово
+ * индексируется как есть и в транслитерации, а слова запроса ищутся в обоих
+ * вариантах: "moskva" находит "Москва", "трансфер" - "Transfer". Поиск по префиксам:
+ * бинарный поиск в отсортированном массиве терминов. Слова запроса объединяются по И.
+ */
+
+class TemplateSearchIndex {
+    /**
+     * @param {Array<Object>} templates - Шаблоны каталога ({ id, name, contractor, description })
+     * @param {Function} transliterate - (text) => латиница (QuoteCalc.transliterate)
+     */
+    constructor(templates, transliterate) {
+        this.templates = templates;
+        this.size = templates.length;
+        this.transliterate = transliterate || (text => text);
+        this.prefixCache = new Map();
+
+        const postings = new Map();
+
+        for (const template of templates) {
+            for (const field of [template.name, template.contractor, template.description]) {
+                for (const term of this._terms(field)) {
+                    let ids = postings.get(term);
+                    if (!ids) {
+                        ids = new Set();
+                        postings.set(term, ids);
+                    }
+                    ids.add(template.id);
+                }
+            }
+        }
+
+        this.postings = postings;
+        this.terms = [...postings.keys()].sort();
+    }
+
+    /**
+     * Индекс построен для этого каталога (тот же массив и та же длина).
+     * Правки шаблонов на месте не видит - после них индекс сбрасывает
+     * вызывающий код (QuoteCalc.invalidateTemplateSearch)
+     */
+    isCurrent(templates) {
+        return this.templates === templates && this.size === templates.length;
+    }
+
+    /**
+     * @param {string} query
+     * @returns {Set<string>|null} id подходящих шаблонов; null - пустой запрос (показать всё)
+     */
+    search(query) {
+        const tokens = this._tokens(query);
+        if (tokens.length === 0) return null;
+
+        let result = null;
+
+        for (const token of tokens) {
+            const ids = this._prefixIds(token);
+            const translit = this.transliterate(token);
+
+            let matches = ids;
+            if (translit !== token) {
+                matches = new Set(ids);
+                for (const id of this._prefixIds(translit)) {
+                    matches.add(id);
+                }
+            }
+
+            result = result ? new Set([...result].filter(id => matches.has(id))) : matches;
+            if (result.size === 0) break;
+        }
+
+        return result;
+    }
+
+    _tokens(text) {
+        return String(text || '').toLowerCase().split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+    }
+
+    _terms(text) {
+        const terms = new Set();
+        for (const token of this._tokens(text)) {
+            terms.add(token);
+            terms.add(this.transliterate(token));
+        }
+        return terms;
+    }
+
+    /**
+     * Все id, у которых есть термин с этим префиксом
+     */
+    _prefixIds(prefix) {
+        const cached = this.prefixCache.get(prefix);
+        if (cached) return cached;
+
+        // Первый термин >= prefix
+        let low = 0;
+        let high = this.terms.length;
+        while (low < high) {
+            const mid = (low + high) >>> 1;
+            if (this.terms[mid] < prefix) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+
+        const ids = new Set();
+        for (let i = low; i < this.terms.length && this.terms[i].startsWith(prefix); i++) {
+            for (const id of this.postings.get(this.terms[i])) {
+                ids.add(id);
+            }
+        }
+
+        this.prefixCache.set(prefix, ids);
+        return ids;
+    }
+}
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.TemplateSearchIndex = TemplateSearchIndex;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = TemplateSearchIndex;
+}
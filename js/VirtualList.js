@@ -0,0 +1,258 @@
+/**
+ * VirtualList - оконный рендеринг длинных списков с переиспользованием строк по ключу
+ *
+ * В DOM создаются только строки, попадающие в видимую область (+ overscan);
+ * место остальных занимают два спейсера с вычисленной высотой. Высота строки
+ * измеряется после вставки и запоминается по ключу, до этого используется оценка.
+ *
+ * Строка перерисовывается только при изменении её сигнатуры:
+ * - { key, html: () => string, estimate? }               - сигнатура = сама HTML строка (один корневой элемент)
+ * - { key, signature: () => string, render: () => Element, estimate? } - для строк, собранных через DOM API
+ */
+
+class VirtualList {
+    /**
+     * @param {HTMLElement} container - Контейнер строк (div или tbody)
+     * @param {Object} options
+     * @param {string} options.rowTag - 'div' | 'tr' (тег спейсеров)
+     * @param {number} options.columns - colspan спейсера для таблиц
+     * @param {number} options.overscan - Запас в px над и под видимой областью
+     * @param {number} options.defaultHeight - Оценка высоты неизмеренной строки
+     * @param {Function} options.onRender - Вызывается после вставки новых строк
+     */
+    constructor(container, options = {}) {
+        this.container = container;
+        this.rowTag = options.rowTag || 'div';
+        this.columns = options.columns || 1;
+        this.overscan = options.overscan ?? 800;
+        this.defaultHeight = options.defaultHeight || 120;
+        this.onRender = options.onRender || null;
+
+        this.items = [];
+        this.rows = new Map();      // key -> { element, signature }
+        this.heights = new Map();   // key -> измеренная высота
+        this.frameId = null;
+
+        this.topSpacer = this._createSpacer();
+        this.bottomSpacer = this._createSpacer();
+        this.container.replaceChildren(this.topSpacer, this.bottomSpacer);
+
+        const scrollParent = this._findScrollParent();
+        this.scrollParent = scrollParent;
+        this.scrollTarget = scrollParent || window;
+
+        this._onViewportChange = () => this.scheduleUpdate();
+        this.scrollTarget.addEventListener('scroll', this._onViewportChange, { passive: true });
+        window.addEventListener('resize', this._onViewportChange);
+
+        // Контейнер стал видимым (переключение вкладки) или изменил ширину
+        if (typeof ResizeObserver !== 'undefined') {
+            this.resizeObserver = new ResizeObserver(this._onViewportChange);
+            this.resizeObserver.observe(this.container);
+        }
+    }
+
+    /**
+     * Спейсеры на месте: контейнер не перезаписывали через innerHTML
+     */
+    isAttached() {
+        return this.topSpacer.parentNode === this.container &&
+            this.bottomSpacer.parentNode === this.container &&
+            this.container.isConnected;
+    }
+
+    /**
+     * Заменить список и сразу отрисовать видимое окно
+     */
+    setItems(items) {
+        this.items = items;
+
+        const keys = new Set(items.map(item => item.key));
+        for (const key of this.heights.keys()) {
+            if (!keys.has(key)) this.heights.delete(key);
+        }
+
+        this.update();
+    }
+
+    scheduleUpdate() {
+        if (this.frameId !== null) return;
+        this.frameId = requestAnimationFrame(() => {
+            this.frameId = null;
+            this.update();
+        });
+    }
+
+    update() {
+        if (!this.isAttached()) return;
+
+        const { start, end } = this._visibleRange();
+        const visible = new Set();
+        let anchor = this.topSpacer;
+        let created = false;
+
+        for (let i = start; i < end; i++) {
+            const item = this.items[i];
+            const row = this._patchRow(item);
+
+            created = created || row.created;
+            row.created = false;
+            visible.add(item.key);
+
+            if (anchor.nextSibling !== row.element) {
+                anchor.after(row.element);
+            }
+            anchor = row.element;
+        }
+
+        for (const [key, row] of this.rows) {
+            if (!visible.has(key)) {
+                row.element.remove();
+                this.rows.delete(key);
+            }
+        }
+
+        this._measure(start, end);
+        this._setSpacerHeight(this.topSpacer, this._sumHeights(0, start));
+        this._setSpacerHeight(this.bottomSpacer, this._sumHeights(end, this.items.length));
+
+        if (created && this.onRender) {
+            this.onRender();
+        }
+    }
+
+    destroy() {
+        if (this.frameId !== null) cancelAnimationFrame(this.frameId);
+        this.scrollTarget.removeEventListener('scroll', this._onViewportChange);
+        window.removeEventListener('resize', this._onViewportChange);
+        if (this.resizeObserver) this.resizeObserver.disconnect();
+        this.rows.clear();
+    }
+
+    _patchRow(item) {
+        const signature = item.html ? item.html() : item.signature();
+        let row = this.rows.get(item.key);
+
+        if (row && row.signature === signature) {
+            return row;
+        }
+
+        const element = item.html ? this._fromHtml(signature) : item.render();
+        if (row) {
+            row.element.replaceWith(element);
+        }
+
+        row = { element, signature, created: true };
+        this.rows.set(item.key, row);
+        return row;
+    }
+
+    _fromHtml(html) {
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        return template.content.firstElementChild;
+    }
+
+    _height(index) {
+        const item = this.items[index];
+        return this.heights.get(item.key) ?? item.estimate ?? this.defaultHeight;
+    }
+
+    _sumHeights(from, to) {
+        let sum = 0;
+        for (let i = from; i < to; i++) {
+            sum += this._height(i);
+        }
+        return sum;
+    }
+
+    _visibleRange() {
+        const listTop = this.topSpacer.getBoundingClientRect().top;
+        let viewTop = 0;
+        let viewBottom = window.innerHeight;
+
+        if (this.scrollParent) {
+            const rect = this.scrollParent.getBoundingClientRect();
+            viewTop = Math.max(rect.top, 0);
+            viewBottom = Math.min(rect.bottom, window.innerHeight);
+        }
+
+        const from = viewTop - listTop - this.overscan;
+        const to = viewBottom - listTop + this.overscan;
+
+        let start = 0;
+        let offset = 0;
+        while (start < this.items.length && offset + this._height(start) < from) {
+            offset += this._height(start);
+            start++;
+        }
+
+        let end = start;
+        while (end < this.items.length && offset < to) {
+            offset += this._height(end);
+            end++;
+        }
+
+        return { start, end };
+    }
+
+    /**
+     * Высота строки = расстояние до следующего элемента (учитывает margin)
+     */
+    _measure(start, end) {
+        let element = this.topSpacer.nextElementSibling;
+
+        for (let i = start; i < end && element && element !== this.bottomSpacer; i++) {
+            const next = element.nextElementSibling;
+            const height = next.offsetTop - element.offsetTop;
+
+            if (height > 0) {
+                this.heights.set(this.items[i].key, height);
+            }
+            element = next;
+        }
+    }
+
+    _createSpacer() {
+        const spacer = document.createElement(this.rowTag);
+        spacer.setAttribute('aria-hidden', 'true');
+
+        if (this.rowTag === 'tr') {
+            const cell = document.createElement('td');
+            cell.colSpan = this.columns;
+            cell.style.cssText = 'padding: 0; border: 0; height: 0;';
+            spacer.appendChild(cell);
+        }
+
+        return spacer;
+    }
+
+    _setSpacerHeight(spacer, height) {
+        const target = this.rowTag === 'tr' ? spacer.firstChild : spacer;
+        target.style.height = `${height}px`;
+    }
+
+    _findScrollParent() {
+        let node = this.container.parentElement;
+
+        while (node && node !== document.body && node !== document.documentElement) {
+            const overflowY = getComputedStyle(node).overflowY;
+            if (overflowY === 'auto' || overflowY === 'scroll') {
+                return node;
+            }
+            node = node.parentElement;
+        }
+
+        return null;
+    }
+}
+
+// Экспорт для использования в index.html
+if (typeof window !== 'undefined') {
+    window.VirtualList = VirtualList;
+}
+
+// Экспорт для Node.js (тестирование)
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = VirtualList;
+}
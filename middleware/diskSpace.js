@@ -3,16 +3,150 @@
  *
  * DAY 1.3: Production Safety - проверка свободного места на диске
  * Предотвращает попытки записи при недостатке места (507 Insufficient Storage)
+ *
+ * Свободное место измеряется фоновым sampler'ом (async statfs), а middleware
+ * и health check читают закэшированное значение - без syscall на запрос.
+ * Чем меньше места, тем чаще sampler обновляет данные.
  */
 
 const fs = require('fs');
 const path = require('path');
+const metrics = require('../utils/metrics');
 
 // Минимальное свободное место (MB) для безопасной записи
 const MIN_DISK_SPACE_MB = 100;
 
+// Порог предупреждения (MB)
+const LOW_DISK_SPACE_MB = 500;
+
+// Интервалы sampler'а (ms): обычный, при малом месте, при критическом
+const SAMPLE_INTERVAL_MS = 30000;
+const SAMPLE_INTERVAL_LOW_MS = 5000;
+const SAMPLE_INTERVAL_CRITICAL_MS = 1000;
+
+const DB_DIR = path.resolve('./db');
+const BYTES_PER_MB = 1024 * 1024;
+
+// Последний замер (null до первого sample)
+let cachedSample = null;
+let samplerTimer = null;
+let samplerRunning = false;
+
+/**
+ * Преобразовать statfs в замер
+ * @private
+ */
+function toSample(stats) {
+    // bavail = доступно для непривилегированных пользователей
+    // bsize = размер блока в байтах
+    const freeSpaceMB = (stats.bavail * stats.bsize) / BYTES_PER_MB;
+    const totalSpaceMB = (stats.blocks * stats.bsize) / BYTES_PER_MB;
+
+    return {
+        freeSpaceMB,
+        totalSpaceMB,
+        sampledAt: Date.now()
+    };
+}
+
+/**
+ * Синхронный замер - только если sampler ещё не успел отработать
+ * @private
+ */
+function sampleSync() {
+    cachedSample = toSample(fs.statfsSync(DB_DIR));
+    return cachedSample;
+}
+
 /**
- * Middleware для проверки свободного места на диске перед записью
+ * Асинхронный замер (не блокирует event loop)
+ * @returns {Promise<object>} Новый замер
+ */
+async function sampleDiskSpace() {
+    const stats = await fs.promises.statfs(DB_DIR);
+    cachedSample = toSample(stats);
+
+    // Логируем предупреждение если места мало (< 500MB)
+    if (cachedSample.freeSpaceMB < LOW_DISK_SPACE_MB) {
+        console.warn(`⚠️  Low disk space warning: ${Math.floor(cachedSample.freeSpaceMB)}MB free`);
+    }
+
+    return cachedSample;
+}
+
+/**
+ * Интервал до следующего замера - адаптивный по свободному месту
+ * @private
+ */
+function nextInterval() {
+    if (!cachedSample) return SAMPLE_INTERVAL_MS;
+    if (cachedSample.freeSpaceMB < MIN_DISK_SPACE_MB * 2) return SAMPLE_INTERVAL_CRITICAL_MS;
+    if (cachedSample.freeSpaceMB < LOW_DISK_SPACE_MB) return SAMPLE_INTERVAL_LOW_MS;
+    return SAMPLE_INTERVAL_MS;
+}
+
+/**
+ * Запустить фоновый sampler
+ */
+function startDiskSpaceSampler() {
+    if (samplerRunning) return;
+    samplerRunning = true;
+
+    const tick = async () => {
+        try {
+            await sampleDiskSpace();
+        } catch (err) {
+            console.warn('Disk space sampling failed:', err.message);
+        }
+
+        if (samplerRunning) {
+            samplerTimer = setTimeout(tick, nextInterval());
+            samplerTimer.unref();
+        }
+    };
+
+    tick();
+}
+
+/**
+ * Остановить фоновый sampler
+ */
+function stopDiskSpaceSampler() {
+    samplerRunning = false;
+    if (samplerTimer) {
+        clearTimeout(samplerTimer);
+        samplerTimer = null;
+    }
+}
+
+/**
+ * Текущий замер: из кэша, либо синхронно если кэш пуст
+ * @private
+ */
+function getSample() {
+    metrics.recordCache('disk_space', !!cachedSample);
+    return cachedSample || sampleSync();
+}
+
+/**
+ * Ожидаемый объём записи по Content-Length (MB).
+ * JSON в SQLite + WAL + индексы занимают больше, чем тело запроса,
+ * поэтому берём двойной запас.
+ * @param {object} req - Express request
+ * @returns {number}
+ */
+function projectWriteSizeMB(req) {
+    const contentLength = parseInt(req.headers['content-length'], 10);
+    if (!contentLength || contentLength < 0) {
+        return 0;
+    }
+    return (contentLength * 2) / BYTES_PER_MB;
+}
+
+/**
+ * Middleware для проверки свободного места на диске перед записью.
+ * Монтируется до body parser'ов - большие import'ы отклоняются
+ * по Content-Length ещё до разбора тела.
  * @param {object} req - Express request
  * @param {object} res - Express response
  * @param {function} next - Express next middleware
@@ -24,31 +158,23 @@ function checkDiskSpace(req, res, next) {
             return next();
         }
 
-        // Получаем статистику файловой системы для директории БД
-        const dbDir = path.resolve('./db');
-        const stats = fs.statfsSync(dbDir);
-
-        // Вычисляем свободное место в MB
-        // bavail = доступно для непривилегированных пользователей
-        // bsize = размер блока в байтах
-        const freeSpaceMB = (stats.bavail * stats.bsize) / (1024 * 1024);
+        const { freeSpaceMB } = getSample();
+        const projectedMB = projectWriteSizeMB(req);
+        const freeAfterWriteMB = freeSpaceMB - projectedMB;
 
-        if (freeSpaceMB < MIN_DISK_SPACE_MB) {
-            console.error(`❌ Insufficient disk space: ${Math.floor(freeSpaceMB)}MB free (required: ${MIN_DISK_SPACE_MB}MB)`);
+        if (freeAfterWriteMB < MIN_DISK_SPACE_MB) {
+            console.error(`❌ Insufficient disk space: ${Math.floor(freeSpaceMB)}MB free, ` +
+                `write needs ~${Math.ceil(projectedMB)}MB (required reserve: ${MIN_DISK_SPACE_MB}MB)`);
 
             return res.status(507).json({
                 success: false,
                 error: 'Insufficient disk space',
                 freeSpaceMB: Math.floor(freeSpaceMB),
+                projectedWriteMB: Math.ceil(projectedMB),
                 requiredMB: MIN_DISK_SPACE_MB
             });
         }
 
-        // Логируем предупреждение если места мало (< 500MB)
-        if (freeSpaceMB < 500) {
-            console.warn(`⚠️  Low disk space warning: ${Math.floor(freeSpaceMB)}MB free`);
-        }
-
         next();
     } catch (err) {
         // Если проверка не удалась, логируем но разрешаем операцию (fail-open)
@@ -60,15 +186,11 @@ function checkDiskSpace(req, res, next) {
 
 /**
  * Получить текущее свободное место на диске (для health check)
- * @returns {object} { freeSpaceMB, totalSpaceMB, usagePercent }
+ * @returns {object} { freeSpaceMB, totalSpaceMB, usagePercent, healthy, sampledAt }
  */
 function getDiskSpaceInfo() {
     try {
-        const dbDir = path.resolve('./db');
-        const stats = fs.statfsSync(dbDir);
-
-        const freeSpaceMB = (stats.bavail * stats.bsize) / (1024 * 1024);
-        const totalSpaceMB = (stats.blocks * stats.bsize) / (1024 * 1024);
+        const { freeSpaceMB, totalSpaceMB, sampledAt } = getSample();
         const usedSpaceMB = totalSpaceMB - freeSpaceMB;
         const usagePercent = (usedSpaceMB / totalSpaceMB) * 100;
 
@@ -76,7 +198,9 @@ function getDiskSpaceInfo() {
             freeSpaceMB: Math.floor(freeSpaceMB),
             totalSpaceMB: Math.floor(totalSpaceMB),
             usagePercent: Math.floor(usagePercent),
-            healthy: freeSpaceMB >= MIN_DISK_SPACE_MB
+            healthy: freeSpaceMB >= MIN_DISK_SPACE_MB,
+            sampledAt: new Date(sampledAt).toISOString(),
+            sampleAgeMs: Date.now() - sampledAt
         };
     } catch (err) {
         console.error('Failed to get disk space info:', err);
@@ -93,5 +217,9 @@ function getDiskSpaceInfo() {
 module.exports = {
     checkDiskSpace,
     getDiskSpaceInfo,
+    sampleDiskSpace,
+    startDiskSpaceSampler,
+    stopDiskSpaceSampler,
+    projectWriteSizeMB,
     MIN_DISK_SPACE_MB
 };
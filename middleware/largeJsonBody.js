@@ -0,0 +1,182 @@
+/**
+ * Large JSON Body Middleware
+ *
+ * Глобальный express.json() работает с небольшим лимитом (JSON_LIMIT).
+ * Маршруты с большими телами (сохранение каталога, импорт, sync batch,
+ * сохранение сметы) перечисляются в rules и читаются здесь:
+ * - свой лимит на маршрут: 413 по Content-Length до чтения или при превышении в потоке
+ * - тело до inlineLimit разбирается в основном потоке (быстрый путь)
+ * - больше - JSON.parse и валидация в JsonParserPool (worker_threads)
+ *
+ * Middleware ставит req._body = true, поэтому express.json() дальше по
+ * цепочке такие запросы пропускает.
+ */
+
+const zlib = require('zlib');
+const logger = require('../utils/logger');
+const { parseJsonBody, bodyError } = require('../utils/jsonBody');
+
+const SIZE_UNITS = { b: 1, kb: 1024, mb: 1024 * 1024, gb: 1024 * 1024 * 1024 };
+
+/**
+ * '50mb' → bytes
+ */
+function parseSize(value) {
+    if (typeof value === 'number') return value;
+
+    const match = /^(\d+(?:\.\d+)?)\s*(b|kb|mb|gb)?$/i.exec(String(value).trim());
+    if (!match) {
+        throw new Error(`Invalid size: ${value}`);
+    }
+    return Math.floor(parseFloat(match[1]) * SIZE_UNITS[(match[2] || 'b').toLowerCase()]);
+}
+
+function isJsonRequest(req) {
+    const type = (req.headers['content-type'] || '').split(';')[0].trim().toLowerCase();
+    return type === 'application/json' || type.endsWith('+json');
+}
+
+function matchRule(rule, req) {
+    if (!rule.methods.includes(req.method)) return false;
+    return rule.path instanceof RegExp ? rule.path.test(req.path) : rule.path === req.path;
+}
+
+/**
+ * Поток тела с учётом Content-Encoding
+ * @private
+ */
+function bodyStream(req) {
+    const encoding = (req.headers['content-encoding'] || 'identity').toLowerCase();
+
+    switch (encoding) {
+        case 'identity':
+            return req;
+        case 'gzip':
+            return req.pipe(zlib.createGunzip());
+        case 'deflate':
+            return req.pipe(zlib.createInflate());
+        case 'br':
+            return req.pipe(zlib.createBrotliDecompress());
+        default:
+            throw bodyError(`Unsupported content encoding "${encoding}"`, 'UNSUPPORTED_ENCODING', 415);
+    }
+}
+
+/**
+ * Прочитать тело целиком с ограничением размера
+ * @returns {Promise<Buffer>}
+ */
+function readBody(req, limit) {
+    return new Promise((resolve, reject) => {
+        const tooLarge = () => bodyError(`Request body exceeds limit of ${limit} bytes`, 'BODY_TOO_LARGE', 413);
+
+        const declared = parseInt(req.headers['content-length'], 10);
+        if (declared > limit) {
+            return reject(tooLarge());
+        }
+
+        const charset = /charset=([^;]+)/i.exec(req.headers['content-type'] || '');
+        if (charset && !/^utf-?8$/i.test(charset[1].trim().replace(/"/g, ''))) {
+            return reject(bodyError(`Unsupported charset "${charset[1].trim()}"`, 'UNSUPPORTED_CHARSET', 415));
+        }
+
+        let stream;
+        try {
+            stream = bodyStream(req);
+        } catch (err) {
+            return reject(err);
+        }
+
+        const chunks = [];
+        let received = 0;
+        let done = false;
+
+        const finish = (err, buffer) => {
+            if (done) return;
+            done = true;
+            stream.removeAllListeners('data');
+            if (err) {
+                // Дочитываем (и выбрасываем) остаток, чтобы ответ дошёл до клиента
+                if (stream !== req) stream.destroy();
+                req.unpipe();
+                req.resume();
+                reject(err);
+            } else {
+                resolve(buffer);
+            }
+        };
+
+        stream.on('data', (chunk) => {
+            received += chunk.length;
+            if (received > limit) {
+                return finish(tooLarge());
+            }
+            chunks.push(chunk);
+        });
+        stream.on('end', () => finish(null, Buffer.concat(chunks, received)));
+        stream.on('error', (err) => finish(bodyError(`Failed to read request body: ${err.message}`, 'BODY_READ_FAILED')));
+        req.on('aborted', () => finish(bodyError('Request aborted', 'BODY_ABORTED')));
+    });
+}
+
+/**
+ * @param {Array<Object>} rules - [{ method, path, limit, validate }]
+ *   method - 'POST' | ['POST', 'PUT'], path - точная строка или RegExp (по req.path),
+ *   limit - '50mb' | bytes, validate - имя валидатора utils/jsonBody
+ * @param {Object} options
+ * @param {JsonParserPool} options.pool - Пул для тел больше inlineLimit
+ * @param {string|number} [options.inlineLimit] - Порог разбора в основном потоке
+ * @returns {Function} Express middleware
+ */
+function largeJsonBody(rules, options) {
+    const pool = options.pool;
+    const inlineLimit = parseSize(options.inlineLimit || process.env.JSON_INLINE_LIMIT || '256kb');
+
+    const compiled = rules.map(rule => ({
+        ...rule,
+        methods: [].concat(rule.method),
+        limit: parseSize(rule.limit),
+        validate: rule.validate || 'object'
+    }));
+
+    return (req, res, next) => {
+        if (req._body || !isJsonRequest(req)) return next();
+
+        const rule = compiled.find(candidate => matchRule(candidate, req));
+        if (!rule) return next();
+
+        readBody(req, rule.limit)
+            .then((buffer) => {
+                req._body = true;
+
+                if (buffer.length === 0) return {};
+                if (buffer.length <= inlineLimit) return parseJsonBody(buffer, rule.validate);
+                return pool.parse(buffer, rule.validate);
+            })
+            .then((body) => {
+                req.body = body;
+                next();
+            }, (err) => {
+                if (!err.status) {
+                    logger.logError(err, { context: 'Large JSON body', path: req.path });
+                    return next(err);
+                }
+
+                if (err.status === 413) {
+                    logger.warn('Request body too large', { path: req.path, limit: rule.limit });
+                    res.set('Connection', 'close');
+                }
+
+                res.status(err.status).json({
+                    success: false,
+                    error: err.message,
+                    code: err.code
+                });
+            });
+    };
+}
+
+module.exports = {
+    largeJsonBody,
+    parseSize
+};
@@ -184,13 +184,10 @@ function requireSharedAccess(storage) {
                 return next();
             }
 
-            // Проверка shared_with
-            if (estimate.shared_with) {
-                const sharedWith = JSON.parse(estimate.shared_with);
-                if (sharedWith.includes(req.user.id)) {
-                    req.estimate = estimate;
-                    return next();
-                }
+            // Явный доступ (estimate_collaborators)
+            if (storage.isEstimateCollaborator(estimate.id, req.user.id)) {
+                req.estimate = estimate;
+                return next();
             }
 
             return res.status(403).json({
@@ -0,0 +1,134 @@
+/**
+ * Static Assets Middleware
+ *
+ * Раздаёт результат scripts/build-assets.js (dist/) из памяти:
+ * - /assets/* - fingerprinted файлы, Cache-Control: immutable на год
+ * - / и /index.html - no-cache (ссылки на новые fingerprint видны сразу после деплоя)
+ * - готовые .br / .gz выбираются по Accept-Encoding, ETag + 304
+ *
+ * Если сборки нет (dev, тесты) - middleware пропускает запросы дальше
+ * (express.static('.') отдаёт исходный index.html).
+ */
+
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const logger = require('../utils/logger');
+
+const CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.svg': 'image/svg+xml'
+};
+
+const IMMUTABLE = 'public, max-age=31536000, immutable';
+const NO_CACHE = 'no-cache';
+
+/**
+ * Кодировки, которые принимает клиент (q=0 - запрещена)
+ * @returns {Set<string>}
+ */
+function acceptedEncodings(header) {
+    const accepted = new Set();
+
+    for (const part of String(header || '').split(',')) {
+        const [name, ...params] = part.trim().toLowerCase().split(';');
+        const q = params.map(p => p.trim()).find(p => p.startsWith('q='));
+        if (name && !(q && parseFloat(q.slice(2)) === 0)) {
+            accepted.add(name);
+        }
+    }
+    return accepted;
+}
+
+function loadFile(file, cacheControl) {
+    const body = fs.readFileSync(file);
+    const etag = crypto.createHash('sha256').update(body).digest('base64url').slice(0, 16);
+
+    const variants = { identity: { body, etag: `"${etag}"` } };
+    for (const [encoding, ext] of [['br', '.br'], ['gzip', '.gz']]) {
+        if (fs.existsSync(file + ext)) {
+            variants[encoding] = { body: fs.readFileSync(file + ext), etag: `"${etag}-${ext.slice(1)}"` };
+        }
+    }
+
+    return {
+        type: CONTENT_TYPES[path.extname(file)] || 'application/octet-stream',
+        cacheControl,
+        variants
+    };
+}
+
+/**
+ * Прочитать сборку в память
+ * @returns {Map<string, Object>|null} URL -> файл; null - сборки нет
+ */
+function loadBuild(distDir) {
+    if (!fs.existsSync(path.join(distDir, 'manifest.json'))) return null;
+
+    const files = new Map();
+    const index = loadFile(path.join(distDir, 'index.html'), NO_CACHE);
+    files.set('/', index);
+    files.set('/index.html', index);
+
+    const assetsDir = path.join(distDir, 'assets');
+    for (const name of fs.readdirSync(assetsDir)) {
+        if (name.endsWith('.br') || name.endsWith('.gz')) continue;
+        files.set(`/assets/${name}`, loadFile(path.join(assetsDir, name), IMMUTABLE));
+    }
+
+    return files;
+}
+
+/**
+ * @param {Object} [options]
+ * @param {string} [options.distDir] - Каталог сборки (по умолчанию dist/ или ASSETS_DIST_DIR)
+ * @returns {Function} Express middleware
+ */
+function staticAssets(options = {}) {
+    const distDir = options.distDir || process.env.ASSETS_DIST_DIR || path.join(__dirname, '..', 'dist');
+    const files = loadBuild(distDir);
+
+    if (!files) {
+        return (req, res, next) => next();
+    }
+
+    logger.info('Serving built assets from memory', { distDir, files: files.size });
+
+    return (req, res, next) => {
+        if (req.method !== 'GET' && req.method !== 'HEAD') return next();
+
+        const file = files.get(req.path);
+        if (!file) return next();
+
+        const accepted = acceptedEncodings(req.headers['accept-encoding']);
+        const encoding = ['br', 'gzip'].find(name => file.variants[name] && accepted.has(name)) || 'identity';
+        const variant = file.variants[encoding];
+
+        res.setHeader('Cache-Control', file.cacheControl);
+        res.setHeader('ETag', variant.etag);
+        res.setHeader('Vary', 'Accept-Encoding');
+
+        const ifNoneMatch = req.headers['if-none-match'];
+        if (ifNoneMatch && ifNoneMatch.split(',').some(tag => tag.trim().replace(/^W\//, '') === variant.etag)) {
+            res.statusCode = 304;
+            return res.end();
+        }
+
+        res.setHeader('Content-Type', file.type);
+        res.setHeader('Content-Length', variant.body.length);
+        if (encoding !== 'identity') {
+            res.setHeader('Content-Encoding', encoding);
+        }
+
+        res.statusCode = 200;
+        res.end(req.method === 'HEAD' ? undefined : variant.body);
+    };
+}
+
+module.exports = {
+    staticAssets,
+    acceptedEncodings
+};
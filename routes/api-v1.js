@@ -5,15 +5,16 @@
  *
  * Структура модулей:
  * - auth.js (3 endpoints) - Регистрация, вход, выход
- * - estimates.js (8 endpoints) - CRUD смет
- * - catalogs.js (3 endpoints) - Каталоги услуг
+ * - estimates.js (13 endpoints) - CRUD смет
+ * - catalogs.js (6 endpoints) - Каталоги услуг
  * - settings.js (2 endpoints) - Настройки
  * - sync.js (2 endpoints) - Синхронизация
  * - users.js (3 endpoints) - Управление пользователями
  * - organizations.js (3 endpoints) - Управление организациями
  * - export.js (4 endpoints) - Экспорт/импорт данных
+ * - audit.js (1 endpoint) - Поиск по audit/auth логам и архиву
  *
- * Всего: 28 endpoints
+ * Всего: 30 endpoints
  *
  * Created: 2025-11-19
  * Version: 3.0.0
@@ -31,6 +32,7 @@ const syncRoutes = require('./api-v1/sync');
 const usersRoutes = require('./api-v1/users');
 const organizationsRoutes = require('./api-v1/organizations');
 const exportRoutes = require('./api-v1/export');
+const auditRoutes = require('./api-v1/audit');
 
 // Mount routes
 router.use('/auth', authRoutes);
@@ -41,6 +43,7 @@ router.use('/sync', syncRoutes);
 router.use('/users', usersRoutes);
 router.use('/organizations', organizationsRoutes);
 router.use('/export', exportRoutes);
+router.use('/audit', auditRoutes);
 
 // API root endpoint
 router.get('/', (req, res) => {
@@ -50,15 +53,16 @@ router.get('/', (req, res) => {
         version: '3.0.0',
         endpoints: {
             auth: 3,
-            estimates: 8,
-            catalogs: 3,
+            estimates: 13,
+            catalogs: 6,
             settings: 2,
             sync: 2,
             users: 3,
             organizations: 3,
-            export: 4
+            export: 4,
+            audit: 1
         },
-        total_endpoints: 28,
+        total_endpoints: 37,
         documentation: '/docs'
     });
 });
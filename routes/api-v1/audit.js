@@ -0,0 +1,104 @@
+/**
+ * Audit Logs API Routes
+ *
+ * Endpoints:
+ * - GET /api/v1/audit - Поиск по audit/auth логам (SQLite + архивные сегменты)
+ *
+ * Query params:
+ * - table: 'audit' (default) | 'auth' (auth - только superuser)
+ * - from, to: unix seconds или ISO дата
+ * - entity_type, entity_id, user_id, limit
+ */
+
+const express = require('express');
+const { requireAuth } = require('../../middleware/jwt-auth');
+const { requireRole } = require('../../middleware/rbac');
+
+const router = express.Router();
+
+const TABLES = {
+    audit: 'audit_logs',
+    auth: 'auth_logs'
+};
+
+function parseTime(value) {
+    if (value === undefined) return undefined;
+    if (/^\d+$/.test(value)) return parseInt(value, 10);
+
+    const ms = Date.parse(value);
+    return isNaN(ms) ? NaN : Math.floor(ms / 1000);
+}
+
+/**
+ * GET /api/v1/audit
+ * Admin видит только свою организацию
+ */
+router.get('/', requireAuth, requireRole('admin'), async (req, res) => {
+    try {
+        const table = TABLES[req.query.table || 'audit'];
+        if (!table) {
+            return res.status(400).json({
+                success: false,
+                error: 'Invalid table. Use "audit" or "auth"'
+            });
+        }
+
+        const isSuperuser = req.user.role === 'superuser';
+
+        // auth_logs не привязаны к организации
+        if (table === 'auth_logs' && !isSuperuser) {
+            return res.status(403).json({
+                success: false,
+                error: 'Insufficient permissions. Required role: superuser'
+            });
+        }
+
+        const from = parseTime(req.query.from);
+        const to = parseTime(req.query.to);
+        if (Number.isNaN(from) || Number.isNaN(to)) {
+            return res.status(400).json({
+                success: false,
+                error: 'Invalid from/to. Use unix seconds or ISO date'
+            });
+        }
+
+        const logArchiver = req.app.locals.logArchiver;
+        if (!logArchiver) {
+            return res.status(503).json({
+                success: false,
+                error: 'Log archive is not available'
+            });
+        }
+
+        const result = await logArchiver.query({
+            table,
+            from,
+            to,
+            organizationId: table === 'audit_logs'
+                ? (isSuperuser ? req.query.organization_id : req.user.organization_id)
+                : undefined,
+            userId: req.query.user_id,
+            entityType: table === 'audit_logs' ? req.query.entity_type : undefined,
+            entityId: table === 'audit_logs' ? req.query.entity_id : undefined,
+            limit: parseInt(req.query.limit) || 100
+        });
+
+        res.json({
+            success: true,
+            data: {
+                logs: result.rows,
+                scannedSegments: result.scannedSegments,
+                totalSegments: result.totalSegments
+            }
+        });
+
+    } catch (err) {
+        console.error('Query audit logs error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to query logs'
+        });
+    }
+});
+
+module.exports = router;
@@ -11,9 +11,9 @@
  */
 
 const express = require('express');
-const bcrypt = require('bcrypt');
 const { requireAuth } = require('../../middleware/jwt-auth');
 const { generateToken } = require('../../middleware/jwt-auth');
+const { hashWithPool, compareWithPool, sendPoolSaturated } = require('../../services/PasswordHasher');
 
 const router = express.Router();
 
@@ -50,7 +50,7 @@ router.post('/register', async (req, res) => {
         const orgSlug = organization_name.toLowerCase().replace(/[^a-z0-9]+/g, '-');
 
         // Hash password
-        const passwordHash = await bcrypt.hash(password, 10);
+        const passwordHash = await hashWithPool(req.app.locals.passwordHasher, password);
 
         // Create organization
         storage.db.prepare(`
@@ -63,7 +63,7 @@ router.post('/register', async (req, res) => {
         `).run(
             orgId, organization_name, orgSlug, 'free', userId,
             5, 100, 10, 100, 1000,
-            1, 0, 0, 0,
+            0, 0, 0, 0,  // usage counters ведут triggers (admin user ниже → users = 1)
             1, Math.floor(Date.now() / 1000), Math.floor(Date.now() / 1000)
         );
 
@@ -108,6 +108,10 @@ router.post('/register', async (req, res) => {
         });
 
     } catch (err) {
+        if (err.code === 'HASH_POOL_SATURATED') {
+            return sendPoolSaturated(res, err);
+        }
+
         console.error('Register error:', err);
         res.status(500).json({
             success: false,
@@ -155,7 +159,7 @@ router.post('/login', async (req, res) => {
         }
 
         // Verify password
-        const passwordMatch = await bcrypt.compare(password, user.password_hash);
+        const passwordMatch = await compareWithPool(req.app.locals.passwordHasher, password, user.password_hash);
         if (!passwordMatch) {
             return res.status(401).json({
                 success: false,
@@ -191,6 +195,10 @@ router.post('/login', async (req, res) => {
         });
 
     } catch (err) {
+        if (err.code === 'HASH_POOL_SATURATED') {
+            return sendPoolSaturated(res, err);
+        }
+
         console.error('Login error:', err);
         res.status(500).json({
             success: false,
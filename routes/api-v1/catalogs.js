@@ -4,6 +4,9 @@
  * Endpoints:
  * - GET /api/v1/catalogs - Список каталогов
  * - GET /api/v1/catalogs/:id - Получить каталог
+ * - POST /api/v1/catalogs/batch-get - Несколько каталогов одним запросом (только изменённые)
+ * - GET /api/v1/catalogs/:id/changes?since=N - Шаблоны / категории, изменённые после версии N
+ * - PATCH /api/v1/catalogs/:id - Изменить отдельные шаблоны / категории
  * - POST /api/v1/catalogs - Создать/обновить каталог
  *
  * Created: 2025-11-19
@@ -12,6 +15,8 @@
 
 const express = require('express');
 const { requireAuth } = require('../../middleware/jwt-auth');
+const logger = require('../../utils/logger');
+const { parseBatchGetRequest, batchGetSql, createBatchGetWriter } = require('../../utils/batchGet');
 
 const router = express.Router();
 
@@ -48,6 +53,97 @@ router.get('/', requireAuth, async (req, res) => {
     }
 });
 
+/**
+ * POST /api/v1/catalogs/batch-get
+ * Полные данные нескольких каталогов одним запросом
+ *
+ * Body: { ids: [...], versions: { id: data_version } }
+ * Ответ (потоком): { catalogs: [{ id, name, region, data_version, ..., data }],
+ *                   unchanged, not_found, forbidden }
+ */
+router.post('/batch-get', requireAuth, async (req, res) => {
+    let writer = null;
+
+    try {
+        const { ids, versions } = parseBatchGetRequest(req.body);
+        const storage = req.app.locals.storage;
+        const sql = batchGetSql(ids);
+
+        const rows = ids.length === 0 ? [] : storage.db.prepare(`
+            SELECT id, name, slug, region, organization_id, visibility,
+                   data_version, templates_count, categories_count,
+                   created_at, updated_at, deleted_at,
+                   ${sql.dataColumn}
+            FROM catalogs
+            WHERE id IN (${sql.placeholders})
+        `).all(JSON.stringify(versions), ...ids);
+
+        const byId = new Map(rows.map(row => [row.id, row]));
+        const summary = { unchanged: [], not_found: [], forbidden: [] };
+        const changed = [];
+
+        for (const id of ids) {
+            const catalog = byId.get(id);
+
+            if (!catalog || catalog.deleted_at) {
+                summary.not_found.push(id);
+            } else if (!(req.user.role === 'superuser' ||
+                catalog.organization_id === req.user.organization_id ||
+                catalog.visibility === 'public')) {
+                summary.forbidden.push(id);
+            } else if (catalog.data === null) {
+                summary.unchanged.push(id);
+            } else {
+                changed.push(catalog);
+            }
+        }
+
+        if (changed.length > 0) {
+            storage.db.prepare(`UPDATE catalogs SET last_accessed_at = ? WHERE id IN (${changed.map(() => '?').join(', ')})`)
+                .run(Math.floor(Date.now() / 1000), ...changed.map(catalog => catalog.id));
+        }
+
+        writer = createBatchGetWriter(res, 'catalogs');
+
+        for (const catalog of changed) {
+            const data = storage.materializeCatalogData(catalog);
+
+            await writer.write({
+                id: catalog.id,
+                name: catalog.name,
+                slug: catalog.slug,
+                region: catalog.region,
+                visibility: catalog.visibility,
+                data_version: catalog.data_version,
+                templates_count: catalog.templates_count,
+                categories_count: catalog.categories_count,
+                updated_at: catalog.updated_at
+            }, data);
+        }
+
+        writer.end(summary);
+
+    } catch (err) {
+        if (writer) {
+            // Заголовки уже отправлены - обрываем ответ
+            console.error('Batch get catalogs stream error:', err);
+            return res.destroy(err);
+        }
+        if (err.status) {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                code: err.code
+            });
+        }
+        console.error('Batch get catalogs error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to fetch catalogs'
+        });
+    }
+});
+
 /**
  * GET /api/v1/catalogs/:id
  * Получить каталог по ID (с полными данными)
@@ -84,15 +180,10 @@ router.get('/:id', requireAuth, async (req, res) => {
         storage.db.prepare('UPDATE catalogs SET last_accessed_at = ? WHERE id = ?')
             .run(Math.floor(Date.now() / 1000), req.params.id);
 
-        // ✅ FIX: Parse JSON data field before sending
-        const catalogData = {
-            ...catalog,
-            data: JSON.parse(catalog.data)
-        };
-
+        // ✅ Возвращаем только parsed data (заголовок + шаблоны и категории), а не весь row
         res.json({
             success: true,
-            data: catalogData.data  // ✅ Возвращаем только parsed data, а не весь row
+            data: JSON.parse(storage.materializeCatalogData(catalog))
         });
 
     } catch (err) {
@@ -104,6 +195,89 @@ router.get('/:id', requireAuth, async (req, res) => {
     }
 });
 
+/**
+ * GET /api/v1/catalogs/:id/changes?since=N
+ * Шаблоны и категории, изменённые после data_version N (since=0 или отсутствует - все)
+ *
+ * Ответ: { id, name, region, dataVersion, full, header,
+ *          templates: { upsert: [{ key, position, data }], delete: [key] }, categories: {...} }
+ */
+router.get('/:id/changes', requireAuth, async (req, res) => {
+    try {
+        const since = parseInt(req.query.since) || 0;
+        const storage = req.app.locals.storage;
+
+        const changes = await storage.getCatalogChanges(req.params.id, since, req.user.organization_id);
+
+        res.json({
+            success: true,
+            data: changes
+        });
+
+    } catch (err) {
+        if (err.status) {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                code: err.code
+            });
+        }
+        console.error('Get catalog changes error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to fetch catalog changes'
+        });
+    }
+});
+
+/**
+ * PATCH /api/v1/catalogs/:id
+ * Изменить отдельные шаблоны / категории каталога
+ *
+ * Body: { baseVersion, header?, templates?: { upsert: [template], delete: [id] }, categories?: {...} }
+ * 409 - затронутый шаблон изменён после baseVersion (в ответе текущая dataVersion)
+ */
+router.patch('/:id', requireAuth, async (req, res) => {
+    try {
+        const { baseVersion, ...changes } = req.body || {};
+
+        if (!Number.isInteger(baseVersion)) {
+            return res.status(400).json({
+                success: false,
+                error: 'baseVersion must be an integer',
+                code: 'INVALID_PATCH'
+            });
+        }
+
+        const storage = req.app.locals.storage;
+        const result = await storage.patchCatalog(
+            req.params.id, baseVersion, changes, req.user.id, req.user.organization_id
+        );
+
+        res.json({
+            success: true,
+            id: result.id,
+            dataVersion: result.dataVersion,
+            unchanged: Boolean(result.unchanged)
+        });
+
+    } catch (err) {
+        if (err.status) {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                code: err.code,
+                dataVersion: err.dataVersion
+            });
+        }
+        console.error('Patch catalog error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to patch catalog'
+        });
+    }
+});
+
 /**
  * POST /api/v1/catalogs
  * Создать или обновить каталог
@@ -123,8 +297,7 @@ router.post('/', requireAuth, async (req, res) => {
         const userId = req.user.id;
         const organizationId = req.user.organization_id;
 
-        // Детальное логирование для отладки
-        console.log('[Catalog Save] Request data:', {
+        logger.debug('Catalog save request', {
             name,
             dataType: typeof data,
             hasTemplates: data && data.templates ? data.templates.length : 'N/A',
@@ -135,14 +308,24 @@ router.post('/', requireAuth, async (req, res) => {
         });
 
         // Use storage layer - it handles ID generation, slug, data_version, etc.
-        await storage.saveCatalog(name, data, userId, organizationId, visibility);
+        const result = await storage.saveCatalog(name, data, userId, organizationId, visibility);
 
         res.json({
             success: true,
-            message: 'Catalog saved successfully'
+            message: 'Catalog saved successfully',
+            id: result.id,
+            dataVersion: result.dataVersion
         });
 
     } catch (err) {
+        if (err.code === 'QUOTA_EXCEEDED') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                quota: err.quota
+            });
+        }
+
         console.error('Create/update catalog error:', err);
         res.status(500).json({
             success: false,
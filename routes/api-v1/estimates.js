@@ -2,9 +2,14 @@
  * Estimates API Routes
  *
  * Endpoints:
- * - GET /api/v1/estimates - Список смет с фильтрацией
+ * - GET /api/v1/estimates - Список смет с фильтрацией (active_between=from,to - пересечение дат тура)
+ * - GET /api/v1/estimates/shared-with-me - Сметы, которыми поделились со мной
+ * - GET /api/v1/estimates/occupancy - Занятость по дням (туры / pax)
  * - GET /api/v1/estimates/:id - Получить смету
  * - POST /api/v1/estimates - Создать смету
+ * - POST /api/v1/estimates/from-template - Создать смету из шаблона (copy-on-write)
+ * - POST /api/v1/estimates/batch-get - Несколько смет одним запросом (только изменённые)
+ * - POST /api/v1/estimates/bulk - Групповые delete / restore / share / visibility / template
  * - PUT /api/v1/estimates/:id - Обновить смету
  * - DELETE /api/v1/estimates/:id - Удалить (soft)
  * - POST /api/v1/estimates/:id/restore - Восстановить
@@ -19,9 +24,136 @@
 const express = require('express');
 const { requireAuth } = require('../../middleware/jwt-auth');
 const { requireRole, requireSharedAccess } = require('../../middleware/rbac');
+const { parseBatchGetRequest, batchGetSql, createBatchGetWriter } = require('../../utils/batchGet');
 
 const router = express.Router();
 
+// Максимум смет в одной bulk-операции
+const BULK_LIMIT = parseInt(process.env.ESTIMATES_BULK_LIMIT) || 500;
+const BULK_ACTIONS = ['delete', 'restore', 'share', 'visibility', 'template'];
+const VISIBILITIES = ['private', 'organization', 'public'];
+
+// Отчёт занятости: максимум дней в одном запросе
+const OCCUPANCY_MAX_DAYS = 366;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Сметы, тур которых пересекается с [from_day, to_day]: обход R*Tree,
+// CROSS JOIN фиксирует порядок (сначала rtree, затем estimate_intervals по PK)
+const ACTIVE_BETWEEN_SQL = `id IN (
+    SELECT i.estimate_id
+    FROM estimate_intervals_rtree r CROSS JOIN estimate_intervals i ON i.id = r.id
+    WHERE r.start_day <= ? AND r.end_day >= ?
+)`;
+
+function filterError(message) {
+    const error = new Error(message);
+    error.code = 'INVALID_FILTER';
+    error.status = 400;
+    return error;
+}
+
+/**
+ * 'YYYY-MM-DD' → номер дня от 1970-01-01 (как в estimate_intervals_rtree)
+ * @returns {number} NaN для невалидной даты
+ */
+function toDayNumber(date) {
+    if (!/^\d{4}-\d{2}-\d{2}$/.test(date)) return NaN;
+
+    const time = Date.parse(date);
+    if (Number.isNaN(time) || new Date(time).toISOString().slice(0, 10) !== date) return NaN;
+    return time / DAY_MS;
+}
+
+function fromDayNumber(day) {
+    return new Date(day * DAY_MS).toISOString().slice(0, 10);
+}
+
+/**
+ * Диапазон дат 'from,to' | [from, to] | 'date' (один день), границы включительно
+ * @returns {{fromDay: number, toDay: number}}
+ * @throws {Error} code INVALID_FILTER, status 400
+ */
+function parseDateRange(value, name) {
+    const [from, to = from] = Array.isArray(value) ? value : String(value).split(',');
+    const fromDay = toDayNumber(String(from).trim());
+    const toDay = toDayNumber(String(to).trim());
+
+    if (Number.isNaN(fromDay) || Number.isNaN(toDay) || toDay < fromDay) {
+        throw filterError(`Invalid ${name}: expected YYYY-MM-DD dates, from <= to`);
+    }
+    return { fromDay, toDay };
+}
+
+/**
+ * WHERE для списка смет организации пользователя.
+ * Общий для GET /estimates (query) и POST /estimates/bulk (body.filter).
+ * @param {Object} filters - client_name, tour_start_from, tour_start_to, active_between, is_template
+ * @param {Object} user - req.user
+ * @param {'exclude'|'include'|'only'} deleted - Удалённые сметы
+ * @returns {{where: string, params: Array}}
+ * @throws {Error} code INVALID_FILTER, status 400
+ */
+function buildEstimateFilter(filters, user, deleted = 'exclude') {
+    const where = ['organization_id = ?'];
+    const params = [user.organization_id];
+
+    if (deleted === 'exclude') {
+        where.push('deleted_at IS NULL');
+    } else if (deleted === 'only') {
+        where.push('deleted_at IS NOT NULL');
+    }
+
+    // Filter by client_name
+    if (filters.client_name) {
+        where.push('client_name LIKE ?');
+        params.push(`%${filters.client_name}%`);
+    }
+
+    // Filter by tour dates
+    if (filters.tour_start_from) {
+        where.push('tour_start >= ?');
+        params.push(filters.tour_start_from);
+    }
+    if (filters.tour_start_to) {
+        where.push('tour_start <= ?');
+        params.push(filters.tour_start_to);
+    }
+
+    // Filter by tour overlap (interval index)
+    if (filters.active_between) {
+        const { fromDay, toDay } = parseDateRange(filters.active_between, 'active_between');
+        where.push(ACTIVE_BETWEEN_SQL);
+        params.push(toDay, fromDay);
+    }
+
+    // Filter by is_template
+    if (filters.is_template !== undefined) {
+        where.push('is_template = ?');
+        params.push(String(filters.is_template) === 'true' ? 1 : 0);
+    }
+
+    return { where: where.join(' AND '), params };
+}
+
+/**
+ * Может ли пользователь читать смету (владелец, admin организации, superuser,
+ * visibility = organization или запись в estimate_collaborators)
+ */
+function canReadEstimate(storage, user, estimate) {
+    return canModifyEstimate(user, estimate) ||
+        (estimate.visibility === 'organization' && estimate.organization_id === user.organization_id) ||
+        storage.isEstimateCollaborator(estimate.id, user.id);
+}
+
+/**
+ * Может ли пользователь изменять смету (владелец, admin организации, superuser)
+ */
+function canModifyEstimate(user, estimate) {
+    return user.role === 'superuser' ||
+        estimate.owner_id === user.id ||
+        (user.role === 'admin' && estimate.organization_id === user.organization_id);
+}
+
 /**
  * GET /api/v1/estimates
  * Список смет с фильтрацией и пагинацией
@@ -41,6 +173,7 @@ router.get('/', requireAuth, async (req, res) => {
 
         // Filters
         const includeDeleted = req.query.include_deleted === 'true' && req.user.role === 'admin';
+        const filter = buildEstimateFilter(req.query, req.user, includeDeleted ? 'include' : 'exclude');
 
         // Build query
         let query = `
@@ -50,39 +183,13 @@ router.get('/', requireAuth, async (req, res) => {
                    data_version, is_template, template_name,
                    created_at, updated_at, last_accessed_at, deleted_at
             FROM estimates
-            WHERE organization_id = ?
+            WHERE ${filter.where}
         `;
 
-        const params = [req.user.organization_id];
-
-        if (!includeDeleted) {
-            query += ' AND deleted_at IS NULL';
-        }
-
-        // Filter by client_name
-        if (req.query.client_name) {
-            query += ' AND client_name LIKE ?';
-            params.push(`%${req.query.client_name}%`);
-        }
-
-        // Filter by tour dates
-        if (req.query.tour_start_from) {
-            query += ' AND tour_start >= ?';
-            params.push(req.query.tour_start_from);
-        }
-        if (req.query.tour_start_to) {
-            query += ' AND tour_start <= ?';
-            params.push(req.query.tour_start_to);
-        }
-
-        // Filter by is_template
-        if (req.query.is_template !== undefined) {
-            query += ' AND is_template = ?';
-            params.push(req.query.is_template === 'true' ? 1 : 0);
-        }
+        const params = filter.params;
 
         // Get total count
-        const countQuery = query.replace(/SELECT[\s\S]*FROM/, 'SELECT COUNT(*) as total FROM');
+        const countQuery = `SELECT COUNT(*) as total FROM estimates WHERE ${filter.where}`;
         const countResult = storage.db.prepare(countQuery).get(...params);
         const total = countResult ? countResult.total : 0;
 
@@ -106,6 +213,12 @@ router.get('/', requireAuth, async (req, res) => {
         });
 
     } catch (err) {
+        if (err.code === 'INVALID_FILTER') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message
+            });
+        }
         console.error('Get estimates error:', err);
         res.status(500).json({
             success: false,
@@ -114,6 +227,119 @@ router.get('/', requireAuth, async (req, res) => {
     }
 });
 
+/**
+ * GET /api/v1/estimates/shared-with-me
+ * Сметы, которыми поделились с текущим пользователем
+ * (keyset-пагинация: ?limit=50&cursor=<next_cursor>)
+ */
+router.get('/shared-with-me', requireAuth, async (req, res) => {
+    try {
+        const storage = req.app.locals.storage;
+        const { estimates, limit, next_cursor } = storage.listSharedWithUser(req.user.id, {
+            limit: req.query.limit,
+            cursor: req.query.cursor
+        });
+
+        res.json({
+            success: true,
+            data: {
+                estimates,
+                pagination: {
+                    limit,
+                    next_cursor
+                }
+            }
+        });
+
+    } catch (err) {
+        if (err.code === 'INVALID_CURSOR') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message
+            });
+        }
+        console.error('Get shared estimates error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to fetch shared estimates'
+        });
+    }
+});
+
+/**
+ * GET /api/v1/estimates/occupancy?from=YYYY-MM-DD&to=YYYY-MM-DD
+ * Занятость по дням: количество активных туров и pax (без шаблонов и удалённых)
+ */
+router.get('/occupancy', requireAuth, async (req, res) => {
+    try {
+        const { fromDay, toDay } = parseDateRange([req.query.from, req.query.to || req.query.from], 'from/to');
+        const length = toDay - fromDay + 1;
+
+        if (length > OCCUPANCY_MAX_DAYS) {
+            return res.status(400).json({
+                success: false,
+                error: `Range too long: ${length} days, limit is ${OCCUPANCY_MAX_DAYS}`
+            });
+        }
+
+        const storage = req.app.locals.storage;
+        const tours = storage.db.prepare(`
+            SELECT r.start_day, r.end_day, e.pax_count
+            FROM estimate_intervals_rtree r
+            CROSS JOIN estimate_intervals i ON i.id = r.id
+            JOIN estimates e ON e.id = i.estimate_id
+            WHERE r.start_day <= ? AND r.end_day >= ?
+              AND e.organization_id = ? AND e.deleted_at IS NULL AND e.is_template = 0
+        `).all(toDay, fromDay, req.user.organization_id);
+
+        // Разностные массивы: +1 в первый день тура в диапазоне, -1 после последнего
+        const tourDelta = new Array(length + 1).fill(0);
+        const paxDelta = new Array(length + 1).fill(0);
+
+        for (const tour of tours) {
+            const first = Math.max(tour.start_day, fromDay) - fromDay;
+            const last = Math.min(tour.end_day, toDay) - fromDay;
+            tourDelta[first]++;
+            tourDelta[last + 1]--;
+            paxDelta[first] += tour.pax_count || 0;
+            paxDelta[last + 1] -= tour.pax_count || 0;
+        }
+
+        const days = [];
+        let activeTours = 0;
+        let activePax = 0;
+
+        for (let day = 0; day < length; day++) {
+            activeTours += tourDelta[day];
+            activePax += paxDelta[day];
+            days.push({ date: fromDayNumber(fromDay + day), tours: activeTours, pax: activePax });
+        }
+
+        res.json({
+            success: true,
+            data: {
+                from: fromDayNumber(fromDay),
+                to: fromDayNumber(toDay),
+                estimates: tours.length,
+                days
+            }
+        });
+
+    } catch (err) {
+        if (err.code === 'INVALID_FILTER') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message
+            });
+        }
+        console.error('Get occupancy error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to build occupancy report'
+        });
+    }
+});
+
 /**
  * GET /api/v1/estimates/:id
  * Получить смету по ID (с проверкой доступа)
@@ -133,14 +359,7 @@ router.get('/:id', requireAuth, async (req, res) => {
         }
 
         // Check access
-        const hasAccess =
-            req.user.role === 'superuser' ||
-            estimate.owner_id === req.user.id ||
-            (req.user.role === 'admin' && estimate.organization_id === req.user.organization_id) ||
-            (estimate.visibility === 'organization' && estimate.organization_id === req.user.organization_id) ||
-            (estimate.shared_with && JSON.parse(estimate.shared_with).includes(req.user.id));
-
-        if (!hasAccess) {
+        if (!canReadEstimate(storage, req.user, estimate)) {
             return res.status(403).json({
                 success: false,
                 error: 'Access denied'
@@ -153,7 +372,8 @@ router.get('/:id', requireAuth, async (req, res) => {
 
         // ✅ FIX: Parse JSON data field before sending
         // Frontend expects parsed object, not string
-        const parsedData = JSON.parse(estimate.data);
+        // (экземпляр шаблона собирается из снимка + override)
+        const parsedData = JSON.parse(storage.materializeEstimateData(estimate));
 
         // Add metadata for frontend
         parsedData.dataVersion = estimate.data_version;
@@ -195,6 +415,9 @@ router.post('/', requireAuth, async (req, res) => {
         // Parse data для извлечения metadata
         const parsedData = JSON.parse(data);
 
+        // Лимит плана (счётчик организации обновит trigger в той же транзакции)
+        storage.assertQuota(req.user.organization_id, 'estimates', Buffer.byteLength(data));
+
         storage.db.prepare(`
             INSERT INTO estimates (
                 id, filename, organization_id, owner_id, visibility, data,
@@ -216,7 +439,7 @@ router.post('/', requireAuth, async (req, res) => {
             parsedData.totalProfit || 0,
             parsedData.services?.length || 0,
             1, // data_version
-            null, // data_hash (TODO: calculate)
+            storage._calculateHash(parsedData), // data_hash (write elision в PUT)
             is_template ? 1 : 0,
             template_name || null,
             Math.floor(Date.now() / 1000),
@@ -224,12 +447,10 @@ router.post('/', requireAuth, async (req, res) => {
             Math.floor(Date.now() / 1000)
         );
 
-        // Update organization counter
-        storage.db.prepare(`
-            UPDATE organizations
-            SET current_estimates_count = current_estimates_count + 1
-            WHERE id = ?
-        `).run(req.user.organization_id);
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'estimate', entityId: estimateId, action: 'create',
+            metadata: { filename, bytes: Buffer.byteLength(data) }
+        });
 
         res.status(201).json({
             success: true,
@@ -241,6 +462,14 @@ router.post('/', requireAuth, async (req, res) => {
         });
 
     } catch (err) {
+        if (err.code === 'QUOTA_EXCEEDED') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                quota: err.quota
+            });
+        }
+
         console.error('Create estimate error:', err);
         res.status(500).json({
             success: false,
@@ -249,6 +478,424 @@ router.post('/', requireAuth, async (req, res) => {
     }
 });
 
+/**
+ * POST /api/v1/estimates/from-template
+ * Создать смету из шаблона организации.
+ * Смета хранит ссылку на версию шаблона и override-документ; полная копия
+ * делается только при первом структурном изменении (добавление/удаление услуг).
+ * Body: { template_id, filename?, fields? } - fields: поля верхнего уровня поверх шаблона
+ */
+router.post('/from-template', requireAuth, async (req, res) => {
+    try {
+        const { template_id, filename, fields } = req.body;
+
+        if (!template_id) {
+            return res.status(400).json({
+                success: false,
+                error: 'Missing required field: template_id'
+            });
+        }
+
+        if (fields !== undefined && (fields === null || typeof fields !== 'object' || Array.isArray(fields))) {
+            return res.status(400).json({
+                success: false,
+                error: 'fields must be an object'
+            });
+        }
+
+        const storage = req.app.locals.storage;
+        const result = await storage.createEstimateFromTemplate(template_id, {
+            id: `est-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`,
+            filename,
+            fields
+        }, req.user.id, req.user.organization_id);
+
+        res.status(201).json({
+            success: true,
+            data: {
+                id: result.id,
+                filename: result.filename,
+                data_version: result.dataVersion,
+                template_id: result.templateId,
+                template_version: result.templateVersion,
+                copy_on_write: result.copyOnWrite
+            }
+        });
+
+    } catch (err) {
+        if (err.code === 'TEMPLATE_NOT_FOUND') {
+            return res.status(err.status).json({
+                success: false,
+                error: 'Template not found'
+            });
+        }
+
+        if (err.code === 'QUOTA_EXCEEDED') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                quota: err.quota
+            });
+        }
+
+        console.error('Create estimate from template error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to create estimate from template'
+        });
+    }
+});
+
+/**
+ * POST /api/v1/estimates/batch-get
+ * Полные данные нескольких смет одним запросом
+ *
+ * Body: { ids: [...], versions: { id: data_version } }
+ * Ответ (потоком): { estimates: [{ id, filename, data_version, ..., data }],
+ *                   unchanged, deleted, not_found, forbidden }
+ */
+router.post('/batch-get', requireAuth, async (req, res) => {
+    let writer = null;
+
+    try {
+        const { ids, versions } = parseBatchGetRequest(req.body);
+        const storage = req.app.locals.storage;
+        const sql = batchGetSql(ids);
+
+        const rows = ids.length === 0 ? [] : storage.db.prepare(`
+            SELECT id, filename, organization_id, owner_id, visibility,
+                   data_version, is_template, template_name,
+                   created_at, updated_at, deleted_at,
+                   ${sql.dataColumn}
+            FROM estimates
+            WHERE id IN (${sql.placeholders})
+        `).all(JSON.stringify(versions), ...ids);
+
+        const byId = new Map(rows.map(row => [row.id, row]));
+        const summary = { unchanged: [], deleted: [], not_found: [], forbidden: [] };
+        const changed = [];
+
+        for (const id of ids) {
+            const estimate = byId.get(id);
+
+            if (!estimate) {
+                summary.not_found.push(id);
+            } else if (!canReadEstimate(storage, req.user, estimate)) {
+                summary.forbidden.push(id);
+            } else if (estimate.deleted_at) {
+                summary.deleted.push(id);
+            } else if (estimate.data === null) {
+                summary.unchanged.push(id);
+            } else {
+                changed.push(estimate);
+            }
+        }
+
+        if (changed.length > 0) {
+            storage.db.prepare(`UPDATE estimates SET last_accessed_at = ? WHERE id IN (${changed.map(() => '?').join(', ')})`)
+                .run(Math.floor(Date.now() / 1000), ...changed.map(estimate => estimate.id));
+        }
+
+        writer = createBatchGetWriter(res, 'estimates');
+
+        for (const estimate of changed) {
+            await writer.write({
+                id: estimate.id,
+                filename: estimate.filename,
+                data_version: estimate.data_version,
+                is_template: estimate.is_template,
+                template_name: estimate.template_name,
+                created_at: estimate.created_at,
+                updated_at: estimate.updated_at
+            }, storage.materializeEstimateData(estimate));
+        }
+
+        writer.end(summary);
+
+    } catch (err) {
+        if (writer) {
+            // Заголовки уже отправлены - обрываем ответ, клиент получит невалидный JSON
+            console.error('Batch get estimates stream error:', err);
+            return res.destroy(err);
+        }
+        if (err.status) {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                code: err.code
+            });
+        }
+        console.error('Batch get estimates error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to fetch estimates'
+        });
+    }
+});
+
+/**
+ * POST /api/v1/estimates/bulk
+ * Групповая операция над сметами: delete, restore, share, visibility, template
+ *
+ * Body: { action, ids: [...] } или { action, filter: {...} } (фильтры как у GET /estimates)
+ *   share - user_ids, visibility - visibility, template - is_template (default true), template_name
+ *
+ * Все изменения выполняются в одной транзакции; в ответе - результат по каждой смете.
+ * Больше ESTIMATES_BULK_LIMIT смет - 400 без изменений.
+ */
+router.post('/bulk', requireAuth, async (req, res) => {
+    try {
+        const { action, ids, filter } = req.body;
+
+        if (!BULK_ACTIONS.includes(action)) {
+            return res.status(400).json({
+                success: false,
+                error: `Invalid action. Expected one of: ${BULK_ACTIONS.join(', ')}`
+            });
+        }
+
+        const hasIds = Array.isArray(ids);
+        const hasFilter = filter !== null && typeof filter === 'object' && !Array.isArray(filter);
+
+        if (hasIds === hasFilter) {
+            return res.status(400).json({
+                success: false,
+                error: 'Provide either ids or filter'
+            });
+        }
+
+        const change = bulkChangeFor(action, req.body, req.app.locals.storage, req.user);
+        if (change.error) {
+            return res.status(400).json({
+                success: false,
+                error: change.error
+            });
+        }
+
+        const storage = req.app.locals.storage;
+        const columns = 'id, owner_id, organization_id, visibility, is_template, template_name, deleted_at';
+        let targetIds;
+        let rows;
+
+        if (hasIds) {
+            targetIds = [...new Set(ids.map(String))];
+
+            if (targetIds.length > BULK_LIMIT) {
+                return bulkLimitExceeded(res, targetIds.length);
+            }
+
+            rows = targetIds.length === 0 ? [] : storage.db.prepare(`
+                SELECT ${columns} FROM estimates
+                WHERE id IN (${targetIds.map(() => '?').join(', ')})
+            `).all(...targetIds);
+        } else {
+            const where = buildEstimateFilter(filter, req.user, action === 'restore' ? 'only' : 'exclude');
+
+            rows = storage.db.prepare(`
+                SELECT ${columns} FROM estimates
+                WHERE ${where.where}
+                ORDER BY updated_at DESC
+                LIMIT ?
+            `).all(...where.params, BULK_LIMIT + 1);
+
+            if (rows.length > BULK_LIMIT) {
+                const matched = storage.db.prepare(`SELECT COUNT(*) as total FROM estimates WHERE ${where.where}`)
+                    .get(...where.params).total;
+                return bulkLimitExceeded(res, matched);
+            }
+
+            targetIds = rows.map(row => row.id);
+        }
+
+        const byId = new Map(rows.map(row => [row.id, row]));
+        const now = Math.floor(Date.now() / 1000);
+        const statement = storage.db.prepare(change.sql);
+        const results = [];
+        const applied = [];
+
+        storage.db.transaction(() => {
+            for (const id of targetIds) {
+                const estimate = byId.get(id);
+
+                // Чужая организация для не-superuser неотличима от отсутствующей сметы
+                if (!estimate ||
+                    (req.user.role !== 'superuser' && estimate.organization_id !== req.user.organization_id)) {
+                    results.push({ id, status: 'not_found' });
+                    continue;
+                }
+
+                const allowed = action === 'restore'
+                    ? req.user.role === 'superuser' || req.user.role === 'admin'
+                    : canModifyEstimate(req.user, estimate);
+
+                if (!allowed) {
+                    results.push({ id, status: 'forbidden' });
+                    continue;
+                }
+
+                const diff = change.diff(estimate);
+                if (diff.skip) {
+                    results.push({ id, status: 'skipped', reason: diff.skip });
+                    continue;
+                }
+
+                if (change.apply) {
+                    change.apply(estimate);
+                }
+
+                const result = statement.run(...change.params(now), id);
+                if (result.changes === 0) {
+                    results.push({ id, status: 'skipped', reason: 'unchanged' });
+                    continue;
+                }
+
+                results.push({ id, status: 'success' });
+                applied.push({ estimate, diff });
+            }
+        })();
+
+        for (const { estimate, diff } of applied) {
+            req.app.locals.auditLogger?.recordRequest(req, {
+                entityType: 'estimate', entityId: estimate.id, action: change.auditAction,
+                before: diff.before, after: diff.after,
+                organizationId: estimate.organization_id
+            });
+        }
+
+        res.json({
+            success: true,
+            data: {
+                action,
+                matched: targetIds.length,
+                affected: applied.length,
+                results
+            }
+        });
+
+    } catch (err) {
+        if (err.code === 'INVALID_FILTER') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message
+            });
+        }
+        console.error('Bulk estimates error:', err);
+        res.status(500).json({
+            success: false,
+            error: 'Failed to apply bulk operation'
+        });
+    }
+});
+
+function bulkLimitExceeded(res, matched) {
+    return res.status(400).json({
+        success: false,
+        error: `Bulk operation affects ${matched} estimates, limit is ${BULK_LIMIT}`,
+        code: 'BULK_LIMIT_EXCEEDED',
+        matched,
+        limit: BULK_LIMIT
+    });
+}
+
+/**
+ * Описание изменения для bulk action:
+ * sql + params(now) для UPDATE ... WHERE id = ?, diff(estimate) → { before, after } | { skip },
+ * apply(estimate) - дополнительные записи перед UPDATE (в той же транзакции)
+ * @returns {Object} { error } при невалидных параметрах
+ */
+function bulkChangeFor(action, body, storage, user) {
+    switch (action) {
+        case 'delete':
+            return {
+                auditAction: 'delete',
+                sql: 'UPDATE estimates SET deleted_at = ? WHERE id = ? AND deleted_at IS NULL',
+                params: now => [now],
+                diff: estimate => (estimate.deleted_at ? { skip: 'already_deleted' } : {})
+            };
+
+        case 'restore':
+            return {
+                auditAction: 'restore',
+                sql: 'UPDATE estimates SET deleted_at = NULL WHERE id = ? AND deleted_at IS NOT NULL',
+                params: () => [],
+                diff: estimate => (estimate.deleted_at ? {} : { skip: 'not_deleted' })
+            };
+
+        case 'share': {
+            const userIds = body.user_ids;
+            if (!Array.isArray(userIds) || userIds.some(id => typeof id !== 'string')) {
+                return { error: 'user_ids must be an array of user IDs' };
+            }
+            const wanted = [...new Set(userIds)];
+            return {
+                auditAction: 'share',
+                sql: 'UPDATE estimates SET updated_at = ? WHERE id = ?',
+                params: now => [now],
+                diff: (estimate) => {
+                    if (estimate.deleted_at) return { skip: 'deleted' };
+                    const current = storage.getEstimateCollaborators(estimate.id);
+                    if (current.length === wanted.length && wanted.every(id => current.includes(id))) {
+                        return { skip: 'unchanged' };
+                    }
+                    return {
+                        before: { shared_with: current },
+                        after: { shared_with: wanted }
+                    };
+                },
+                apply: estimate => storage.setEstimateCollaborators(estimate.id, wanted, user.id)
+            };
+        }
+
+        case 'visibility': {
+            const visibility = body.visibility;
+            if (!VISIBILITIES.includes(visibility)) {
+                return { error: `visibility must be one of: ${VISIBILITIES.join(', ')}` };
+            }
+            return {
+                auditAction: 'share',
+                sql: 'UPDATE estimates SET visibility = ?, updated_at = ? WHERE id = ?',
+                params: now => [visibility, now],
+                diff: (estimate) => {
+                    if (estimate.deleted_at) return { skip: 'deleted' };
+                    if (estimate.visibility === visibility) return { skip: 'unchanged' };
+                    return {
+                        before: { visibility: estimate.visibility },
+                        after: { visibility }
+                    };
+                }
+            };
+        }
+
+        case 'template': {
+            const isTemplate = body.is_template === undefined ? true : body.is_template;
+            if (typeof isTemplate !== 'boolean') {
+                return { error: 'is_template must be a boolean' };
+            }
+            if (body.template_name !== undefined && typeof body.template_name !== 'string') {
+                return { error: 'template_name must be a string' };
+            }
+            return {
+                auditAction: 'update',
+                sql: `UPDATE estimates
+                      SET is_template = ?, template_name = COALESCE(?, template_name), updated_at = ?
+                      WHERE id = ?`,
+                params: now => [isTemplate ? 1 : 0, body.template_name ?? null, now],
+                diff: (estimate) => {
+                    if (estimate.deleted_at) return { skip: 'deleted' };
+                    const name = body.template_name ?? estimate.template_name;
+                    if (Boolean(estimate.is_template) === isTemplate && estimate.template_name === name) {
+                        return { skip: 'unchanged' };
+                    }
+                    return {
+                        before: { is_template: Boolean(estimate.is_template), template_name: estimate.template_name },
+                        after: { is_template: isTemplate, template_name: name }
+                    };
+                }
+            };
+        }
+    }
+}
+
 /**
  * PUT /api/v1/estimates/:id
  * Обновить смету (с optimistic locking)
@@ -295,17 +942,33 @@ router.put('/:id', requireAuth, async (req, res) => {
                 success: false,
                 error: 'Conflict: Estimate was modified by another user',
                 serverVersion: estimate.data_version,
-                serverData: estimate.data
+                serverData: storage.materializeEstimateData(estimate)
             });
         }
 
         // Parse data для metadata
         const parsedData = JSON.parse(data);
+
+        // Те же данные (autosave / повторная отправка) - без записи и новой версии
+        const dataHash = storage._calculateHash(parsedData);
+        if (storage.isUnchangedEstimate(estimate, dataHash, 'api')) {
+            return res.json({
+                success: true,
+                data: {
+                    id: req.params.id,
+                    data_version: estimate.data_version,
+                    unchanged: true
+                }
+            });
+        }
+
         const newVersion = estimate.data_version + 1;
+        const before = req.app.locals.auditLogger ? storage.materializeEstimateData(estimate) : undefined;
 
-        storage.db.prepare(`
+        const update = storage.db.prepare(`
             UPDATE estimates
             SET data = ?,
+                data_hash = ?,
                 client_name = ?,
                 client_email = ?,
                 client_phone = ?,
@@ -318,8 +981,12 @@ router.put('/:id', requireAuth, async (req, res) => {
                 data_version = ?,
                 updated_at = ?
             WHERE id = ? AND data_version = ?
-        `).run(
-            data,
+        `);
+
+        // Экземпляр шаблона пишется override-документом (или отвязывается от шаблона)
+        storage.db.transaction(() => update.run(
+            storage.encodeEstimateWrite(req.params.id, parsedData, data),
+            dataHash,
             parsedData.clientName || null,
             parsedData.clientEmail || null,
             parsedData.clientPhone || null,
@@ -333,7 +1000,14 @@ router.put('/:id', requireAuth, async (req, res) => {
             Math.floor(Date.now() / 1000),
             req.params.id,
             estimate.data_version
-        );
+        ))();
+
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'estimate', entityId: req.params.id, action: 'update',
+            before, after: data,
+            organizationId: estimate.organization_id,
+            metadata: { dataVersion: newVersion }
+        });
 
         res.json({
             success: true,
@@ -385,6 +1059,11 @@ router.delete('/:id', requireAuth, async (req, res) => {
         storage.db.prepare('UPDATE estimates SET deleted_at = ? WHERE id = ?')
             .run(Math.floor(Date.now() / 1000), req.params.id);
 
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'estimate', entityId: req.params.id, action: 'delete',
+            organizationId: estimate.organization_id
+        });
+
         res.json({
             success: true,
             message: 'Estimate deleted successfully'
@@ -407,9 +1086,15 @@ router.post('/:id/restore', requireAuth, requireRole('admin'), async (req, res)
     try {
         const storage = req.app.locals.storage;
 
-        storage.db.prepare('UPDATE estimates SET deleted_at = NULL WHERE id = ?')
+        const result = storage.db.prepare('UPDATE estimates SET deleted_at = NULL WHERE id = ?')
             .run(req.params.id);
 
+        if (result.changes > 0) {
+            req.app.locals.auditLogger?.recordRequest(req, {
+                entityType: 'estimate', entityId: req.params.id, action: 'restore'
+            });
+        }
+
         res.json({
             success: true,
             message: 'Estimate restored successfully'
@@ -465,6 +1150,12 @@ router.put('/:id/rename', requireAuth, async (req, res) => {
         storage.db.prepare('UPDATE estimates SET filename = ?, updated_at = ? WHERE id = ?')
             .run(filename, Math.floor(Date.now() / 1000), req.params.id);
 
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'estimate', entityId: req.params.id, action: 'rename',
+            before: { filename: estimate.filename }, after: { filename },
+            organizationId: estimate.organization_id
+        });
+
         res.json({
             success: true,
             data: {
@@ -513,35 +1204,43 @@ router.post('/:id/share', requireAuth, async (req, res) => {
             });
         }
 
-        // Update sharing
-        const updates = {};
-        if (user_ids) {
-            updates.shared_with = JSON.stringify(user_ids);
-        }
-        if (visibility) {
-            updates.visibility = visibility;
-        }
-
-        let query = 'UPDATE estimates SET';
-        const params = [];
-        const sets = [];
-
-        if (updates.shared_with) {
-            sets.push(' shared_with = ?');
-            params.push(updates.shared_with);
-        }
-        if (updates.visibility) {
-            sets.push(' visibility = ?');
-            params.push(updates.visibility);
+        if (user_ids !== undefined &&
+            (!Array.isArray(user_ids) || user_ids.some(id => typeof id !== 'string'))) {
+            return res.status(400).json({
+                success: false,
+                error: 'user_ids must be an array of user IDs'
+            });
         }
 
-        sets.push(' updated_at = ?');
-        params.push(Math.floor(Date.now() / 1000));
-
-        query += sets.join(',') + ' WHERE id = ?';
-        params.push(req.params.id);
+        // Update sharing: список пользователей - в estimate_collaborators
+        const sharing = storage.db.transaction(() => {
+            const collaborators = user_ids
+                ? storage.setEstimateCollaborators(req.params.id, user_ids, req.user.id)
+                : null;
+
+            if (visibility) {
+                storage.db.prepare('UPDATE estimates SET visibility = ?, updated_at = ? WHERE id = ?')
+                    .run(visibility, Math.floor(Date.now() / 1000), req.params.id);
+            } else {
+                storage.db.prepare('UPDATE estimates SET updated_at = ? WHERE id = ?')
+                    .run(Math.floor(Date.now() / 1000), req.params.id);
+            }
 
-        storage.db.prepare(query).run(...params);
+            return collaborators || { before: null, after: null };
+        })();
+
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'estimate', entityId: req.params.id, action: 'share',
+            before: {
+                shared_with: sharing.before,
+                visibility: estimate.visibility
+            },
+            after: {
+                shared_with: sharing.after,
+                visibility: visibility || estimate.visibility
+            },
+            organizationId: estimate.organization_id
+        });
 
         res.json({
             success: true,
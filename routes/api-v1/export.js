@@ -30,17 +30,19 @@ router.get('/organization', requireAuth, requireRole('admin'), async (req, res)
             'SELECT * FROM organizations WHERE id = ?'
         ).get(req.user.organization_id);
 
-        // Get all estimates
+        // Get all estimates (экземпляры шаблонов - полным JSON)
         const estimates = storage.db.prepare(`
             SELECT * FROM estimates
             WHERE organization_id = ? AND deleted_at IS NULL
-        `).all(req.user.organization_id);
+        `).all(req.user.organization_id)
+            .map(estimate => ({ ...estimate, data: storage.materializeEstimateData(estimate) }));
 
         // Get all catalogs
         const catalogs = storage.db.prepare(`
             SELECT * FROM catalogs
             WHERE organization_id = ? AND deleted_at IS NULL
-        `).all(req.user.organization_id);
+        `).all(req.user.organization_id)
+            .map(catalog => ({ ...catalog, data: storage.materializeCatalogData(catalog) }));
 
         // Get all users
         const users = storage.db.prepare(`
@@ -92,8 +94,10 @@ router.get('/full', requireAuth, requireRole('superuser'), async (req, res) => {
         // Export all tables
         const organizations = storage.db.prepare('SELECT * FROM organizations').all();
         const users = storage.db.prepare('SELECT * FROM users').all();
-        const estimates = storage.db.prepare('SELECT * FROM estimates').all();
-        const catalogs = storage.db.prepare('SELECT * FROM catalogs').all();
+        const estimates = storage.db.prepare('SELECT * FROM estimates').all()
+            .map(estimate => ({ ...estimate, data: storage.materializeEstimateData(estimate) }));
+        const catalogs = storage.db.prepare('SELECT * FROM catalogs').all()
+            .map(catalog => ({ ...catalog, data: storage.materializeCatalogData(catalog) }));
         const settings = storage.db.prepare('SELECT * FROM settings').all();
         const backups = storage.db.prepare('SELECT * FROM backups').all();
         const auditLogs = storage.db.prepare('SELECT * FROM audit_logs').all();
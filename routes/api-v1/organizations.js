@@ -28,6 +28,7 @@ router.get('/', requireAuth, requireRole('superuser'), async (req, res) => {
             SELECT id, name, slug, plan, subscription_status,
                    max_users, max_estimates, max_catalogs,
                    current_users_count, current_estimates_count, current_catalogs_count,
+                   storage_limit_mb, current_storage_mb,
                    is_active, created_at, updated_at
             FROM organizations
             WHERE deleted_at IS NULL
@@ -190,6 +191,19 @@ router.put('/:id', requireAuth, async (req, res) => {
         const query = `UPDATE organizations SET ${updates.join(', ')} WHERE id = ?`;
         storage.db.prepare(query).run(...params);
 
+        const profileFields = ({ name, logo_url, primary_color, email, phone, website, address, settings }) =>
+            ({ name, logo_url, primary_color, email, phone, website, address, settings });
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'organization', entityId: orgId, action: 'update',
+            before: profileFields(organization),
+            after: profileFields({
+                ...organization,
+                ...req.body,
+                settings: settings !== undefined ? JSON.stringify(settings) : organization.settings
+            }),
+            organizationId: orgId
+        });
+
         res.json({
             success: true,
             message: 'Organization updated successfully'
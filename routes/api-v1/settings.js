@@ -2,8 +2,8 @@
  * Settings API Routes
  *
  * Endpoints:
- * - GET /api/v1/settings - Получить настройки
- * - PUT /api/v1/settings - Обновить настройки
+ * - GET /api/v1/settings - Получить настройки (снимок из памяти, ETag / 304)
+ * - PUT /api/v1/settings - Обновить настройки (одна транзакция, версия scope + 1)
  *
  * Created: 2025-11-19
  * Version: 3.0.0
@@ -37,33 +37,18 @@ router.get('/', requireAuth, async (req, res) => {
             });
         }
 
-        const settings = storage.db.prepare(`
-            SELECT key, value, value_type, is_public
-            FROM settings
-            WHERE scope = ? AND scope_id = ?
-        `).all(scope, scopeId);
-
-        // Convert to object
-        const settingsObj = {};
-        settings.forEach(s => {
-            let parsedValue = s.value;
-            if (s.value_type === 'string') {
-                parsedValue = JSON.parse(s.value);
-            } else if (s.value_type === 'number') {
-                parsedValue = parseFloat(s.value);
-            } else if (s.value_type === 'boolean') {
-                parsedValue = s.value === 'true';
-            }
-            settingsObj[s.key] = parsedValue;
-        });
+        const snapshot = await storage.getSettingsSnapshot(scope, scopeId);
 
-        res.json({
-            success: true,
-            data: {
-                scope,
-                settings: settingsObj
-            }
-        });
+        // Версия scope в ETag: повторный запрос без изменений - 304 без тела
+        res.set({ 'ETag': snapshot.etag, 'Cache-Control': 'private, no-cache' });
+        if (req.fresh) {
+            return res.status(304).end();
+        }
+
+        // settings уже сериализованы в снимке
+        res.type('json').send(
+            `{"success":true,"data":{"scope":${JSON.stringify(scope)},"version":${snapshot.version},"settings":${snapshot.json}}}`
+        );
 
     } catch (err) {
         console.error('Get settings error:', err);
@@ -89,6 +74,13 @@ router.put('/', requireAuth, async (req, res) => {
             });
         }
 
+        if (typeof settings !== 'object' || Array.isArray(settings)) {
+            return res.status(400).json({
+                success: false,
+                error: 'settings must be an object'
+            });
+        }
+
         let scopeId;
         if (scope === 'user') {
             scopeId = req.user.id;
@@ -118,35 +110,20 @@ router.put('/', requireAuth, async (req, res) => {
         }
 
         const storage = req.app.locals.storage;
+        const { version, before, unchanged } = await storage.updateSettings(scope, scopeId, settings);
 
-        // Upsert each setting
-        for (const [key, value] of Object.entries(settings)) {
-            let valueType = 'string';
-            let valueStr = JSON.stringify(value);
-
-            if (typeof value === 'number') {
-                valueType = 'number';
-                valueStr = value.toString();
-            } else if (typeof value === 'boolean') {
-                valueType = 'boolean';
-                valueStr = value.toString();
-            }
-
-            storage.db.prepare(`
-                INSERT INTO settings (scope, scope_id, key, value, value_type, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(scope, scope_id, key)
-                DO UPDATE SET value = ?, value_type = ?, updated_at = ?
-            `).run(
-                scope, scopeId, key, valueStr, valueType,
-                Math.floor(Date.now() / 1000), Math.floor(Date.now() / 1000),
-                valueStr, valueType, Math.floor(Date.now() / 1000)
-            );
+        if (!unchanged) {
+            req.app.locals.auditLogger?.recordRequest(req, {
+                entityType: 'settings', entityId: `${scope}:${scopeId}`, action: 'update',
+                before,
+                after: settings
+            });
         }
 
         res.json({
             success: true,
-            message: 'Settings updated successfully'
+            message: 'Settings updated successfully',
+            data: { scope, version }
         });
 
     } catch (err) {
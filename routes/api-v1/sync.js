@@ -32,7 +32,8 @@ router.get('/updates', requireAuth, async (req, res) => {
               AND deleted_at IS NULL
             ORDER BY updated_at ASC
             LIMIT 100
-        `).all(req.user.organization_id, since);
+        `).all(req.user.organization_id, since)
+            .map(estimate => ({ ...estimate, data: storage.materializeEstimateData(estimate) }));
 
         // Get updated catalogs
         const catalogs = storage.db.prepare(`
@@ -43,7 +44,8 @@ router.get('/updates', requireAuth, async (req, res) => {
               AND deleted_at IS NULL
             ORDER BY updated_at ASC
             LIMIT 10
-        `).all(req.user.organization_id, since);
+        `).all(req.user.organization_id, since)
+            .map(catalog => ({ ...catalog, data: storage.materializeCatalogData(catalog) }));
 
         // Get updated settings
         const settings = storage.db.prepare(`
@@ -106,7 +108,7 @@ router.post('/batch', requireAuth, async (req, res) => {
                     if (action === 'update' || action === 'create') {
                         // Get current estimate
                         const estimate = storage.db.prepare(
-                            'SELECT data_version FROM estimates WHERE id = ?'
+                            'SELECT data_version, data_hash FROM estimates WHERE id = ?'
                         ).get(entity_id);
 
                         // Optimistic locking check
@@ -124,27 +126,45 @@ router.post('/batch', requireAuth, async (req, res) => {
 
                         // Update
                         if (estimate) {
-                            const newVersion = estimate.data_version + 1;
                             const parsedData = JSON.parse(data);
+                            const dataHash = storage._calculateHash(parsedData);
+
+                            // Без изменений - текущая версия, без записи
+                            if (storage.isUnchangedEstimate(estimate, dataHash, 'sync')) {
+                                results.push({
+                                    entity_type,
+                                    entity_id,
+                                    status: 'success',
+                                    data_version: estimate.data_version
+                                });
+                                continue;
+                            }
+
+                            const newVersion = estimate.data_version + 1;
 
-                            storage.db.prepare(`
+                            const update = storage.db.prepare(`
                                 UPDATE estimates
                                 SET data = ?,
+                                    data_hash = ?,
                                     client_name = ?,
                                     pax_count = ?,
                                     total_cost = ?,
                                     data_version = ?,
                                     updated_at = ?
                                 WHERE id = ?
-                            `).run(
-                                data,
+                            `);
+
+                            // Экземпляр шаблона - override-документом (или отвязка от шаблона)
+                            storage.db.transaction(() => update.run(
+                                storage.encodeEstimateWrite(entity_id, parsedData, data),
+                                dataHash,
                                 parsedData.clientName || null,
                                 parsedData.paxCount || 0,
                                 parsedData.totalCost || 0,
                                 newVersion,
                                 Math.floor(Date.now() / 1000),
                                 entity_id
-                            );
+                            ))();
 
                             results.push({
                                 entity_type,
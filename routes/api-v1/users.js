@@ -11,9 +11,9 @@
  */
 
 const express = require('express');
-const bcrypt = require('bcrypt');
 const { requireAuth } = require('../../middleware/jwt-auth');
 const { requireRole } = require('../../middleware/rbac');
+const { hashWithPool, sendPoolSaturated } = require('../../services/PasswordHasher');
 
 const router = express.Router();
 
@@ -77,27 +77,17 @@ router.post('/', requireAuth, requireRole('admin'), async (req, res) => {
             });
         }
 
-        // Check organization limits
-        const org = storage.db.prepare(`
-            SELECT current_users_count, max_users
-            FROM organizations
-            WHERE id = ?
-        `).get(req.user.organization_id);
-
-        if (org.current_users_count >= org.max_users) {
-            return res.status(403).json({
-                success: false,
-                error: 'Organization user limit reached'
-            });
-        }
+        // Check organization limits (до хеширования пароля)
+        storage.assertQuota(req.user.organization_id, 'users');
 
         // Generate user ID
         const userId = `user-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
 
-        // Hash password
-        const passwordHash = await bcrypt.hash(password, 10);
+        // Hash password (worker pool, если настроен)
+        const passwordHash = await hashWithPool(req.app.locals.passwordHasher, password);
 
-        // Create user
+        // Create user (повторная проверка: пока хешировали, лимит мог заполниться)
+        storage.assertQuota(req.user.organization_id, 'users');
         storage.db.prepare(`
             INSERT INTO users (
                 id, email, username, password_hash, full_name,
@@ -118,12 +108,10 @@ router.post('/', requireAuth, requireRole('admin'), async (req, res) => {
             Math.floor(Date.now() / 1000)
         );
 
-        // Update organization counter
-        storage.db.prepare(`
-            UPDATE organizations
-            SET current_users_count = current_users_count + 1
-            WHERE id = ?
-        `).run(req.user.organization_id);
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'user', entityId: userId, action: 'create',
+            metadata: { email, role: role || 'user' }
+        });
 
         res.status(201).json({
             success: true,
@@ -136,6 +124,18 @@ router.post('/', requireAuth, requireRole('admin'), async (req, res) => {
         });
 
     } catch (err) {
+        if (err.code === 'QUOTA_EXCEEDED') {
+            return res.status(err.status).json({
+                success: false,
+                error: err.message,
+                quota: err.quota
+            });
+        }
+
+        if (err.code === 'HASH_POOL_SATURATED') {
+            return sendPoolSaturated(res, err);
+        }
+
         console.error('Create user error:', err);
         res.status(500).json({
             success: false,
@@ -195,7 +195,7 @@ router.put('/:id', requireAuth, async (req, res) => {
         }
 
         if (password !== undefined) {
-            const passwordHash = await bcrypt.hash(password, 10);
+            const passwordHash = await hashWithPool(req.app.locals.passwordHasher, password);
             updates.push('password_hash = ?');
             params.push(passwordHash);
         }
@@ -227,12 +227,30 @@ router.put('/:id', requireAuth, async (req, res) => {
         const query = `UPDATE users SET ${updates.join(', ')} WHERE id = ?`;
         storage.db.prepare(query).run(...params);
 
+        // password_hash в audit не попадает - только факт смены
+        const auditFields = ({ full_name, email, role, is_active }) => ({ full_name, email, role, is_active });
+        const updatedUser = storage.db.prepare(
+            'SELECT full_name, email, role, is_active FROM users WHERE id = ?'
+        ).get(userId);
+
+        req.app.locals.auditLogger?.recordRequest(req, {
+            entityType: 'user', entityId: userId, action: 'update',
+            before: auditFields(targetUser),
+            after: auditFields(updatedUser),
+            organizationId: targetUser.organization_id,
+            metadata: password !== undefined ? { passwordChanged: true } : undefined
+        });
+
         res.json({
             success: true,
             message: 'User updated successfully'
         });
 
     } catch (err) {
+        if (err.code === 'HASH_POOL_SATURATED') {
+            return sendPoolSaturated(res, err);
+        }
+
         console.error('Update user error:', err);
         res.status(500).json({
             success: false,
@@ -7,6 +7,7 @@ const express = require('express');
 const passport = require('passport');
 const { requireAuth, rateLimit } = require('../middleware/auth');
 const logger = require('../utils/logger');
+const { sendPoolSaturated } = require('../services/PasswordHasher');
 
 const router = express.Router();
 
@@ -41,6 +42,10 @@ router.post('/register',
         } catch (error) {
             logger.logError(error, { context: 'Register endpoint' });
 
+            if (error.code === 'HASH_POOL_SATURATED') {
+                return sendPoolSaturated(res, error);
+            }
+
             res.status(400).json({
                 success: false,
                 error: error.message
@@ -58,6 +63,10 @@ router.post('/login',
     (req, res, next) => {
         passport.authenticate('local', (err, user, info) => {
             if (err) {
+                if (err.code === 'HASH_POOL_SATURATED') {
+                    return sendPoolSaturated(res, err);
+                }
+
                 logger.logError(err, { context: 'Login authentication' });
                 return res.status(500).json({
                     success: false,
@@ -171,6 +180,10 @@ router.post('/change-password', requireAuth, async (req, res) => {
     } catch (error) {
         logger.logError(error, { context: 'Change password', userId: req.user.id });
 
+        if (error.code === 'HASH_POOL_SATURATED') {
+            return sendPoolSaturated(res, error);
+        }
+
         res.status(400).json({
             success: false,
             error: error.message
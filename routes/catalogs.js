@@ -20,7 +20,7 @@ router.get('/', requireAuth, async (req, res) => {
 
         const catalogs = await storage.getCatalogsList(organizationId);
 
-        logger.info('Catalogs listed', {
+        logger.infoSampled('catalogs.list', 'Catalogs listed', {
             userId: req.user.id,
             organizationId,
             count: catalogs.length
@@ -56,7 +56,7 @@ router.get('/:id', requireAuth, async (req, res) => {
 
         const data = await storage.loadCatalogById(id, organizationId);
 
-        logger.info('Catalog loaded', {
+        logger.infoSampled('catalogs.load', 'Catalog loaded', {
             userId: req.user.id,
             organizationId,
             catalogId: id
@@ -131,6 +131,15 @@ router.post('/', requireAuth, async (req, res) => {
             catalogName: req.body?.name
         });
 
+        if (error.code === 'QUOTA_EXCEEDED') {
+            return res.status(error.status).json({
+                success: false,
+                error: error.message,
+                code: error.code,
+                quota: error.quota
+            });
+        }
+
         res.status(500).json({
             success: false,
             error: error.message
@@ -0,0 +1,234 @@
+#!/usr/bin/env node
+
+/**
+ * Build Assets - сборка index.html для production
+ *
+ * - inline <script> / <style> из index.html выносятся в отдельные файлы
+ * - локальные скрипты (/apiClient.js, /js/*.js) и лениво загружаемые ресурсы
+ *   (Quill, AutosaveWorker) получают fingerprint в имени: /assets/<name>.<hash>.<ext>
+ * - JS минифицируется через terser (если установлен), CSS - встроенным минификатором
+ * - рядом с каждым файлом кладутся .br и .gz (если они меньше оригинала)
+ * - dist/manifest.json: исходный URL -> fingerprinted URL
+ *
+ * Результат раздаёт middleware/staticAssets.js (из памяти, с immutable cache headers).
+ *
+ * Использование:
+ *   node scripts/build-assets.js [outDir]     (по умолчанию dist/)
+ */
+
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const zlib = require('zlib');
+
+const ROOT = path.join(__dirname, '..');
+const DEFAULT_OUT_DIR = path.join(ROOT, 'dist');
+
+// Загружаются из кода (не через <script src>), URL подставляется в строковые литералы
+const LAZY_ASSETS = [
+    '/lib/quill/quill.min.js',
+    '/lib/quill/quill.snow.css',
+    '/js/AutosaveWorker.js'
+];
+
+const LOCAL_SCRIPT_RE = /<script src="(\/[^"]+\.js)"><\/script>/g;
+const INLINE_SCRIPT_RE = /<script>([\s\S]*?)<\/script>/g;
+const INLINE_STYLE_RE = /<style>([\s\S]*?)<\/style>/g;
+
+// Сжимать имеет смысл только текст
+const COMPRESSIBLE_EXT = new Set(['.html', '.js', '.css', '.json', '.svg']);
+
+let terser = null;
+try {
+    terser = require('terser');
+} catch (err) {
+    // terser не установлен - JS копируется без минификации (сжатие br/gz остаётся)
+}
+
+function contentHash(content) {
+    return crypto.createHash('sha256').update(content).digest('hex').slice(0, 10);
+}
+
+/**
+ * Минификация CSS: комментарии и лишние пробелы (строки в кавычках не трогаются)
+ */
+function minifyCss(css) {
+    const parts = css.split(/("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')/);
+
+    return parts.map((part, index) => {
+        if (index % 2 === 1) return part; // строка в кавычках
+
+        return part
+            .replace(/\/\*[\s\S]*?\*\//g, '')
+            .replace(/\s+/g, ' ')
+            .replace(/\s*([{};,>])\s*/g, '$1')
+            .replace(/([:(])\s+/g, '$1')
+            .replace(/\s+\)/g, ')')
+            .replace(/;}/g, '}');
+    }).join('').trim();
+}
+
+async function minifyJs(code, name) {
+    if (!terser) return code;
+
+    try {
+        const result = await terser.minify(code, { compress: true, mangle: true });
+        return result.code;
+    } catch (err) {
+        console.warn(`⚠️  terser failed on ${name}, keeping original: ${err.message}`);
+        return code;
+    }
+}
+
+/**
+ * Заменить строковые литералы '/js/X.js' на fingerprinted URL
+ */
+function rewriteUrls(code, urlMap) {
+    let result = code;
+    for (const [source, target] of Object.entries(urlMap)) {
+        for (const quote of ["'", '"', '`']) {
+            result = result.split(quote + source + quote).join(quote + target + quote);
+        }
+    }
+    return result;
+}
+
+class AssetBuilder {
+    constructor(root, outDir) {
+        this.root = root;
+        this.outDir = outDir;
+        this.assetsDir = path.join(outDir, 'assets');
+        this.urlMap = {};     // исходный URL -> /assets/...
+        this.files = [];      // все записанные файлы (для сжатия)
+    }
+
+    async build() {
+        fs.rmSync(this.outDir, { recursive: true, force: true });
+        fs.mkdirSync(this.assetsDir, { recursive: true });
+
+        let html = fs.readFileSync(path.join(this.root, 'index.html'), 'utf8');
+
+        // 1. Ленивые ресурсы - листья, на них ссылаются остальные файлы
+        for (const url of LAZY_ASSETS) {
+            await this.addFile(url);
+        }
+
+        // 2. Локальные <script src> - в порядке подключения
+        const scripts = [...html.matchAll(LOCAL_SCRIPT_RE)].map(match => match[1]);
+        for (const url of scripts) {
+            await this.addFile(url);
+        }
+        html = html.replace(LOCAL_SCRIPT_RE, (tag, url) => `<script src="${this.urlMap[url]}"></script>`);
+
+        // 3. Inline блоки -> отдельные файлы (порядок выполнения сохраняется)
+        let scriptIndex = 0;
+        const inlineScripts = [];
+        for (const match of html.matchAll(INLINE_SCRIPT_RE)) {
+            const url = await this.writeAsset(`app-${++scriptIndex}.js`, await minifyJs(rewriteUrls(match[1], this.urlMap), 'inline script'));
+            inlineScripts.push(`<script src="${url}"></script>`);
+        }
+        html = html.replace(INLINE_SCRIPT_RE, () => inlineScripts.shift());
+
+        let styleIndex = 0;
+        const inlineStyles = [];
+        for (const match of html.matchAll(INLINE_STYLE_RE)) {
+            const url = await this.writeAsset(`app-${++styleIndex}.css`, minifyCss(match[1]));
+            inlineStyles.push(`<link rel="stylesheet" href="${url}">`);
+        }
+        html = html.replace(INLINE_STYLE_RE, () => inlineStyles.shift());
+
+        this.writeFile(path.join(this.outDir, 'index.html'), html);
+
+        // 4. Precompression
+        for (const file of this.files) {
+            this.precompress(file);
+        }
+
+        const manifest = {
+            builtAt: new Date().toISOString(),
+            minifiedJs: Boolean(terser),
+            assets: this.urlMap
+        };
+        fs.writeFileSync(path.join(this.outDir, 'manifest.json'), JSON.stringify(manifest, null, 2));
+
+        return manifest;
+    }
+
+    /**
+     * Локальный файл по URL -> /assets/<name>.<hash>.<ext>
+     */
+    async addFile(url) {
+        if (this.urlMap[url]) return this.urlMap[url];
+
+        const ext = path.extname(url);
+        let content = fs.readFileSync(path.join(this.root, url));
+
+        if (ext === '.js') {
+            content = await minifyJs(rewriteUrls(content.toString('utf8'), this.urlMap), url);
+        } else if (ext === '.css' && !url.endsWith('.min.css')) {
+            content = minifyCss(content.toString('utf8'));
+        }
+
+        this.urlMap[url] = await this.writeAsset(path.basename(url), content);
+        return this.urlMap[url];
+    }
+
+    async writeAsset(name, content) {
+        const ext = path.extname(name);
+        const hashed = `${path.basename(name, ext)}.${contentHash(content)}${ext}`;
+        this.writeFile(path.join(this.assetsDir, hashed), content);
+        return `/assets/${hashed}`;
+    }
+
+    writeFile(file, content) {
+        fs.writeFileSync(file, content);
+        this.files.push(file);
+    }
+
+    precompress(file) {
+        if (!COMPRESSIBLE_EXT.has(path.extname(file))) return;
+
+        const content = fs.readFileSync(file);
+        const br = zlib.brotliCompressSync(content, {
+            params: {
+                [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+                [zlib.constants.BROTLI_PARAM_SIZE_HINT]: content.length
+            }
+        });
+        const gz = zlib.gzipSync(content, { level: zlib.constants.Z_BEST_COMPRESSION });
+
+        if (br.length < content.length) fs.writeFileSync(file + '.br', br);
+        if (gz.length < content.length) fs.writeFileSync(file + '.gz', gz);
+    }
+}
+
+/**
+ * @param {Object} [options]
+ * @param {string} [options.root] - Корень проекта (где index.html)
+ * @param {string} [options.outDir] - Каталог сборки
+ * @returns {Promise<Object>} manifest
+ */
+function build(options = {}) {
+    return new AssetBuilder(options.root || ROOT, options.outDir || DEFAULT_OUT_DIR).build();
+}
+
+if (require.main === module) {
+    const outDir = process.argv[2] ? path.resolve(process.argv[2]) : DEFAULT_OUT_DIR;
+
+    build({ outDir })
+        .then((manifest) => {
+            console.log(`✅ Assets built: ${Object.keys(manifest.assets).length} files fingerprinted -> ${outDir}`);
+            if (!manifest.minifiedJs) {
+                console.log('ℹ️  terser not installed - JS is not minified (br/gz only)');
+            }
+        })
+        .catch((err) => {
+            console.error('❌ Asset build failed:', err);
+            process.exit(1);
+        });
+}
+
+module.exports = {
+    build,
+    minifyCss
+};
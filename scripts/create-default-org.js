@@ -109,7 +109,7 @@ async function createDefaultOrganization(db) {
         50,     // max_catalogs
         5000,   // storage_limit_mb
         10000,  // api_rate_limit
-        1,      // current_users_count (будет админ)
+        0,      // current_users_count (trigger увеличит при создании админа)
         0,      // current_estimates_count
         0,      // current_catalogs_count
         0,      // current_storage_mb
@@ -6,14 +6,18 @@ const path = require('path');
 const fs = require('fs');
 const passport = require('passport');
 const session = require('express-session');
-const SQLiteStore = require('connect-sqlite3')(session);
 
 // Storage adapters
 const SQLiteStorage = require('./storage/SQLiteStorage');
+const SQLiteSessionStore = require('./storage/SQLiteSessionStore');
 const FileStorage = require('./storage/FileStorage'); // Only for import/export
 
 // Authentication
 const AuthService = require('./services/AuthService');
+const PasswordHasher = require('./services/PasswordHasher');
+const AuditLogger = require('./services/AuditLogger');
+const LogArchiver = require('./services/LogArchiver');
+const JsonParserPool = require('./services/JsonParserPool');
 const configurePassport = require('./config/passport');
 const authRoutes = require('./routes/auth');
 const catalogRoutes = require('./routes/catalogs');
@@ -23,11 +27,17 @@ const { requireAuth } = require('./middleware/auth');
 const apiV1Router = require('./routes/api-v1');
 
 // DAY 1.3: Disk space validation middleware (Production Safety)
-const { checkDiskSpace, getDiskSpaceInfo } = require('./middleware/diskSpace');
+const { checkDiskSpace, getDiskSpaceInfo, startDiskSpaceSampler, stopDiskSpaceSampler } = require('./middleware/diskSpace');
+const { largeJsonBody } = require('./middleware/largeJsonBody');
+const { staticAssets } = require('./middleware/staticAssets');
 
 // DAY 2.1: Structured logging with Winston (Production Observability)
 const logger = require('./utils/logger');
 
+// Prometheus-style metrics (/metrics)
+const metrics = require('./utils/metrics');
+const { validateOverrides } = require('./utils/estimateOverrides');
+
 const app = express();
 
 // ============================================================================
@@ -57,7 +67,43 @@ app.use(cors({
     origin: process.env.CORS_ORIGIN || true,
     credentials: true  // Allow cookies
 }));
-app.use(express.json({ limit: process.env.JSON_LIMIT || '50mb' }));
+
+// Route latency и размеры request/response (включая 413/507 до body parsing)
+app.use(metrics.middleware());
+
+// DAY 1.3: Disk space check для всех записей - ДО body parsing,
+// чтобы большие import'ы отклонялись по Content-Length без разбора тела.
+// Auth endpoints (login/logout) не блокируем - они почти ничего не пишут.
+const WRITE_METHODS = new Set(['POST', 'PUT', 'PATCH', 'DELETE']);
+app.use((req, res, next) => {
+    if (!WRITE_METHODS.has(req.method) ||
+        req.path.startsWith('/api/auth/') ||
+        req.path.startsWith('/api/v1/auth/')) {
+        return next();
+    }
+    checkDiskSpace(req, res, next);
+});
+
+// Большие тела: свой лимит на маршрут, проверка тел выше JSON_INLINE_LIMIT - в worker pool.
+// Остальные запросы - обычный express.json() с небольшим лимитом.
+const jsonParserPool = new JsonParserPool();
+const LARGE_BODY_LIMIT = process.env.LARGE_JSON_LIMIT || '50mb';
+const IMPORT_BODY_LIMIT = process.env.IMPORT_JSON_LIMIT || '100mb';
+
+app.use(largeJsonBody([
+    { method: 'POST', path: '/api/import/all', limit: IMPORT_BODY_LIMIT, validate: 'import' },
+    { method: 'POST', path: '/api/v1/export/organization', limit: IMPORT_BODY_LIMIT },
+    { method: 'POST', path: '/api/v1/catalogs', limit: LARGE_BODY_LIMIT, validate: 'catalog' },
+    { method: 'PATCH', path: /^\/api\/v1\/catalogs\/[^/]+$/, limit: LARGE_BODY_LIMIT },
+    { method: 'POST', path: '/api/estimates/batch', limit: LARGE_BODY_LIMIT, validate: 'estimateBatch' },
+    { method: 'POST', path: '/api/v1/sync/batch', limit: LARGE_BODY_LIMIT, validate: 'syncBatch' },
+    { method: 'POST', path: /^\/api\/estimates\/[^/]+(\/transactional)?$/, limit: LARGE_BODY_LIMIT },
+    { method: 'PATCH', path: /^\/api\/estimates\/[^/]+$/, limit: LARGE_BODY_LIMIT },
+    { method: 'POST', path: '/api/v1/estimates', limit: LARGE_BODY_LIMIT, validate: 'estimate' },
+    { method: 'PUT', path: /^\/api\/v1\/estimates\/[^/]+$/, limit: LARGE_BODY_LIMIT, validate: 'estimate' }
+], { pool: jsonParserPool }));
+
+app.use(express.json({ limit: process.env.JSON_LIMIT || '1mb' }));
 app.use(express.urlencoded({ extended: true }));  // For form data
 
 // DAY 2.1: HTTP request logging
@@ -65,31 +111,10 @@ if (!isTestMode) {
     app.use(logger.middleware());
 }
 
-// Session configuration (must be before passport)
-const sessionStore = new SQLiteStore({
-    db: process.env.SESSION_DB_PATH || 'sessions.db',
-    dir: './db',
-    table: 'sessions'
-});
-
-app.use(session({
-    secret: process.env.SESSION_SECRET || 'dev-secret-change-in-production-IMPORTANT',
-    resave: false,
-    saveUninitialized: false,
-    store: sessionStore,
-    cookie: {
-        secure: process.env.SESSION_SECURE_COOKIE === 'true',  // true only for HTTPS
-        httpOnly: true,
-        maxAge: 7 * 24 * 60 * 60 * 1000,  // 7 days
-        sameSite: 'lax'
-    }
-}));
-
-// Initialize Passport (must be after session)
-app.use(passport.initialize());
-app.use(passport.session());
+// Собранный index.html и fingerprinted assets (scripts/build-assets.js) - из памяти, br/gzip
+app.use(staticAssets());
 
-// Serve static files (login.html, etc.)
+// Serve static files (login.html, etc.) - без session lookup
 app.use(express.static('.'));
 
 // ============================================================================
@@ -100,6 +125,65 @@ app.use(express.static('.'));
 // Используем defaults (user_default, org_default) для совместимости с legacy data
 const storage = new SQLiteStorage();
 
+// ============================================================================
+// Legacy Session Auth (route-scoped)
+// ============================================================================
+
+// Сессии хранятся в таблице `sessions` основной БД (без отдельного sessions.db).
+// Middleware подключается только к legacy routes: static и /api/v1 (JWT)
+// не делают ни одного обращения к session store.
+const sessionStore = new SQLiteSessionStore({ storage });
+
+const legacySession = [
+    session({
+        secret: process.env.SESSION_SECRET || 'dev-secret-change-in-production-IMPORTANT',
+        resave: false,
+        saveUninitialized: false,
+        store: sessionStore,
+        cookie: {
+            secure: process.env.SESSION_SECURE_COOKIE === 'true',  // true only for HTTPS
+            httpOnly: true,
+            maxAge: 7 * 24 * 60 * 60 * 1000,  // 7 days
+            sameSite: 'lax'
+        }
+    }),
+    passport.initialize(),
+    passport.session()
+];
+
+app.use([
+    '/api/auth',
+    '/api/estimates',
+    '/api/settings',
+    '/api/export',
+    '/api/import',
+    '/api/database'
+], legacySession);
+
+// bcrypt worker pool (создаётся в initStorage)
+let passwordHasher = null;
+
+// Batched audit_logs writer (создаётся в initStorage)
+let auditLogger = null;
+
+// Архив audit_logs / auth_logs в сжатых сегментах (создаётся в initStorage)
+let logArchiver = null;
+
+// Сверка счётчиков usage организаций с фактическими данными
+const USAGE_RECONCILE_INTERVAL_MS = parseInt(process.env.USAGE_RECONCILE_INTERVAL_MS) || 6 * 60 * 60 * 1000;
+let usageReconcileTimer = null;
+
+async function reconcileUsage() {
+    try {
+        const { checked, corrected } = await storage.reconcileUsageCounters();
+        if (corrected.length > 0) {
+            logger.warn('Organization usage counters corrected', { checked, corrected });
+        }
+    } catch (err) {
+        logger.logError(err, { context: 'Usage counters reconciliation' });
+    }
+}
+
 // Инициализация storage при старте
 async function initStorage() {
     try {
@@ -109,8 +193,22 @@ async function initStorage() {
             environment: process.env.NODE_ENV || 'development'
         });
 
+        // Audit: мутации storage и v1 routes → очередь → batched flush
+        auditLogger = new AuditLogger({ db: storage.db });
+        storage.auditLogger = auditLogger;
+        app.locals.auditLogger = auditLogger;
+
+        // Старые сутки логов → сжатые сегменты вне quotes.db
+        logArchiver = new LogArchiver({ db: storage.db });
+        app.locals.logArchiver = logArchiver;
+        logArchiver.start();
+
+        // bcrypt worker pool (hash/compare вне основного потока)
+        passwordHasher = new PasswordHasher();
+        app.locals.passwordHasher = passwordHasher;
+
         // Initialize AuthService
-        const authService = new AuthService(storage.db);
+        const authService = new AuthService(storage.db, { passwordHasher });
         app.locals.authService = authService;
         app.locals.db = storage.db;
         app.locals.storage = storage;  // Make storage available to routes
@@ -118,8 +216,16 @@ async function initStorage() {
         // Configure Passport
         configurePassport(authService);
 
+        // Batched expiry sweeps для session store
+        sessionStore.startSweeper();
+
+        // Счётчики usage: сверка при старте (старые БД без triggers) и периодически
+        reconcileUsage();
+        usageReconcileTimer = setInterval(reconcileUsage, USAGE_RECONCILE_INTERVAL_MS);
+        usageReconcileTimer.unref();
+
         logger.info('Authentication configured', {
-            sessionStore: 'sqlite',
+            sessionStore: 'sqlite-main',
             cookieSecure: process.env.SESSION_SECURE_COOKIE === 'true'
         });
     } catch (err) {
@@ -149,7 +255,9 @@ app.get('/login', (req, res) => {
 // Catalog API (Multi-Tenant)
 // ============================================================================
 
-app.use('/api/v1/catalogs', catalogRoutes);
+// Legacy catalog routes: сюда доходят только запросы, не обработанные
+// JWT-роутером /api/v1 выше, поэтому session нужна только здесь
+app.use('/api/v1/catalogs', legacySession, catalogRoutes);
 
 // ============================================================================
 // API для смет
@@ -162,7 +270,7 @@ app.get('/api/estimates', async (req, res) => {
         const organizationId = req.user?.organization_id || 'magellania-org';
         const estimates = await storage.getEstimatesList(organizationId);
 
-        logger.info('Estimates list retrieved', {
+        logger.infoSampled('estimates.list', 'Estimates list retrieved', {
             userId: req.user?.id || 'anonymous',
             organizationId,
             count: estimates.length
@@ -185,7 +293,7 @@ app.get('/api/estimates', async (req, res) => {
  * Body: { items: [{id, data}, ...] }
  * Returns: { succeeded: [ids], failed: [{id, error}] }
  */
-app.post('/api/estimates/batch', checkDiskSpace, async (req, res) => {
+app.post('/api/estimates/batch', async (req, res) => {
     const { items } = req.body;
 
     if (!Array.isArray(items) || items.length === 0) {
@@ -214,64 +322,8 @@ app.post('/api/estimates/batch', checkDiskSpace, async (req, res) => {
                     }
 
                     try {
-                        // Используем синхронный метод внутри транзакции
-                        const now = Math.floor(Date.now() / 1000);
-                        const dataStr = JSON.stringify(data);
-                        const dataHash = storage._calculateHash(dataStr);
-                        const metadata = storage._extractMetadata(data);
-                        const filename = data.filename || metadata.filename || `estimate_${id}.json`;
-
-                        const orgId = storage.defaultOrganizationId;
-                        const ownerId = storage.defaultUserId;
-
-                        // Проверяем существование
-                        const existing = storage.statements.getEstimateById.get(id, orgId);
-
-                        if (existing) {
-                            // UPDATE
-                            storage.statements.updateEstimate.run(
-                                filename,
-                                dataStr,
-                                metadata.clientName,
-                                metadata.clientEmail,
-                                metadata.clientPhone,
-                                metadata.paxCount,
-                                metadata.tourStart,
-                                metadata.tourEnd,
-                                metadata.totalCost,
-                                metadata.totalProfit,
-                                metadata.servicesCount,
-                                dataHash,
-                                now,
-                                id,
-                                existing.data_version,
-                                orgId
-                            );
-                        } else {
-                            // INSERT
-                            storage.statements.insertEstimate.run(
-                                id,
-                                filename,
-                                data.version || '1.1.0',
-                                storage.appVersion,
-                                dataStr,
-                                metadata.clientName,
-                                metadata.clientEmail,
-                                metadata.clientPhone,
-                                metadata.paxCount,
-                                metadata.tourStart,
-                                metadata.tourEnd,
-                                metadata.totalCost,
-                                metadata.totalProfit,
-                                metadata.servicesCount,
-                                1,
-                                dataHash,
-                                now,
-                                now,
-                                ownerId,
-                                orgId
-                            );
-                        }
+                        // Синхронный save внутри транзакции (write elision, copy-on-write, quota)
+                        storage.saveEstimateSync(id, data);
 
                         results.succeeded.push(id);
                     } catch (err) {
@@ -331,7 +383,7 @@ app.get('/api/estimates/:id', async (req, res) => {
         const organizationId = req.user?.organization_id || 'magellania-org';
         const data = await storage.loadEstimate(req.params.id, organizationId);
 
-        logger.info('Estimate loaded', {
+        logger.infoSampled('estimates.load', 'Estimate loaded', {
             userId: req.user?.id || 'anonymous',
             organizationId,
             estimateId: req.params.id
@@ -345,7 +397,7 @@ app.get('/api/estimates/:id', async (req, res) => {
 });
 
 // ID-First: Save estimate by ID
-app.post('/api/estimates/:id', checkDiskSpace, async (req, res) => {
+app.post('/api/estimates/:id', async (req, res) => {
     try {
         const { id } = req.params;
         const data = req.body;
@@ -355,28 +407,63 @@ app.post('/api/estimates/:id', checkDiskSpace, async (req, res) => {
         const organizationId = req.user?.organization_id || storage.defaultOrganizationId;
 
         // Save estimate with ID-First architecture + multi-tenancy
-        await storage.saveEstimate(id, data, userId, organizationId);
+        const result = await storage.saveEstimate(id, data, userId, organizationId);
 
-        res.json({ success: true });
+        res.json({ success: true, dataVersion: result.dataVersion, unchanged: !!result.unchanged });
     } catch (err) {
         logger.logError(err, { context: `Save estimate ${req.params.id}` });
 
         // Проверка на optimistic locking conflict
         if (err.message.includes('Concurrent modification')) {
             res.status(409).json({ success: false, error: err.message, code: 'CONFLICT' });
+        } else if (err.code === 'QUOTA_EXCEEDED') {
+            res.status(err.status).json({ success: false, error: err.message, code: err.code, quota: err.quota });
+        } else {
+            res.status(500).json({ success: false, error: err.message });
+        }
+    }
+});
+
+// Autosave дельтой: { baseVersion, set, unset } относительно data_version на сервере
+// 409 / 404 - клиент повторяет сохранение полной сметой через POST
+app.patch('/api/estimates/:id', async (req, res) => {
+    try {
+        const { baseVersion, set, unset } = req.body || {};
+
+        if (!Number.isInteger(baseVersion)) {
+            return res.status(400).json({ success: false, error: 'Expected { baseVersion, set, unset }', code: 'INVALID_PATCH' });
+        }
+
+        const invalid = validateOverrides({ set, unset });
+        if (invalid) {
+            return res.status(400).json({ success: false, error: invalid, code: 'INVALID_PATCH' });
+        }
+
+        const userId = req.user?.id || storage.defaultUserId;
+        const organizationId = req.user?.organization_id || storage.defaultOrganizationId;
+
+        const result = await storage.patchEstimate(req.params.id, baseVersion, { set, unset }, userId, organizationId);
+
+        res.json({ success: true, dataVersion: result.dataVersion, unchanged: !!result.unchanged });
+    } catch (err) {
+        if (err.code === 'CONFLICT' || err.code === 'ESTIMATE_NOT_FOUND' || err.code === 'INVALID_PATCH') {
+            res.status(err.status).json({ success: false, error: err.message, code: err.code, dataVersion: err.dataVersion });
+        } else if (err.message.includes('Concurrent modification')) {
+            res.status(409).json({ success: false, error: err.message, code: 'CONFLICT' });
         } else {
+            logger.logError(err, { context: `Patch estimate ${req.params.id}` });
             res.status(500).json({ success: false, error: err.message });
         }
     }
 });
 
 // ID-First: Delete estimate by ID
-app.delete('/api/estimates/:id', checkDiskSpace, async (req, res) => {
+app.delete('/api/estimates/:id', async (req, res) => {
     try {
         // Multi-tenancy: используем organization_id пользователя
         // По умолчанию magellania-org (Migration 010)
         const organizationId = req.user?.organization_id || 'magellania-org';
-        await storage.deleteEstimate(req.params.id, organizationId);
+        await storage.deleteEstimate(req.params.id, organizationId, req.user?.id);
 
         logger.info('Estimate deleted', {
             userId: req.user?.id || 'anonymous',
@@ -392,7 +479,7 @@ app.delete('/api/estimates/:id', checkDiskSpace, async (req, res) => {
 });
 
 // ID-First rename endpoint
-app.put('/api/estimates/:id/rename', checkDiskSpace, async (req, res) => {
+app.put('/api/estimates/:id/rename', async (req, res) => {
     try {
         const { id } = req.params;
         const { newFilename } = req.body;
@@ -410,7 +497,7 @@ app.put('/api/estimates/:id/rename', checkDiskSpace, async (req, res) => {
 
         // Update filename in metadata and save back
         estimate.filename = newFilename;
-        await storage.saveEstimate(id, estimate);
+        await storage.saveEstimate(id, estimate, req.user?.id);
 
         res.json({ success: true, newFilename });
     } catch (err) {
@@ -432,9 +519,9 @@ app.get('/api/settings', async (req, res) => {
     }
 });
 
-app.post('/api/settings', checkDiskSpace, async (req, res) => {
+app.post('/api/settings', async (req, res) => {
     try {
-        await storage.saveSettings(req.body);
+        await storage.saveSettings(req.body, null, req.user?.id);
         res.json({ success: true });
     } catch (err) {
         res.status(500).json({ success: false, error: err.message });
@@ -445,7 +532,7 @@ app.post('/api/settings', checkDiskSpace, async (req, res) => {
 // API для транзакционного сохранения (только для SQLite)
 // ============================================================================
 
-app.post('/api/estimates/:filename/transactional', checkDiskSpace, async (req, res) => {
+app.post('/api/estimates/:filename/transactional', async (req, res) => {
     try {
         // Транзакционное сохранение доступно только для SQLite
         if (storage.constructor.name === 'SQLiteStorage') {
@@ -581,7 +668,7 @@ app.get('/api/export/all', async (req, res) => {
  * Body: JSON export file
  * Returns: { success: true, imported: {...counts}, failed: {...counts} }
  */
-app.post('/api/import/all', checkDiskSpace, async (req, res) => {
+app.post('/api/import/all', async (req, res) => {
     try {
         const importData = req.body;
 
@@ -660,7 +747,7 @@ app.post('/api/import/all', checkDiskSpace, async (req, res) => {
         // Import settings
         if (importData.data.settings) {
             try {
-                await storage.saveSettings(importData.data.settings);
+                await storage.saveSettings(importData.data.settings, null, req.user?.id);
                 results.imported.settings = true;
             } catch (err) {
                 logger.warn('Failed to import settings', { error: err.message });
@@ -839,6 +926,69 @@ app.post('/api/import/database', express.raw({ type: 'application/octet-stream',
 // Health Check
 // ============================================================================
 
+// Gauges, которые снимаются в момент scrape
+const walSizeGauge = metrics.gauge('sqlite_wal_size_bytes', 'SQLite WAL file size');
+const dbSizeGauge = metrics.gauge('sqlite_db_size_bytes', 'SQLite database file size');
+const diskFreeGauge = metrics.gauge('disk_free_bytes', 'Free disk space for the database directory (cached sample)');
+const hashPoolGauge = metrics.gauge('password_hash_pool', 'bcrypt worker pool state');
+const hashLatencyGauge = metrics.gauge('password_hash_latency_seconds', 'bcrypt operation latency (recent samples)');
+const logBufferGauge = metrics.gauge('log_buffer_entries', 'Buffered log transport state');
+const auditGauge = metrics.gauge('audit_log_writer', 'Batched audit log writer state');
+const archiveGauge = metrics.gauge('log_archive', 'Archived log segments');
+const jsonPoolGauge = metrics.gauge('json_parser_pool', 'Large JSON body parser pool state');
+
+metrics.registerCollector(() => {
+    if (storage.initialized) {
+        const { dbBytes, walBytes } = storage.getFileSizes();
+        dbSizeGauge.set(dbBytes);
+        walSizeGauge.set(walBytes);
+    }
+
+    diskFreeGauge.set(getDiskSpaceInfo().freeSpaceMB * 1024 * 1024);
+
+    if (passwordHasher) {
+        const pool = passwordHasher.getStats();
+        for (const key of ['size', 'busy', 'queueDepth', 'completed', 'failed', 'rejected', 'workerRestarts']) {
+            hashPoolGauge.set({ stat: key }, pool[key]);
+        }
+        hashLatencyGauge.set({ quantile: '0.5' }, pool.latencyMs.p50 / 1000);
+        hashLatencyGauge.set({ quantile: '0.95' }, pool.latencyMs.p95 / 1000);
+    }
+
+    for (const [key, value] of Object.entries(jsonParserPool.getStats())) {
+        jsonPoolGauge.set({ stat: key }, value);
+    }
+
+    if (auditLogger) {
+        for (const [key, value] of Object.entries(auditLogger.getStats())) {
+            auditGauge.set({ stat: key }, value);
+        }
+    }
+
+    if (logArchiver) {
+        for (const [key, value] of Object.entries(logArchiver.getStats())) {
+            archiveGauge.set({ stat: key }, value);
+        }
+    }
+
+    for (const { filename, buffered, capacity, dropped } of logger.getBufferStats()) {
+        logBufferGauge.set({ file: filename, stat: 'buffered' }, buffered);
+        logBufferGauge.set({ file: filename, stat: 'capacity' }, capacity);
+        logBufferGauge.set({ file: filename, stat: 'dropped' }, dropped);
+    }
+});
+
+// Metrics endpoint (Prometheus text format).
+// Если задан METRICS_TOKEN - требуется Authorization: Bearer <token>
+app.get('/metrics', (req, res) => {
+    const token = process.env.METRICS_TOKEN;
+    if (token && req.get('authorization') !== `Bearer ${token}`) {
+        return res.status(401).json({ success: false, error: 'Unauthorized' });
+    }
+
+    res.type(metrics.CONTENT_TYPE).send(metrics.render());
+});
+
 // Health check endpoint (with /api/health alias for Docker healthcheck)
 app.get(['/health', '/api/health'], async (req, res) => {
     try {
@@ -846,6 +996,7 @@ app.get(['/health', '/api/health'], async (req, res) => {
         const stats = await storage.getStats();
 
         // DAY 1.3: Include disk space info in health check (Production Safety)
+        // (закэшированный замер фонового sampler'а, без statfs на probe)
         const diskSpace = getDiskSpaceInfo();
 
         const healthy = storageHealth.healthy && diskSpace.healthy;
@@ -860,6 +1011,9 @@ app.get(['/health', '/api/health'], async (req, res) => {
                 stats
             },
             diskSpace,
+            auth: {
+                hashPool: passwordHasher ? passwordHasher.getStats() : null
+            },
             uptime: process.uptime(),
             timestamp: new Date().toISOString()
         });
@@ -935,8 +1089,22 @@ app.get('/api/database/export', requireAuth, async (req, res) => {
 async function shutdown() {
     logger.info('Shutting down gracefully...');
     try {
+        sessionStore.stopSweeper();
+        clearInterval(usageReconcileTimer);
+        stopDiskSpaceSampler();
+        metrics.stopDefaultMetrics();
+        if (logArchiver) {
+            logArchiver.stop();
+        }
+        if (auditLogger) {
+            auditLogger.close();
+        }
         await storage.close();
         logger.info('Storage connections closed');
+        if (passwordHasher) {
+            await passwordHasher.close();
+        }
+        await jsonParserPool.close();
         process.exit(0);
     } catch (err) {
         logger.logError(err, { context: 'Graceful shutdown' });
@@ -954,6 +1122,9 @@ process.on('SIGINT', shutdown);
 if (require.main === module) {
     initStorage()
         .then(() => {
+            startDiskSpaceSampler();
+            metrics.startDefaultMetrics();
+
             app.listen(PORT, () => {
                 logger.info('Server started', {
                     version: '2.3.0',
@@ -0,0 +1,328 @@
+/**
+ * AuditLogger - batched asynchronous writer для audit_logs
+ *
+ * Мутации (SQLiteStorage, v1 routes) ставятся в in-memory очередь вызовом
+ * record() - это O(1) без обращения к БД. Фоновый flush:
+ * - считает field-level diff между before/after (вместо полных snapshot'ов)
+ * - пишет пачку одной транзакцией (один fsync на batch)
+ * - уступает event loop между порциями diff'ов
+ *
+ * Формат `changes`: [{ op: 'set'|'add'|'remove', path: 'services.3.price', from, to }]
+ * snapshot_before / snapshot_after не заполняются.
+ */
+
+const logger = require('../utils/logger');
+
+// Сколько записей считать diff'ом между уступками event loop
+const DIFF_CHUNK_SIZE = 25;
+
+// Ограничения на размер diff
+const MAX_CHANGES = 500;
+const MAX_VALUE_LENGTH = 1024;
+
+class AuditLogger {
+    /**
+     * @param {Object} options
+     * @param {Database} options.db - better-sqlite3 connection (storage.db)
+     * @param {number} [options.flushInterval] - Период flush (ms)
+     * @param {number} [options.batchSize] - Записей в одной транзакции
+     * @param {number} [options.maxQueue] - При переполнении flush выполняется синхронно
+     */
+    constructor(options = {}) {
+        if (!options.db) {
+            throw new Error('AuditLogger requires a database connection');
+        }
+
+        this.db = options.db;
+        this.flushInterval = options.flushInterval || parseInt(process.env.AUDIT_FLUSH_INTERVAL_MS) || 1000;
+        this.batchSize = options.batchSize || 200;
+        this.maxQueue = options.maxQueue || 10000;
+
+        this.queue = [];
+        this.flushing = false;
+        this.flushScheduled = false;
+        this.closed = false;
+
+        this.stats = {
+            recorded: 0,
+            written: 0,
+            skipped: 0,
+            failed: 0,
+            forcedFlushes: 0,
+            lastFlushMs: 0
+        };
+
+        this.insertStmt = this.db.prepare(`
+            INSERT INTO audit_logs (
+                entity_type, entity_id, action, changes,
+                user_id, user_ip, user_agent, organization_id, metadata, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        `);
+        this.insertBatch = this.db.transaction((rows) => {
+            for (const row of rows) {
+                this.insertStmt.run(...row);
+            }
+        });
+
+        this.timer = setInterval(() => this.flush(), this.flushInterval);
+        this.timer.unref();
+    }
+
+    /**
+     * Поставить мутацию в очередь
+     * @param {Object} entry
+     * @param {string} entry.entityType - 'estimate' | 'catalog' | 'settings' | 'user' | 'organization'
+     * @param {string} entry.entityId
+     * @param {string} entry.action - 'create' | 'update' | 'delete' | 'restore' | 'rename' | 'share' ...
+     * @param {string|Object} [entry.before] - Состояние до (JSON string или объект)
+     * @param {string|Object} [entry.after] - Состояние после
+     * @param {string} entry.userId
+     * @param {string} entry.organizationId
+     * @param {string} [entry.ip]
+     * @param {string} [entry.userAgent]
+     * @param {Object} [entry.metadata]
+     */
+    record(entry) {
+        if (this.closed) return;
+
+        this.queue.push({ ...entry, createdAt: Math.floor(Date.now() / 1000) });
+        this.stats.recorded++;
+
+        if (this.queue.length >= this.maxQueue) {
+            // Back-pressure: audit не теряем, платим задержкой текущего запроса
+            this.stats.forcedFlushes++;
+            this.flushSync();
+        } else if (this.queue.length >= this.batchSize && !this.flushScheduled) {
+            this.flushScheduled = true;
+            setImmediate(() => {
+                this.flushScheduled = false;
+                this.flush();
+            });
+        }
+    }
+
+    /**
+     * record() с контекстом из Express request (user, ip, user-agent)
+     */
+    recordRequest(req, entry) {
+        this.record({
+            userId: req.user?.id,
+            organizationId: req.user?.organization_id,
+            ip: req.ip,
+            userAgent: req.get('user-agent'),
+            ...entry
+        });
+    }
+
+    /**
+     * Асинхронный flush очереди порциями по batchSize
+     * @returns {Promise<void>}
+     */
+    async flush() {
+        if (this.flushing || this.queue.length === 0) return;
+        this.flushing = true;
+
+        try {
+            while (this.queue.length > 0) {
+                const batch = this.queue.splice(0, this.batchSize);
+                const rows = [];
+
+                for (let i = 0; i < batch.length; i++) {
+                    const row = this._toRow(batch[i]);
+                    if (row) rows.push(row);
+
+                    if ((i + 1) % DIFF_CHUNK_SIZE === 0) {
+                        await new Promise(resolve => setImmediate(resolve));
+                    }
+                }
+
+                this._write(rows);
+                await new Promise(resolve => setImmediate(resolve));
+            }
+        } finally {
+            this.flushing = false;
+        }
+    }
+
+    /**
+     * Синхронный flush (переполнение очереди, shutdown)
+     */
+    flushSync() {
+        const batch = this.queue.splice(0, this.queue.length);
+        const rows = [];
+        for (const entry of batch) {
+            const row = this._toRow(entry);
+            if (row) rows.push(row);
+        }
+        this._write(rows);
+    }
+
+    /**
+     * Остановить таймер и дописать очередь
+     */
+    close() {
+        clearInterval(this.timer);
+        this.flushSync();
+        this.closed = true;
+    }
+
+    getStats() {
+        return {
+            queued: this.queue.length,
+            ...this.stats
+        };
+    }
+
+    /**
+     * Преобразовать запись очереди в строку audit_logs (с diff)
+     * @private
+     */
+    _toRow(entry) {
+        let changes = null;
+        let truncated = false;
+
+        if (entry.before !== undefined || entry.after !== undefined) {
+            try {
+                const result = diff(parseState(entry.before), parseState(entry.after));
+                changes = result.changes;
+                truncated = result.truncated;
+            } catch (err) {
+                changes = [{ op: 'set', path: '', error: 'diff failed' }];
+            }
+
+            // Обновление без изменений - не пишем
+            if (entry.action === 'update' && changes.length === 0) {
+                this.stats.skipped++;
+                return null;
+            }
+        }
+
+        const metadata = truncated ? { ...entry.metadata, changesTruncated: true } : entry.metadata;
+
+        return [
+            entry.entityType,
+            String(entry.entityId),
+            entry.action,
+            changes ? JSON.stringify(changes) : null,
+            entry.userId || 'system',
+            entry.ip || null,
+            entry.userAgent || null,
+            entry.organizationId || 'system',
+            metadata ? JSON.stringify(metadata) : null,
+            entry.createdAt
+        ];
+    }
+
+    /**
+     * @private
+     */
+    _write(rows) {
+        if (rows.length === 0) return;
+
+        const start = Date.now();
+        try {
+            this.insertBatch(rows);
+            this.stats.written += rows.length;
+        } catch (err) {
+            this.stats.failed += rows.length;
+            logger.logError(err, { context: 'Audit log flush', rows: rows.length });
+        }
+        this.stats.lastFlushMs = Date.now() - start;
+    }
+}
+
+// ============================================================================
+// Field-level diff
+// ============================================================================
+
+function parseState(state) {
+    if (state === undefined || state === null) return {};
+    if (typeof state === 'string') return JSON.parse(state);
+    return state;
+}
+
+function joinPath(path, key) {
+    return path ? `${path}.${key}` : String(key);
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+function compactValue(value) {
+    if (value === undefined) return null;
+    const json = JSON.stringify(value);
+    if (json && json.length > MAX_VALUE_LENGTH) {
+        return { truncated: true, length: json.length };
+    }
+    return value;
+}
+
+/**
+ * Field-level diff двух JSON-состояний.
+ * Объекты сравниваются по ключам, массивы - поэлементно по индексу.
+ * @param {*} before
+ * @param {*} after
+ * @returns {{changes: Array, truncated: boolean}}
+ */
+function diff(before, after) {
+    const changes = [];
+    let truncated = false;
+
+    const push = (change) => {
+        if (changes.length >= MAX_CHANGES) {
+            truncated = true;
+            return false;
+        }
+        changes.push(change);
+        return true;
+    };
+
+    const walk = (a, b, path) => {
+        if (a === b) return true;
+
+        const bothObjects = isPlainObject(a) && isPlainObject(b);
+        const bothArrays = Array.isArray(a) && Array.isArray(b);
+
+        if (bothObjects) {
+            for (const key of Object.keys(a)) {
+                const childPath = joinPath(path, key);
+                if (!(key in b)) {
+                    if (!push({ op: 'remove', path: childPath, from: compactValue(a[key]) })) return false;
+                } else if (!walk(a[key], b[key], childPath)) {
+                    return false;
+                }
+            }
+            for (const key of Object.keys(b)) {
+                if (!(key in a)) {
+                    const childPath = joinPath(path, key);
+                    if (!push({ op: 'add', path: childPath, to: compactValue(b[key]) })) return false;
+                }
+            }
+            return true;
+        }
+
+        if (bothArrays) {
+            const common = Math.min(a.length, b.length);
+            for (let i = 0; i < common; i++) {
+                if (!walk(a[i], b[i], joinPath(path, i))) return false;
+            }
+            for (let i = common; i < a.length; i++) {
+                if (!push({ op: 'remove', path: joinPath(path, i), from: compactValue(a[i]) })) return false;
+            }
+            for (let i = common; i < b.length; i++) {
+                if (!push({ op: 'add', path: joinPath(path, i), to: compactValue(b[i]) })) return false;
+            }
+            return true;
+        }
+
+        return push({ op: 'set', path, from: compactValue(a), to: compactValue(b) });
+    };
+
+    walk(before, after, '');
+    return { changes, truncated };
+}
+
+AuditLogger.diff = diff;
+
+module.exports = AuditLogger;
@@ -3,27 +3,34 @@
  * Handles user registration, login, password management
  *
  * Features:
- * - bcrypt password hashing
+ * - bcrypt password hashing (off main thread via PasswordHasher pool)
  * - Account lockout after failed attempts
  * - Email verification support
  * - Password reset tokens
  * - OAuth ready (Google)
  */
 
-const bcrypt = require('bcryptjs');
 const crypto = require('crypto');
 const logger = require('../utils/logger');
+const { BCRYPT_ROUNDS, hashWithPool, compareWithPool } = require('./PasswordHasher');
 
 class AuthService {
-    constructor(db) {
+    /**
+     * @param {Database} db - better-sqlite3 instance
+     * @param {Object} [options]
+     * @param {PasswordHasher} [options.passwordHasher] - Worker pool для bcrypt
+     *        (без него hash/compare выполняются в основном потоке)
+     */
+    constructor(db, options = {}) {
         if (!db) {
             throw new Error('Database instance is required');
         }
         this.db = db;
+        this.passwordHasher = options.passwordHasher || null;
 
         // Security configuration
         this.config = {
-            bcryptRounds: 10,  // bcrypt cost factor
+            bcryptRounds: BCRYPT_ROUNDS,  // bcrypt cost factor
             maxFailedAttempts: 5,  // Before account lockout
             lockoutDurationMinutes: 15,  // Account lockout duration
             passwordResetTokenExpiry: 3600,  // 1 hour in seconds
@@ -147,7 +154,7 @@ class AuthService {
             }
 
             // Hash password
-            const passwordHash = await bcrypt.hash(password, this.config.bcryptRounds);
+            const passwordHash = await this._hashPassword(password);
 
             // Generate user ID
             const userId = this._generateId();
@@ -221,7 +228,7 @@ class AuthService {
             }
 
             // Verify password
-            const passwordValid = await bcrypt.compare(password, user.password_hash);
+            const passwordValid = await this._comparePassword(password, user.password_hash);
 
             if (!passwordValid) {
                 // Increment failed attempts
@@ -291,7 +298,7 @@ class AuthService {
             }
 
             // Verify old password
-            const passwordValid = await bcrypt.compare(oldPassword, user.password_hash);
+            const passwordValid = await this._comparePassword(oldPassword, user.password_hash);
             if (!passwordValid) {
                 throw new Error('Current password is incorrect');
             }
@@ -302,7 +309,7 @@ class AuthService {
             }
 
             // Hash new password
-            const passwordHash = await bcrypt.hash(newPassword, this.config.bcryptRounds);
+            const passwordHash = await this._hashPassword(newPassword);
             const now = Math.floor(Date.now() / 1000);
 
             // Update password
@@ -365,6 +372,20 @@ class AuthService {
         }
     }
 
+    /**
+     * Hash password (worker pool if configured)
+     */
+    _hashPassword(password) {
+        return hashWithPool(this.passwordHasher, password, this.config.bcryptRounds);
+    }
+
+    /**
+     * Compare password with stored hash (worker pool if configured)
+     */
+    _comparePassword(password, hash) {
+        return compareWithPool(this.passwordHasher, password, hash);
+    }
+
     /**
      * Validate email format
      */
@@ -0,0 +1,210 @@
+/**
+ * JsonParserPool - worker pool для разбора больших JSON тел
+ *
+ * JSON.parse импорта или каталога на десятки MB занимает основной поток на
+ * сотни миллисекунд. Пул переносит разбор и валидацию (utils/jsonBody) в
+ * worker_threads; основной поток JSON.parse больших тел не выполняет и только
+ * получает готовый объект (structured clone из воркера).
+ *
+ * Features:
+ * - Fixed-size pool (воркеры пересоздаются при падении)
+ * - Буфер тела передаётся через transfer list (без копирования)
+ * - Bounded queue с back-pressure (JSON_POOL_SATURATED → 503)
+ */
+
+const path = require('path');
+const os = require('os');
+const { Worker } = require('worker_threads');
+const logger = require('../utils/logger');
+const { bodyError } = require('../utils/jsonBody');
+
+const WORKER_PATH = path.join(__dirname, 'jsonParseWorker.js');
+
+class JsonParserPool {
+    /**
+     * @param {Object} [options]
+     * @param {number} [options.size] - Количество воркеров (default: CPU - 1, от 1 до 2)
+     * @param {number} [options.maxQueue] - Максимум тел в очереди ожидания
+     */
+    constructor(options = {}) {
+        const cpuCount = os.cpus().length || 1;
+
+        this.size = options.size || parseInt(process.env.JSON_POOL_SIZE) || Math.min(2, Math.max(1, cpuCount - 1));
+        this.maxQueue = options.maxQueue || parseInt(process.env.JSON_POOL_MAX_QUEUE) || 16;
+
+        this.workers = [];
+        this.idle = [];
+        this.queue = [];
+        this.tasks = new Map();
+        this.nextTaskId = 1;
+        this.closed = false;
+
+        this.stats = {
+            parsed: 0,
+            failed: 0,
+            rejected: 0,
+            workerRestarts: 0,
+            bytes: 0,
+            workerParseMs: 0
+        };
+
+        for (let i = 0; i < this.size; i++) {
+            this._spawnWorker();
+        }
+    }
+
+    /**
+     * Разобрать и провалидировать JSON в воркере.
+     * Буфер передаётся воркеру и после вызова в основном потоке недоступен.
+     * @param {Buffer} buffer - Тело запроса (UTF-8)
+     * @param {string} [validate] - Имя валидатора (utils/jsonBody VALIDATORS)
+     * @returns {Promise<*>} Разобранное тело
+     */
+    parse(buffer, validate = 'object') {
+        if (this.closed) {
+            return Promise.reject(new Error('JSON parser pool is closed'));
+        }
+
+        if (this.idle.length === 0 && this.queue.length >= this.maxQueue) {
+            this.stats.rejected++;
+            logger.warn('JSON parser pool saturated', {
+                queueDepth: this.queue.length,
+                maxQueue: this.maxQueue
+            });
+            return Promise.reject(bodyError('Server is busy processing uploads. Please retry shortly',
+                'JSON_POOL_SATURATED', 503));
+        }
+
+        return new Promise((resolve, reject) => {
+            this.queue.push({
+                id: this.nextTaskId++,
+                buffer: transferable(buffer),
+                validate,
+                resolve,
+                reject,
+                worker: null
+            });
+            this._dispatch();
+        });
+    }
+
+    /**
+     * Метрики пула
+     */
+    getStats() {
+        return {
+            size: this.size,
+            busy: this.size - this.idle.length,
+            queueDepth: this.queue.length,
+            maxQueue: this.maxQueue,
+            ...this.stats
+        };
+    }
+
+    /**
+     * Остановить все воркеры (graceful shutdown)
+     */
+    async close() {
+        this.closed = true;
+
+        const pending = [...this.queue, ...this.tasks.values()];
+        this.queue = [];
+        this.tasks.clear();
+        for (const task of pending) {
+            task.reject(new Error('JSON parser pool is closed'));
+        }
+
+        await Promise.all(this.workers.map(worker => worker.terminate()));
+        this.workers = [];
+        this.idle = [];
+    }
+
+    /**
+     * @private
+     */
+    _dispatch() {
+        while (this.idle.length > 0 && this.queue.length > 0) {
+            const worker = this.idle.pop();
+            const task = this.queue.shift();
+
+            task.worker = worker;
+            this.tasks.set(task.id, task);
+            this.stats.bytes += task.buffer.byteLength;
+
+            worker.ref();
+            worker.postMessage(
+                { id: task.id, buffer: task.buffer, validate: task.validate },
+                [task.buffer]
+            );
+            task.buffer = null;
+        }
+    }
+
+    /**
+     * @private
+     */
+    _spawnWorker() {
+        const worker = new Worker(WORKER_PATH);
+        worker.unref();
+
+        worker.on('message', ({ id, result, parseMs, error, code, status }) => {
+            const task = this.tasks.get(id);
+            this.tasks.delete(id);
+            this.idle.push(worker);
+            worker.unref();
+
+            if (task) {
+                if (error) {
+                    this.stats.failed++;
+                    task.reject(code ? bodyError(error, code, status) : new Error(error));
+                } else {
+                    this.stats.parsed++;
+                    this.stats.workerParseMs += parseMs;
+                    task.resolve(result);
+                }
+            }
+
+            this._dispatch();
+        });
+
+        worker.on('error', (err) => {
+            logger.logError(err, { context: 'JSON parse worker' });
+        });
+
+        worker.on('exit', (code) => {
+            this.workers = this.workers.filter(w => w !== worker);
+            this.idle = this.idle.filter(w => w !== worker);
+
+            for (const [id, task] of this.tasks) {
+                if (task.worker === worker) {
+                    this.tasks.delete(id);
+                    this.stats.failed++;
+                    task.reject(new Error(`JSON parse worker exited with code ${code}`));
+                }
+            }
+
+            if (!this.closed) {
+                this.stats.workerRestarts++;
+                this._spawnWorker();
+                this._dispatch();
+            }
+        });
+
+        this.workers.push(worker);
+        this.idle.push(worker);
+        return worker;
+    }
+}
+
+/**
+ * ArrayBuffer, который можно передать в transfer list.
+ * Маленькие Buffer живут в общем pool - их копируем.
+ */
+function transferable(buffer) {
+    if (buffer.byteOffset === 0 && buffer.byteLength === buffer.buffer.byteLength) {
+        return buffer.buffer;
+    }
+    return buffer.buffer.slice(buffer.byteOffset, buffer.byteOffset + buffer.byteLength);
+}
+
+module.exports = JsonParserPool;
@@ -0,0 +1,385 @@
+/**
+ * LogArchiver - сегментный архив audit_logs / auth_logs
+ *
+ * Закрытые временные диапазоны (UTC-сутки старше retentionDays) переносятся
+ * из quotes.db в сжатые сегменты `<dir>/<table>/<YYYY-MM-DD>.<part>.ndjson.gz`.
+ * Для каждого сегмента в index.json хранится маленький индекс: диапазон
+ * времени и id, количество строк, множества org / user / entity.
+ * query() распаковывает только сегменты, чей индекс может совпасть с фильтром.
+ *
+ * Порядок записи: сегмент (tmp + rename) → index.json → DELETE из SQLite.
+ * Если процесс упал после index.json, строки с уже заархивированными id
+ * при следующем запуске просто удаляются, без повторной записи.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const readline = require('readline');
+const { promisify } = require('util');
+const logger = require('../utils/logger');
+
+const gzip = promisify(zlib.gzip);
+
+const DAY_SECONDS = 24 * 60 * 60;
+
+// Множества в индексе сегмента ограничены - при переполнении null ("любое значение")
+const MAX_INDEX_VALUES = 1000;
+
+// Какие колонки индексировать для каждой таблицы
+const TABLES = {
+    audit_logs: {
+        organization: row => row.organization_id,
+        user: row => row.user_id,
+        entity: row => `${row.entity_type}:${row.entity_id}`
+    },
+    auth_logs: {
+        organization: null,
+        user: row => row.user_id,
+        entity: null
+    }
+};
+
+class LogArchiver {
+    /**
+     * @param {Object} options
+     * @param {Database} options.db - better-sqlite3 connection (storage.db)
+     * @param {string} [options.dir] - Каталог архива
+     * @param {number} [options.retentionDays] - Сколько суток логов держать в SQLite
+     */
+    constructor(options = {}) {
+        if (!options.db) {
+            throw new Error('LogArchiver requires a database connection');
+        }
+
+        this.db = options.db;
+        this.dir = options.dir || process.env.LOG_ARCHIVE_DIR || path.join(process.cwd(), 'db', 'archive');
+        this.retentionDays = options.retentionDays || parseInt(process.env.LOG_ARCHIVE_AFTER_DAYS) || 30;
+
+        this.index = null;
+        this.running = false;
+        this.timer = null;
+    }
+
+    /**
+     * Перенести в архив все закрытые сутки старше retentionDays
+     * @returns {Promise<{segments: number, rows: number}>}
+     */
+    async archive() {
+        if (this.running) return { segments: 0, rows: 0 };
+        this.running = true;
+
+        const result = { segments: 0, rows: 0 };
+
+        try {
+            await this._loadIndex();
+
+            const now = Math.floor(Date.now() / 1000);
+            const cutoff = startOfDay(now - this.retentionDays * DAY_SECONDS);
+
+            for (const table of Object.keys(TABLES)) {
+                const nextOldest = this.db.prepare(
+                    `SELECT MIN(created_at) AS oldest FROM ${table} WHERE created_at >= ? AND created_at < ?`
+                );
+
+                // Переходим сразу к следующим суткам с данными (пустые дни не сканируем)
+                let cursor = 0;
+                for (;;) {
+                    const { oldest } = nextOldest.get(cursor, cutoff);
+                    if (oldest === null) break;
+
+                    const day = startOfDay(oldest);
+                    const archived = await this._archiveDay(table, day);
+                    if (archived > 0) {
+                        result.segments++;
+                        result.rows += archived;
+                    }
+                    cursor = day + DAY_SECONDS;
+                }
+            }
+
+            if (result.rows > 0) {
+                logger.info('Logs archived', result);
+            }
+        } catch (err) {
+            logger.logError(err, { context: 'Log archive' });
+        } finally {
+            this.running = false;
+        }
+
+        return result;
+    }
+
+    /**
+     * Поиск по архиву и по ещё не заархивированным строкам.
+     * Распаковываются только сегменты, чей индекс допускает совпадение.
+     * @param {Object} filter
+     * @param {string} filter.table - 'audit_logs' | 'auth_logs'
+     * @param {number} [filter.from] - unix seconds (включительно)
+     * @param {number} [filter.to] - unix seconds (включительно)
+     * @param {string} [filter.organizationId]
+     * @param {string} [filter.userId]
+     * @param {string} [filter.entityType]
+     * @param {string} [filter.entityId]
+     * @param {number} [filter.limit]
+     * @returns {Promise<{rows: Array, scannedSegments: number, totalSegments: number}>}
+     */
+    async query(filter) {
+        const spec = TABLES[filter.table];
+        if (!spec) {
+            throw new Error(`Unknown log table: ${filter.table}`);
+        }
+
+        await this._loadIndex();
+
+        const from = filter.from || 0;
+        const to = filter.to || Number.MAX_SAFE_INTEGER;
+        const limit = Math.min(filter.limit || 1000, 10000);
+        const matches = rowMatcher(filter, from, to);
+
+        // 1. Живые строки из SQLite (самые свежие)
+        const rows = this._queryLive(filter, from, to, limit);
+
+        // 2. Сегменты, новые первыми
+        const segments = this.index.segments
+            .filter(segment => segment.table === filter.table)
+            .sort((a, b) => b.from - a.from);
+
+        let scannedSegments = 0;
+        for (const segment of segments) {
+            if (rows.length >= limit) break;
+            if (!segmentMayMatch(segment, filter, from, to)) continue;
+
+            scannedSegments++;
+            await this._scanSegment(segment, (row) => {
+                if (matches(row)) rows.push(row);
+                return rows.length < limit;
+            });
+        }
+
+        return { rows, scannedSegments, totalSegments: segments.length };
+    }
+
+    /**
+     * Статистика архива (для /metrics)
+     */
+    getStats() {
+        const segments = this.index ? this.index.segments : [];
+        return {
+            segments: segments.length,
+            rows: segments.reduce((sum, s) => sum + s.count, 0),
+            bytes: segments.reduce((sum, s) => sum + s.bytes, 0)
+        };
+    }
+
+    /**
+     * Запустить периодическую архивацию
+     * @param {number} [intervalMs]
+     */
+    start(intervalMs = parseInt(process.env.LOG_ARCHIVE_INTERVAL_MS) || 6 * 60 * 60 * 1000) {
+        if (this.timer) return;
+
+        this.archive();
+        this.timer = setInterval(() => this.archive(), intervalMs);
+        this.timer.unref();
+    }
+
+    stop() {
+        if (this.timer) {
+            clearInterval(this.timer);
+            this.timer = null;
+        }
+    }
+
+    /**
+     * Заархивировать одни сутки таблицы
+     * @private
+     * @returns {Promise<number>} Количество перенесённых строк
+     */
+    async _archiveDay(table, dayStart) {
+        const dayEnd = dayStart + DAY_SECONDS;
+        const day = new Date(dayStart * 1000).toISOString().slice(0, 10);
+
+        const rows = this.db.prepare(
+            `SELECT * FROM ${table} WHERE created_at >= ? AND created_at < ? ORDER BY id`
+        ).all(dayStart, dayEnd);
+
+        if (rows.length === 0) return 0;
+
+        // Строки, уже попавшие в сегмент до сбоя, повторно не пишем
+        const existing = this.index.segments.filter(s => s.table === table && s.day === day);
+        const isArchived = (row) => existing.some(s => row.id >= s.minId && row.id <= s.maxId);
+        const fresh = rows.filter(row => !isArchived(row));
+
+        if (fresh.length > 0) {
+            const segment = await this._writeSegment(table, day, existing.length, fresh);
+            this.index.segments.push(segment);
+            await this._saveIndex();
+        }
+
+        // Удаляем только то, что видели (строки, вставленные после SELECT, останутся)
+        const maxId = rows[rows.length - 1].id;
+        this.db.prepare(
+            `DELETE FROM ${table} WHERE created_at >= ? AND created_at < ? AND id <= ?`
+        ).run(dayStart, dayEnd, maxId);
+
+        return fresh.length;
+    }
+
+    /**
+     * @private
+     */
+    async _writeSegment(table, day, part, rows) {
+        const spec = TABLES[table];
+        const tableDir = path.join(this.dir, table);
+        await fs.promises.mkdir(tableDir, { recursive: true });
+
+        const file = path.join(table, `${day}.${part}.ndjson.gz`);
+        const fullPath = path.join(this.dir, file);
+        const tmpPath = `${fullPath}.tmp`;
+
+        const body = rows.map(row => JSON.stringify(row)).join('\n') + '\n';
+        const compressed = await gzip(body);
+
+        await fs.promises.writeFile(tmpPath, compressed);
+        await fs.promises.rename(tmpPath, fullPath);
+
+        return {
+            table,
+            day,
+            file,
+            count: rows.length,
+            bytes: compressed.length,
+            from: rows.reduce((min, row) => Math.min(min, row.created_at), Infinity),
+            to: rows.reduce((max, row) => Math.max(max, row.created_at), -Infinity),
+            minId: rows[0].id,
+            maxId: rows[rows.length - 1].id,
+            organizations: collectValues(rows, spec.organization),
+            users: collectValues(rows, spec.user),
+            entities: collectValues(rows, spec.entity)
+        };
+    }
+
+    /**
+     * Потоково распаковать сегмент; visit() возвращает false для остановки
+     * @private
+     */
+    async _scanSegment(segment, visit) {
+        const stream = fs.createReadStream(path.join(this.dir, segment.file)).pipe(zlib.createGunzip());
+        const lines = readline.createInterface({ input: stream, crlfDelay: Infinity });
+
+        try {
+            for await (const line of lines) {
+                if (!line) continue;
+                if (!visit(JSON.parse(line))) break;
+            }
+        } finally {
+            lines.close();
+            stream.destroy();
+        }
+    }
+
+    /**
+     * @private
+     */
+    _queryLive(filter, from, to, limit) {
+        const where = ['created_at >= ?', 'created_at <= ?'];
+        const params = [from, to];
+
+        if (filter.userId) {
+            where.push('user_id = ?');
+            params.push(filter.userId);
+        }
+        if (filter.table === 'audit_logs') {
+            if (filter.organizationId) {
+                where.push('organization_id = ?');
+                params.push(filter.organizationId);
+            }
+            if (filter.entityType) {
+                where.push('entity_type = ?');
+                params.push(filter.entityType);
+            }
+            if (filter.entityId) {
+                where.push('entity_id = ?');
+                params.push(filter.entityId);
+            }
+        }
+
+        params.push(limit);
+        return this.db.prepare(
+            `SELECT * FROM ${filter.table} WHERE ${where.join(' AND ')} ORDER BY created_at DESC LIMIT ?`
+        ).all(...params);
+    }
+
+    /**
+     * @private
+     */
+    async _loadIndex() {
+        if (this.index) return;
+
+        try {
+            this.index = JSON.parse(await fs.promises.readFile(path.join(this.dir, 'index.json'), 'utf8'));
+        } catch (err) {
+            if (err.code !== 'ENOENT') throw err;
+            this.index = { version: 1, segments: [] };
+        }
+    }
+
+    /**
+     * @private
+     */
+    async _saveIndex() {
+        const indexPath = path.join(this.dir, 'index.json');
+        await fs.promises.writeFile(`${indexPath}.tmp`, JSON.stringify(this.index));
+        await fs.promises.rename(`${indexPath}.tmp`, indexPath);
+    }
+}
+
+function startOfDay(unixSeconds) {
+    return unixSeconds - (unixSeconds % DAY_SECONDS);
+}
+
+function collectValues(rows, extract) {
+    if (!extract) return null;
+
+    const values = new Set();
+    for (const row of rows) {
+        const value = extract(row);
+        if (value === null || value === undefined) continue;
+        values.add(value);
+        if (values.size > MAX_INDEX_VALUES) return null;
+    }
+    return [...values];
+}
+
+/**
+ * Может ли сегмент содержать строки под фильтр (по индексу, без распаковки)
+ */
+function segmentMayMatch(segment, filter, from, to) {
+    if (segment.to < from || segment.from > to) return false;
+
+    const includes = (values, value) => !value || values === null || values.includes(value);
+
+    if (!includes(segment.organizations, filter.organizationId)) return false;
+    if (!includes(segment.users, filter.userId)) return false;
+
+    if (segment.entities !== null && filter.entityType) {
+        if (filter.entityId) {
+            return segment.entities.includes(`${filter.entityType}:${filter.entityId}`);
+        }
+        return segment.entities.some(entity => entity.startsWith(`${filter.entityType}:`));
+    }
+
+    return true;
+}
+
+function rowMatcher(filter, from, to) {
+    return (row) =>
+        row.created_at >= from && row.created_at <= to &&
+        (!filter.organizationId || row.organization_id === filter.organizationId) &&
+        (!filter.userId || row.user_id === filter.userId) &&
+        (!filter.entityType || row.entity_type === filter.entityType) &&
+        (!filter.entityId || row.entity_id === filter.entityId);
+}
+
+module.exports = LogArchiver;
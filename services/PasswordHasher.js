@@ -0,0 +1,317 @@
+/**
+ * PasswordHasher - bcrypt worker pool
+ *
+ * Выносит bcrypt hash/compare из основного потока в фиксированный пул
+ * worker_threads. Каждая операция стоит десятки миллисекунд CPU, поэтому
+ * всплеск логинов больше не блокирует остальные запросы.
+ *
+ * Features:
+ * - Fixed-size pool (воркеры пересоздаются при падении)
+ * - Bounded queue с back-pressure (HASH_POOL_SATURATED → 429)
+ * - Метрики: глубина очереди, latency хеширования (avg/p95/max)
+ * - hashWithPool / compareWithPool / sendPoolSaturated - общие хелперы для роутов
+ */
+
+const path = require('path');
+const os = require('os');
+const { Worker } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+const logger = require('../utils/logger');
+
+const WORKER_PATH = path.join(__dirname, 'passwordHashWorker.js');
+
+// Сколько последних замеров latency хранить для перцентилей
+const LATENCY_SAMPLE_SIZE = 256;
+
+// bcrypt cost factor (единый для пула, AuthService и роутов)
+const BCRYPT_ROUNDS = 10;
+
+class PasswordHasher {
+    /**
+     * @param {Object} [options]
+     * @param {number} [options.size] - Количество воркеров (default: CPU - 1, от 1 до 4)
+     * @param {number} [options.maxQueue] - Максимум задач в очереди ожидания
+     * @param {number} [options.rounds] - bcrypt cost factor по умолчанию
+     */
+    constructor(options = {}) {
+        const cpuCount = os.cpus().length || 1;
+
+        this.size = options.size || parseInt(process.env.HASH_POOL_SIZE) || Math.min(4, Math.max(1, cpuCount - 1));
+        this.maxQueue = options.maxQueue || parseInt(process.env.HASH_POOL_MAX_QUEUE) || 64;
+        this.rounds = options.rounds || BCRYPT_ROUNDS;
+
+        this.workers = [];
+        this.idle = [];
+        this.queue = [];
+        this.tasks = new Map();
+        this.nextTaskId = 1;
+        this.closed = false;
+
+        this.stats = {
+            completed: 0,
+            failed: 0,
+            rejected: 0,
+            workerRestarts: 0,
+            latencyTotalMs: 0,
+            latencyMaxMs: 0,
+            queueWaitTotalMs: 0
+        };
+        this.latencySamples = [];
+
+        for (let i = 0; i < this.size; i++) {
+            this._spawnWorker();
+        }
+    }
+
+    /**
+     * Хешировать пароль
+     * @param {string} password - Plain text password
+     * @param {number} [rounds] - bcrypt cost factor
+     * @returns {Promise<string>} bcrypt hash
+     */
+    hash(password, rounds = this.rounds) {
+        return this._submit({ op: 'hash', password, rounds });
+    }
+
+    /**
+     * Сравнить пароль с хешем
+     * @param {string} password - Plain text password
+     * @param {string} hash - bcrypt hash из БД
+     * @returns {Promise<boolean>}
+     */
+    compare(password, hash) {
+        return this._submit({ op: 'compare', password, hash });
+    }
+
+    /**
+     * Метрики пула (для /health и мониторинга)
+     */
+    getStats() {
+        const sorted = [...this.latencySamples].sort((a, b) => a - b);
+        const percentile = (p) => sorted.length
+            ? sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))]
+            : 0;
+        const completed = this.stats.completed + this.stats.failed;
+
+        return {
+            size: this.size,
+            busy: this.size - this.idle.length,
+            queueDepth: this.queue.length,
+            maxQueue: this.maxQueue,
+            completed: this.stats.completed,
+            failed: this.stats.failed,
+            rejected: this.stats.rejected,
+            workerRestarts: this.stats.workerRestarts,
+            latencyMs: {
+                avg: completed ? Math.round(this.stats.latencyTotalMs / completed) : 0,
+                p50: Math.round(percentile(0.5)),
+                p95: Math.round(percentile(0.95)),
+                max: Math.round(this.stats.latencyMaxMs)
+            },
+            queueWaitAvgMs: completed ? Math.round(this.stats.queueWaitTotalMs / completed) : 0
+        };
+    }
+
+    /**
+     * Остановить все воркеры (graceful shutdown)
+     */
+    async close() {
+        this.closed = true;
+
+        const pending = [...this.queue, ...this.tasks.values()];
+        this.queue = [];
+        this.tasks.clear();
+        for (const task of pending) {
+            task.reject(new Error('Password hasher is closed'));
+        }
+
+        await Promise.all(this.workers.map(worker => worker.terminate()));
+        this.workers = [];
+        this.idle = [];
+    }
+
+    /**
+     * Поставить задачу в пул
+     * @private
+     */
+    _submit(payload) {
+        if (this.closed) {
+            return Promise.reject(new Error('Password hasher is closed'));
+        }
+
+        if (this.idle.length === 0 && this.queue.length >= this.maxQueue) {
+            this.stats.rejected++;
+            logger.warn('Password hash pool saturated', {
+                queueDepth: this.queue.length,
+                maxQueue: this.maxQueue
+            });
+
+            const error = new Error('Too many authentication requests. Please retry shortly');
+            error.code = 'HASH_POOL_SATURATED';
+            error.status = 429;
+            return Promise.reject(error);
+        }
+
+        return new Promise((resolve, reject) => {
+            const task = {
+                id: this.nextTaskId++,
+                payload,
+                resolve,
+                reject,
+                enqueuedAt: process.hrtime.bigint(),
+                startedAt: null,
+                worker: null
+            };
+
+            this.queue.push(task);
+            this._dispatch();
+        });
+    }
+
+    /**
+     * Раздать задачи свободным воркерам
+     * @private
+     */
+    _dispatch() {
+        while (this.idle.length > 0 && this.queue.length > 0) {
+            const worker = this.idle.pop();
+            const task = this.queue.shift();
+
+            task.worker = worker;
+            task.startedAt = process.hrtime.bigint();
+            this.tasks.set(task.id, task);
+
+            // Пока воркер занят, он удерживает event loop (ответ не потеряется)
+            worker.ref();
+            worker.postMessage({ id: task.id, ...task.payload });
+        }
+    }
+
+    /**
+     * Создать воркер и подписаться на события
+     * @private
+     */
+    _spawnWorker() {
+        const worker = new Worker(WORKER_PATH);
+
+        // Пул не должен удерживать процесс (тесты, CLI-скрипты)
+        worker.unref();
+
+        worker.on('message', ({ id, result, error }) => {
+            const task = this.tasks.get(id);
+            this.tasks.delete(id);
+            this.idle.push(worker);
+            worker.unref();
+
+            if (task) {
+                this._recordLatency(task, !!error);
+                if (error) {
+                    task.reject(new Error(error));
+                } else {
+                    task.resolve(result);
+                }
+            }
+
+            this._dispatch();
+        });
+
+        worker.on('error', (err) => {
+            logger.logError(err, { context: 'Password hash worker' });
+        });
+
+        worker.on('exit', (code) => {
+            this._removeWorker(worker);
+
+            // Задача, которую выполнял упавший воркер, завершается ошибкой
+            for (const [id, task] of this.tasks) {
+                if (task.worker === worker) {
+                    this.tasks.delete(id);
+                    this._recordLatency(task, true);
+                    task.reject(new Error(`Password hash worker exited with code ${code}`));
+                }
+            }
+
+            if (!this.closed) {
+                this.stats.workerRestarts++;
+                this._spawnWorker();
+                this._dispatch();
+            }
+        });
+
+        this.workers.push(worker);
+        this.idle.push(worker);
+        return worker;
+    }
+
+    /**
+     * @private
+     */
+    _removeWorker(worker) {
+        this.workers = this.workers.filter(w => w !== worker);
+        this.idle = this.idle.filter(w => w !== worker);
+    }
+
+    /**
+     * @private
+     */
+    _recordLatency(task, failed) {
+        const now = process.hrtime.bigint();
+        const latencyMs = Number(now - task.startedAt) / 1e6;
+        const waitMs = Number(task.startedAt - task.enqueuedAt) / 1e6;
+
+        if (failed) {
+            this.stats.failed++;
+        } else {
+            this.stats.completed++;
+        }
+
+        this.stats.latencyTotalMs += latencyMs;
+        this.stats.queueWaitTotalMs += waitMs;
+        this.stats.latencyMaxMs = Math.max(this.stats.latencyMaxMs, latencyMs);
+
+        this.latencySamples.push(latencyMs);
+        if (this.latencySamples.length > LATENCY_SAMPLE_SIZE) {
+            this.latencySamples.shift();
+        }
+    }
+}
+
+/**
+ * Хешировать пароль через пул (app.locals.passwordHasher), без пула - в основном потоке
+ * @param {PasswordHasher|null} hasher
+ * @param {string} password
+ * @param {number} [rounds]
+ * @returns {Promise<string>}
+ */
+function hashWithPool(hasher, password, rounds = BCRYPT_ROUNDS) {
+    return hasher ? hasher.hash(password, rounds) : bcrypt.hash(password, rounds);
+}
+
+/**
+ * Сравнить пароль с хешем через пул, без пула - в основном потоке
+ * @param {PasswordHasher|null} hasher
+ * @param {string} password
+ * @param {string} hash
+ * @returns {Promise<boolean>}
+ */
+function compareWithPool(hasher, password, hash) {
+    return hasher ? hasher.compare(password, hash) : bcrypt.compare(password, hash);
+}
+
+/**
+ * 429 если очередь хеширования переполнена (HASH_POOL_SATURATED)
+ */
+function sendPoolSaturated(res, err) {
+    res.set('Retry-After', '1');
+    return res.status(429).json({
+        success: false,
+        error: err.message,
+        code: err.code
+    });
+}
+
+module.exports = PasswordHasher;
+module.exports.BCRYPT_ROUNDS = BCRYPT_ROUNDS;
+module.exports.hashWithPool = hashWithPool;
+module.exports.compareWithPool = compareWithPool;
+module.exports.sendPoolSaturated = sendPoolSaturated;
@@ -0,0 +1,26 @@
+/**
+ * JSON Parse Worker
+ *
+ * Выполняется внутри worker_threads (см. JsonParserPool.js).
+ * Буфер тела приходит через transfer list (без копирования), JSON.parse и
+ * валидация блокируют только поток воркера. Разобранное тело возвращается
+ * вместе с временем разбора.
+ */
+
+const { parentPort } = require('worker_threads');
+const { parseJsonBody } = require('../utils/jsonBody');
+
+parentPort.on('message', ({ id, buffer, validate }) => {
+    try {
+        const started = performance.now();
+        const result = parseJsonBody(new Uint8Array(buffer), validate);
+        parentPort.postMessage({ id, result, parseMs: performance.now() - started });
+    } catch (error) {
+        parentPort.postMessage({
+            id,
+            error: error.message,
+            code: error.code,
+            status: error.status
+        });
+    }
+});
@@ -0,0 +1,28 @@
+/**
+ * Password Hash Worker
+ *
+ * Выполняется внутри worker_threads (см. PasswordHasher.js).
+ * Синхронный bcryptjs здесь безопасен - блокируется только поток воркера,
+ * а не event loop основного сервера.
+ */
+
+const { parentPort } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+parentPort.on('message', ({ id, op, password, hash, rounds }) => {
+    try {
+        let result;
+
+        if (op === 'hash') {
+            result = bcrypt.hashSync(password, rounds);
+        } else if (op === 'compare') {
+            result = bcrypt.compareSync(password, hash);
+        } else {
+            throw new Error(`Unknown password hash operation: ${op}`);
+        }
+
+        parentPort.postMessage({ id, result });
+    } catch (error) {
+        parentPort.postMessage({ id, error: error.message });
+    }
+});
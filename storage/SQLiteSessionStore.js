@@ -0,0 +1,226 @@
+/**
+ * SQLiteSessionStore - express-session store на основном соединении
+ *
+ * Заменяет connect-sqlite3 (отдельный sessions.db + отдельное соединение).
+ * Использует таблицу `sessions` из db/schema.sql через уже открытый
+ * better-sqlite3 connection SQLiteStorage.
+ *
+ * Features:
+ * - Синхронные prepared statements (без лишнего connection/event loop hop)
+ * - touch() пишет в БД не чаще чем раз в touchIntervalMs на сессию
+ * - Просроченные сессии удаляются фоновыми batch-sweep'ами,
+ *   а не отдельным DELETE на каждом запросе
+ */
+
+const session = require('express-session');
+const logger = require('../utils/logger');
+
+// Сессии без cookie.expires живут сутки (как в connect-sqlite3)
+const DEFAULT_TTL_MS = 24 * 60 * 60 * 1000;
+
+class SQLiteSessionStore extends session.Store {
+    /**
+     * @param {Object} options
+     * @param {SQLiteStorage} options.storage - Storage с открытым `db` (после init())
+     * @param {number} [options.sweepIntervalMs] - Период sweep'а просроченных сессий
+     * @param {number} [options.sweepBatchSize] - Сколько строк удалять за один DELETE
+     * @param {number} [options.touchIntervalMs] - Минимальный интервал записи touch()
+     */
+    constructor(options = {}) {
+        super();
+
+        if (!options.storage) {
+            throw new Error('SQLiteSessionStore requires a storage instance');
+        }
+
+        this.storage = options.storage;
+        this.sweepIntervalMs = options.sweepIntervalMs || 15 * 60 * 1000;
+        this.sweepBatchSize = options.sweepBatchSize || 500;
+        this.touchIntervalMs = options.touchIntervalMs || 60 * 1000;
+
+        this.db = null;
+        this.statements = null;
+        this.sweepTimer = null;
+
+        // sid → expired, как он записан в БД (для throttling touch())
+        this.storedExpiry = new Map();
+    }
+
+    /**
+     * Подготовить statements на текущем соединении storage.
+     * Соединение открывается в storage.init(), поэтому делаем это лениво.
+     * @private
+     */
+    _prepare() {
+        const db = this.storage.db;
+
+        if (!db) {
+            throw new Error('Session store used before storage initialization');
+        }
+
+        if (this.db === db) {
+            return this.statements;
+        }
+
+        this.db = db;
+        this.statements = {
+            get: db.prepare('SELECT sess, expired FROM sessions WHERE sid = ? AND expired > ?'),
+            upsert: db.prepare(`
+                INSERT INTO sessions (sid, sess, expired) VALUES (?, ?, ?)
+                ON CONFLICT(sid) DO UPDATE SET sess = excluded.sess, expired = excluded.expired
+            `),
+            touch: db.prepare('UPDATE sessions SET expired = ? WHERE sid = ?'),
+            destroy: db.prepare('DELETE FROM sessions WHERE sid = ?'),
+            sweep: db.prepare(`
+                DELETE FROM sessions WHERE rowid IN (
+                    SELECT rowid FROM sessions WHERE expired <= ? LIMIT ?
+                )
+            `),
+            length: db.prepare('SELECT COUNT(*) as count FROM sessions WHERE expired > ?'),
+            clear: db.prepare('DELETE FROM sessions')
+        };
+
+        return this.statements;
+    }
+
+    /**
+     * Время истечения сессии (ms)
+     * @private
+     */
+    _getExpiry(sess) {
+        if (sess && sess.cookie && sess.cookie.expires) {
+            return new Date(sess.cookie.expires).getTime();
+        }
+        return Date.now() + DEFAULT_TTL_MS;
+    }
+
+    get(sid, callback) {
+        try {
+            const row = this._prepare().get.get(sid, Date.now());
+            if (!row) {
+                this.storedExpiry.delete(sid);
+                return callback(null, null);
+            }
+            this.storedExpiry.set(sid, row.expired);
+            callback(null, JSON.parse(row.sess));
+        } catch (err) {
+            callback(err);
+        }
+    }
+
+    set(sid, sess, callback) {
+        try {
+            const expiry = this._getExpiry(sess);
+            this._prepare().upsert.run(sid, JSON.stringify(sess), expiry);
+            this.storedExpiry.set(sid, expiry);
+            callback && callback(null);
+        } catch (err) {
+            callback && callback(err);
+        }
+    }
+
+    /**
+     * Продлить сессию. express-session вызывает touch() на каждом запросе
+     * с сессией - пишем только если срок сдвинулся больше чем на touchIntervalMs.
+     */
+    touch(sid, sess, callback) {
+        try {
+            const expiry = this._getExpiry(sess);
+            const previous = this.storedExpiry.get(sid);
+
+            if (!previous || expiry - previous >= this.touchIntervalMs) {
+                this._prepare().touch.run(expiry, sid);
+                this.storedExpiry.set(sid, expiry);
+            }
+            callback && callback(null);
+        } catch (err) {
+            callback && callback(err);
+        }
+    }
+
+    destroy(sid, callback) {
+        try {
+            this._prepare().destroy.run(sid);
+            this.storedExpiry.delete(sid);
+            callback && callback(null);
+        } catch (err) {
+            callback && callback(err);
+        }
+    }
+
+    length(callback) {
+        try {
+            callback(null, this._prepare().length.get(Date.now()).count);
+        } catch (err) {
+            callback(err);
+        }
+    }
+
+    clear(callback) {
+        try {
+            this._prepare().clear.run();
+            this.storedExpiry.clear();
+            callback && callback(null);
+        } catch (err) {
+            callback && callback(err);
+        }
+    }
+
+    /**
+     * Удалить просроченные сессии пачками по sweepBatchSize,
+     * уступая event loop между пачками.
+     * @returns {Promise<number>} Количество удалённых сессий
+     */
+    async sweep() {
+        let total = 0;
+        const now = Date.now();
+
+        try {
+            const { sweep } = this._prepare();
+
+            for (;;) {
+                const { changes } = sweep.run(now, this.sweepBatchSize);
+                total += changes;
+
+                if (changes < this.sweepBatchSize) {
+                    break;
+                }
+                await new Promise(resolve => setImmediate(resolve));
+            }
+
+            for (const [sid, expiry] of this.storedExpiry) {
+                if (expiry <= now) {
+                    this.storedExpiry.delete(sid);
+                }
+            }
+
+            if (total > 0) {
+                logger.debug('Expired sessions swept', { count: total });
+            }
+        } catch (err) {
+            logger.warn('Session sweep failed', { error: err.message });
+        }
+
+        return total;
+    }
+
+    /**
+     * Запустить периодический sweep (вызывается после storage.init())
+     */
+    startSweeper() {
+        if (this.sweepTimer) return;
+
+        this.sweep();
+        this.sweepTimer = setInterval(() => this.sweep(), this.sweepIntervalMs);
+        this.sweepTimer.unref();
+    }
+
+    stopSweeper() {
+        if (this.sweepTimer) {
+            clearInterval(this.sweepTimer);
+            this.sweepTimer = null;
+        }
+    }
+}
+
+module.exports = SQLiteSessionStore;
@@ -19,6 +19,136 @@ const path = require('path');
 const fs = require('fs');
 const crypto = require('crypto');
 const { transliterate } = require('../utils');
+const metrics = require('../utils/metrics');
+const { computeOverrides, applyOverrides, validateOverrides } = require('../utils/estimateOverrides');
+
+// Планы без лимитов (max_* игнорируются)
+const UNLIMITED_PLANS = new Set(['enterprise']);
+const BYTES_PER_MB = 1024 * 1024;
+
+// Сохранения, пропущенные из-за совпадения data_hash (write elision)
+const estimateWritesElided = metrics.counter('estimate_writes_elided_total', 'Estimate saves skipped because data_hash matched the stored row');
+
+// Разобранные снимки шаблонов (общие для всех экземпляров)
+const TEMPLATE_SNAPSHOT_CACHE_SIZE = 32;
+
+// Снимки настроек scope (user-scope - по одному на пользователя)
+const SETTINGS_SNAPSHOT_CACHE_SIZE = 256;
+
+// crypto.hash (Node >= 20.12) - one-shot без объекта Hash
+const hashString = typeof crypto.hash === 'function'
+    ? (data) => crypto.hash('sha1', data)
+    : (data) => crypto.createHash('sha1').update(data).digest('hex');
+
+// Канонический JSON для data_hash: ключи объектов по алфавиту, одни и те же
+// данные дают один hash независимо от порядка ключей и пробелов в строке клиента
+function canonicalJson(value) {
+    return JSON.stringify(value, (key, val) => {
+        if (!val || typeof val !== 'object' || Array.isArray(val)) return val;
+
+        const sorted = Object.create(null);
+        for (const name of Object.keys(val).sort()) {
+            sorted[name] = val[name];
+        }
+        return sorted;
+    });
+}
+
+// Курсор shared-with-me: "<created_at>.<collaborator id>" в base64url
+function encodeSharedCursor(createdAt, id) {
+    return Buffer.from(`${createdAt}.${id}`).toString('base64url');
+}
+
+function decodeSharedCursor(cursor) {
+    if (!cursor) return null;
+
+    const match = /^(\d+)\.(\d+)$/.exec(Buffer.from(String(cursor), 'base64url').toString());
+    if (!match) {
+        const error = new Error('Invalid cursor');
+        error.code = 'INVALID_CURSOR';
+        error.status = 400;
+        throw error;
+    }
+    return { createdAt: parseInt(match[1]), id: parseInt(match[2]) };
+}
+
+/**
+ * Значение настройки -> строка settings.value и value_type
+ * (строки, объекты и массивы - JSON с типом 'string', как всегда писал PUT /api/v1/settings)
+ */
+function encodeSetting(value) {
+    if (typeof value === 'number' || typeof value === 'boolean') {
+        return { value: value.toString(), valueType: typeof value };
+    }
+    return { value: JSON.stringify(value) ?? 'null', valueType: 'string' };
+}
+
+function decodeSetting(value, valueType) {
+    if (valueType === 'number') return parseFloat(value);
+    if (valueType === 'boolean') return value === 'true';
+    return JSON.parse(value);
+}
+
+// Коллекции каталога, которые хранятся строками catalog_items: kind -> ключ в data
+const CATALOG_COLLECTIONS = { template: 'templates', category: 'categories' };
+
+function catalogError(message, code, status) {
+    const error = new Error(message);
+    error.code = code;
+    error.status = status;
+    return error;
+}
+
+/**
+ * Ключ строки каталога: id шаблона / категории (категория может быть строкой)
+ * @returns {string|null} null - у элемента нет id
+ */
+function catalogItemKey(item) {
+    if (typeof item === 'string') return item;
+    if (item && typeof item === 'object' && item.id !== undefined && item.id !== null) return String(item.id);
+    return null;
+}
+
+/**
+ * Разделить данные каталога на заголовок и строки catalog_items.
+ * Массивы templates / categories в заголовке заменяются пустыми и идут последними
+ * ключами - materializeCatalogData() подставляет в них строки без JSON.parse.
+ * Элементы без id (или с повторным id) получают ключ по позиции: '#<position>'.
+ * @returns {{header: string, items: Array<{kind, key, position, data}>}}
+ */
+function splitCatalogData(data) {
+    const header = {};
+    for (const [key, value] of Object.entries(data)) {
+        if (!(Object.values(CATALOG_COLLECTIONS).includes(key) && Array.isArray(value))) {
+            header[key] = value;
+        }
+    }
+
+    const items = [];
+    for (const [kind, collection] of Object.entries(CATALOG_COLLECTIONS)) {
+        if (!Array.isArray(data[collection])) continue;
+        header[collection] = [];
+
+        const seen = new Set();
+        data[collection].forEach((item, position) => {
+            let key = catalogItemKey(item);
+            if (key === null || seen.has(key)) {
+                key = `#${position}`;
+                while (seen.has(key)) key += '#';
+            }
+            seen.add(key);
+            items.push({ kind, key, position, data: JSON.stringify(item) ?? 'null' });
+        });
+    }
+
+    return { header: JSON.stringify(header), items };
+}
+
+function countCatalogItems(items) {
+    const counts = { template: 0, category: 0 };
+    for (const item of items) counts[item.kind]++;
+    return counts;
+}
 
 class SQLiteStorage extends StorageAdapter {
     constructor(config = {}) {
@@ -40,9 +170,21 @@ class SQLiteStorage extends StorageAdapter {
         this.db = null;
         this.initialized = false;
 
+        // Batched audit writer (services/AuditLogger), подключается после init()
+        this.auditLogger = config.auditLogger || null;
+
+        // Отладочное логирование SQL и FK-проверок (только по STORAGE_DEBUG)
+        this.debug = config.debug !== undefined ? config.debug : process.env.STORAGE_DEBUG === 'true';
+
         // Prepared statements (для производительности)
         this.statements = {};
 
+        // LRU разобранных template_snapshots: `${templateId}:${version}` → object
+        this.templateSnapshots = new Map();
+
+        // LRU снимков настроек: `${scope}:${scopeId}` → snapshot (действителен, пока версия scope та же)
+        this.settingsSnapshots = new Map();
+
         // Multi-tenancy defaults (production values)
         // ВАЖНО: Всегда используем superadmin и magellania-org как defaults
         // См. миграцию 010_superadmin_setup.sql и CLAUDE.md
@@ -68,7 +210,7 @@ class SQLiteStorage extends StorageAdapter {
 
             // Открываем БД (создается автоматически если не существует)
             this.db = new Database(this.dbPath, {
-                verbose: process.env.NODE_ENV === 'development' ? console.log : null
+                verbose: this.debug ? console.log : null
             });
 
             // ВАЖНО: Включаем FOREIGN KEY constraints (по умолчанию выключены в SQLite!)
@@ -86,6 +228,14 @@ class SQLiteStorage extends StorageAdapter {
 
             // Подготавливаем statements для производительности
             this._prepareStatements();
+            this._instrumentStatements();
+
+            // Старые БД: sharing из estimates.shared_with → estimate_collaborators
+            this._backfillCollaborators();
+            // Старые БД: interval index дат тура заполняется triggers только для новых записей
+            this._backfillTourIntervals();
+            // Старые БД: шаблоны и категории внутри catalogs.data → catalog_items
+            this._backfillCatalogItems();
 
             this.initialized = true;
             console.log(`SQLite database initialized at ${this.dbPath}`);
@@ -142,6 +292,78 @@ class SQLiteStorage extends StorageAdapter {
             WHERE id = ? AND data_version = ? AND organization_id = ?
         `);
 
+        // Версия и hash без data - для write elision в saveEstimate
+        this.statements.getEstimateHeadById = this.db.prepare(`
+            SELECT e.id, e.data_version, e.data_hash, r.template_id, r.template_version
+            FROM estimates e
+            LEFT JOIN estimate_template_refs r ON r.estimate_id = e.id
+            WHERE e.id = ? AND e.organization_id = ? AND e.deleted_at IS NULL
+        `);
+
+        // Copy-on-write сметы из шаблонов
+        this.statements.getTemplateRef = this.db.prepare(`
+            SELECT template_id, template_version FROM estimate_template_refs WHERE estimate_id = ?
+        `);
+
+        this.statements.insertTemplateRef = this.db.prepare(`
+            INSERT INTO estimate_template_refs (estimate_id, template_id, template_version, created_at)
+            VALUES (?, ?, ?, ?)
+        `);
+
+        this.statements.deleteTemplateRef = this.db.prepare(`
+            DELETE FROM estimate_template_refs WHERE estimate_id = ?
+        `);
+
+        this.statements.getTemplateSnapshot = this.db.prepare(`
+            SELECT data FROM template_snapshots WHERE template_id = ? AND template_version = ?
+        `);
+
+        this.statements.insertTemplateSnapshot = this.db.prepare(`
+            INSERT OR IGNORE INTO template_snapshots (template_id, template_version, data, organization_id, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        `);
+
+        this.statements.getTemplateHeadById = this.db.prepare(`
+            SELECT id, data_version FROM estimates
+            WHERE id = ? AND organization_id = ? AND is_template = 1 AND deleted_at IS NULL
+        `);
+
+        // Sharing ACL: estimate_collaborators (UNIQUE(estimate_id, user_id) - point lookup)
+        this.statements.isCollaborator = this.db.prepare(`
+            SELECT 1 FROM estimate_collaborators WHERE estimate_id = ? AND user_id = ?
+        `).pluck();
+
+        this.statements.listCollaborators = this.db.prepare(`
+            SELECT user_id FROM estimate_collaborators WHERE estimate_id = ? ORDER BY id
+        `).pluck();
+
+        // Несуществующие пользователи пропускаются (FK на users)
+        this.statements.insertCollaborator = this.db.prepare(`
+            INSERT OR IGNORE INTO estimate_collaborators (estimate_id, user_id, role, created_at, created_by)
+            SELECT ?, id, 'viewer', ?, ? FROM users WHERE id = ?
+        `);
+
+        this.statements.deleteCollaborator = this.db.prepare(`
+            DELETE FROM estimate_collaborators WHERE estimate_id = ? AND user_id = ?
+        `);
+
+        // Keyset-пагинация: первая страница и страницы после курсора (created_at, id)
+        const sharedWithUserSql = cursorClause => `
+            SELECT e.id, e.filename, e.organization_id, e.owner_id, e.visibility,
+                   e.client_name, e.pax_count, e.tour_start, e.tour_end,
+                   e.total_cost, e.services_count, e.data_version,
+                   e.created_at, e.updated_at,
+                   c.role, c.created_at AS shared_at, c.created_by AS shared_by, c.id AS share_id
+            FROM estimate_collaborators c
+            JOIN estimates e ON e.id = c.estimate_id
+            WHERE c.user_id = ? AND e.deleted_at IS NULL
+              ${cursorClause}
+            ORDER BY c.created_at DESC, c.id DESC
+            LIMIT ?
+        `;
+        this.statements.listSharedWithUser = this.db.prepare(sharedWithUserSql(''));
+        this.statements.listSharedWithUserAfter = this.db.prepare(sharedWithUserSql('AND (c.created_at, c.id) < (?, ?)'));
+
         // ✅ ID-First: только по ID (filename больше не используется для поиска)
         this.statements.getEstimateById = this.db.prepare(`
             SELECT * FROM estimates
@@ -179,13 +401,14 @@ class SQLiteStorage extends StorageAdapter {
         // ========================================================================
 
         this.statements.upsertCatalog = this.db.prepare(`
-            INSERT INTO catalogs (id, name, slug, version, data, region, templates_count, created_at, updated_at, owner_id, organization_id, visibility, data_version)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO catalogs (id, name, slug, version, data, region, templates_count, categories_count, created_at, updated_at, owner_id, organization_id, visibility, data_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(organization_id, slug) DO UPDATE SET
                 name = excluded.name,
                 data = excluded.data,
                 region = excluded.region,
                 templates_count = excluded.templates_count,
+                categories_count = excluded.categories_count,
                 updated_at = excluded.updated_at,
                 visibility = excluded.visibility,
                 data_version = excluded.data_version,
@@ -207,29 +430,132 @@ class SQLiteStorage extends StorageAdapter {
             WHERE organization_id = ? AND deleted_at IS NULL
         `);
 
+        // Заголовок каталога после delta-изменения (optimistic lock по data_version)
+        this.statements.updateCatalogHeader = this.db.prepare(`
+            UPDATE catalogs SET
+                data = ?, templates_count = ?, categories_count = ?,
+                data_version = data_version + 1, updated_at = ?
+            WHERE id = ? AND data_version = ?
+        `);
+
+        // Catalog items (шаблоны и категории строками)
+        this.statements.listCatalogItems = this.db.prepare(`
+            SELECT kind, data FROM catalog_items
+            WHERE catalog_id = ? AND data IS NOT NULL
+            ORDER BY position
+        `);
+
+        this.statements.listCatalogItemStates = this.db.prepare(`
+            SELECT kind, item_key, position, data FROM catalog_items WHERE catalog_id = ?
+        `);
+
+        this.statements.getCatalogItem = this.db.prepare(`
+            SELECT position, data, version FROM catalog_items
+            WHERE catalog_id = ? AND kind = ? AND item_key = ?
+        `);
+
+        // Позиция последнего элемента (включая tombstones - позиции только растут)
+        this.statements.getCatalogItemsEnd = this.db.prepare(`
+            SELECT COALESCE(MAX(position), -1) FROM catalog_items
+            WHERE catalog_id = ? AND kind = ?
+        `).pluck();
+
+        // Изменения после версии клиента (включая tombstones); since = 0 - все строки
+        this.statements.listCatalogItemChanges = this.db.prepare(`
+            SELECT kind, item_key, position, data FROM catalog_items
+            WHERE catalog_id = ? AND version > ? AND (? > 0 OR data IS NOT NULL)
+            ORDER BY position
+        `);
+
+        this.statements.upsertCatalogItem = this.db.prepare(`
+            INSERT INTO catalog_items (catalog_id, kind, item_key, position, data, version, organization_id, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(catalog_id, kind, item_key) DO UPDATE SET
+                position = excluded.position,
+                data = excluded.data,
+                version = excluded.version,
+                updated_at = excluded.updated_at
+        `);
+
+        this.statements.deleteCatalogItem = this.db.prepare(`
+            UPDATE catalog_items SET data = NULL, version = ?, updated_at = ?
+            WHERE catalog_id = ? AND kind = ? AND item_key = ? AND data IS NOT NULL
+        `);
+
         // ========================================================================
         // Settings - Multi-Tenant (Migration 009: scope-based)
         // ========================================================================
 
         this.statements.upsertSetting = this.db.prepare(`
             INSERT INTO settings (scope, scope_id, key, value, value_type, description, created_at, updated_at)
-            VALUES ('organization', ?, ?, ?, 'object', NULL, ?, ?)
+            VALUES (?, ?, ?, ?, ?, NULL, ?, ?)
             ON CONFLICT(scope, scope_id, key) DO UPDATE SET
                 value = excluded.value,
+                value_type = excluded.value_type,
                 updated_at = excluded.updated_at
         `);
 
-        this.statements.getSetting = this.db.prepare(`
-            SELECT value FROM settings
-            WHERE scope = 'organization' AND scope_id = ? AND key = ?
+        this.statements.getScopeSettings = this.db.prepare(`
+            SELECT key, value, value_type FROM settings
+            WHERE scope = ? AND scope_id = ?
         `);
 
-        this.statements.getAllSettings = this.db.prepare(`
-            SELECT key, value FROM settings
-            WHERE scope = 'organization' AND scope_id = ?
+        this.statements.getSettingsVersion = this.db.prepare(`
+            SELECT version FROM settings_versions
+            WHERE scope = ? AND scope_id = ?
+        `).pluck();
+
+        // ========================================================================
+        // Organization usage (счётчики ведут triggers в schema.sql)
+        // ========================================================================
+
+        this.statements.getOrganizationUsage = this.db.prepare(`
+            SELECT plan, max_users, max_estimates, max_catalogs, storage_limit_mb,
+                   current_users_count, current_estimates_count, current_catalogs_count,
+                   current_storage_mb
+            FROM organizations WHERE id = ?
         `);
     }
 
+    /**
+     * Обернуть prepared statements для метрик (тайминги по имени statement)
+     * @private
+     */
+    _instrumentStatements() {
+        for (const [name, statement] of Object.entries(this.statements)) {
+            this.statements[name] = metrics.instrumentStatement(name, statement);
+        }
+    }
+
+    /**
+     * Поставить мутацию в audit очередь (no-op без auditLogger)
+     * @private
+     */
+    _audit(entry) {
+        if (this.auditLogger) {
+            this.auditLogger.record(entry);
+        }
+    }
+
+    /**
+     * Размеры файлов БД (для метрик, без обращения к БД)
+     * @returns {{dbBytes: number, walBytes: number}}
+     */
+    getFileSizes() {
+        const sizeOf = (file) => {
+            try {
+                return fs.statSync(file).size;
+            } catch (err) {
+                return 0;
+            }
+        };
+
+        return {
+            dbBytes: sizeOf(this.dbPath),
+            walBytes: sizeOf(`${this.dbPath}-wal`)
+        };
+    }
+
     // ========================================================================
     // Estimates (Сметы)
     // ========================================================================
@@ -279,7 +605,7 @@ class SQLiteStorage extends StorageAdapter {
         }
 
         // Включаем metadata для v3.0.0 API
-        const data = JSON.parse(row.data);
+        const data = JSON.parse(this.materializeEstimateData(row));
         data.dataVersion = row.data_version; // Добавляем data_version для optimistic locking
         data.updatedAt = new Date(row.updated_at * 1000);
         data.createdAt = new Date(row.created_at * 1000);
@@ -303,7 +629,7 @@ class SQLiteStorage extends StorageAdapter {
             throw new Error(`Estimate not found: ${filename}`);
         }
 
-        return JSON.parse(row.data);
+        return JSON.parse(this.materializeEstimateData(row));
     }
 
     /**
@@ -315,7 +641,14 @@ class SQLiteStorage extends StorageAdapter {
      */
     async saveEstimate(id, data, userId = null, organizationId = null) {
         await this.init();
+        return this.saveEstimateSync(id, data, userId, organizationId);
+    }
 
+    /**
+     * Синхронная часть saveEstimate (для вызова внутри db.transaction, напр. batch)
+     * @returns {{success: boolean, id: string, isNew: boolean, dataVersion: number, unchanged?: boolean}}
+     */
+    saveEstimateSync(id, data, userId = null, organizationId = null) {
         // Валидация входных данных
         if (!data || typeof data !== 'object') {
             throw new Error(`Invalid data for estimate: ${id} - data must be a non-null object`);
@@ -333,7 +666,7 @@ class SQLiteStorage extends StorageAdapter {
             throw new Error(`Failed to serialize estimate data for: ${id}`);
         }
 
-        const dataHash = this._calculateHash(dataStr);
+        const dataHash = this._calculateHash(data);
 
         // Извлекаем метаданные для индексации
         const metadata = this._extractMetadata(data);
@@ -345,14 +678,24 @@ class SQLiteStorage extends StorageAdapter {
         const ownerId = userId || this.defaultUserId;
         const orgId = organizationId || this.defaultOrganizationId;
 
-        // ID-First: проверяем существование только по ID
-        const existing = this.statements.getEstimateById.get(id, orgId);
+        // ID-First: проверяем существование только по ID (без чтения data)
+        const existing = this.statements.getEstimateHeadById.get(id, orgId);
 
         if (existing) {
-            // UPDATE с optimistic locking
-            const result = this.statements.updateEstimate.run(
+            // Данные не изменились - ни UPDATE, ни новой data_version
+            if (this.isUnchangedEstimate(existing, dataHash, 'storage')) {
+                return { success: true, id, isNew: false, unchanged: true, dataVersion: existing.data_version };
+            }
+
+            // Старые data нужны только для audit diff
+            const before = this.auditLogger
+                ? this.materializeEstimateData(this.statements.getEstimateById.get(id, orgId))
+                : undefined;
+
+            // UPDATE с optimistic locking; экземпляр шаблона остаётся override-документом
+            const result = this.db.transaction(() => this.statements.updateEstimate.run(
                 filename,
-                dataStr,
+                this.encodeEstimateWrite(id, data, dataStr, existing),
                 metadata.clientName,
                 metadata.clientEmail,
                 metadata.clientPhone,
@@ -367,15 +710,24 @@ class SQLiteStorage extends StorageAdapter {
                 id,                         // WHERE id = ?
                 existing.data_version,      // AND data_version = ? (optimistic lock)
                 orgId                       // AND organization_id = ?
-            );
+            ))();
 
             if (result.changes === 0) {
                 throw new Error('Concurrent modification detected. Please reload and try again.');
             }
 
-            return { success: true, id, isNew: false };
+            this._audit({
+                entityType: 'estimate', entityId: id, action: 'update',
+                before, after: dataStr,
+                userId: ownerId, organizationId: orgId,
+                metadata: { dataVersion: existing.data_version + 1 }
+            });
+
+            return { success: true, id, isNew: false, dataVersion: existing.data_version + 1 };
         } else {
             // INSERT новой сметы
+            this.assertQuota(orgId, 'estimates', Buffer.byteLength(dataStr));
+
             this.statements.insertEstimate.run(
                 id,
                 filename,
@@ -399,16 +751,66 @@ class SQLiteStorage extends StorageAdapter {
                 orgId           // organization_id
             );
 
-            return { success: true, id, isNew: true };
+            this._audit({
+                entityType: 'estimate', entityId: id, action: 'create',
+                userId: ownerId, organizationId: orgId,
+                metadata: { filename, bytes: Buffer.byteLength(dataStr) }
+            });
+
+            return { success: true, id, isNew: true, dataVersion: 1 };
+        }
+    }
+
+    /**
+     * Применить к смете изменения относительно версии baseVersion (autosave дельтой)
+     * @param {string} id - ID сметы
+     * @param {number} baseVersion - data_version, от которой клиент считал изменения
+     * @param {{set: Array, unset: Array}} changes - Формат utils/estimateOverrides
+     * @param {string} userId - ID пользователя (опционально)
+     * @param {string} organizationId - ID организации (опционально)
+     * @throws {Error} code INVALID_PATCH (400) | ESTIMATE_NOT_FOUND (404) | CONFLICT (409) -
+     *   при 404 / 409 клиент отправляет смету целиком
+     */
+    async patchEstimate(id, baseVersion, changes, userId = null, organizationId = null) {
+        await this.init();
+
+        const invalid = validateOverrides(changes);
+        if (invalid) {
+            const error = new Error(invalid);
+            error.code = 'INVALID_PATCH';
+            error.status = 400;
+            throw error;
+        }
+
+        const orgId = organizationId || this.defaultOrganizationId;
+        const row = this.statements.getEstimateById.get(id, orgId);
+
+        if (!row) {
+            const error = new Error(`Estimate not found: ${id}`);
+            error.code = 'ESTIMATE_NOT_FOUND';
+            error.status = 404;
+            throw error;
+        }
+
+        if (row.data_version !== baseVersion) {
+            const error = new Error('Concurrent modification detected. Please reload and try again.');
+            error.code = 'CONFLICT';
+            error.status = 409;
+            error.dataVersion = row.data_version;
+            throw error;
         }
+
+        const data = applyOverrides(JSON.parse(this.materializeEstimateData(row)), changes, { strict: true });
+        return this.saveEstimateSync(id, data, userId, organizationId);
     }
 
     /**
      * Удалить смету (soft delete) - ID-First + Multi-Tenant
      * @param {string} id - ID сметы
      * @param {string} organizationId - ID организации (опционально)
+     * @param {string} userId - Кто удаляет (для audit, опционально)
      */
-    async deleteEstimate(id, organizationId = null) {
+    async deleteEstimate(id, organizationId = null, userId = null) {
         await this.init();
 
         const orgId = organizationId || this.defaultOrganizationId;
@@ -416,6 +818,13 @@ class SQLiteStorage extends StorageAdapter {
 
         const result = this.statements.deleteEstimate.run(now, id, orgId);
 
+        if (result.changes > 0) {
+            this._audit({
+                entityType: 'estimate', entityId: id, action: 'delete',
+                userId: userId || this.defaultUserId, organizationId: orgId
+            });
+        }
+
         // Multi-tenancy security: Don't throw if estimate not found in this org
         // (prevents information leak about IDs in other orgs)
         // If result.changes === 0, either:
@@ -431,8 +840,9 @@ class SQLiteStorage extends StorageAdapter {
      * @param {string} id - ID сметы
      * @param {string} newFilename - Новое имя файла
      * @param {string} organizationId - ID организации (опционально)
+     * @param {string} userId - Кто переименовывает (для audit, опционально)
      */
-    async renameEstimate(id, newFilename, organizationId = null) {
+    async renameEstimate(id, newFilename, organizationId = null, userId = null) {
         await this.init();
 
         const orgId = organizationId || this.defaultOrganizationId;
@@ -445,10 +855,10 @@ class SQLiteStorage extends StorageAdapter {
         }
 
         // Обновляем filename в JSON data
-        const data = JSON.parse(existing.data);
+        const data = JSON.parse(this.materializeEstimateData(existing));
         data.filename = newFilename;
         const updatedDataStr = JSON.stringify(data);
-        const dataHash = this._calculateHash(updatedDataStr);
+        const dataHash = this._calculateHash(data);
 
         // Обновляем и колонку filename И data blob
         const updateStmt = this.db.prepare(`
@@ -457,15 +867,342 @@ class SQLiteStorage extends StorageAdapter {
             WHERE id = ? AND organization_id = ?
         `);
 
-        const result = updateStmt.run(newFilename, updatedDataStr, dataHash, now, id, orgId);
+        const result = this.db.transaction(() => updateStmt.run(
+            newFilename, this.encodeEstimateWrite(id, data, updatedDataStr), dataHash, now, id, orgId
+        ))();
 
         if (result.changes === 0) {
             throw new Error(`Failed to rename estimate: ${id}`);
         }
 
+        this._audit({
+            entityType: 'estimate', entityId: id, action: 'rename',
+            before: { filename: existing.filename }, after: { filename: newFilename },
+            userId: userId || this.defaultUserId, organizationId: orgId
+        });
+
         return { success: true, id, newFilename };
     }
 
+    /**
+     * Заполнить estimate_intervals / estimate_intervals_rtree для смет, созданных
+     * до появления triggers. Выполняется, только если индекс пуст, а сметы с датами есть.
+     * @private
+     */
+    _backfillTourIntervals() {
+        if (this.db.prepare('SELECT 1 FROM estimate_intervals LIMIT 1').get()) return;
+        if (!this.db.prepare('SELECT 1 FROM estimates WHERE julianday(tour_start) IS NOT NULL LIMIT 1').get()) return;
+
+        const indexed = this.db.transaction(() => {
+            this.db.prepare(`
+                INSERT INTO estimate_intervals (estimate_id)
+                SELECT id FROM estimates WHERE julianday(tour_start) IS NOT NULL
+            `).run();
+
+            return this.db.prepare(`
+                INSERT INTO estimate_intervals_rtree (id, start_day, end_day)
+                SELECT i.id,
+                       CAST(julianday(e.tour_start) - 2440587.5 AS INTEGER),
+                       CAST(MAX(julianday(e.tour_start), COALESCE(julianday(e.tour_end), 0)) - 2440587.5 AS INTEGER)
+                FROM estimate_intervals i
+                JOIN estimates e ON e.id = i.estimate_id
+            `).run().changes;
+        })();
+
+        console.log(`Tour interval index built: ${indexed} estimates`);
+    }
+
+    // ========================================================================
+    // Copy-on-write сметы из шаблонов
+    // ========================================================================
+
+    /**
+     * Создать смету из шаблона (copy-on-write).
+     * Снимок шаблона сохраняется один раз на его data_version, новая смета
+     * хранит только override-документ (utils/estimateOverrides).
+     * @param {string} templateId - ID сметы-шаблона (is_template = 1)
+     * @param {Object} [options]
+     * @param {string} [options.id] - ID новой сметы (default: сгенерированный)
+     * @param {string} [options.filename]
+     * @param {Object} [options.fields] - Поля верхнего уровня поверх шаблона (clientName, tourStart, ...)
+     * @param {string} userId - ID пользователя (опционально)
+     * @param {string} organizationId - ID организации (опционально)
+     */
+    async createEstimateFromTemplate(templateId, options = {}, userId = null, organizationId = null) {
+        await this.init();
+
+        const ownerId = userId || this.defaultUserId;
+        const orgId = organizationId || this.defaultOrganizationId;
+        const now = Math.floor(Date.now() / 1000);
+
+        const template = this.statements.getTemplateHeadById.get(templateId, orgId);
+        if (!template) {
+            const error = new Error(`Template not found: ${templateId}`);
+            error.code = 'TEMPLATE_NOT_FOUND';
+            error.status = 404;
+            throw error;
+        }
+
+        const templateVersion = template.data_version;
+        const id = options.id || this._generateId();
+
+        // Снимок пишется при первом экземпляре этой версии шаблона
+        if (!this.templateSnapshots.has(`${templateId}:${templateVersion}`)) {
+            const templateRow = this.statements.getEstimateById.get(templateId, orgId);
+            this.statements.insertTemplateSnapshot.run(
+                templateId, templateVersion, this.materializeEstimateData(templateRow), orgId, now
+            );
+        }
+
+        const base = this._templateSnapshot(templateId, templateVersion);
+        const data = { ...base, ...options.fields, id };
+        data.filename = options.filename || `estimate_${id}.json`;
+
+        const dataStr = JSON.stringify(data);
+        const overrides = this._encodeOverrides(base, data, dataStr);
+        const stored = overrides || dataStr;
+        const metadata = this._extractMetadata(data);
+
+        this.assertQuota(orgId, 'estimates', Buffer.byteLength(stored));
+
+        this.db.transaction(() => {
+            this.statements.insertEstimate.run(
+                id,
+                data.filename,
+                data.version || '1.1.0',
+                this.appVersion,
+                stored,
+                metadata.clientName,
+                metadata.clientEmail,
+                metadata.clientPhone,
+                metadata.paxCount,
+                metadata.tourStart,
+                metadata.tourEnd,
+                metadata.totalCost,
+                metadata.totalProfit,
+                metadata.servicesCount,
+                1,
+                this._calculateHash(data),
+                now,
+                now,
+                ownerId,
+                orgId
+            );
+
+            if (overrides) {
+                this.statements.insertTemplateRef.run(id, templateId, templateVersion, now);
+            }
+        })();
+
+        this._audit({
+            entityType: 'estimate', entityId: id, action: 'create',
+            userId: ownerId, organizationId: orgId,
+            metadata: { filename: data.filename, templateId, templateVersion, bytes: Buffer.byteLength(stored) }
+        });
+
+        return {
+            success: true,
+            id,
+            isNew: true,
+            dataVersion: 1,
+            filename: data.filename,
+            templateId,
+            templateVersion,
+            copyOnWrite: !!overrides
+        };
+    }
+
+    /**
+     * Полный JSON сметы по строке estimates (для экземпляров шаблона -
+     * снимок + override-документ, для остальных - row.data как есть)
+     * @param {Object} row - Строка estimates (нужны id и data)
+     * @returns {string}
+     */
+    materializeEstimateData(row) {
+        const ref = this.statements.getTemplateRef.get(row.id);
+        if (!ref) {
+            return row.data;
+        }
+
+        const base = this._templateSnapshot(ref.template_id, ref.template_version);
+        return JSON.stringify(applyOverrides(base, JSON.parse(row.data)));
+    }
+
+    /**
+     * Что записать в estimates.data: override-документ для экземпляра шаблона
+     * или полный JSON. При структурном расхождении экземпляр отвязывается от
+     * шаблона (copy on first divergence).
+     * Вызывать в той же транзакции, что и UPDATE estimates.data.
+     * @param {string} id - ID сметы
+     * @param {Object} data - Новые данные
+     * @param {string} dataStr - JSON.stringify(data)
+     * @param {Object} [ref] - {template_id, template_version}, если уже прочитан (getEstimateHeadById)
+     * @returns {string}
+     */
+    encodeEstimateWrite(id, data, dataStr, ref) {
+        if (ref === undefined) {
+            ref = this.statements.getTemplateRef.get(id);
+        }
+        if (!ref || !ref.template_id) {
+            return dataStr;
+        }
+
+        const base = this._templateSnapshot(ref.template_id, ref.template_version);
+        const overrides = this._encodeOverrides(base, data, dataStr);
+        if (overrides) {
+            return overrides;
+        }
+
+        this.statements.deleteTemplateRef.run(id);
+        return dataStr;
+    }
+
+    /**
+     * Override-документ или null (структурное расхождение / нет выигрыша в размере)
+     * @private
+     */
+    _encodeOverrides(base, data, dataStr) {
+        const overrides = computeOverrides(base, data);
+        if (!overrides) return null;
+
+        const encoded = JSON.stringify(overrides);
+        return encoded.length * 2 < dataStr.length ? encoded : null;
+    }
+
+    /**
+     * Разобранный снимок шаблона (LRU кэш; объект только для чтения)
+     * @private
+     */
+    _templateSnapshot(templateId, templateVersion) {
+        const key = `${templateId}:${templateVersion}`;
+        const cached = this.templateSnapshots.get(key);
+
+        if (cached) {
+            metrics.recordCache('template_snapshots', true);
+            this.templateSnapshots.delete(key);
+            this.templateSnapshots.set(key, cached);
+            return cached;
+        }
+
+        metrics.recordCache('template_snapshots', false);
+        const row = this.statements.getTemplateSnapshot.get(templateId, templateVersion);
+        if (!row) {
+            throw new Error(`Template snapshot not found: ${key}`);
+        }
+
+        const snapshot = JSON.parse(row.data);
+        this.templateSnapshots.set(key, snapshot);
+        if (this.templateSnapshots.size > TEMPLATE_SNAPSHOT_CACHE_SIZE) {
+            this.templateSnapshots.delete(this.templateSnapshots.keys().next().value);
+        }
+        return snapshot;
+    }
+
+    // ========================================================================
+    // SHARING (estimate_collaborators)
+    // ========================================================================
+
+    /**
+     * Есть ли у пользователя явный доступ к смете (indexed point lookup)
+     * @param {string} estimateId
+     * @param {string} userId
+     * @returns {boolean}
+     */
+    isEstimateCollaborator(estimateId, userId) {
+        return this.statements.isCollaborator.get(estimateId, userId) === 1;
+    }
+
+    /**
+     * ID пользователей, с которыми поделились сметой
+     * @param {string} estimateId
+     * @returns {string[]}
+     */
+    getEstimateCollaborators(estimateId) {
+        return this.statements.listCollaborators.all(estimateId);
+    }
+
+    /**
+     * Заменить список пользователей с доступом к смете.
+     * Синхронный - вызывать внутри db.transaction вместе с остальными изменениями.
+     * @param {string} estimateId
+     * @param {string[]} userIds - Новый список (несуществующие пользователи пропускаются)
+     * @param {string} createdBy - Кто поделился
+     * @returns {{before: string[], after: string[]}}
+     */
+    setEstimateCollaborators(estimateId, userIds, createdBy = null) {
+        const before = this.getEstimateCollaborators(estimateId);
+        const wanted = new Set(userIds);
+        const now = Math.floor(Date.now() / 1000);
+
+        for (const userId of before) {
+            if (!wanted.has(userId)) {
+                this.statements.deleteCollaborator.run(estimateId, userId);
+            }
+        }
+        for (const userId of wanted) {
+            this.statements.insertCollaborator.run(estimateId, now, createdBy, userId);
+        }
+
+        return { before, after: this.getEstimateCollaborators(estimateId) };
+    }
+
+    /**
+     * Сметы, которыми поделились с пользователем (keyset-пагинация по
+     * idx_collaborators_user_created - стоимость страницы не зависит от её номера)
+     * @param {string} userId
+     * @param {Object} [options]
+     * @param {number} [options.limit=50]
+     * @param {string} [options.cursor] - next_cursor предыдущей страницы
+     * @returns {{estimates: Array, limit: number, next_cursor: string|null}}
+     */
+    listSharedWithUser(userId, options = {}) {
+        const limit = Math.min(200, Math.max(1, parseInt(options.limit) || 50));
+        const cursor = decodeSharedCursor(options.cursor);
+
+        const rows = cursor
+            ? this.statements.listSharedWithUserAfter.all(userId, cursor.createdAt, cursor.id, limit + 1)
+            : this.statements.listSharedWithUser.all(userId, limit + 1);
+
+        const hasMore = rows.length > limit;
+        const page = hasMore ? rows.slice(0, limit) : rows;
+        const last = page[page.length - 1];
+
+        return {
+            estimates: page.map(({ share_id, ...estimate }) => estimate),
+            limit,
+            next_cursor: hasMore ? encodeSharedCursor(last.shared_at, last.share_id) : null
+        };
+    }
+
+    /**
+     * Перенести estimates.shared_with (JSON массив) в estimate_collaborators.
+     * Идемпотентно; после переноса shared_with = NULL, и повторный запуск -
+     * один probe по пустому partial index idx_estimates_shared_legacy.
+     * @private
+     */
+    _backfillCollaborators() {
+        const pending = this.db.prepare('SELECT 1 FROM estimates WHERE shared_with IS NOT NULL LIMIT 1').get();
+        if (!pending) return;
+
+        const migrate = this.db.transaction(() => {
+            const inserted = this.db.prepare(`
+                INSERT OR IGNORE INTO estimate_collaborators (estimate_id, user_id, role, created_at, created_by)
+                SELECT e.id, u.id, 'viewer', e.updated_at, e.owner_id
+                FROM estimates e, json_each(e.shared_with) j
+                JOIN users u ON u.id = j.value
+                WHERE e.shared_with IS NOT NULL AND json_valid(e.shared_with)
+            `).run().changes;
+
+            const estimates = this.db.prepare('UPDATE estimates SET shared_with = NULL WHERE shared_with IS NOT NULL')
+                .run().changes;
+
+            return { estimates, collaborators: inserted };
+        });
+
+        const result = migrate();
+        console.log(`Sharing migrated to estimate_collaborators: ${result.collaborators} collaborators from ${result.estimates} estimates`);
+    }
+
     // ========================================================================
     // Catalogs (Каталоги услуг) - Multi-Tenant + Visibility
     // ========================================================================
@@ -497,7 +1234,7 @@ class SQLiteStorage extends StorageAdapter {
             throw new Error(`Catalog not found: ${name}`);
         }
 
-        return JSON.parse(row.data);
+        return JSON.parse(this.materializeCatalogData(row));
     }
 
     /**
@@ -515,66 +1252,524 @@ class SQLiteStorage extends StorageAdapter {
             throw new Error(`Catalog not found: ${id}`);
         }
 
-        return JSON.parse(row.data);
+        return JSON.parse(this.materializeCatalogData(row));
+    }
+
+    /**
+     * Полный JSON каталога: заголовок catalogs.data + строки catalog_items.
+     * Строки вставляются как есть (без JSON.parse / JSON.stringify).
+     * Каталог без строк (пустой или ещё не разделённый, напр. после импорта) - data как есть.
+     * @param {Object} row - Строка catalogs (id, data)
+     * @returns {string}
+     */
+    materializeCatalogData(row) {
+        const items = this.statements.listCatalogItems.all(row.id);
+        if (items.length === 0) return row.data;
+
+        // Сначала templates: маркер categories стоит после него и остаётся последним
+        let json = row.data;
+        for (const [kind, collection] of Object.entries(CATALOG_COLLECTIONS)) {
+            const values = items.filter(item => item.kind === kind).map(item => item.data);
+            const marker = `"${collection}":[]`;
+            const at = json.lastIndexOf(marker);
+            if (values.length === 0 || at === -1) continue;
+
+            json = `${json.slice(0, at)}"${collection}":[${values.join(',')}]${json.slice(at + marker.length)}`;
+        }
+        return json;
     }
 
     /**
      * Сохранить каталог - Multi-Tenant + Visibility
+     * Пишутся только изменившиеся шаблоны / категории (и удалённые - tombstones),
+     * data_version увеличивается, только если что-то изменилось.
      * @param {string} name - Имя каталога
      * @param {object} data - Данные каталога
      * @param {string} userId - ID пользователя (опционально)
      * @param {string} organizationId - ID организации (опционально)
      * @param {string} visibility - Видимость: 'private', 'team', 'organization' (опционально)
+     * @returns {Promise<{success: boolean, id: string, dataVersion: number, unchanged?: boolean}>}
      */
     async saveCatalog(name, data, userId = null, organizationId = null, visibility = 'organization') {
         await this.init();
 
         const now = Math.floor(Date.now() / 1000);
-        const dataStr = JSON.stringify(data);
+        const { header, items } = splitCatalogData(data);
+        const counts = countCatalogItems(items);
 
         const ownerId = userId || this.defaultUserId;
         const orgId = organizationId || this.defaultOrganizationId;
 
-        // Проверяем существует ли каталог
-        const existing = this.statements.getCatalogByName.get(name, orgId);
-
-        // Используем существующий ID или генерируем новый на основе name
-        const id = existing ? existing.id : this._generateIdFromString(name);
         const region = data.region || name;  // ✅ FIX: используем name если data.region пустой
-        const templatesCount = Array.isArray(data.templates) ? data.templates.length : 0;
         const slug = name.toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/(^-|-$)/g, '');
 
-        // Детальное логирование для отладки FOREIGN KEY
-        console.log('[SQLite saveCatalog] Parameters:', {
-            id, name, slug, ownerId, orgId, visibility,
-            existingCatalog: existing ? 'UPDATE' : 'INSERT'
+        const save = this.db.transaction(() => {
+            // Проверяем существует ли каталог
+            const existing = this.statements.getCatalogByName.get(name, orgId);
+
+            // Используем существующий ID или генерируем новый на основе name
+            const id = existing ? existing.id : this._generateIdFromString(name);
+
+            // Детальное логирование для отладки FOREIGN KEY (два лишних SELECT - только в debug)
+            if (this.debug) {
+                console.log('[SQLite saveCatalog] Parameters:', {
+                    id, name, slug, ownerId, orgId, visibility,
+                    existingCatalog: existing ? 'UPDATE' : 'INSERT'
+                });
+
+                const userExists = this.db.prepare('SELECT id FROM users WHERE id = ?').get(ownerId);
+                const orgExists = this.db.prepare('SELECT id FROM organizations WHERE id = ?').get(orgId);
+                console.log('[SQLite saveCatalog] FK Check:', {
+                    userExists: !!userExists,
+                    orgExists: !!orgExists
+                });
+            }
+
+            const { upserts, deletes } = existing
+                ? this._diffCatalogItems(id, items)
+                : { upserts: items, deletes: [] };
+
+            if (existing && upserts.length === 0 && deletes.length === 0 &&
+                existing.data === header && existing.visibility === visibility) {
+                return { success: true, id, unchanged: true, dataVersion: existing.data_version };
+            }
+
+            const bytes = items.reduce((sum, item) => sum + Buffer.byteLength(item.data), Buffer.byteLength(header));
+            if (!existing) {
+                this.assertQuota(orgId, 'catalogs', bytes);
+            }
+
+            // Старый JSON нужен только для audit diff
+            const before = existing && this.auditLogger ? this.materializeCatalogData(existing) : undefined;
+            const dataVersion = existing ? existing.data_version + 1 : 1;
+
+            this.statements.upsertCatalog.run(
+                id,
+                name,
+                slug,           // slug
+                data.version || '1.2.0',
+                header,
+                region,
+                counts.template,
+                counts.category,
+                existing ? existing.created_at : now,  // Сохраняем оригинальный created_at
+                now,            // updated_at
+                ownerId,        // owner_id
+                orgId,          // organization_id
+                visibility,     // visibility
+                dataVersion     // data_version (increment on update)
+            );
+
+            for (const item of upserts) {
+                this.statements.upsertCatalogItem.run(id, item.kind, item.key, item.position, item.data, dataVersion, orgId, now);
+            }
+            for (const row of deletes) {
+                this.statements.deleteCatalogItem.run(dataVersion, now, id, row.kind, row.item_key);
+            }
+
+            this._audit(existing
+                ? {
+                    entityType: 'catalog', entityId: id, action: 'update',
+                    before, after: this.auditLogger ? JSON.stringify(data) : undefined,
+                    userId: ownerId, organizationId: orgId,
+                    metadata: { dataVersion, upserted: upserts.length, deleted: deletes.length }
+                }
+                : {
+                    entityType: 'catalog', entityId: id, action: 'create',
+                    userId: ownerId, organizationId: orgId,
+                    metadata: { name, bytes }
+                });
+
+            return { success: true, id, dataVersion };
         });
 
-        // Проверяем существование пользователя и организации
-        const userExists = this.db.prepare('SELECT id FROM users WHERE id = ?').get(ownerId);
-        const orgExists = this.db.prepare('SELECT id FROM organizations WHERE id = ?').get(orgId);
-        console.log('[SQLite saveCatalog] FK Check:', {
-            userExists: !!userExists,
-            orgExists: !!orgExists
+        return save();
+    }
+
+    /**
+     * Delta-изменение каталога: только переданные шаблоны / категории.
+     * Новые элементы добавляются в конец коллекции, существующие сохраняют позицию.
+     * Конфликт - только если затронутый элемент изменён после baseVersion;
+     * правки других элементов другими пользователями сливаются.
+     * @param {string} id - ID каталога
+     * @param {number} baseVersion - data_version, на которой основаны изменения
+     * @param {Object} changes - { header?, templates?: { upsert: [item], delete: [key] }, categories?: {...} }
+     * @returns {Promise<{success: boolean, id: string, dataVersion: number, unchanged?: boolean}>}
+     * @throws {Error} CATALOG_NOT_FOUND (404), INVALID_PATCH (400), CONFLICT (409, .dataVersion)
+     */
+    async patchCatalog(id, baseVersion, changes, userId = null, organizationId = null) {
+        await this.init();
+
+        const now = Math.floor(Date.now() / 1000);
+        const ownerId = userId || this.defaultUserId;
+        const orgId = organizationId || this.defaultOrganizationId;
+        const operations = this._parseCatalogChanges(changes);
+
+        const patch = this.db.transaction(() => {
+            const row = this._splitLegacyCatalog(this._getCatalogOrThrow(id, orgId));
+
+            const conflict = () => {
+                const error = catalogError('Concurrent modification detected. Please reload and try again.', 'CONFLICT', 409);
+                error.dataVersion = row.data_version;
+                return error;
+            };
+
+            if (baseVersion > row.data_version) throw conflict();
+
+            const header = JSON.parse(row.data);
+            const dataVersion = row.data_version + 1;
+            const counts = { template: row.templates_count, category: row.categories_count };
+            const writes = [];
+
+            for (const { kind, upsert, remove } of operations) {
+                let end = this.statements.getCatalogItemsEnd.get(id, kind);
+
+                for (const { key, data } of upsert) {
+                    const current = this.statements.getCatalogItem.get(id, kind, key);
+                    if (current && current.version > baseVersion) throw conflict();
+                    if (current && current.data === data) continue;
+
+                    const isNew = !current || current.data === null;
+                    const position = isNew ? ++end : current.position;
+                    if (isNew) counts[kind]++;
+                    writes.push(() => this.statements.upsertCatalogItem.run(id, kind, key, position, data, dataVersion, orgId, now));
+                }
+
+                for (const key of remove) {
+                    const current = this.statements.getCatalogItem.get(id, kind, key);
+                    if (!current || current.data === null) continue;
+                    if (current.version > baseVersion) throw conflict();
+
+                    counts[kind]--;
+                    writes.push(() => this.statements.deleteCatalogItem.run(dataVersion, now, id, kind, key));
+                }
+
+                if (upsert.length > 0) header[CATALOG_COLLECTIONS[kind]] = [];
+            }
+
+            // Новый заголовок: переданные поля + маркеры коллекций (всегда последними, по порядку)
+            const nextHeader = {};
+            for (const [key, value] of Object.entries(changes.header || header)) {
+                if (!Object.values(CATALOG_COLLECTIONS).includes(key)) nextHeader[key] = value;
+            }
+            for (const collection of Object.values(CATALOG_COLLECTIONS)) {
+                if (Array.isArray(header[collection])) nextHeader[collection] = [];
+            }
+            const headerJson = JSON.stringify(nextHeader);
+
+            if (writes.length === 0 && headerJson === row.data) {
+                return { success: true, id, unchanged: true, dataVersion: row.data_version };
+            }
+
+            for (const write of writes) write();
+
+            const result = this.statements.updateCatalogHeader.run(
+                headerJson, counts.template, counts.category, now, id, row.data_version
+            );
+            if (result.changes === 0) throw conflict();
+
+            this._audit({
+                entityType: 'catalog', entityId: id, action: 'update',
+                userId: ownerId, organizationId: orgId,
+                metadata: { dataVersion, patched: writes.length }
+            });
+
+            return { success: true, id, dataVersion };
         });
 
-        this.statements.upsertCatalog.run(
-            id,
-            name,
-            slug,           // slug
-            data.version || '1.2.0',
-            dataStr,
-            region,
-            templatesCount,
-            existing ? existing.created_at : now,  // Сохраняем оригинальный created_at
-            now,            // updated_at
-            ownerId,        // owner_id
-            orgId,          // organization_id
-            visibility,     // visibility
-            existing ? existing.data_version + 1 : 1  // data_version (increment on update)
-        );
+        return patch();
+    }
+
+    /**
+     * Изменения каталога после версии клиента
+     * @param {string} id - ID каталога
+     * @param {number} since - data_version, которая есть у клиента (0 - всё)
+     * @returns {Promise<Object>} { id, name, region, dataVersion, full, header,
+     *   templates: { upsert: [{ key, position, data }], delete: [key] }, categories: {...} }
+     */
+    async getCatalogChanges(id, since = 0, organizationId = null) {
+        await this.init();
+
+        const orgId = organizationId || this.defaultOrganizationId;
+        const row = this.db.transaction(() => this._splitLegacyCatalog(this._getCatalogOrThrow(id, orgId)))();
+
+        // Версия клиента из будущего (БД восстановлена из backup) - отдаём всё
+        const full = !(since > 0 && since <= row.data_version);
+        const result = {
+            id: row.id,
+            name: row.name,
+            region: row.region,
+            dataVersion: row.data_version,
+            full,
+            header: JSON.parse(row.data),
+            templates: { upsert: [], delete: [] },
+            categories: { upsert: [], delete: [] }
+        };
+
+        const effectiveSince = full ? 0 : since;
+        for (const item of this.statements.listCatalogItemChanges.all(id, effectiveSince, effectiveSince)) {
+            const collection = result[CATALOG_COLLECTIONS[item.kind]];
+            if (item.data === null) {
+                collection.delete.push(item.item_key);
+            } else {
+                collection.upsert.push({ key: item.item_key, position: item.position, data: JSON.parse(item.data) });
+            }
+        }
+
+        return result;
+    }
+
+    /**
+     * Строки каталога, которые отличаются от сохранённых (данные или позиция), и удалённые.
+     * Если сохранённые элементы идут в прежнем порядке, а новые - после них, элементы
+     * сохраняют свои позиции (новые - в конец); иначе позиции пересчитываются по порядку.
+     * @private
+     */
+    _diffCatalogItems(id, items) {
+        const stored = new Map();
+        const ends = { template: -1, category: -1 };
+        for (const row of this.statements.listCatalogItemStates.all(id)) {
+            stored.set(`${row.kind}:${row.item_key}`, row);
+            ends[row.kind] = Math.max(ends[row.kind], row.position);
+        }
+
+        for (const kind of Object.keys(CATALOG_COLLECTIONS)) {
+            const list = items.filter(item => item.kind === kind);
+            let last = -1;
+            let added = false;
+            const ordered = list.every((item) => {
+                const current = stored.get(`${kind}:${item.key}`);
+                if (!current || current.data === null) {
+                    added = true;
+                    return true;
+                }
+                if (added || current.position <= last) return false;
+                last = current.position;
+                return true;
+            });
 
-        return { success: true };
+            if (ordered) {
+                for (const item of list) {
+                    const current = stored.get(`${kind}:${item.key}`);
+                    item.position = current && current.data !== null ? current.position : ++ends[kind];
+                }
+            }
+        }
+
+        const upserts = items.filter((item) => {
+            const current = stored.get(`${item.kind}:${item.key}`);
+            stored.delete(`${item.kind}:${item.key}`);
+            return !current || current.data !== item.data || current.position !== item.position;
+        });
+        const deletes = [...stored.values()].filter(row => row.data !== null);
+
+        return { upserts, deletes };
+    }
+
+    /**
+     * @private
+     */
+    _getCatalogOrThrow(id, orgId) {
+        const row = this.statements.getCatalogById.get(id, orgId);
+        if (!row) {
+            throw catalogError(`Catalog not found: ${id}`, 'CATALOG_NOT_FOUND', 404);
+        }
+        return row;
+    }
+
+    /**
+     * Проверить тело delta-изменения каталога
+     * @private
+     * @returns {Array<{kind, upsert: Array<{key, data}>, remove: string[]}>}
+     */
+    _parseCatalogChanges(changes) {
+        const invalid = (message) => catalogError(message, 'INVALID_PATCH', 400);
+
+        if (!changes || typeof changes !== 'object') throw invalid('changes must be an object');
+        if (changes.header !== undefined && (changes.header === null || typeof changes.header !== 'object' || Array.isArray(changes.header))) {
+            throw invalid('header must be an object');
+        }
+
+        const operations = [];
+        for (const [kind, collection] of Object.entries(CATALOG_COLLECTIONS)) {
+            const { upsert = [], delete: remove = [] } = changes[collection] || {};
+            if (!Array.isArray(upsert) || !Array.isArray(remove)) {
+                throw invalid(`${collection}.upsert and ${collection}.delete must be arrays`);
+            }
+
+            const items = upsert.map((item) => {
+                const key = catalogItemKey(item);
+                if (key === null) throw invalid(`${collection}: every upserted item needs an id`);
+                return { key, data: JSON.stringify(item) };
+            });
+            if (remove.some(key => typeof key !== 'string')) {
+                throw invalid(`${collection}.delete must contain item keys`);
+            }
+
+            if (items.length > 0 || remove.length > 0) {
+                operations.push({ kind, upsert: items, remove });
+            }
+        }
+        return operations;
+    }
+
+    /**
+     * Разложить каталоги старого формата (templates / categories в catalogs.data)
+     * на строки catalog_items. Выполняется, только если такие каталоги есть.
+     * @private
+     */
+    _backfillCatalogItems() {
+        const legacy = this.db.prepare(`
+            SELECT * FROM catalogs
+            WHERE json_valid(data)
+              AND (json_array_length(data, '$.templates') > 0 OR json_array_length(data, '$.categories') > 0)
+        `).all();
+        if (legacy.length === 0) return;
+
+        this.db.transaction(() => {
+            for (const row of legacy) this._splitLegacyCatalog(row);
+        })();
+        console.log(`Catalogs migrated to catalog_items: ${legacy.length}`);
+    }
+
+    /**
+     * Каталог в старом формате (templates / categories внутри catalogs.data, напр. после
+     * импорта) - разложить на строки catalog_items. Вызывается внутри транзакции.
+     * @private
+     * @returns {Object} Строка catalogs с заголовком в data
+     */
+    _splitLegacyCatalog(row) {
+        const data = JSON.parse(row.data);
+        const isLegacy = Object.values(CATALOG_COLLECTIONS)
+            .some(collection => Array.isArray(data[collection]) && data[collection].length > 0);
+        if (!isLegacy) return row;
+
+        const now = Math.floor(Date.now() / 1000);
+        const { header, items } = splitCatalogData(data);
+        const counts = countCatalogItems(items);
+
+        for (const item of items) {
+            this.statements.upsertCatalogItem.run(
+                row.id, item.kind, item.key, item.position, item.data, row.data_version, row.organization_id, now
+            );
+        }
+        this.db.prepare('UPDATE catalogs SET data = ?, templates_count = ?, categories_count = ? WHERE id = ?')
+            .run(header, counts.template, counts.category, row.id);
+
+        return { ...row, data: header, templates_count: counts.template, categories_count: counts.category };
+    }
+
+    // ========================================================================
+    // Organization usage & quotas
+    // ========================================================================
+
+    /**
+     * Проверить лимит плана перед созданием ресурса.
+     * Одно чтение строки organizations (счётчики поддерживаются triggers),
+     * без COUNT(*) по таблицам. Вызывается после init(), синхронно -
+     * проверка и последующий INSERT выполняются без уступки event loop.
+     * @param {string} organizationId - ID организации
+     * @param {string} resource - 'users' | 'estimates' | 'catalogs'
+     * @param {number} addBytes - Размер создаваемых данных (для storage_limit_mb)
+     * @throws {Error} code QUOTA_EXCEEDED, status 403
+     */
+    assertQuota(organizationId, resource, addBytes = 0) {
+        const usage = this.statements.getOrganizationUsage.get(organizationId);
+
+        if (!usage || UNLIMITED_PLANS.has(usage.plan)) {
+            return;
+        }
+
+        const limit = usage[`max_${resource}`];
+        const current = usage[`current_${resource}_count`];
+
+        if (limit > 0 && current >= limit) {
+            throw this._quotaError(resource, limit, current);
+        }
+
+        const storageLimit = usage.storage_limit_mb;
+        if (storageLimit > 0 && usage.current_storage_mb + addBytes / BYTES_PER_MB > storageLimit) {
+            throw this._quotaError('storage_mb', storageLimit, Math.ceil(usage.current_storage_mb));
+        }
+    }
+
+    /**
+     * @private
+     */
+    _quotaError(resource, limit, current) {
+        const error = new Error(`Organization ${resource} limit reached (${current}/${limit})`);
+        error.code = 'QUOTA_EXCEEDED';
+        error.status = 403;
+        error.quota = { resource, limit, current };
+        return error;
+    }
+
+    /**
+     * Пересчитать счётчики usage по фактическим данным и исправить дрейф.
+     * Организации обрабатываются по одной с уступкой event loop между ними.
+     * @returns {Promise<Object>} { checked, corrected: [{ organizationId, before, after }] }
+     */
+    async reconcileUsageCounters() {
+        await this.init();
+
+        const orgIds = this.db.prepare('SELECT id FROM organizations').pluck().all();
+
+        const actualStmt = this.db.prepare(`
+            SELECT
+                (SELECT COUNT(*) FROM users WHERE organization_id = @id AND deleted_at IS NULL) AS users,
+                (SELECT COUNT(*) FROM estimates WHERE organization_id = @id AND deleted_at IS NULL) AS estimates,
+                (SELECT COUNT(*) FROM catalogs WHERE organization_id = @id AND deleted_at IS NULL) AS catalogs,
+                (SELECT COALESCE(SUM(length(CAST(data AS BLOB))), 0) FROM estimates
+                    WHERE organization_id = @id AND deleted_at IS NULL)
+                + (SELECT COALESCE(SUM(length(CAST(data AS BLOB))), 0) FROM catalogs
+                    WHERE organization_id = @id AND deleted_at IS NULL)
+                + (SELECT COALESCE(SUM(length(CAST(i.data AS BLOB))), 0) FROM catalog_items i
+                    JOIN catalogs c ON c.id = i.catalog_id
+                    WHERE i.organization_id = @id AND c.deleted_at IS NULL) AS bytes
+        `);
+        const fixStmt = this.db.prepare(`
+            UPDATE organizations
+            SET current_users_count = ?, current_estimates_count = ?,
+                current_catalogs_count = ?, current_storage_mb = ?
+            WHERE id = ?
+        `);
+
+        const corrected = [];
+
+        for (const id of orgIds) {
+            // Чтение и исправление в одной транзакции - между ними нет записей
+            const drift = this.db.transaction(() => {
+                const stored = this.statements.getOrganizationUsage.get(id);
+                const actual = actualStmt.get({ id });
+                if (!stored) return null;
+
+                const storedBytes = Math.round(stored.current_storage_mb * BYTES_PER_MB);
+                const inSync =
+                    stored.current_users_count === actual.users &&
+                    stored.current_estimates_count === actual.estimates &&
+                    stored.current_catalogs_count === actual.catalogs &&
+                    storedBytes === actual.bytes;
+
+                if (inSync) return null;
+
+                fixStmt.run(actual.users, actual.estimates, actual.catalogs, actual.bytes / BYTES_PER_MB, id);
+                return {
+                    organizationId: id,
+                    before: {
+                        users: stored.current_users_count,
+                        estimates: stored.current_estimates_count,
+                        catalogs: stored.current_catalogs_count,
+                        bytes: storedBytes
+                    },
+                    after: actual
+                };
+            })();
+
+            if (drift) corrected.push(drift);
+            await new Promise(resolve => setImmediate(resolve));
+        }
+
+        return { checked: orgIds.length, corrected };
     }
 
     // ========================================================================
@@ -582,19 +1777,93 @@ class SQLiteStorage extends StorageAdapter {
     // ========================================================================
 
     /**
-     * Загрузить настройки организации
-     * @param {string} organizationId - ID организации (опционально)
+     * Снимок настроек scope: значения разбираются один раз на версию и отдаются из памяти.
+     * Версию scope увеличивают triggers на settings (schema.sql) в транзакции записи -
+     * на каждый запрос только чтение settings_versions по первичному ключу.
+     * @param {string} scope - user | organization | app
+     * @param {string} scopeId - ID пользователя / организации / 'global'
+     * @returns {Promise<{scope, scopeId, version, settings, json, etag}>}
+     *   settings - только для чтения; json - JSON.stringify(settings); version 0 - scope не записывался
      */
-    async loadSettings(organizationId = null) {
+    async getSettingsSnapshot(scope, scopeId) {
         await this.init();
 
-        const orgId = organizationId || this.defaultOrganizationId;
-        const rows = this.statements.getAllSettings.all(orgId);
+        const cacheKey = `${scope}:${scopeId}`;
+        const cached = this.settingsSnapshots.get(cacheKey);
+        if (cached && cached.version === (this.statements.getSettingsVersion.get(scope, scopeId) || 0)) {
+            metrics.recordCache('settings_snapshots', true);
+            this.settingsSnapshots.delete(cacheKey);
+            this.settingsSnapshots.set(cacheKey, cached);
+            return cached;
+        }
+
+        metrics.recordCache('settings_snapshots', false);
 
-        const settings = {};
-        for (const row of rows) {
-            settings[row.key] = JSON.parse(row.value);
+        // Версия и строки - из одного read-снимка БД
+        const snapshot = this.db.transaction(() => {
+            const version = this.statements.getSettingsVersion.get(scope, scopeId) || 0;
+            const settings = {};
+            const stored = new Map();
+
+            for (const row of this.statements.getScopeSettings.all(scope, scopeId)) {
+                settings[row.key] = decodeSetting(row.value, row.value_type);
+                stored.set(row.key, `${row.value_type}:${row.value}`);
+            }
+
+            const json = JSON.stringify(settings);
+            const etag = `"${version}-${hashString(`${cacheKey}\n${json}`).slice(0, 16)}"`;
+            return { scope, scopeId, version, settings, json, etag, stored };
+        })();
+
+        this.settingsSnapshots.set(cacheKey, snapshot);
+        if (this.settingsSnapshots.size > SETTINGS_SNAPSHOT_CACHE_SIZE) {
+            this.settingsSnapshots.delete(this.settingsSnapshots.keys().next().value);
         }
+        return snapshot;
+    }
+
+    /**
+     * Записать несколько настроек scope одной транзакцией (версия scope растёт в ней же).
+     * Значения, совпадающие с сохранёнными, не пишутся; если не изменилось ничего - версия прежняя.
+     * @param {string} scope - user | organization | app
+     * @param {string} scopeId
+     * @param {object} values - key-value pairs
+     * @returns {Promise<{version, before, unchanged?}>} before - прежние значения изменённых ключей
+     */
+    async updateSettings(scope, scopeId, values) {
+        const current = await this.getSettingsSnapshot(scope, scopeId);
+
+        const changed = [];
+        const before = {};
+        for (const [key, value] of Object.entries(values)) {
+            const encoded = encodeSetting(value);
+            if (current.stored.get(key) === `${encoded.valueType}:${encoded.value}`) continue;
+
+            changed.push([key, encoded]);
+            if (key in current.settings) before[key] = current.settings[key];
+        }
+
+        if (changed.length === 0) {
+            return { version: current.version, before, unchanged: true };
+        }
+
+        const now = Math.floor(Date.now() / 1000);
+        this.db.transaction(() => {
+            for (const [key, { value, valueType }] of changed) {
+                this.statements.upsertSetting.run(scope, scopeId, key, value, valueType, now, now);
+            }
+        })();
+
+        return { version: (await this.getSettingsSnapshot(scope, scopeId)).version, before };
+    }
+
+    /**
+     * Загрузить настройки организации
+     * @param {string} organizationId - ID организации (опционально)
+     */
+    async loadSettings(organizationId = null) {
+        const orgId = organizationId || this.defaultOrganizationId;
+        const { settings } = await this.getSettingsSnapshot('organization', orgId);
 
         // Дефолтные настройки если нет в БД
         if (Object.keys(settings).length === 0) {
@@ -604,32 +1873,28 @@ class SQLiteStorage extends StorageAdapter {
             };
         }
 
-        return settings;
+        return { ...settings };
     }
 
     /**
      * Сохранить настройки организации
      * @param {object} data - Настройки (key-value pairs)
      * @param {string} organizationId - ID организации (опционально)
+     * @param {string} userId - Кто сохраняет (для audit, опционально)
      */
-    async saveSettings(data, organizationId = null) {
-        await this.init();
-
-        const now = Math.floor(Date.now() / 1000);
+    async saveSettings(data, organizationId = null, userId = null) {
         const orgId = organizationId || this.defaultOrganizationId;
+        const { version, before, unchanged } = await this.updateSettings('organization', orgId, data);
 
-        // Сохраняем каждую настройку
-        for (const [key, value] of Object.entries(data)) {
-            this.statements.upsertSetting.run(
-                key,
-                JSON.stringify(value),
-                now,
-                now,
-                orgId       // organization_id
-            );
+        if (!unchanged) {
+            this._audit({
+                entityType: 'settings', entityId: orgId, action: 'update',
+                before, after: JSON.stringify(data),
+                userId: userId || this.defaultUserId, organizationId: orgId
+            });
         }
 
-        return { success: true };
+        return { success: true, version };
     }
 
     // ========================================================================
@@ -667,19 +1932,47 @@ class SQLiteStorage extends StorageAdapter {
     }
 
     /**
-     * Вычислить hash данных для optimistic locking
+     * Вычислить hash данных (optimistic locking, write elision).
+     * Хешируется канонический JSON, а не строка клиента: перестановка ключей
+     * или другое форматирование не считаются изменением.
+     * Не криптографическая задача - sha1 заметно дешевле sha256 на больших сметах.
+     * @param {Object|string} data - Данные или их JSON (строка не-JSON хешируется как есть)
      * @private
      */
     _calculateHash(data) {
+        if (data && typeof data === 'object') {
+            return hashString(canonicalJson(data)).substring(0, 32);
+        }
+
         if (!data || typeof data !== 'string') {
-            throw new Error('_calculateHash requires a non-empty string');
+            throw new Error('_calculateHash requires an object or a non-empty string');
+        }
+
+        let parsed;
+        try {
+            parsed = JSON.parse(data);
+        } catch (err) {
+            return hashString(data).substring(0, 32);
+        }
+
+        return hashString(canonicalJson(parsed)).substring(0, 32);
+    }
+
+    /**
+     * Совпадает ли data_hash сохраняемых данных с текущей строкой.
+     * Совпадение учитывается в estimate_writes_elided_total.
+     * @param {Object} existing - Строка estimates (нужны data_hash)
+     * @param {string} dataHash - _calculateHash новых данных
+     * @param {string} [source] - Label метрики (storage / batch / api / sync)
+     * @returns {boolean}
+     */
+    isUnchangedEstimate(existing, dataHash, source = 'storage') {
+        if (!existing || !existing.data_hash || existing.data_hash !== dataHash) {
+            return false;
         }
 
-        return crypto
-            .createHash('sha256')
-            .update(data)
-            .digest('hex')
-            .substring(0, 32);
+        estimateWritesElided.inc({ source });
+        return true;
     }
 
     /**
@@ -771,6 +2064,7 @@ class SQLiteStorage extends StorageAdapter {
             this.db.close();
             this.db = null;
             this.initialized = false;
+            this.templateSnapshots.clear();
         }
     }
 }
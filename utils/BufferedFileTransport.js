@@ -0,0 +1,206 @@
+/**
+ * BufferedFileTransport - асинхронный batched file transport для winston
+ *
+ * Вместо записи каждой строки в поток: строки копятся в ограниченном
+ * ring buffer и сбрасываются одним appendFile раз в flushInterval
+ * (или раньше, когда набралось flushBatchSize записей).
+ *
+ * - Bounded: при переполнении вытесняются самые старые записи (счётчик dropped)
+ * - Rotation: file.log → file1.log → ... → file{maxFiles-1}.log (tailable)
+ * - На process exit остаток буфера дописывается синхронно
+ */
+
+const fs = require('fs');
+const { Transport } = require('winston');
+
+// Отформатированная строка (winston/triple-beam MESSAGE symbol)
+const MESSAGE = Symbol.for('message');
+
+class BufferedFileTransport extends Transport {
+    /**
+     * @param {Object} options - winston transport options плюс:
+     * @param {string} options.filename - Путь к лог-файлу
+     * @param {number} [options.maxsize] - Размер файла для rotation (bytes)
+     * @param {number} [options.maxFiles] - Сколько файлов хранить (включая текущий)
+     * @param {number} [options.bufferSize] - Ёмкость ring buffer (записей)
+     * @param {number} [options.flushInterval] - Период flush (ms)
+     * @param {number} [options.flushBatchSize] - Flush раньше при таком количестве записей
+     */
+    constructor(options = {}) {
+        super(options);
+
+        this.filename = options.filename;
+        this.maxsize = options.maxsize || 5242880;
+        this.maxFiles = options.maxFiles || 5;
+        this.bufferSize = options.bufferSize || 10000;
+        this.flushInterval = options.flushInterval || 1000;
+        this.flushBatchSize = options.flushBatchSize || 500;
+
+        // Ring buffer
+        this.buffer = new Array(this.bufferSize);
+        this.head = 0;
+        this.length = 0;
+        this.dropped = 0;
+        this.totalDropped = 0;
+
+        this.flushing = false;
+        this.flushScheduled = false;
+        this.currentSize = this._statSize();
+
+        this.timer = setInterval(() => this.flush(), this.flushInterval);
+        this.timer.unref();
+
+        this._onExit = () => this.flushSync();
+        process.on('exit', this._onExit);
+    }
+
+    log(info, callback) {
+        this._push(info[MESSAGE] + '\n');
+
+        if (this.length >= this.flushBatchSize && !this.flushScheduled) {
+            this.flushScheduled = true;
+            setImmediate(() => {
+                this.flushScheduled = false;
+                this.flush();
+            });
+        }
+
+        this.emit('logged', info);
+        callback();
+    }
+
+    /**
+     * Асинхронно сбросить буфер в файл
+     * @returns {Promise<void>}
+     */
+    async flush() {
+        if (this.flushing || this.length === 0) return;
+        this.flushing = true;
+
+        try {
+            const chunk = this._drain();
+            await fs.promises.appendFile(this.filename, chunk);
+            this.currentSize += Buffer.byteLength(chunk);
+
+            if (this.currentSize >= this.maxsize) {
+                await this._rotate();
+            }
+        } catch (err) {
+            this.emit('warn', err);
+        } finally {
+            this.flushing = false;
+        }
+
+        // Пока писали, могли накопиться новые записи
+        if (this.length >= this.flushBatchSize) {
+            this.flush();
+        }
+    }
+
+    /**
+     * Синхронный flush (process exit / close)
+     */
+    flushSync() {
+        if (this.length === 0) return;
+
+        try {
+            fs.appendFileSync(this.filename, this._drain());
+        } catch (err) {
+            // Процесс завершается - сообщить об ошибке уже некуда
+        }
+    }
+
+    close() {
+        clearInterval(this.timer);
+        process.removeListener('exit', this._onExit);
+        this.flushSync();
+    }
+
+    /**
+     * Статистика буфера (для метрик)
+     */
+    getStats() {
+        return {
+            buffered: this.length,
+            capacity: this.bufferSize,
+            dropped: this.totalDropped
+        };
+    }
+
+    /**
+     * @private
+     */
+    _push(line) {
+        const tail = (this.head + this.length) % this.bufferSize;
+        this.buffer[tail] = line;
+
+        if (this.length === this.bufferSize) {
+            // Переполнение - вытесняем самую старую запись
+            this.head = (this.head + 1) % this.bufferSize;
+            this.dropped++;
+            this.totalDropped++;
+        } else {
+            this.length++;
+        }
+    }
+
+    /**
+     * Забрать всё содержимое буфера одной строкой
+     * @private
+     */
+    _drain() {
+        const lines = new Array(this.length);
+        for (let i = 0; i < this.length; i++) {
+            const index = (this.head + i) % this.bufferSize;
+            lines[i] = this.buffer[index];
+            this.buffer[index] = undefined;
+        }
+        this.head = 0;
+        this.length = 0;
+
+        if (this.dropped > 0) {
+            lines.unshift(JSON.stringify({
+                level: 'warn',
+                message: 'Log buffer overflow, entries dropped',
+                dropped: this.dropped,
+                timestamp: new Date().toISOString()
+            }) + '\n');
+            this.dropped = 0;
+        }
+
+        return lines.join('');
+    }
+
+    /**
+     * Tailable rotation: текущий файл всегда `filename`
+     * @private
+     */
+    async _rotate() {
+        const ext = this.filename.endsWith('.log') ? '.log' : '';
+        const base = ext ? this.filename.slice(0, -ext.length) : this.filename;
+        const nameFor = (n) => (n === 0 ? this.filename : `${base}${n}${ext}`);
+
+        for (let n = this.maxFiles - 1; n >= 1; n--) {
+            try {
+                await fs.promises.rename(nameFor(n - 1), nameFor(n));
+            } catch (err) {
+                if (err.code !== 'ENOENT') throw err;
+            }
+        }
+
+        this.currentSize = 0;
+    }
+
+    /**
+     * @private
+     */
+    _statSize() {
+        try {
+            return fs.statSync(this.filename).size;
+        } catch (err) {
+            return 0;
+        }
+    }
+}
+
+module.exports = BufferedFileTransport;
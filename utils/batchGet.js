@@ -0,0 +1,110 @@
+/**
+ * Batch-get: общий код для POST /api/v1/estimates/batch-get и /api/v1/catalogs/batch-get
+ *
+ * Клиент передаёт список id и (опционально) известные ему data_version:
+ *   { ids: ['a', 'b'], versions: { a: 3 } }
+ * Сервер читает все записи одним запросом WHERE id IN (...); для записей с
+ * совпадающей версией data не выбирается (CASE ... THEN NULL), такие id
+ * возвращаются в unchanged. Ответ пишется в поток по одной записи - data
+ * вставляется как есть, без JSON.parse / JSON.stringify на сервере.
+ */
+
+const BATCH_GET_LIMIT = parseInt(process.env.BATCH_GET_LIMIT) || 500;
+
+function batchGetError(message, code = 'INVALID_BATCH_GET') {
+    const error = new Error(message);
+    error.code = code;
+    error.status = 400;
+    return error;
+}
+
+/**
+ * Проверить тело запроса
+ * @param {Object} body - { ids, versions }
+ * @returns {{ids: string[], versions: Object}}
+ * @throws {Error} code INVALID_BATCH_GET | BATCH_GET_LIMIT_EXCEEDED, status 400
+ */
+function parseBatchGetRequest(body) {
+    const { ids, versions = {} } = body || {};
+
+    if (!Array.isArray(ids) || ids.some(id => typeof id !== 'string')) {
+        throw batchGetError('ids must be an array of IDs');
+    }
+    if (versions === null || typeof versions !== 'object' || Array.isArray(versions)) {
+        throw batchGetError('versions must be an object { id: data_version }');
+    }
+
+    const unique = [...new Set(ids)];
+    if (unique.length > BATCH_GET_LIMIT) {
+        throw batchGetError(`Too many IDs: ${unique.length}, limit is ${BATCH_GET_LIMIT}`,
+            'BATCH_GET_LIMIT_EXCEEDED');
+    }
+
+    const known = {};
+    for (const id of unique) {
+        const version = parseInt(versions[id]);
+        if (Number.isInteger(version)) known[id] = version;
+    }
+
+    return { ids: unique, versions: known };
+}
+
+/**
+ * SQL-фрагменты для запроса: placeholders для IN (...) и выражение data,
+ * которое возвращает NULL, если версия у клиента совпадает.
+ * Параметры: [JSON.stringify(versions), ...ids]
+ */
+function batchGetSql(ids) {
+    return {
+        placeholders: ids.map(() => '?').join(', '),
+        dataColumn: "CASE WHEN data_version = json_extract(?, '$.' || json_quote(id)) THEN NULL ELSE data END AS data"
+    };
+}
+
+/**
+ * Потоковый JSON ответ:
+ * {"success":true,"data":{"<collection>":[{...meta,"data":<raw>}, ...], ...summary}}
+ * @param {Object} res - Express response
+ * @param {string} collection - 'estimates' | 'catalogs'
+ */
+function createBatchGetWriter(res, collection) {
+    let count = 0;
+
+    res.status(200).type('application/json');
+    res.write(`{"success":true,"data":{${JSON.stringify(collection)}:[`);
+
+    return {
+        /**
+         * Записать одну запись; ждёт drain, если буфер ответа заполнен
+         * @param {Object} meta - Поля записи (без data)
+         * @param {string} dataJson - data в виде JSON строки
+         */
+        async write(meta, dataJson) {
+            const head = JSON.stringify(meta).slice(0, -1);
+            const separator = head.length > 1 ? ',' : '';
+            const chunk = `${count > 0 ? ',' : ''}${head}${separator}"data":${dataJson}}`;
+
+            count++;
+            if (!res.write(chunk)) {
+                await new Promise(resolve => res.once('drain', resolve));
+            }
+        },
+
+        /**
+         * Закрыть массив и дописать сводку (unchanged, not_found, ...)
+         */
+        end(summary) {
+            const tail = Object.entries(summary)
+                .map(([key, value]) => `,${JSON.stringify(key)}:${JSON.stringify(value)}`)
+                .join('');
+            res.end(`]${tail}}}`);
+        }
+    };
+}
+
+module.exports = {
+    BATCH_GET_LIMIT,
+    parseBatchGetRequest,
+    batchGetSql,
+    createBatchGetWriter
+};
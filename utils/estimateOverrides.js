@@ -0,0 +1,165 @@
+/**
+ * Override-документы для copy-on-write смет из шаблонов
+ *
+ * Смета-экземпляр хранит не полный JSON, а отличия от снимка шаблона:
+ *   { set: [[path, value], ...], unset: [path, ...] }
+ * path - массив ключей (строки для объектов, числа для индексов массивов).
+ *
+ * Изменение значений (клиент, даты, цены, pax) выражается через set/unset.
+ * Структурное расхождение - другая длина массива (добавлена / удалена услуга)
+ * или массив вместо объекта - override не строится, смета копируется целиком.
+ */
+
+// Больше операций - дешевле хранить полную копию
+const MAX_OPERATIONS = 1000;
+
+// Ключи, запись в которые меняет прототип, а не данные
+const FORBIDDEN_KEYS = new Set(['__proto__', 'constructor', 'prototype']);
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+function isValidPath(path) {
+    return Array.isArray(path) && path.length > 0 && path.every(key =>
+        (typeof key === 'string' && !FORBIDDEN_KEYS.has(key)) || (Number.isInteger(key) && key >= 0));
+}
+
+/**
+ * Проверить форму override-документа, пришедшего от клиента
+ * @param {*} overrides - { set: [[path, value], ...], unset: [path, ...] }
+ * @returns {string|null} Текст ошибки или null
+ */
+function validateOverrides(overrides) {
+    if (!isPlainObject(overrides)) return 'Patch must be an object';
+
+    const { set = [], unset = [] } = overrides;
+    if (!Array.isArray(set) || !Array.isArray(unset)) return 'set and unset must be arrays';
+
+    for (const entry of set) {
+        if (!Array.isArray(entry) || entry.length !== 2 || !isValidPath(entry[0])) {
+            return 'Each set entry must be a [path, value] pair with a non-empty path of strings or integers';
+        }
+    }
+    for (const path of unset) {
+        if (!isValidPath(path)) {
+            return 'Each unset entry must be a non-empty path of strings or integers';
+        }
+    }
+    return null;
+}
+
+function invalidPatch(message) {
+    const error = new Error(message);
+    error.code = 'INVALID_PATCH';
+    error.status = 400;
+    return error;
+}
+
+/**
+ * Построить override-документ target относительно base
+ * @param {*} base - Снимок шаблона
+ * @param {*} target - Данные сметы
+ * @returns {{set: Array, unset: Array}|null} null - структурное расхождение
+ */
+function computeOverrides(base, target) {
+    const set = [];
+    const unset = [];
+
+    const walk = (a, b, path) => {
+        if (a === b) return true;
+
+        if (Array.isArray(a) || Array.isArray(b)) {
+            if (!Array.isArray(a) || !Array.isArray(b) || a.length !== b.length) {
+                return false;
+            }
+            for (let i = 0; i < a.length; i++) {
+                if (!walk(a[i], b[i], [...path, i])) return false;
+            }
+            return true;
+        }
+
+        if (isPlainObject(a) && isPlainObject(b)) {
+            for (const key of Object.keys(a)) {
+                if (!(key in b)) unset.push([...path, key]);
+            }
+            for (const key of Object.keys(b)) {
+                if (key in a) {
+                    if (!walk(a[key], b[key], [...path, key])) return false;
+                } else {
+                    set.push([[...path, key], b[key]]);
+                }
+            }
+        } else {
+            set.push([path, b]);
+        }
+
+        return set.length + unset.length <= MAX_OPERATIONS;
+    };
+
+    return walk(base, target, []) ? { set, unset } : null;
+}
+
+/**
+ * Применить override-документ к снимку.
+ * base не изменяется: копируются только контейнеры на путях из overrides,
+ * остальное дерево разделяется со снимком (результат - только для чтения/JSON).
+ * @param {*} base
+ * @param {{set: Array, unset: Array}} overrides
+ * @param {Object} [options]
+ * @param {boolean} [options.strict] - Изменения от клиента: путь должен идти через
+ *   существующие объекты / массивы (индекс массива - целое не больше длины),
+ *   иначе INVALID_PATCH (400) вместо порчи данных
+ * @returns {*}
+ */
+function applyOverrides(base, overrides, { strict = false } = {}) {
+    const holder = { root: base };
+    const copied = new Set([holder]);
+
+    const checkStep = (container, key, path, last) => {
+        if (Array.isArray(container)) {
+            if (!Number.isInteger(key) || key > container.length || (!last && key === container.length)) {
+                throw invalidPatch(`Invalid array index in patch path: ${JSON.stringify(path)}`);
+            }
+        } else if (!isPlainObject(container)) {
+            throw invalidPatch(`Patch path runs through a non-object value: ${JSON.stringify(path)}`);
+        }
+    };
+
+    const parentOf = (path) => {
+        let parent = holder;
+        const keys = ['root', ...path];
+
+        for (let i = 0; i < keys.length - 1; i++) {
+            let child = parent[keys[i]];
+            if (strict) checkStep(child, keys[i + 1], path, i === keys.length - 2);
+            if (!copied.has(child)) {
+                child = Array.isArray(child) ? child.slice() : { ...child };
+                parent[keys[i]] = child;
+                copied.add(child);
+            }
+            parent = child;
+        }
+        return [parent, keys[keys.length - 1]];
+    };
+
+    for (const path of overrides.unset || []) {
+        const [parent, key] = parentOf(path);
+        if (strict && Array.isArray(parent)) {
+            throw invalidPatch(`Cannot unset an array element: ${JSON.stringify(path)}`);
+        }
+        delete parent[key];
+    }
+    for (const [path, value] of overrides.set || []) {
+        const [parent, key] = parentOf(path);
+        parent[key] = value;
+    }
+
+    return holder.root;
+}
+
+module.exports = {
+    computeOverrides,
+    applyOverrides,
+    validateOverrides
+};
@@ -0,0 +1,85 @@
+/**
+ * JSON body: разбор и валидация структуры
+ *
+ * Общий код для основного потока (маленькие тела) и jsonParseWorker
+ * (большие тела). Валидаторы проверяют только форму тела - то, без чего
+ * route всё равно вернёт 400, - чтобы невалидный импорт на десятки MB
+ * отклонялся в воркере, не доходя до основного потока.
+ */
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+/**
+ * Валидаторы по имени (имя передаётся в воркер вместо функции).
+ * Возвращают текст ошибки или null.
+ */
+const VALIDATORS = {
+    object: (body) => (isPlainObject(body) ? null : 'Request body must be a JSON object'),
+
+    estimate: (body) => (isPlainObject(body) && body.data
+        ? null
+        : 'Missing required field: data'),
+
+    catalog: (body) => (isPlainObject(body) && body.name && body.data
+        ? null
+        : 'Missing required fields: name, data'),
+
+    import: (body) => (isPlainObject(body) && body.version && isPlainObject(body.data)
+        ? null
+        : 'Invalid import data: missing version or data fields'),
+
+    estimateBatch: (body) => (isPlainObject(body) && Array.isArray(body.items) && body.items.length > 0
+        ? null
+        : 'Invalid request: items must be a non-empty array'),
+
+    syncBatch: (body) => (isPlainObject(body) && Array.isArray(body.changes)
+        ? null
+        : 'Invalid request: changes must be an array')
+};
+
+function bodyError(message, code, status = 400) {
+    const error = new Error(message);
+    error.code = code;
+    error.status = status;
+    return error;
+}
+
+/**
+ * Разобрать UTF-8 буфер и проверить структуру
+ * @param {Buffer|Uint8Array} buffer - Тело запроса
+ * @param {string} [validate] - Имя валидатора из VALIDATORS (default: 'object')
+ * @returns {*} Разобранное тело
+ * @throws {Error} code INVALID_JSON | INVALID_BODY, status 400
+ */
+function parseJsonBody(buffer, validate = 'object') {
+    const text = Buffer.isBuffer(buffer)
+        ? buffer.toString('utf8')
+        : Buffer.from(buffer.buffer, buffer.byteOffset, buffer.byteLength).toString('utf8');
+
+    let body;
+    try {
+        body = JSON.parse(text);
+    } catch (err) {
+        throw bodyError(`Invalid JSON: ${err.message}`, 'INVALID_JSON');
+    }
+
+    const validator = VALIDATORS[validate];
+    if (!validator) {
+        throw new Error(`Unknown JSON body validator: ${validate}`);
+    }
+
+    const message = validator(body);
+    if (message) {
+        throw bodyError(message, 'INVALID_BODY');
+    }
+
+    return body;
+}
+
+module.exports = {
+    VALIDATORS,
+    parseJsonBody,
+    bodyError
+};
@@ -7,10 +7,13 @@
  * - Console output в development
  * - Timestamps и metadata
  * - No sensitive data logging
+ * - File transports буферизуются и пишутся batch'ами (BufferedFileTransport)
+ * - Sampling для high-volume info логов (HTTP requests, list/load)
  */
 
 const winston = require('winston');
 const path = require('path');
+const BufferedFileTransport = require('./BufferedFileTransport');
 
 // Определяем окружение
 const isDevelopment = process.env.NODE_ENV !== 'production';
@@ -59,27 +62,30 @@ const consoleFormat = winston.format.combine(
 const transports = [];
 
 // File transports (всегда активны кроме test mode)
+// Асинхронные: ring buffer + batched flush, без записи на каждую строку
 if (!isTest) {
     // Error logs - только errors
     transports.push(
-        new winston.transports.File({
+        new BufferedFileTransport({
             filename: path.join(logsDir, 'error.log'),
             level: 'error',
             format: customFormat,
             maxsize: 5242880, // 5MB
             maxFiles: 5,
-            tailable: true
+            bufferSize: parseInt(process.env.LOG_BUFFER_SIZE) || 10000,
+            flushInterval: parseInt(process.env.LOG_FLUSH_INTERVAL_MS) || 1000
         })
     );
 
     // Combined logs - все уровни
     transports.push(
-        new winston.transports.File({
+        new BufferedFileTransport({
             filename: path.join(logsDir, 'combined.log'),
             format: customFormat,
             maxsize: 5242880, // 5MB
             maxFiles: 5,
-            tailable: true
+            bufferSize: parseInt(process.env.LOG_BUFFER_SIZE) || 10000,
+            flushInterval: parseInt(process.env.LOG_FLUSH_INTERVAL_MS) || 1000
         })
     );
 }
@@ -138,17 +144,100 @@ function sanitize(data) {
     return sanitized;
 }
 
+// ============================================================================
+// Sampling
+// ============================================================================
+
+/**
+ * Sample rates для high-volume info логов (0..1).
+ * Ключи `http:<prefix>` применяются к HTTP request логам по префиксу URL
+ * (самый длинный совпавший префикс), остальные - к logger.infoSampled().
+ * Переопределение: LOG_SAMPLE_RATES="http:/api/v1/sync=0.01,estimates.load=0.5"
+ */
+const sampleRates = {
+    'http:/': 0.05,                 // static assets
+    'http:/api/': 1,
+    'http:/api/estimates': 0.1,
+    'http:/api/v1/estimates': 0.1,
+    'http:/api/v1/catalogs': 0.2,
+    'http:/api/v1/sync': 0.05,
+    'http:/health': 0.01,
+    'http:/api/health': 0.01,
+    'estimates.list': 0.1,
+    'estimates.load': 0.1,
+    'catalogs.list': 0.1,
+    'catalogs.load': 0.1
+};
+
+if (process.env.LOG_SAMPLE_RATES) {
+    for (const pair of process.env.LOG_SAMPLE_RATES.split(',')) {
+        const [key, rate] = pair.split('=');
+        if (key && !isNaN(parseFloat(rate))) {
+            sampleRates[key.trim()] = Math.min(1, Math.max(0, parseFloat(rate)));
+        }
+    }
+}
+
+// HTTP prefixes отсортированы по длине (longest match first)
+const httpPrefixes = Object.keys(sampleRates)
+    .filter(key => key.startsWith('http:'))
+    .map(key => key.slice(5))
+    .sort((a, b) => b.length - a.length);
+
+// Запросы медленнее этого порога логируются всегда
+const SLOW_REQUEST_MS = parseInt(process.env.LOG_SLOW_REQUEST_MS) || 1000;
+
+/**
+ * Sample rate для HTTP запроса по URL
+ * @private
+ */
+function httpSampleRate(url) {
+    for (const prefix of httpPrefixes) {
+        if (url.startsWith(prefix)) {
+            return sampleRates[`http:${prefix}`];
+        }
+    }
+    return 1;
+}
+
+/**
+ * Решить, попадает ли запись в выборку
+ * @param {number} rate - 0..1
+ * @returns {boolean}
+ */
+logger.shouldSample = (rate) => rate >= 1 || (rate > 0 && Math.random() < rate);
+
+/**
+ * Info лог с sampling по ключу (для "Estimate loaded" и подобных).
+ * В metadata добавляется sampleRate, чтобы счётчики можно было масштабировать.
+ */
+logger.infoSampled = (key, message, metadata = {}) => {
+    const rate = sampleRates[key] !== undefined ? sampleRates[key] : 1;
+    if (!logger.shouldSample(rate)) return;
+
+    logger.info(message, rate < 1 ? { ...metadata, sampleRate: rate } : metadata);
+};
+
 /**
  * Log HTTP request (для Express middleware)
+ * Ошибки (4xx/5xx) и медленные запросы логируются всегда, остальные - с sampling
  */
 logger.logRequest = (req, res, duration) => {
-    logger.info('HTTP Request', {
+    const url = req.originalUrl || req.url;
+    const isError = res.statusCode >= 400;
+    const isSlow = duration >= SLOW_REQUEST_MS;
+    const rate = isError || isSlow ? 1 : httpSampleRate(url);
+
+    if (!logger.shouldSample(rate)) return;
+
+    logger.log(isError ? 'warn' : 'info', 'HTTP Request', {
         method: req.method,
-        url: req.url,
+        url,
         statusCode: res.statusCode,
         duration: `${duration}ms`,
         ip: req.ip || req.connection.remoteAddress,
-        userAgent: req.get('user-agent')
+        userAgent: req.get('user-agent'),
+        ...(rate < 1 ? { sampleRate: rate } : {})
     });
 };
 
@@ -200,13 +289,10 @@ logger.middleware = () => {
     return (req, res, next) => {
         const startTime = Date.now();
 
-        // Перехватываем res.end для логирования response
-        const originalEnd = res.end;
-        res.end = function(...args) {
-            const duration = Date.now() - startTime;
-            logger.logRequest(req, res, duration);
-            originalEnd.apply(res, args);
-        };
+        // 'finish' вместо перехвата res.end - лог пишется вне пути ответа
+        res.on('finish', () => {
+            logger.logRequest(req, res, Date.now() - startTime);
+        });
 
         next();
     };
@@ -219,5 +305,12 @@ if (!fs.existsSync(logsDir)) {
     logger.info('Logs directory created', { path: logsDir });
 }
 
+/**
+ * Статистика буферов file transports (для метрик)
+ */
+logger.getBufferStats = () => transports
+    .filter(t => t instanceof BufferedFileTransport)
+    .map(t => ({ filename: path.basename(t.filename), ...t.getStats() }));
+
 // Export logger
 module.exports = logger;
@@ -0,0 +1,346 @@
+/**
+ * In-process metrics registry (Prometheus text exposition format)
+ *
+ * Features:
+ * - Counter / Gauge / Histogram с labels
+ * - HTTP middleware: latency по route, размеры request/response
+ * - Тайминги SQLite prepared statements по имени statement
+ * - Default metrics: heap, RSS, event-loop lag
+ * - Collectors - gauges, которые вычисляются в момент scrape (WAL size, пулы, буферы)
+ *
+ * Usage:
+ *   const metrics = require('./utils/metrics');
+ *   app.use(metrics.middleware());
+ *   app.get('/metrics', (req, res) => res.type(metrics.CONTENT_TYPE).send(metrics.render()));
+ */
+
+const { monitorEventLoopDelay } = require('perf_hooks');
+
+const CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8';
+
+// Buckets (seconds / bytes)
+const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+const SQL_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1];
+const SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216];
+
+// ============================================================================
+// Metric types
+// ============================================================================
+
+function escapeLabel(value) {
+    return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+}
+
+function formatLabels(labels) {
+    const keys = Object.keys(labels);
+    if (keys.length === 0) return '';
+    return '{' + keys.map(key => `${key}="${escapeLabel(labels[key])}"`).join(',') + '}';
+}
+
+function labelKey(labels) {
+    return formatLabels(labels);
+}
+
+class Counter {
+    constructor(name, help) {
+        this.name = name;
+        this.help = help;
+        this.type = 'counter';
+        this.values = new Map();
+    }
+
+    inc(labels = {}, value = 1) {
+        const key = labelKey(labels);
+        const entry = this.values.get(key);
+        if (entry) {
+            entry.value += value;
+        } else {
+            this.values.set(key, { labels, value });
+        }
+    }
+
+    get(labels = {}) {
+        const entry = this.values.get(labelKey(labels));
+        return entry ? entry.value : 0;
+    }
+
+    lines() {
+        return [...this.values.values()].map(({ labels, value }) =>
+            `${this.name}${formatLabels(labels)} ${value}`);
+    }
+}
+
+class Gauge extends Counter {
+    constructor(name, help) {
+        super(name, help);
+        this.type = 'gauge';
+    }
+
+    set(labels, value) {
+        if (typeof labels === 'number') {
+            value = labels;
+            labels = {};
+        }
+        this.values.set(labelKey(labels), { labels, value });
+    }
+}
+
+class Histogram {
+    constructor(name, help, buckets) {
+        this.name = name;
+        this.help = help;
+        this.type = 'histogram';
+        this.buckets = buckets;
+        this.values = new Map();
+    }
+
+    observe(labels, value) {
+        const key = labelKey(labels);
+        let entry = this.values.get(key);
+        if (!entry) {
+            entry = { labels, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+            this.values.set(key, entry);
+        }
+
+        // Храним не-кумулятивные счётчики, кумулятивность - при render
+        for (let i = 0; i < this.buckets.length; i++) {
+            if (value <= this.buckets[i]) {
+                entry.counts[i]++;
+                break;
+            }
+        }
+        entry.sum += value;
+        entry.count++;
+    }
+
+    lines() {
+        const out = [];
+        for (const { labels, counts, sum, count } of this.values.values()) {
+            let cumulative = 0;
+            for (let i = 0; i < this.buckets.length; i++) {
+                cumulative += counts[i];
+                out.push(`${this.name}_bucket${formatLabels({ ...labels, le: this.buckets[i] })} ${cumulative}`);
+            }
+            out.push(`${this.name}_bucket${formatLabels({ ...labels, le: '+Inf' })} ${count}`);
+            out.push(`${this.name}_sum${formatLabels(labels)} ${sum}`);
+            out.push(`${this.name}_count${formatLabels(labels)} ${count}`);
+        }
+        return out;
+    }
+}
+
+// ============================================================================
+// Registry
+// ============================================================================
+
+const registry = new Map();
+const collectors = [];
+
+function register(metric) {
+    if (registry.has(metric.name)) {
+        return registry.get(metric.name);
+    }
+    registry.set(metric.name, metric);
+    return metric;
+}
+
+const counter = (name, help) => register(new Counter(name, help));
+const gauge = (name, help) => register(new Gauge(name, help));
+const histogram = (name, help, buckets = LATENCY_BUCKETS) => register(new Histogram(name, help, buckets));
+
+/**
+ * Зарегистрировать collector - вызывается перед каждым render()
+ * @param {Function} fn - (metrics) => void, обновляет gauges
+ */
+function registerCollector(fn) {
+    collectors.push(fn);
+}
+
+/**
+ * Текст для /metrics
+ * @returns {string}
+ */
+function render() {
+    for (const collect of collectors) {
+        try {
+            collect(module.exports);
+        } catch (err) {
+            // Сломанный collector не должен ронять весь scrape
+            collectorErrors.inc({ error: err.message.slice(0, 100) });
+        }
+    }
+
+    const out = [];
+    for (const metric of registry.values()) {
+        if (metric.values.size === 0) continue;
+        out.push(`# HELP ${metric.name} ${metric.help}`);
+        out.push(`# TYPE ${metric.name} ${metric.type}`);
+        out.push(...metric.lines());
+    }
+    return out.join('\n') + '\n';
+}
+
+// ============================================================================
+// Built-in metrics
+// ============================================================================
+
+const collectorErrors = counter('metrics_collector_errors_total', 'Errors thrown by metric collectors');
+
+const httpDuration = histogram('http_request_duration_seconds', 'HTTP request latency by route', LATENCY_BUCKETS);
+const httpRequestSize = histogram('http_request_size_bytes', 'HTTP request body size by route', SIZE_BUCKETS);
+const httpResponseSize = histogram('http_response_size_bytes', 'HTTP response body size by route', SIZE_BUCKETS);
+
+const sqlDuration = histogram('sqlite_statement_duration_seconds', 'SQLite prepared statement execution time', SQL_BUCKETS);
+
+const cacheRequests = counter('cache_requests_total', 'Cache lookups by cache and result');
+const cacheHitRatio = gauge('cache_hit_ratio', 'Cache hit ratio since process start');
+
+/**
+ * Route label: шаблон Express route (не сырой URL - ограничиваем cardinality)
+ * @private
+ */
+function routeLabel(req, res) {
+    if (req.route) {
+        const routePath = Array.isArray(req.route.path) ? req.route.path.join('|') : req.route.path;
+        return (req.baseUrl || '') + routePath;
+    }
+    return res.statusCode === 404 ? 'unmatched' : 'static';
+}
+
+/**
+ * Express middleware: latency и размеры по route
+ */
+function middleware() {
+    return (req, res, next) => {
+        const start = process.hrtime.bigint();
+
+        res.on('finish', () => {
+            const labels = {
+                method: req.method,
+                route: routeLabel(req, res),
+                status: res.statusCode
+            };
+            const sizeLabels = { method: labels.method, route: labels.route };
+
+            httpDuration.observe(labels, Number(process.hrtime.bigint() - start) / 1e9);
+
+            const requestSize = parseInt(req.headers['content-length'], 10);
+            if (requestSize > 0) {
+                httpRequestSize.observe(sizeLabels, requestSize);
+            }
+
+            const responseSize = parseInt(res.getHeader('content-length'), 10);
+            if (responseSize >= 0) {
+                httpResponseSize.observe(sizeLabels, responseSize);
+            }
+        });
+
+        next();
+    };
+}
+
+/**
+ * Обернуть better-sqlite3 statement: run/get/all пишут тайминг в histogram
+ * @param {string} name - Имя statement (label)
+ * @param {Statement} statement - Prepared statement
+ * @returns {Object} Объект с тем же API run/get/all/iterate
+ */
+function instrumentStatement(name, statement) {
+    const labels = { statement: name };
+    const timed = (method) => (...args) => {
+        const start = process.hrtime.bigint();
+        try {
+            return statement[method](...args);
+        } finally {
+            sqlDuration.observe(labels, Number(process.hrtime.bigint() - start) / 1e9);
+        }
+    };
+
+    return {
+        run: timed('run'),
+        get: timed('get'),
+        all: timed('all'),
+        iterate: (...args) => statement.iterate(...args),
+        source: statement.source,
+        statement
+    };
+}
+
+/**
+ * Учесть обращение к кэшу
+ * @param {string} cache - Имя кэша
+ * @param {boolean} hit
+ */
+function recordCache(cache, hit) {
+    cacheRequests.inc({ cache, result: hit ? 'hit' : 'miss' });
+}
+
+registerCollector(() => {
+    const caches = new Set([...cacheRequests.values.values()].map(entry => entry.labels.cache));
+    for (const cache of caches) {
+        const hits = cacheRequests.get({ cache, result: 'hit' });
+        const total = hits + cacheRequests.get({ cache, result: 'miss' });
+        cacheHitRatio.set({ cache }, total ? hits / total : 0);
+    }
+});
+
+// ============================================================================
+// Default process metrics
+// ============================================================================
+
+let eventLoopMonitor = null;
+
+/**
+ * Включить process metrics (heap, RSS, event-loop lag)
+ */
+function startDefaultMetrics() {
+    if (eventLoopMonitor) return;
+
+    eventLoopMonitor = monitorEventLoopDelay({ resolution: 20 });
+    eventLoopMonitor.enable();
+
+    const heapUsed = gauge('nodejs_heap_used_bytes', 'V8 heap used');
+    const heapTotal = gauge('nodejs_heap_total_bytes', 'V8 heap total');
+    const external = gauge('nodejs_external_memory_bytes', 'Memory used by C++ objects bound to JS');
+    const rss = gauge('process_resident_memory_bytes', 'Resident set size');
+    const lag = gauge('nodejs_eventloop_lag_seconds', 'Event loop delay since previous scrape');
+    const uptime = gauge('process_uptime_seconds', 'Process uptime');
+
+    registerCollector(() => {
+        const memory = process.memoryUsage();
+        heapUsed.set(memory.heapUsed);
+        heapTotal.set(memory.heapTotal);
+        external.set(memory.external);
+        rss.set(memory.rss);
+        uptime.set(process.uptime());
+
+        // Histogram в наносекундах; сбрасываем - каждый scrape видит своё окно
+        lag.set({ quantile: '0.5' }, eventLoopMonitor.percentile(50) / 1e9);
+        lag.set({ quantile: '0.99' }, eventLoopMonitor.percentile(99) / 1e9);
+        lag.set({ quantile: 'max' }, eventLoopMonitor.max / 1e9);
+        eventLoopMonitor.reset();
+    });
+}
+
+function stopDefaultMetrics() {
+    if (eventLoopMonitor) {
+        eventLoopMonitor.disable();
+    }
+}
+
+module.exports = {
+    CONTENT_TYPE,
+    counter,
+    gauge,
+    histogram,
+    registerCollector,
+    render,
+    middleware,
+    instrumentStatement,
+    recordCache,
+    startDefaultMetrics,
+    stopDefaultMetrics,
+    LATENCY_BUCKETS,
+    SQL_BUCKETS,
+    SIZE_BUCKETS
+};